@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# catalog.py - Per-vendor product catalog: raw product names -> display names
+
+"""
+Product Catalog for Telegram Dispatch Bot
+
+Every vendor (Julis Spätzlerei, Leckerolls, Pommes Freunde, ...) has a stable
+menu, so display names are looked up instead of re-derived per line item:
+
+- Seed: data/product_catalog.json, {vendor: {raw name: display name}}. These
+  entries are reviewed - a display name here overrides the cleaning rules
+- Warm-up (startup): the seed is loaded and every name other workers have seen
+  (Redis) is run through utils.clean_product_name once, so ingestion is a dict
+  lookup per item
+- Unseen names fall back to clean_product_name, are added to the catalog and
+  persisted (Redis) as pending review; pending_review() lists them so the good
+  ones can be copied into the seed file (and bad ones fixed there)
+- Each entry counts how often it was ordered since startup
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis_state import redis_get_catalog_entries, redis_save_catalog_entry
+from utils import clean_product_name
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "product_catalog.json")
+PENDING_REVIEW_SHOWN = 20  # Names listed in the health check
+
+
+class ProductCatalog:
+    """Vendor -> raw product name -> [display name, reviewed, times seen]."""
+
+    def __init__(self):
+        self._vendors: Dict[str, Dict[str, list]] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    def _add(self, vendor: str, raw: str, display: str, reviewed: bool) -> None:
+        entries = self._vendors.setdefault(vendor, {})
+        current = entries.get(raw)
+        if current is not None and current[1] and not reviewed:
+            return  # Never let the rules override a reviewed name
+        entries[raw] = [display, reviewed, current[2] if current else 0]
+
+    def load_file(self, path: str = CATALOG_FILE) -> int:
+        """Load reviewed names from the seed file. Returns entries loaded."""
+        if not os.path.exists(path):
+            logger.warning(f"Product catalog file not found: {path}")
+            return 0
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        loaded = 0
+        for vendor, products in data.items():
+            for raw, display in products.items():
+                self._add(vendor, raw, display, reviewed=True)
+                loaded += 1
+        return loaded
+
+    def warm(self) -> int:
+        """Precompute display names for every name seen before (Redis). Returns entries added."""
+        learned = redis_get_catalog_entries()
+        for key in learned:
+            vendor, _, raw = key.partition("|")
+            # Re-derived, not taken from Redis: rule fixes since the name was first seen apply
+            self._add(vendor, raw, clean_product_name(raw), reviewed=False)
+        logger.info(f"Product catalog warm: {self.size()} names ({len(learned)} learned)")
+        return len(learned)
+
+    def display_name(self, vendor: Optional[str], raw: str) -> str:
+        """Display name for a line item; unseen names are cleaned by the rules and recorded for review."""
+        entries = self._vendors.get(vendor or "")
+        entry = entries.get(raw) if entries else None
+        if entry is not None:
+            self.stats["hits"] += 1
+            entry[2] += 1
+            return entry[0]
+
+        self.stats["misses"] += 1
+        display = clean_product_name(raw)
+        if not raw or not vendor:
+            return display
+        self._add(vendor, raw, display, reviewed=False)
+        self._vendors[vendor][raw][2] = 1
+        redis_save_catalog_entry(f"{vendor}|{raw}", display)
+        logger.info(f"New product for {vendor}: '{raw}' → '{display}' (pending review)")
+        return display
+
+    def pending_review(self) -> List[Tuple[str, str, str]]:
+        """(vendor, raw name, display name) of names that aren't in the seed file yet."""
+        return [
+            (vendor, raw, entry[0])
+            for vendor, entries in self._vendors.items()
+            for raw, entry in entries.items()
+            if not entry[1]
+        ]
+
+    def size(self) -> int:
+        return sum(len(entries) for entries in self._vendors.values())
+
+    def metrics(self) -> Dict[str, Any]:
+        pending = self.pending_review()
+        return {
+            "vendors": len(self._vendors),
+            "products": self.size(),
+            **self.stats,
+            "pending_review": len(pending),
+            "pending_sample": [f"{vendor}: {raw} → {display}" for vendor, raw, display in pending[:PENDING_REVIEW_SHOWN]],
+        }
+
+
+# Shared instance, seeded from the data file (warm() at startup adds learned names)
+catalog = ProductCatalog()
+catalog.load_file()
+
+
+def display_name(vendor: Optional[str], raw: str) -> str:
+    """Display name of a raw product name for this vendor (dict lookup once known)."""
+    return catalog.display_name(vendor, raw)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# commands.py - Text command registry: prefix trie, chat scopes, arguments, per-command timing
+
+"""
+Command Router for Telegram Dispatch Bot
+
+telegram_webhook used to test every message against a chain of
+text.startswith("/sched"), "/assign", "/testsm", ... - restaurant chat
+messages included. Commands are now registered once:
+
+- Matching: a character trie over the command names. Text that doesn't start
+  with "/" is rejected after one character; otherwise the longest registered
+  name the text starts with wins, so "/ocr_status" still reaches "/ocr" and
+  "/sched@DispatchBot" reaches "/sched" (same prefix semantics as before)
+- Scopes: each command lists the chats it may run in (MDG, RG, private chats,
+  other). The chat's scope comes from the function given to configure();
+  a command sent elsewhere is ignored (consumed, not run)
+- Arguments: Arg(name, type, default) per positional argument after the
+  command; a value that doesn't convert replies with the command's usage
+- Metrics: per command count, out-of-scope and failed runs, and a latency
+  histogram of the handler (coroutines are timed until they finish)
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from log_pipeline import event
+from outbound import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# --- CHAT SCOPES ---
+SCOPE_MDG = "mdg"          # Main dispatch group
+SCOPE_RG = "rg"            # Restaurant groups
+SCOPE_PRIVATE = "private"  # Private chats with the bot (couriers, admins)
+SCOPE_OTHER = "other"
+ANY_SCOPE = frozenset({SCOPE_MDG, SCOPE_RG, SCOPE_PRIVATE, SCOPE_OTHER})
+
+COMMAND_PREFIX = "/"
+COMMAND_LATENCY_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+_END = ""  # Trie key holding the command registered at a node (never a character)
+
+
+@dataclass(frozen=True)
+class Arg:
+    """Positional command argument."""
+
+    name: str
+    type: Callable[[str], Any] = str
+    default: Any = None
+
+
+@dataclass
+class CommandContext:
+    """What a handler gets: the message, its chat and the parsed arguments."""
+
+    chat_id: Optional[int]
+    message_id: Optional[int]
+    text: str
+    args: Dict[str, Any]
+    scope: str
+    msg: Dict[str, Any]
+
+
+@dataclass
+class Command:
+    name: str
+    handler: Callable[[CommandContext], Optional[Awaitable[Any]]]
+    scopes: FrozenSet[str] = ANY_SCOPE
+    args: Tuple[Arg, ...] = ()
+    usage: Optional[str] = None
+    count: int = 0
+    out_of_scope: int = 0
+    errors: int = 0
+    latency: LatencyHistogram = field(default_factory=lambda: LatencyHistogram(COMMAND_LATENCY_BUCKETS))
+
+    def parse_args(self, text: str) -> Dict[str, Any]:
+        """Positional arguments after the command word. Raises ValueError if one doesn't convert."""
+        values = text.split()[1:]
+        return {
+            arg.name: arg.type(values[i]) if i < len(values) else arg.default
+            for i, arg in enumerate(self.args)
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        latency = self.latency.snapshot()
+        return {
+            "count": self.count,
+            "out_of_scope": self.out_of_scope,
+            "errors": self.errors,
+            "avg_ms": latency["avg_ms"],
+            "p50_le": latency["p50_le"],
+            "p95_le": latency["p95_le"],
+        }
+
+
+class CommandRouter:
+    """Registered text commands, matched through a prefix trie."""
+
+    def __init__(self):
+        self.commands: Dict[str, Command] = {}
+        self._trie: Dict[str, Any] = {}
+        self._scope_of: Callable[[Dict[str, Any]], str] = lambda msg: SCOPE_OTHER
+        self._run: Callable[[Awaitable[Any]], Any] = asyncio.ensure_future
+        self._reply: Optional[Callable[[int, str], Awaitable[Any]]] = None
+        self.stats: Dict[str, int] = {"messages": 0, "commands": 0, "unknown": 0}
+
+    def configure(self, scope_of: Callable[[Dict[str, Any]], str], run: Callable[[Awaitable[Any]], Any],
+                  reply: Optional[Callable[[int, str], Awaitable[Any]]] = None) -> None:
+        """Chat -> scope function, how to schedule handler coroutines, and how to send usage replies."""
+        self._scope_of = scope_of
+        self._run = run
+        self._reply = reply
+
+    def register(self, name: str, handler: Callable[[CommandContext], Optional[Awaitable[Any]]],
+                 scopes: Iterable[str] = ANY_SCOPE, args: Iterable[Arg] = (), usage: Optional[str] = None) -> Command:
+        """Add a command ("/name"); handlers may return a coroutine, which is scheduled and timed."""
+        if not name.startswith(COMMAND_PREFIX) or len(name) < 2:
+            raise ValueError(f"Command names start with '{COMMAND_PREFIX}': {name!r}")
+        command = Command(name, handler, frozenset(scopes), tuple(args), usage)
+        node = self._trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[_END] = command
+        self.commands[name] = command
+        return command
+
+    def match(self, text: str) -> Optional[Command]:
+        """Command with the longest name that text starts with (None for plain messages)."""
+        if not text or text[0] != COMMAND_PREFIX:
+            return None
+        node, found = self._trie, None
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(_END, found)
+        return found
+
+    def dispatch(self, msg: Dict[str, Any]) -> bool:
+        """Run the command in a message. True if the message was a command (run, refused or answered with usage)."""
+        self.stats["messages"] += 1
+        text = msg.get("text") or ""
+        command = self.match(text)
+        if command is None:
+            if text[:1] == COMMAND_PREFIX:
+                self.stats["unknown"] += 1
+            return False
+
+        self.stats["commands"] += 1
+        chat_id = (msg.get("chat") or {}).get("id")
+        scope = self._scope_of(msg)
+        event(logger, "command", command=command.name, chat_id=chat_id, scope=scope)
+        if scope not in command.scopes:
+            command.out_of_scope += 1
+            logger.info(f"Ignored {command.name} in {scope} chat {chat_id} (allowed: {', '.join(sorted(command.scopes))})")
+            return True
+
+        try:
+            args = command.parse_args(text)
+        except ValueError:
+            command.errors += 1
+            if self._reply and command.usage and chat_id is not None:
+                self._run(self._reply(chat_id, f"❌ Invalid command. Usage: {command.usage}"))
+            return True
+
+        ctx = CommandContext(chat_id, msg.get("message_id"), text, args, scope, msg)
+        start = time.perf_counter()
+        try:
+            result = command.handler(ctx)
+        except Exception as e:
+            command.count += 1
+            command.errors += 1
+            command.latency.observe(time.perf_counter() - start)
+            logger.error(f"Command {command.name} failed: {e}")
+            logger.exception(e)
+            return True
+        if asyncio.iscoroutine(result):
+            self._run(self._timed(command, result, start))
+        else:
+            command.count += 1
+            command.latency.observe(time.perf_counter() - start)
+        return True
+
+    async def _timed(self, command: Command, coro: Awaitable[Any], start: float) -> Any:
+        try:
+            return await coro
+        except Exception as e:
+            command.errors += 1
+            logger.error(f"Command {command.name} failed: {e}")
+            logger.exception(e)
+        finally:
+            command.count += 1
+            command.latency.observe(time.perf_counter() - start)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "per_command": {name: cmd.metrics() for name, cmd in self.commands.items() if cmd.count or cmd.out_of_scope},
+        }
+
+
+# Shared instance: main.py registers its commands and calls configure()
+router = CommandRouter()
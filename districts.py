@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# districts.py - Non-blocking district resolution with a persistent shared cache
+
+"""
+District Resolution for Telegram Dispatch Bot
+
+The MDG details view shows the customer's district (🏙️ Innstadt (94032)).
+Looking it up used to be a synchronous Google Geocoding request inside
+build_mdg_dispatch_text, stalling the event loop for up to 5s on a miss.
+
+- prefetch(order) is called at order ingestion: a cached district is written to
+  order["district"] right away, otherwise the lookup runs in a worker thread
+- Rendering never waits: a pending district is simply left out, and once the
+  lookup finishes the on_resolved hook (main.py) re-edits MDG-ORD if the
+  details view is open
+- Streets in the offline gazetteer (gazetteer.py) resolve without any lookup;
+  the geocoder is only asked for the rest, and its answers are written back
+  to the gazetteer so the next order to that address resolves offline too
+- Results are cached in memory (LRU) and in Redis (TTL), shared by all workers
+  and kept across restarts; concurrent lookups of one address are merged
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from gazetteer import gazetteer
+from redis_state import redis_get_district, redis_save_district
+
+logger = logging.getLogger(__name__)
+
+# Google Maps API key for district detection (optional)
+GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
+
+DISTRICT_CACHE_SIZE = 2000                 # Addresses kept in memory
+DISTRICT_TTL_SECONDS = 90 * 24 * 3600      # Districts don't move; re-check quarterly
+NO_DISTRICT_TTL_SECONDS = 24 * 3600        # Retry "not found" / API errors daily
+GEOCODE_TIMEOUT = 5                        # Seconds per Geocoding API request
+
+_MISSING = object()
+
+# Hook run with the order_id after a pending lookup resolved (set by main.py)
+_on_resolved: Optional[Callable[[str], Awaitable[None]]] = None
+
+
+def configure(on_resolved: Callable[[str], Awaitable[None]]) -> None:
+    """Register the coroutine called with order_id once its district is known."""
+    global _on_resolved
+    _on_resolved = on_resolved
+
+
+def _address_key(address: str) -> str:
+    """Normalize an address for cache keys (case and whitespace insensitive)."""
+    return " ".join(address.lower().split())
+
+
+def geocode_district(address: str) -> Optional[str]:
+    """
+    Determine district/neighborhood from address using Google Maps Geocoding API.
+
+    Blocking HTTP call - only run it in a worker thread (see resolve()).
+
+    Args:
+        address: Full address string (e.g., "Lederergasse 15, Passau 94032")
+
+    Returns:
+        District name (e.g., "Innstadt") or None if not found/unavailable
+
+    Raises:
+        requests.RequestException on network/HTTP errors
+    """
+    logger.info(f"Querying Google Maps for district: '{address}'")
+
+    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    params = {
+        "address": f"{address}, Passau, Germany",
+        "key": GOOGLE_MAPS_API_KEY,
+        "language": "de"
+    }
+
+    response = requests.get(url, params=params, timeout=GEOCODE_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("status") != "OK":
+        logger.warning(f"Google Maps API error: {data.get('status')}")
+        return None
+
+    results = data.get("results", [])
+    if not results:
+        logger.warning(f"No results from Google Maps for: {address}")
+        return None
+
+    # Look for sublocality/neighborhood in components (most specific districts)
+    for component in results[0].get("address_components", []):
+        types = component.get("types", [])
+        if any(t in types for t in ["sublocality", "sublocality_level_1", "sublocality_level_2", "neighborhood"]):
+            name = component.get("long_name")
+            if name:
+                logger.info(f"District found: '{name}' for address '{address}'")
+                return name
+
+    logger.info(f"No district/sublocality found for: {address}")
+    return None
+
+
+class DistrictResolver:
+    """Memory LRU + Redis TTL cache in front of the geocoder, with merged in-flight lookups."""
+
+    def __init__(self, max_entries: int = DISTRICT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiting: Dict[str, List[Tuple[Dict[str, Any], Optional[str]]]] = {}
+        self.stats: Dict[str, int] = {"gazetteer_hits": 0, "memory_hits": 0, "redis_hits": 0, "lookups": 0, "errors": 0, "merged": 0}
+
+    def _remember(self, key: str, district: Optional[str]) -> None:
+        self._memory[key] = district
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def cached(self, address: str) -> Any:
+        """District from the gazetteer, memory or Redis without any network call to Google (_MISSING if unknown)."""
+        district = gazetteer.lookup(address)
+        if district:
+            self.stats["gazetteer_hits"] += 1
+            return district
+        key = _address_key(address)
+        district = self._memory.get(key, _MISSING)
+        if district is not _MISSING:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return district
+        stored = redis_get_district(key)
+        if stored is not None:
+            self.stats["redis_hits"] += 1
+            self._remember(key, stored.get("district"))
+            return stored.get("district")
+        return _MISSING
+
+    async def resolve(self, address: str) -> Optional[str]:
+        """Cached district, or geocode it off the event loop (one request per address at a time)."""
+        district = self.cached(address)
+        if district is not _MISSING:
+            return district
+        if not GOOGLE_MAPS_API_KEY:
+            self._remember(_address_key(address), None)
+            return None
+
+        key = _address_key(address)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["merged"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats["lookups"] += 1
+            try:
+                district = await asyncio.to_thread(geocode_district, address)
+                ttl = DISTRICT_TTL_SECONDS if district else NO_DISTRICT_TTL_SECONDS
+            except Exception as e:
+                logger.error(f"Error calling Google Maps API: {e}")
+                self.stats["errors"] += 1
+                district, ttl = None, NO_DISTRICT_TTL_SECONDS
+            self._remember(key, district)
+            redis_save_district(key, district, ttl)
+            if district:
+                gazetteer.learn(address, None, district)
+            future.set_result(district)
+            return district
+        finally:
+            self._inflight.pop(key, None)
+
+    def prefetch(self, order: Dict[str, Any]) -> None:
+        """
+        Fill order["district"] from cache, or start a background lookup.
+
+        The key stays absent while the lookup is pending; the on_resolved hook
+        runs for the order once it completes.
+        """
+        if "district" in order:
+            return
+        customer = order.get("customer", {})
+        address = customer.get("original_address") or customer.get("address")
+        if not address:
+            order["district"] = None
+            return
+
+        district = self.cached(address)
+        if district is not _MISSING:
+            order["district"] = district
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (e.g. sync tests) - retried on the next render
+        key = _address_key(address)
+        waiting = self._waiting.setdefault(key, [])
+        if any(o is order for o, _ in waiting):
+            return
+        waiting.append((order, order.get("order_id")))
+        if len(waiting) == 1:
+            loop.create_task(self._resolve_and_notify(key, address))
+
+    async def _resolve_and_notify(self, key: str, address: str) -> None:
+        district = await self.resolve(address)
+        for order, order_id in self._waiting.pop(key, []):
+            order["district"] = district
+            if district and order_id and _on_resolved:
+                try:
+                    await _on_resolved(order_id)
+                except Exception as e:
+                    logger.error(f"Error refreshing order {order_id} after district lookup: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Cache size, hit counters and pending lookups for the health check."""
+        return {"cached": len(self._memory), "pending": len(self._waiting), **self.stats,
+                "gazetteer": gazetteer.metrics()}
+
+
+# Shared instance
+resolver = DistrictResolver()
+
+
+def prefetch(order: Dict[str, Any]) -> None:
+    """Resolve the order's district in the background (call at order ingestion)."""
+    resolver.prefetch(order)
+
+
+def get_order_district(order: Dict[str, Any]) -> Optional[str]:
+    """District for rendering: never blocks; starts a lookup if none is known yet."""
+    resolver.prefetch(order)
+    return order.get("district")
+
+
+def metrics() -> Dict[str, Any]:
+    return resolver.metrics()
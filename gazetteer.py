@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# gazetteer.py - Offline Passau street -> district lookup
+
+"""
+Street Gazetteer for Telegram Dispatch Bot
+
+Most Passau orders go to a small set of streets, so districts are looked up
+offline first and the Google geocoder (districts.py) is only asked for misses.
+
+- Seed data: data/passau_districts.csv (street, zip, optional house number range)
+- Index: character trie over normalized street names. Lookups walk the address
+  once and take the longest street that ends at a word boundary, so
+  "Lederergasse 15a, 2. OG" finds "lederergasse"
+- Normalization folds the spellings abbreviate_street deals with:
+  Straße / Strasse / Str. / Str, Doktor / Dr., Sankt / St., hyphens, case
+- Geocoder results are learned per address (street, zip, house number) and
+  persisted in Redis, so every worker knows the address from then on. A single
+  geocoded point says nothing about the rest of a street that crosses a
+  district border, so learning never creates whole-street entries
+"""
+
+import csv
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis_state import redis_get_gazetteer_entries, redis_save_gazetteer_entry
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "passau_districts.csv")
+
+_ZIP_RE = re.compile(r"\b(9\d{4})\b")
+_HOUSE_RE = re.compile(r"^\s*(\d+)")
+_SEPARATORS_RE = re.compile(r"[\s.\-/]+")
+_WORD_RULES = [
+    (re.compile(r"str\b"), "strasse"),      # "innstr" / "innstr." -> "innstrasse", "neuburger str" -> "neuburger strasse"
+    (re.compile(r"\bdoktor\b"), "dr"),
+    (re.compile(r"\bsankt\b"), "st"),
+]
+
+_END = ""  # Trie key holding the entries of a complete street name
+
+
+def normalize_street(text: str) -> str:
+    """Canonical street spelling: lowercase, ß→ss, Str./Straße→strasse, separators→single space."""
+    text = text.lower().replace("ß", "ss")
+    text = _SEPARATORS_RE.sub(" ", text).strip()
+    for pattern, replacement in _WORD_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class Gazetteer:
+    """Character trie of normalized street names -> [(zip, house_from, house_to, district)]."""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+        self.streets = 0
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "learned": 0}
+
+    def add(self, street: str, zip_code: Optional[str], district: str,
+            house_from: Optional[int] = None, house_to: Optional[int] = None) -> None:
+        """Index one street (optionally restricted to a zip code / house number range)."""
+        node = self._root
+        for char in normalize_street(street):
+            node = node.setdefault(char, {})
+        entries = node.get(_END)
+        if entries is None:
+            entries = node[_END] = []
+            self.streets += 1
+        entry = (zip_code or None, house_from, house_to, district)
+        if entry not in entries:
+            entries.append(entry)
+
+    def load_file(self, path: str = GAZETTEER_FILE) -> int:
+        """Load seed data from CSV (lines starting with # are comments). Returns rows loaded."""
+        if not os.path.exists(path):
+            logger.warning(f"Gazetteer file not found: {path}")
+            return 0
+        loaded = 0
+        with open(path, encoding="utf-8") as f:
+            for row in csv.reader(line for line in f if line.strip() and not line.startswith("#")):
+                if len(row) < 5:
+                    logger.warning(f"Skipping malformed gazetteer row: {row}")
+                    continue
+                street, zip_code, house_from, house_to, district = (cell.strip() for cell in row[:5])
+                self.add(street, zip_code, district,
+                         int(house_from) if house_from else None,
+                         int(house_to) if house_to else None)
+                loaded += 1
+        return loaded
+
+    def load_learned(self) -> int:
+        """Add addresses learned from the geocoder by any worker (Redis). Returns entries loaded."""
+        loaded = 0
+        for key, district in redis_get_gazetteer_entries().items():
+            street, zip_code, house = (key.split("|") + [""])[:3]
+            if not house.isdigit():
+                continue  # Whole-street entry written before learning was per address
+            self.add(street, zip_code, district, int(house), int(house))
+            loaded += 1
+        return loaded
+
+    def learn(self, address: str, zip_code: Optional[str], district: str) -> None:
+        """Write a geocoder result back: index this house number only and persist it for other workers."""
+        street = self._street_part(address)
+        house_match = _HOUSE_RE.match(address.split(",")[0][len(street):])
+        if not street or not house_match:
+            return
+        house = int(house_match.group(1))
+        zip_code = zip_code or self._zip(address)
+        self.add(street, zip_code, district, house, house)
+        redis_save_gazetteer_entry(f"{normalize_street(street)}|{zip_code or ''}|{house}", district)
+        self.stats["learned"] += 1
+
+    @staticmethod
+    def _zip(address: str) -> Optional[str]:
+        match = _ZIP_RE.search(address)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _street_part(address: str) -> str:
+        """Street name without house number / city ("Lederergasse 15, Passau" -> "Lederergasse")."""
+        street = address.split(",")[0]
+        return re.split(r"\s\d", street, maxsplit=1)[0].strip()
+
+    def _longest_match(self, text: str) -> Tuple[Optional[List[tuple]], str]:
+        """Walk the trie along text; return entries of the longest street ending at a word boundary."""
+        node = self._root
+        best: Optional[List[tuple]] = None
+        rest = text
+        for i, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            if _END in node and (i + 1 == len(text) or not text[i + 1].isalpha()):
+                best, rest = node[_END], text[i + 1:]
+        return best, rest
+
+    def lookup(self, address: str, zip_code: Optional[str] = None) -> Optional[str]:
+        """
+        District for an address, or None if the street isn't indexed.
+
+        Args:
+            address: Address as entered ("Lederergasse 15, Passau 94032")
+            zip_code: ZIP if stored separately (Smoothr orders)
+        """
+        if not address:
+            return None
+        entries, rest = self._longest_match(normalize_street(address.split(",")[0]))
+        if not entries:
+            self.stats["misses"] += 1
+            return None
+
+        zip_code = zip_code or self._zip(address)
+        house_match = _HOUSE_RE.match(rest)
+        house = int(house_match.group(1)) if house_match else None
+
+        best = None
+        for entry_zip, house_from, house_to, district in entries:
+            if zip_code and entry_zip and entry_zip != zip_code:
+                continue
+            if house_from is not None or house_to is not None:
+                if house is None or not ((house_from or 0) <= house <= (house_to or house)):
+                    continue
+                best = district  # A matching house number range beats a whole-street entry
+                break
+            best = best or district
+        self.stats["hits" if best else "misses"] += 1
+        return best
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"streets": self.streets, **self.stats}
+
+
+# Shared instance, seeded from the data file (learned entries are added at startup)
+gazetteer = Gazetteer()
+gazetteer.load_file()
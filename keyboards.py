@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# keyboards.py - Precomputed inline keyboard templates
+
+"""
+Keyboard Templates for Telegram Dispatch Bot
+
+Time pickers and exact-time grids (mdg.time_picker_keyboard, exact_time_keyboard,
+exact_hour_keyboard, rg.vendor_exact_time_keyboard, vendor_exact_hour_keyboard)
+have a layout that depends only on the time bucket (current minute / hour),
+vendor and action. Only the order id differs between orders.
+
+A KeyboardTemplate holds that layout with every label and callback string
+precomputed (callbacks split around the order id), so building a keyboard for
+a click is one pass that stamps the order id in. Buttons that don't carry the
+order id (e.g. "← Back" → hide) are built once and shared, since
+InlineKeyboardButton is immutable. Constructing PTB buttons dominates the cost
+of a keyboard, so the last few stamped keyboards per template are kept as well:
+reopening the same picker for the same order (hours → minutes → back) within a
+time bucket returns the already built markup.
+
+Templates are cached per (bucket, vendor, action) by the lru_cache'd builders
+in mdg.py / rg.py.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple, Union
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+ORDER_ID = "\x00"  # Placeholder for the order id in template callback data
+TEMPLATE_CACHE_SIZE = 512  # Per builder: time buckets × vendors × actions in use
+STAMPED_PER_TEMPLATE = 16  # Built keyboards kept per template (orders with the picker open)
+
+_Cell = Union[InlineKeyboardButton, Tuple[str, str, str]]
+
+
+class KeyboardTemplate:
+    """Keyboard layout with the order id left open in callback data."""
+
+    __slots__ = ("rows", "_stamped")
+
+    def __init__(self, rows: Sequence[Sequence[Tuple[str, str]]]):
+        """
+        Args:
+            rows: Rows of (label, callback_data) pairs; callback_data may contain ORDER_ID once
+        """
+        compiled: List[Tuple[_Cell, ...]] = []
+        for row in rows:
+            cells: List[_Cell] = []
+            for label, callback in row:
+                if ORDER_ID in callback:
+                    prefix, suffix = callback.split(ORDER_ID, 1)
+                    cells.append((label, prefix, suffix))
+                else:
+                    cells.append(InlineKeyboardButton(label, callback_data=callback))
+            compiled.append(tuple(cells))
+        self.rows: Tuple[Tuple[_Cell, ...], ...] = tuple(compiled)
+        self._stamped: "OrderedDict[str, InlineKeyboardMarkup]" = OrderedDict()
+
+    def stamp(self, order_id: str) -> InlineKeyboardMarkup:
+        """Build (or reuse) the keyboard for one order."""
+        markup = self._stamped.get(order_id)
+        if markup is not None:
+            self._stamped.move_to_end(order_id)
+            return markup
+        markup = InlineKeyboardMarkup([
+            [
+                cell if isinstance(cell, InlineKeyboardButton)
+                else InlineKeyboardButton(cell[0], callback_data=cell[1] + order_id + cell[2])
+                for cell in row
+            ]
+            for row in self.rows
+        ])
+        self._stamped[order_id] = markup
+        if len(self._stamped) > STAMPED_PER_TEMPLATE:
+            self._stamped.popitem(last=False)
+        return markup
+
+
+def grid(cells: Sequence[Tuple[str, str]], per_row: int) -> List[List[Tuple[str, str]]]:
+    """Split (label, callback) cells into rows of `per_row`."""
+    return [list(cells[i:i + per_row]) for i in range(0, len(cells), per_row)]
+
+
+def add_minutes(hhmm: Tuple[int, int], minutes: int) -> str:
+    """(hour, minute) + minutes as "HH:MM", wrapping past midnight."""
+    total = (hhmm[0] * 60 + hhmm[1] + minutes) % (24 * 60)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def optional_suffix(value: Optional[str]) -> str:
+    """"|value" for callbacks with an optional trailing field, "" otherwise."""
+    return f"|{value}" if value else ""
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+# log_pipeline.py - Structured, queue-based logging with per-category levels, sampling and rate limits
+
+"""
+Log Pipeline for Telegram Dispatch Bot
+
+Every Telegram update used to log a dozen INFO lines (plus stderr prints on
+every send), each formatted and written to stdout synchronously by the
+request thread. Logging now goes through one pipeline:
+
+- Structured records: event(logger, "update", chat_id=..., text=...) logs one
+  line with key=value fields instead of one line per field. LOG_FORMAT picks
+  the output: "kv" (default, logfmt), "json" (one object per line) or "text"
+  (the previous "time - name - level - message" layout, fields appended)
+- Async output: callers only put the record on a bounded queue; a listener
+  thread formats and writes it. When the queue is full, records below WARNING
+  are dropped and counted instead of blocking a webhook; WARNING and above
+  are written synchronously instead
+- Categories are logger names ("main.updates", "outbound", ...). LOG_LEVELS
+  sets levels per category, e.g. "main.updates=WARNING,outbound=DEBUG"
+- Sampling: LOG_SAMPLE="main.updates=10" keeps 1 in 10 records of a category
+  (kept records carry sampled=10)
+- Rate limits: LOG_RATE_LIMITS="utils.send=5" caps a category at 5 records/s;
+  DEBUG records of every category are capped at DEBUG_RATE_PER_SEC. Suppressed
+  records are counted per category (health check)
+
+WARNING and above are never sampled, rate limited or dropped.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, TextIO, Tuple
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "kv")          # kv | json | text
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")            # category=LEVEL,...
+LOG_SAMPLE = os.environ.get("LOG_SAMPLE", "")            # category=N,... (keep 1 in N)
+LOG_RATE_LIMITS = os.environ.get("LOG_RATE_LIMITS", "")  # category=records per second,...
+LOG_QUEUE_SIZE = 10_000     # Records waiting for the writer thread before new ones are dropped
+DEBUG_RATE_PER_SEC = 20.0   # Default cap for DEBUG records, per category
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes that aren't structured fields
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "fields", "sampled"}
+
+
+def parse_spec(spec: str) -> Dict[str, str]:
+    """"a=1,b.c=2" -> {"a": "1", "b.c": "2"} (malformed parts ignored)."""
+    result = {}
+    for part in spec.split(","):
+        name, sep, value = part.partition("=")
+        if sep and name.strip() and value.strip():
+            result[name.strip()] = value.strip()
+    return result
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """Structured fields of a record: event() fields, then any extra= attributes."""
+    fields = dict(getattr(record, "fields", None) or {})
+    for key, value in vars(record).items():
+        if key not in _RESERVED and not key.startswith("_"):
+            fields.setdefault(key, value)
+    sampled = getattr(record, "sampled", None)
+    if sampled:
+        fields["sampled"] = sampled
+    return fields
+
+
+def _kv_value(value: Any) -> str:
+    text = value if isinstance(value, str) else str(value)
+    if text and not any(c in text for c in ' "=\n\t'):
+        return text
+    return json.dumps(text, ensure_ascii=False)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """logfmt: time=... level=INFO logger=main msg="..." key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            f"time={datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+            f"msg={_kv_value(record.getMessage())}",
+        ]
+        parts.extend(f"{key}={_kv_value(value)}" for key, value in record_fields(record).items())
+        exc = self._exception_text(record)
+        if exc:
+            parts.append(f"exc={_kv_value(exc)}")
+        return " ".join(parts)
+
+    def _exception_text(self, record: logging.LogRecord) -> Optional[str]:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        return record.exc_text
+
+
+class JsonFormatter(KeyValueFormatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **record_fields(record),
+        }
+        exc = self._exception_text(record)
+        if exc:
+            entry["exc"] = exc
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The previous human-readable layout, with structured fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        fields = record_fields(record)
+        line = super().formatMessage(record)
+        if not fields:
+            return line
+        return line + "".join(f" {key}={_kv_value(value)}" for key, value in fields.items())
+
+
+FORMATTERS = {"kv": KeyValueFormatter, "json": JsonFormatter, "text": TextFormatter}
+
+
+class CategoryLimiter(logging.Filter):
+    """Sampling and rate limits per category (logger name prefix) for records below WARNING."""
+
+    def __init__(self, sample: Optional[Dict[str, int]] = None, rates: Optional[Dict[str, float]] = None,
+                 debug_rate: float = DEBUG_RATE_PER_SEC):
+        super().__init__()
+        self.sample = dict(sample or {})
+        self.rates = dict(rates or {})
+        self.debug_rate = debug_rate
+        self.suppressed: Dict[str, int] = {}
+        self._counters: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[str, bool], list] = {}  # (category, debug) -> [tokens, last refill]
+        self._resolved: Dict[Tuple[str, bool], Tuple[str, int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _rule(self, name: str, debug: bool) -> Tuple[str, int, float]:
+        """(category, keep 1 in N, records/s or 0) for a logger name; most specific category wins."""
+        key = (name, debug)
+        rule = self._resolved.get(key)
+        if rule is None:
+            category, n, rate = name, 1, 0.0
+            prefix = name
+            while prefix:
+                if prefix in self.sample or prefix in self.rates:
+                    category = prefix
+                    n = self.sample.get(prefix, 1)
+                    rate = self.rates.get(prefix, 0.0)
+                    break
+                prefix = prefix.rpartition(".")[0]
+            if debug and self.debug_rate and (not rate or self.debug_rate < rate):
+                rate = self.debug_rate
+            rule = self._resolved[key] = (category, max(1, int(n)), rate)
+        return rule
+
+    def _allow_rate(self, key: Tuple[str, bool], rate: float) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [max(1.0, rate), now]
+        bucket[0] = min(max(1.0, rate), bucket[0] + (now - bucket[1]) * rate)  # Burst: one second worth
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        debug = record.levelno <= logging.DEBUG
+        category, n, rate = self._rule(record.name, debug)
+        if n == 1 and not rate:
+            return True
+        with self._lock:
+            if n > 1:
+                count = self._counters.get(category, 0)
+                self._counters[category] = count + 1
+                if count % n:
+                    self.suppressed[category] = self.suppressed.get(category, 0) + 1
+                    return False
+                record.sampled = n
+            if rate and not self._allow_rate((category, debug), rate):
+                self.suppressed[category] = self.suppressed.get(category, 0) + 1
+                return False
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Puts records on a bounded queue without formatting them.
+
+    Full queue: records below WARNING are dropped and counted, WARNING and
+    above go straight through the overflow handler (the writer) instead.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: Optional[logging.Handler] = None):
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve %-args and tracebacks now (they may change or go away); formatting happens in the writer
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            overflow = self.overflow or logging.lastResort
+            if overflow:
+                overflow.handle(record)  # Synchronous, but errors under load must not get lost
+
+
+class LogPipeline:
+    """Root logging setup: filtered queue handler in front, one writer thread behind."""
+
+    def __init__(self):
+        self.handler: Optional[AsyncQueueHandler] = None
+        self.limiter: Optional[CategoryLimiter] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.format = LOG_FORMAT
+
+    def configure(self, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, levels: str = LOG_LEVELS,
+                  sample: str = LOG_SAMPLE, rate_limits: str = LOG_RATE_LIMITS, stream: TextIO = None,
+                  queue_size: int = LOG_QUEUE_SIZE, debug_rate: float = DEBUG_RATE_PER_SEC) -> None:
+        """Install the pipeline on the root logger (replaces existing root handlers; safe to call again)."""
+        self.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(level.upper())
+        for category, category_level in parse_spec(levels).items():
+            logging.getLogger(category).setLevel(category_level.upper())
+
+        self.format = fmt if fmt in FORMATTERS else "kv"
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(FORMATTERS[self.format]())
+
+        self.limiter = CategoryLimiter(
+            sample={name: int(n) for name, n in parse_spec(sample).items() if n.isdigit()},
+            rates={name: float(rate) for name, rate in parse_spec(rate_limits).items() if _is_number(rate)},
+            debug_rate=debug_rate,
+        )
+        self.handler = AsyncQueueHandler(queue.Queue(queue_size), overflow=writer)
+        self.handler.addFilter(self.limiter)
+        root.addHandler(self.handler)
+        self.listener = logging.handlers.QueueListener(self.handler.queue, writer)
+        self.listener.start()
+
+    def flush(self) -> None:
+        """Block until every queued record is written (stop + restart the writer)."""
+        if self.listener:
+            self.listener.stop()
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Write what's queued and stop the writer thread."""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+        if self.handler:
+            logging.getLogger().removeHandler(self.handler)
+            self.handler = None
+
+    def metrics(self) -> Dict[str, Any]:
+        if not self.handler:
+            return {"configured": False}
+        return {
+            "format": self.format,
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "suppressed": dict(self.limiter.suppressed),
+        }
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def event(logger: logging.Logger, name: str, level: int = logging.INFO, **fields: Any) -> None:
+    """Log one structured record: message name plus key=value fields (nothing is built when the level is off)."""
+    if logger.isEnabledFor(level):
+        logger.log(level, name, extra={"fields": fields})
+
+
+# Shared instance (configure() at startup in main.py); queued records are written on exit
+pipeline = LogPipeline()
+atexit.register(pipeline.stop)
+
+
+def configure(**kwargs: Any) -> None:
+    """Install the log pipeline on the root logger (settings from the LOG_* environment variables)."""
+    pipeline.configure(**kwargs)
+
+
+def metrics() -> Dict[str, Any]:
+    return pipeline.metrics()
@@ -18,6 +18,7 @@
 # =============================================================================
 
 import os
+import re
 import json
 import hmac
 import hashlib
@@ -31,9 +32,21 @@ from zoneinfo import ZoneInfo
 from typing import Dict, Any, List, Optional
 from flask import Flask, request, jsonify
 from telegram import Bot, InlineKeyboardMarkup, InlineKeyboardButton
-import tempfile
 import ocr
-from telegram.constants import ParseMode
+import ocr_cache
+import ocr_pipeline
+import commands
+import same_time
+import districts
+import outbound
+from gazetteer import gazetteer
+from catalog import catalog
+from shopify import normalize_order
+import log_pipeline
+import render_cache
+import timers
+from log_pipeline import event
+from outbound import PRIORITY_HIGH, PRIORITY_LOW, fan_out
 from telegram.request import HTTPXRequest
 from telegram.error import TelegramError, TimedOut, NetworkError
 
@@ -73,19 +86,19 @@ from rg import (
 )
 import upc
 from upc import check_all_vendors_confirmed, mdg_assignment_keyboard, courier_selection_keyboard
-from utils import clean_product_name, RESTAURANT_SHORTCUTS
+from utils import RESTAURANT_SHORTCUTS, safe_send_message, safe_edit_message, safe_delete_message, send_status_message
 
 # --- CONFIGURATION CONSTANTS ---
 # Order tracking and logging limits
 RECENT_ORDERS_MAX_SIZE = 50   # Maximum number of recent orders to keep for "same time as" feature
 LOG_MESSAGE_TRUNCATE_LENGTH = 200  # Truncate long log messages to this length
+SPAM_RE = re.compile(r'(?i:foxy|airdrop)|t\.me/')  # Potential spam: one scan instead of upper()/lower() copies
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (structured records, written by a background thread - see log_pipeline.py)
+log_pipeline.configure()
 logger = logging.getLogger(__name__)
+update_log = logging.getLogger(f"{__name__}.updates")      # One record per incoming update
+callback_log = logging.getLogger(f"{__name__}.callbacks")  # One record per button press
 
 # --- FLASK APP SETUP ---
 app = Flask(__name__)
@@ -199,19 +212,37 @@ def run_async(coro):
     asyncio.run_coroutine_threadsafe(coro, loop)
 
 
-def validate_phone(phone: str) -> Optional[str]:
-    """Validate and format phone number for tel: links."""
-    if not phone or phone == "N/A":
-        return None
+outbound.configure(bot)  # Bot used for batched deleteMessages calls
+
+# Re-arm auto-delete timers persisted before the last restart
+timers.load_pending()
+run_async(timers.start())
+
+# Warm the courier roster so the first "Assign to 👉" doesn't wait on getChatAdministrators
+run_async(upc.courier_roster.refresh(bot))
+
+
+async def refresh_mdg_district(order_id: str):
+    """Re-edit MDG-ORD once a background district lookup finishes (shown in the details view only)."""
+    order = STATE.get(order_id)
+    if not order or not order.get("mdg_expanded") or not order.get("mdg_message_id"):
+        return
+    from mdg import build_mdg_dispatch_text, mdg_initial_keyboard
+    await safe_edit_message(
+        DISPATCH_MAIN_CHAT_ID,
+        order["mdg_message_id"],
+        build_mdg_dispatch_text(order, show_details=True),
+        mdg_initial_keyboard(order, state=STATE)
+    )
+
 
-    import re
+districts.configure(refresh_mdg_district)
 
-    cleaned = re.sub(r'[^\d+\s]', '', phone).strip()
-    digits_only = re.sub(r'\D', '', cleaned)
-    if len(digits_only) < 7:
-        return None
+# Streets other workers learned from the geocoder resolve offline here too
+gazetteer.load_learned()
 
-    return cleaned
+# Product names other workers have seen get their display name computed once, up front
+catalog.warm()
 
 
 def should_use_address_format(order: Dict, vendor: Optional[str] = None) -> bool:
@@ -270,98 +301,6 @@ def verify_webhook(raw: bytes, hmac_header: str) -> bool:
         return False
 
 
-def fmt_address(addr: Dict[str, Any]) -> str:
-    """Format address - only street, building number and zip code (no city!)."""
-    if not addr:
-        return "No address provided"
-
-    try:
-        parts = []
-        if addr.get("address1"):
-            parts.append(addr["address1"])
-        if addr.get("zip"):
-            parts.append(addr["zip"])
-        return ", ".join(parts) if parts else "Address incomplete"
-    except Exception as exc:
-        logger.error(f"Address formatting error: {exc}")
-        return "Address formatting error"
-
-
-# --- ASYNC UTILITY FUNCTIONS ---
-async def safe_send_message(chat_id: int, text: str, reply_markup=None, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True):
-    """Send message with error handling and retry logic"""
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Send message attempt {attempt + 1}")
-            return await bot.send_message(
-                chat_id=chat_id, 
-                text=text, 
-                reply_markup=reply_markup, 
-                parse_mode=parse_mode,
-                disable_web_page_preview=disable_web_page_preview
-            )
-        except Exception as e:
-            logger.error(f"Send message attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(2 ** attempt)
-                continue
-            else:
-                logger.error(f"Failed to send message after {max_retries} attempts: {e}")
-                raise
-
-async def safe_edit_message(chat_id: int, message_id: int, text: str, reply_markup=None, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True):
-    """Edit message with error handling"""
-    try:
-        await bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=text,
-            reply_markup=reply_markup,
-            parse_mode=parse_mode,
-            disable_web_page_preview=disable_web_page_preview
-        )
-    except Exception as e:
-        logger.error(f"Error editing message: {e}")
-
-async def safe_delete_message(chat_id: int, message_id: int):
-    """Delete message with error handling"""
-    try:
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"Successfully deleted message {message_id}")
-    except Exception as e:
-        logger.error(f"Error deleting message {message_id}: {e}")
-
-async def send_status_message(chat_id: int, text: str, auto_delete_after: int = 20, reply_markup=None):
-    """
-    Send a status message that auto-deletes after specified seconds.
-    
-    Used for temporary status updates like:
-    - Vendor confirmations: "Vendor replied: Will prepare #90 at 14:57 👍"
-    - ASAP/TIME requests sent: "✅ ASAP request sent to Vendor"
-    - Delays: "Vendor: We have a delay for #90 - new time 15:00"
-    
-    Args:
-        chat_id: Chat to send message to
-        text: Message text
-        auto_delete_after: Seconds to wait before deletion (default: 20)
-        reply_markup: Optional keyboard to attach to message
-    """
-    try:
-        msg = await safe_send_message(chat_id, text, reply_markup)
-        # Schedule deletion in background
-        asyncio.create_task(_delete_after_delay(chat_id, msg.message_id, auto_delete_after))
-    except Exception as e:
-        logger.error(f"Error in send_status_message: {e}")
-
-async def _delete_after_delay(chat_id: int, message_id: int, delay: int):
-    """Helper to delete message after delay"""
-    try:
-        await asyncio.sleep(delay)
-        await safe_delete_message(chat_id, message_id)
-    except Exception as e:
-        logger.error(f"Error in _delete_after_delay: {e}")
-
 def build_undo_keyboard(order_id: str, vendors: list) -> InlineKeyboardMarkup:
     """
     Build keyboard with single Undo button for rg-time-req status messages.
@@ -522,10 +461,7 @@ async def handle_scheduled_command(chat_id: int, trigger_message_id: int):
         await safe_send_message(chat_id, text, keyboard, parse_mode=None)
         
         # Delete trigger message (the /scheduled command itself)
-        try:
-            await bot.delete_message(chat_id, trigger_message_id)
-        except Exception as e:
-            logger.debug(f"Could not delete trigger message: {e}")
+        await safe_delete_message(chat_id, trigger_message_id, priority=PRIORITY_LOW)
         
         logger.info("✅ Scheduled orders list sent")
     except Exception as e:
@@ -548,10 +484,7 @@ async def handle_assigned_command(chat_id: int, trigger_message_id: int):
         await safe_send_message(chat_id, text, keyboard, parse_mode=None)
         
         # Delete trigger message (the /assigned command itself)
-        try:
-            await bot.delete_message(chat_id, trigger_message_id)
-        except Exception as e:
-            logger.debug(f"Could not delete trigger message: {e}")
+        await safe_delete_message(chat_id, trigger_message_id, priority=PRIORITY_LOW)
         
         logger.info("✅ Assigned orders list sent")
     except Exception as e:
@@ -1089,6 +1022,7 @@ async def handle_test_pf_command(chat_id: int, message_id: int):
     
     # Send MDG-ORD
     from mdg import build_mdg_dispatch_text, mdg_initial_keyboard
+    districts.prefetch(STATE[order_id])  # Geocode in the background for the details view
     mdg_text = build_mdg_dispatch_text(STATE[order_id], show_details=False)
     keyboard = mdg_initial_keyboard(STATE[order_id], state=STATE)
     mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, keyboard)
@@ -1389,6 +1323,61 @@ async def handle_cleanup_command(chat_id: int, days_to_keep: int, message_id: in
             await safe_send_message(chat_id, error_text)
 
 
+# =============================================================================
+# TEXT COMMANDS
+# =============================================================================
+
+# /test<shortcut> → Shopify test order for that vendor
+TEST_VENDOR_COMMANDS = {
+    "/testjs": "Julis Spätzlerei",
+    "/testzh": "Zweite Heimat",
+    "/testka": "Kahaani",
+    "/testsa": "i Sapori della Toscana",
+    "/testlr": "Leckerolls",
+    "/testsf": "Safi",
+    "/testhb": "Hello Burrito",
+    "/testki": "Kimbu",
+}
+RG_CHAT_IDS = set(VENDOR_GROUP_MAP.values()) | {PF_RG_CHAT_ID}
+
+
+def chat_scope(msg: dict) -> str:
+    """Command scope of the chat a message was sent in."""
+    chat = msg.get("chat") or {}
+    chat_id = chat.get("id")
+    if chat_id == DISPATCH_MAIN_CHAT_ID:
+        return commands.SCOPE_MDG
+    if chat_id in RG_CHAT_IDS:
+        return commands.SCOPE_RG
+    if chat.get("type") == "private":
+        return commands.SCOPE_PRIVATE
+    return commands.SCOPE_OTHER
+
+
+def register_commands(router: commands.CommandRouter) -> None:
+    """Text commands handled in telegram_webhook, with the chats they may run in."""
+    mdg_or_private = (commands.SCOPE_MDG, commands.SCOPE_PRIVATE)
+    # Menu commands: order lists for dispatchers and couriers
+    router.register("/sched", lambda ctx: handle_scheduled_command(ctx.chat_id, ctx.message_id), scopes=mdg_or_private)
+    router.register("/assign", lambda ctx: handle_assigned_command(ctx.chat_id, ctx.message_id), scopes=mdg_or_private)
+    # Test orders (anyone can trigger)
+    router.register("/testsm", lambda ctx: handle_test_smoothr_command(ctx.chat_id, ctx.text, ctx.message_id))
+    router.register("/testsh", lambda ctx: handle_test_shopify_command(ctx.chat_id, ctx.text, ctx.message_id))
+    router.register("/testpf", lambda ctx: handle_test_pf_command(ctx.chat_id, ctx.message_id))
+    for name, vendor in TEST_VENDOR_COMMANDS.items():
+        router.register(name, lambda ctx, vendor=vendor: handle_test_vendor_command(ctx.chat_id, vendor, ctx.message_id))
+    # Admin commands (MDG only)
+    router.register("/ocr", lambda ctx: handle_ocr_status_command(ctx.chat_id, ctx.message_id),
+                    scopes=(commands.SCOPE_MDG,))
+    router.register("/cleanup", lambda ctx: handle_cleanup_command(ctx.chat_id, ctx.args["days_to_keep"], ctx.message_id),
+                    scopes=(commands.SCOPE_MDG,), args=(commands.Arg("days_to_keep", int, 1),),
+                    usage="/cleanup [days_to_keep]\nExample: /cleanup 1")
+
+
+register_commands(commands.router)
+commands.router.configure(chat_scope, run_async, reply=safe_send_message)
+
+
 async def process_shopify_webhook(payload: dict, is_test: bool = False):
     """
     Process Shopify webhook payload (used by both real webhooks and test command).
@@ -1403,186 +1392,48 @@ async def process_shopify_webhook(payload: dict, is_test: bool = False):
         
         logger.info(f"Processing Shopify order: {order_id}")
 
-        # Extract order data
-        order_name = payload.get("name", "Unknown")
-        
-        # Extract customer data with enhanced phone extraction
-        customer = payload.get("customer") or {}
-        customer_name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip() or "Unknown"
-        customer_email = customer.get("email") or payload.get("email")  # Extract email
-        
-        # Enhanced phone extraction from multiple sources
-        phone = (
-            customer.get("phone") or 
-            payload.get("phone") or 
-            payload.get("billing_address", {}).get("phone") or 
-            payload.get("shipping_address", {}).get("phone") or 
-            "N/A"
-        )
-        
-        # Validate and format phone
-        phone = validate_phone(phone)
-        if not phone:
-            logger.warning(f"Phone number missing or invalid for order {order_id}")
-            phone = "N/A"
-        
-        address = fmt_address(payload.get("shipping_address") or {})
-        
-        # Store original address for clean Google Maps URL
-        shipping_addr = payload.get("shipping_address", {})
-        original_address = f"{shipping_addr.get('address1', '')}, {shipping_addr.get('zip', '')}".strip()
-        if original_address == ", " or not original_address:
-            original_address = address  # fallback to formatted address
-        
-        # Extract vendors from line items
-        line_items = payload.get("line_items", [])
-        vendors = []
-        vendor_items = {}
-        items_text = ""
-        
-        for item in line_items:
-            vendor = item.get('vendor')
-            if vendor and vendor in VENDOR_GROUP_MAP:
-                if vendor not in vendors:
-                    vendors.append(vendor)
-                    vendor_items[vendor] = []
-                
-                # Clean product name using project rules
-                raw_name = item.get('name', 'Item')
-                logger.info(f"PRODUCT NAME DEBUG - Raw: '{raw_name}'")
-                cleaned_name = clean_product_name(raw_name)
-                logger.info(f"PRODUCT NAME DEBUG - Cleaned: '{cleaned_name}'")
-                item_line = f"{item.get('quantity', 1)} x {cleaned_name}"
-                vendor_items[vendor].append(item_line)
-        
-        # Build items text
-        if len(vendors) > 1:
-            # Multi-vendor: show vendor names above items
-            items_by_vendor = ""
-            for vendor in vendors:
-                items_by_vendor += f"\n{vendor}:\n" + "\n".join(vendor_items[vendor]) + "\n"
-            items_text = items_by_vendor.strip()
-        else:
-            # Single vendor: just list items
-            all_items = []
-            for vendor_item_list in vendor_items.values():
-                all_items.extend(vendor_item_list)
-            items_text = "\n".join(all_items)
-        
-        # Check for pickup orders
-        is_pickup = False
-        payload_str = str(payload).lower()
-        if "abholung" in payload_str:
-            is_pickup = True
-            logger.info("Pickup order detected (Abholung found in payload)")
-        
-        # Extract payment method and total from Shopify payload
-        payment_method = "Paid"  # Default
-        total_price = "0.00"     # Default
-        
-        # Check payment gateway names for CoD detection
-        payment_gateways = payload.get("payment_gateway_names", [])
-        if payment_gateways:
-            gateway_str = " ".join(payment_gateways).lower()
-            if "cash" in gateway_str and "delivery" in gateway_str:
-                payment_method = "Cash on Delivery"
-        
-        # Check transactions for more detailed payment info
-        transactions = payload.get("transactions", [])
-        for transaction in transactions:
-            gateway = transaction.get("gateway", "").lower()
-            if "cash" in gateway or "cod" in gateway:
-                payment_method = "Cash on Delivery"
-                break
-        
-        # Get total price from payload
-        total_price_raw = payload.get("total_price", "0.00")
-        try:
-            total_price = f"{float(total_price_raw):.2f}€"
-        except (ValueError, TypeError):
-            total_price = "0.00€"
-        
-        # Get customer note
-        note = payload.get("note", "")
-        
-        # Get tip
-        tips = payload.get("total_tip_received", "0.00")
-        
-        # Continue with STATE creation and message sending (same as Shopify webhook)
-        # This is where the rest of the Shopify processing logic would go
-        # For now, we'll defer to the existing Shopify webhook handler inline logic
-        
-        # Create STATE entry
-        STATE[order_id] = {
-            "order_id": order_id,
-            "name": order_name,
-            "vendors": vendors,
-            "customer": {
-                "name": customer_name,
-                "phone": phone,
-                "address": address,
-                "original_address": original_address,
-                "email": customer_email
-            },
-            "vendor_items": vendor_items,
-            "total": total_price,
-            "tips": tips,
-            "note": note,
-            "payment_method": payment_method,
-            "order_type": "shopify",
-            "is_pickup": is_pickup,
-            "status": "new",
-            "status_history": [{"type": "new", "timestamp": now()}],
-            "mdg_message_id": None,
-            "rg_message_ids": {},
-            "vendor_expanded": {vendor: False for vendor in vendors},
-            "mdg_additional_messages": [],
-            "created_at": payload.get("created_at", now().isoformat()),
-            "is_test": is_test,
-            "requested_time": None,
-            "requested_times": {},
-            "confirmed_time": None,
-            "confirmed_times": {},
-            "group_id": None,
-            "group_color": None,
-            "group_position": None,
-            "grouped_via": None,
-            "group_reference_order": None,
-            "upc_message_id": None,
-            "upc_assignment_message_id": None,
-        }
+        # Same normalizer as the Shopify webhook route (shopify.py)
+        STATE[order_id] = normalize_order(payload, VENDOR_GROUP_MAP, is_test=is_test)
+        vendors = STATE[order_id]["vendors"]
         
         # Send MDG-ORD + RG-SUM messages
         from mdg import build_mdg_dispatch_text, mdg_initial_keyboard
         from rg import build_vendor_summary_text, vendor_keyboard
         
-        # Send to MDG
+        # Send to MDG first: if it fails, no RG-SUM goes out for an order dispatch can't see
+        districts.prefetch(STATE[order_id])  # Geocode in the background for the details view
         mdg_text = build_mdg_dispatch_text(STATE[order_id], show_details=False)
         mdg_keyboard = mdg_initial_keyboard(STATE[order_id], state=STATE)
-        mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, mdg_keyboard)
+        mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, mdg_keyboard, priority=PRIORITY_HIGH)
         
         if mdg_msg:
             STATE[order_id]["mdg_message_id"] = mdg_msg.message_id
             logger.info(f"Sent MDG-ORD for order {order_id}, message_id={mdg_msg.message_id}")
         
-        # Send to RG (vendor groups)
+        # Send all RG-SUM messages concurrently (one round trip for all vendor groups)
+        sends = {}
         for vendor in vendors:
             vendor_chat_id = VENDOR_GROUP_MAP.get(vendor)
             if vendor_chat_id:
                 rg_text = build_vendor_summary_text(STATE[order_id], vendor)
                 rg_keyboard = vendor_keyboard(order_id, vendor, False, STATE[order_id])
-                
-                rg_msg = await safe_send_message(vendor_chat_id, rg_text, rg_keyboard)
-                
-                if rg_msg:
-                    STATE[order_id]["rg_message_ids"][vendor] = rg_msg.message_id
-                    logger.info(f"Sent RG-SUM to {vendor} for order {order_id}")
-                else:
-                    logger.error(f"❌ CRITICAL: safe_send_message returned None/False for {vendor}, order {order_id}")
-                    logger.error(f"   RG message_id NOT stored - Details button will fail!")
+                sends[vendor] = lambda chat=vendor_chat_id, text=rg_text, kb=rg_keyboard: safe_send_message(chat, text, kb)
             else:
                 logger.warning(f"No vendor_chat_id found for {vendor}, order {order_id}")
         
+        results, errors = await fan_out(sends)
+        
+        for vendor in vendors:
+            if vendor not in sends:
+                continue
+            rg_msg = results.get(vendor)
+            if rg_msg:
+                STATE[order_id]["rg_message_ids"][vendor] = rg_msg.message_id
+                logger.info(f"Sent RG-SUM to {vendor} for order {order_id}")
+            else:
+                logger.error(f"❌ CRITICAL: safe_send_message returned None/False for {vendor}, order {order_id}")
+                logger.error(f"   RG message_id NOT stored - Details button will fail!")
+        
         logger.info(f"✅ Shopify order {order_id} processed successfully")
         
         # Save STATE after processing
@@ -1672,11 +1523,12 @@ async def process_smoothr_order(smoothr_data: dict, is_test: bool = False):
         
         # Use standard builder for consistency
         from mdg import build_mdg_dispatch_text
+        districts.prefetch(STATE[order_id])  # Geocode in the background for the details view
         mdg_text = build_mdg_dispatch_text(STATE[order_id], show_details=False)
         
         # Send MDG-ORD with initial keyboard
         keyboard = mdg_initial_keyboard(STATE[order_id], state=STATE)
-        mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, keyboard)
+        mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, keyboard, priority=PRIORITY_HIGH)
         
         if mdg_msg:
             STATE[order_id]["mdg_message_id"] = mdg_msg.message_id
@@ -1728,33 +1580,53 @@ async def handle_pf_photo(message: dict):
     # Get largest photo (last in list)
     largest_photo = photo_list[-1]
     file_id = largest_photo.get("file_id")
+    file_unique_id = largest_photo.get("file_unique_id")
     
     logger.info(f"=== PF PHOTO RECEIVED ===")
     logger.info(f"Chat ID: {chat_id}")
     logger.info(f"Message ID: {message_id}")
     logger.info(f"File ID: {file_id}")
     
+    timer = ocr_pipeline.StageTimer()
     try:
-        # Download photo
-        file = await bot.get_file(file_id)
-        
-        # Save to temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-            photo_path = temp_file.name
-            await file.download_to_drive(photo_path)
-            logger.info(f"Downloaded photo to {photo_path}")
-        
-        # Extract text via OCR
-        ocr_text = ocr.extract_text_from_image(photo_path)
+        # Exact resend of a photo we already read: skip download and OCR
+        cached = ocr_cache.cache.lookup_file(file_unique_id)
+        if cached is None:
+            # Download photo into memory (no temp files on the dyno disk)
+            with timer.stage("download"):
+                file = await bot.get_file(file_id)
+                photo_bytes = bytes(await file.download_as_bytearray())
+                logger.info(f"Downloaded photo ({len(photo_bytes)} bytes)")
+            
+            # Preprocess + OCR in the bounded OCR pool (blocking work off the event loop)
+            cached = await ocr_pipeline.read_photo(photo_bytes, timer, file_unique_id)
+        else:
+            logger.info(f"Photo {file_unique_id} was read before - reusing OCR result")
+        ocr_text = cached.text
         logger.info(f"OCR extraction complete, text length: {len(ocr_text)}")
         
-        # Parse order fields
-        parsed_data = ocr.parse_pf_order(ocr_text)
+        # Parse order fields (cached with the OCR text once successful)
+        with timer.stage("parse"):
+            if cached.parsed is None:
+                cached.parsed = ocr.parse_pf_order(ocr_text)
+            parsed_data = cached.parsed
         logger.info(f"Parsed PF order: #{parsed_data['order_num']}")
         logger.info(f"  Customer: {parsed_data['customer']}")
         logger.info(f"  Time: {parsed_data['time']}")
         logger.info(f"  Total: {parsed_data['total']}€")
         
+        # Same order sent again (resent or re-photographed): same code, customer and total
+        duplicate_id = ocr_cache.find_duplicate_order(STATE, parsed_data, now())
+        if duplicate_id:
+            ocr_cache.cache.stats["duplicates"] += 1
+            logger.info(f"PF photo is a duplicate of {duplicate_id} - no new order created")
+            await safe_send_message(
+                chat_id,
+                f"⚠️ This order was already received (#{STATE[duplicate_id].get('name')}, "
+                f"{parsed_data['customer']}). It was not created again."
+            )
+            return
+        
         # Determine order type and display number (same as Smoothr)
         from utils import get_smoothr_order_type
         order_type, display_num = get_smoothr_order_type(parsed_data['order_num'])
@@ -1762,6 +1634,7 @@ async def handle_pf_photo(message: dict):
         # Create unique order ID
         order_id = f"PF_{parsed_data['order_num']}_{int(datetime.now().timestamp())}"
         vendor = "Pommes Freunde"
+        cached.order_id = order_id
         
         # Create STATE entry (following Smoothr pattern)
         STATE[order_id] = {
@@ -1796,22 +1669,24 @@ async def handle_pf_photo(message: dict):
             "created_at": now(),
         }
         
-        # Send MDG-ORD
-        from mdg import build_mdg_dispatch_text
-        mdg_text = build_mdg_dispatch_text(STATE[order_id], show_details=False)
-        keyboard = mdg_initial_keyboard(STATE[order_id], state=STATE)
-        mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, keyboard)
-        
-        if mdg_msg:
-            STATE[order_id]["mdg_message_id"] = mdg_msg.message_id
-        
-        # Send RG-SUM to PF group
-        rg_text = build_vendor_summary_text(STATE[order_id], vendor)
-        rg_keyboard = vendor_keyboard(order_id, vendor, expanded=False, order=STATE[order_id])
-        rg_msg = await safe_send_message(chat_id, rg_text, rg_keyboard)
-        
-        if rg_msg:
-            STATE[order_id]["rg_message_ids"][vendor] = rg_msg.message_id
+        with timer.stage("send"):
+            # Send MDG-ORD
+            from mdg import build_mdg_dispatch_text
+            districts.prefetch(STATE[order_id])  # Geocode in the background for the details view
+            mdg_text = build_mdg_dispatch_text(STATE[order_id], show_details=False)
+            keyboard = mdg_initial_keyboard(STATE[order_id], state=STATE)
+            mdg_msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, mdg_text, keyboard, priority=PRIORITY_HIGH)
+            
+            if mdg_msg:
+                STATE[order_id]["mdg_message_id"] = mdg_msg.message_id
+            
+            # Send RG-SUM to PF group
+            rg_text = build_vendor_summary_text(STATE[order_id], vendor)
+            rg_keyboard = vendor_keyboard(order_id, vendor, expanded=False, order=STATE[order_id])
+            rg_msg = await safe_send_message(chat_id, rg_text, rg_keyboard)
+            
+            if rg_msg:
+                STATE[order_id]["rg_message_ids"][vendor] = rg_msg.message_id
         
         logger.info(f"✅ PF photo order {order_id} processed successfully")
         
@@ -1851,6 +1726,8 @@ async def handle_pf_photo(message: dict):
         alert_msg = f"❌ **PF Photo Processing Error**\n\nFailed to process photo from Pommes Freunde.\n\nError: {str(e)[:200]}"
         await safe_send_message(DISPATCH_MAIN_CHAT_ID, alert_msg)
     finally:
+        ocr_pipeline.stage_metrics.record(timer)
+        logger.info(f"PF photo {message_id} timings: {timer.summary()}")
         # Save STATE after processing (whether success or failure)
         save_state()
 
@@ -1867,19 +1744,9 @@ async def cleanup_mdg_messages(order_id: str):
     
     logger.info(f"Cleaning up {len(additional_messages)} additional MDG messages for order {order_id}")
     
-    for message_id in additional_messages:
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                await bot.delete_message(chat_id=DISPATCH_MAIN_CHAT_ID, message_id=message_id)
-                logger.info(f"Successfully deleted MDG message {message_id} for order {order_id}")
-                break
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed to delete message {message_id}: {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(1)
-                else:
-                    logger.error(f"Failed to delete message {message_id} after {max_retries} attempts")
+    # One deleteMessages request per 100 ids (retries handled per chunk)
+    deleted = await outbound.deletes.delete(DISPATCH_MAIN_CHAT_ID, additional_messages)
+    logger.info(f"Deleted {deleted}/{len(additional_messages)} MDG messages for order {order_id}")
     
     # Clear the list after cleanup
     order["mdg_additional_messages"] = []
@@ -1923,15 +1790,13 @@ async def forward_restaurant_message_to_mdg(vendor_name: str, message_text: str,
             
             logger.info(f"Forwarded message from {vendor_name} to MDG (MDG msg_id: {mdg_message_id})")
             
-            # Schedule auto-delete after 10 minutes
-            await asyncio.sleep(600)  # 10 minutes = 600 seconds
-            await safe_delete_message(DISPATCH_MAIN_CHAT_ID, mdg_message_id)
-            
-            # Clean up tracking
-            if mdg_message_id in RESTAURANT_FORWARDED_MESSAGES:
-                del RESTAURANT_FORWARDED_MESSAGES[mdg_message_id]
-            
-            logger.info(f"Auto-deleted restaurant message {mdg_message_id} from MDG after 10 minutes")
+            # Schedule auto-delete after 10 minutes (tracking is cleaned up when it fires)
+            timers.schedule_delete(
+                DISPATCH_MAIN_CHAT_ID,
+                mdg_message_id,
+                600,  # 10 minutes = 600 seconds
+                on_fire=lambda: RESTAURANT_FORWARDED_MESSAGES.pop(mdg_message_id, None)
+            )
     
     except Exception as e:
         logger.error(f"Error forwarding restaurant message to MDG: {e}")
@@ -1979,10 +1844,7 @@ async def forward_mdg_reply_to_restaurant(from_user: Dict[str, Any], reply_text:
             logger.info(f"Forwarded reply from {courier_name} to {vendor_name} (RG msg_id: {rg_message_id})")
             
             # Schedule auto-delete after 10 minutes
-            await asyncio.sleep(600)  # 10 minutes = 600 seconds
-            await safe_delete_message(rg_chat_id, rg_message_id)
-            
-            logger.info(f"Auto-deleted reply message {rg_message_id} from {vendor_name} RG after 10 minutes")
+            timers.schedule_delete(rg_chat_id, rg_message_id, 600)  # 10 minutes = 600 seconds
     
     except Exception as e:
         logger.error(f"Error forwarding MDG reply to restaurant: {e}")
@@ -1999,6 +1861,19 @@ def health_check():
         "orders_in_memory": len(STATE),
         "orders_in_redis": redis_count,
         "redis_connected": redis_count >= 0,
+        "outbound_queue_depth": outbound.scheduler.queue_depths(),
+        "edit_stats": dict(outbound.edits.stats, saved=outbound.edits.edits_saved()),
+        "delete_stats": outbound.deletes.stats,
+        "timers": timers.stats(),
+        "telegram_api": outbound.client.metrics(),
+        "render_cache": render_cache.cache.metrics(),
+        "districts": districts.metrics(),
+        "ocr": ocr_pipeline.metrics(),
+        "product_catalog": catalog.metrics(),
+        "courier_roster": upc.courier_roster.metrics(),
+        "commands": commands.router.metrics(),
+        "same_time": same_time.metrics(),
+        "logging": log_pipeline.metrics(),
         "timestamp": now().isoformat()
     }), 200
 
@@ -2122,10 +1997,12 @@ def telegram_webhook():
         if not upd:
             return "OK"
 
-        # Log all incoming updates for spam detection
-        logger.info(f"=== INCOMING UPDATE ===")
-        logger.info(f"Update ID: {upd.get('update_id')}")
-        logger.info(f"Timestamp: {now().isoformat()}")
+        # MDG membership changes keep the cached courier roster current.
+        # Telegram only delivers chat_member if the webhook's allowed_updates include it.
+        if "chat_member" in upd or "my_chat_member" in upd:
+            about_bot = "my_chat_member" in upd
+            upc.courier_roster.apply_member_update(upd["my_chat_member" if about_bot else "chat_member"], about_bot=about_bot)
+            return "OK"
 
         # Check for regular messages, channel posts, or edited messages
         msg = None
@@ -2149,127 +2026,31 @@ def telegram_webhook():
             chat = msg.get("chat", {})
             text = msg.get("text", "")
 
-            logger.info(f"MESSAGE RECEIVED:")
-            logger.info(f"  Update Type: {update_type}")
-            logger.info(f"  Chat ID: {chat.get('id')}")
-            logger.info(f"  Chat Type: {chat.get('type')}")
-            logger.info(f"  Chat Title: {chat.get('title', 'N/A')}")
-            logger.info(f"  From User ID: {from_user.get('id', 'N/A')}")
-            logger.info(f"  From Username: {from_user.get('username', 'N/A')}")
-            logger.info(f"  From First Name: {from_user.get('first_name', 'N/A')}")
-            logger.info(f"  From Last Name: {from_user.get('last_name', 'N/A')}")
-            logger.info(f"  Message Text: {text[:LOG_MESSAGE_TRUNCATE_LENGTH]}{'...' if len(text) > LOG_MESSAGE_TRUNCATE_LENGTH else ''}")
-            logger.info(f"  Message Length: {len(text)}")
+            # All incoming messages are logged for spam detection: one structured record per update
+            event(
+                update_log, "message",
+                update_id=upd.get("update_id"),
+                type=update_type,
+                chat_id=chat.get("id"),
+                chat_type=chat.get("type"),
+                chat_title=chat.get("title"),
+                user_id=from_user.get("id"),
+                username=from_user.get("username"),
+                first_name=from_user.get("first_name"),
+                last_name=from_user.get("last_name"),
+                text=text[:LOG_MESSAGE_TRUNCATE_LENGTH] + ("..." if len(text) > LOG_MESSAGE_TRUNCATE_LENGTH else ""),
+                length=len(text),
+            )
 
             # Flag potential spam
-            if "FOXY" in text.upper() or "airdrop" in text.lower() or "t.me/" in text:
+            if SPAM_RE.search(text):
                 logger.warning(f"🚨 POTENTIAL SPAM DETECTED: {text[:100]}...")
             
             # Get chat_id early for command detection
             chat_id = chat.get('id')
             
-            # =================================================================
-            # MENU COMMANDS (sched, assign)
-            # =================================================================
-            if text.startswith("/sched"):
-                logger.info("=== SCHEDULED ORDERS COMMAND ===")
-                run_async(handle_scheduled_command(chat_id, msg.get('message_id')))
-                return "OK"
-            
-            if text.startswith("/assign"):
-                logger.info("=== ASSIGNED ORDERS COMMAND ===")
-                run_async(handle_assigned_command(chat_id, msg.get('message_id')))
-                return "OK"
-            
-            # =================================================================
-            # TEST SMOOTHR COMMAND (anyone can trigger)
-            # =================================================================
-            if text.startswith("/testsm"):
-                logger.info("=== TEST SMOOTHR COMMAND DETECTED ===")
-                run_async(handle_test_smoothr_command(chat_id, text, msg.get('message_id')))
-                return "OK"
-            
-            # =================================================================
-            # TEST SHOPIFY COMMAND (anyone can trigger)
-            # =================================================================
-            if text.startswith("/testsh"):
-                logger.info("=== TEST SHOPIFY COMMAND DETECTED ===")
-                run_async(handle_test_shopify_command(chat_id, text, msg.get('message_id')))
-                return "OK"
-
-            # =================================================================
-            # TEST PF COMMAND (anyone can trigger)
-            # =================================================================
-            if text.startswith("/testpf"):
-                logger.info("=== TEST PF COMMAND DETECTED ===")
-                run_async(handle_test_pf_command(chat_id, msg.get('message_id')))
-                return "OK"
-
-            # =================================================================
-            # TEST VENDOR COMMANDS (anyone can trigger)
-            # =================================================================
-            if text.startswith("/testjs"):
-                logger.info("[ORDER-JS] === TEST JS COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Julis Spätzlerei", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testzh"):
-                logger.info("[ORDER-ZH] === TEST ZH COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Zweite Heimat", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testka"):
-                logger.info("[ORDER-KA] === TEST KA COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Kahaani", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testsa"):
-                logger.info("[ORDER-SA] === TEST SA COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "i Sapori della Toscana", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testlr"):
-                logger.info("[ORDER-LR] === TEST LR COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Leckerolls", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testsf"):
-                logger.info("[ORDER-SF] === TEST SF COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Safi", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testhb"):
-                logger.info("[ORDER-HB] === TEST HB COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Hello Burrito", msg.get('message_id')))
-                return "OK"
-
-            if text.startswith("/testki"):
-                logger.info("[ORDER-KI] === TEST KI COMMAND DETECTED ===")
-                run_async(handle_test_vendor_command(chat_id, "Kimbu", msg.get('message_id')))
-                return "OK"
-
-            # =================================================================
-            # OCR STATUS CHECK COMMAND (MDG only)
-            # =================================================================
-            if text.startswith("/ocr"):
-                logger.info("=== OCR STATUS COMMAND DETECTED ===")
-                run_async(handle_ocr_status_command(chat_id, msg.get('message_id')))
-                return "OK"
-            
-            # =================================================================
-            # REDIS CLEANUP COMMAND (admin only)
-            # =================================================================
-            if text.startswith("/cleanup"):
-                logger.info("=== REDIS CLEANUP COMMAND DETECTED ===")
-                # Extract days_to_keep from command (default: 1)
-                # /cleanup or /cleanup 1 → keep 1 day
-                # /cleanup 2 → keep 2 days
-                try:
-                    parts = text.split()
-                    days_to_keep = int(parts[1]) if len(parts) > 1 else 1
-                    run_async(handle_cleanup_command(chat_id, days_to_keep, msg.get('message_id')))
-                except ValueError:
-                    run_async(safe_send_message(chat_id, "❌ Invalid command. Usage: /cleanup [days_to_keep]\nExample: /cleanup 1"))
+            # Text commands (/sched, /assign, /test..., /ocr, /cleanup) - see register_commands()
+            if commands.router.dispatch(msg):
                 return "OK"
 
             # =================================================================
@@ -2364,7 +2145,8 @@ def telegram_webhook():
 
         cq = upd.get("callback_query")
         if not cq:
-            logger.info("=== NO CALLBACK QUERY - END UPDATE ===")
+            if not msg:
+                event(update_log, "update", update_id=upd.get("update_id"), keys=",".join(upd))
             return "OK"
 
         # Answer callback query immediately (synchronously)
@@ -2386,9 +2168,14 @@ def telegram_webhook():
                 return
             
             action = data[0]
-            logger.info(f"Raw callback data: {cq.get('data')}")
-            logger.info(f"Parsed callback data: {data}")
-            logger.info(f"Processing callback: {action}")
+            event(
+                callback_log, "callback",
+                update_id=upd.get("update_id"),
+                action=action,
+                data=cq.get("data"),
+                chat_id=(cq.get("message") or {}).get("chat", {}).get("id"),
+                user_id=(cq.get("from") or {}).get("id"),
+            )
             
             try:
                 # VENDOR SELECTION (for multi-vendor orders)
@@ -2724,6 +2511,7 @@ def telegram_webhook():
                     
                     # 5. Reset order status to 'new'
                     order["status"] = "new"
+                    same_time.track(order_id, order)
                     
                     # 6. Delete MDG-CONF message if exists (created after all vendors confirm)
                     mdg_conf_id = order.get("mdg_conf_message_id")
@@ -2821,6 +2609,7 @@ def telegram_webhook():
                         "type": "removed",
                         "timestamp": now()
                     })
+                    same_time.track(order_id, order)
                     
                     logger.info(f"✅ Test order {order_id} removed successfully")
                 
@@ -3745,6 +3534,7 @@ def telegram_webhook():
                         order["confirmed_times"][vendor] = confirmed_time
                         order["confirmed_time"] = confirmed_time  # Keep for backward compatibility
                         order["confirmed_by"] = vendor
+                        same_time.track(order_id, order)
                         
                         # Append status to history
                         order["status_history"].append({
@@ -3773,7 +3563,7 @@ def telegram_webhook():
                             f"Confirmation was sent to dishbee. Please prepare 🔖 {order_num} at {confirmed_time} for courier."
                         )
                         if rg_conf_msg:
-                            asyncio.create_task(_delete_after_delay(vendor_group_id, rg_conf_msg.message_id, 20))
+                            timers.schedule_delete(vendor_group_id, rg_conf_msg.message_id, 20)
                     
                     # Update MDG message with new status
                     # Preserve keyboard for multi-vendor orders (don't rebuild until all vendors confirm)
@@ -3823,7 +3613,8 @@ def telegram_webhook():
                             assignment_msg = await safe_send_message(
                                 DISPATCH_MAIN_CHAT_ID,
                                 build_assignment_confirmation_message(order),
-                                mdg_assignment_keyboard(order_id)
+                                mdg_assignment_keyboard(order_id),
+                                priority=PRIORITY_HIGH
                             )
                             # Track MDG-CONF message ID for updating keyboard after assignment
                             order["mdg_conf_message_id"] = assignment_msg.message_id
@@ -3868,6 +3659,7 @@ def telegram_webhook():
                         # Store time for the correct vendor
                         order["confirmed_times"][vendor] = selected_time
                         order["confirmed_time"] = selected_time  # Keep for backward compatibility
+                        same_time.track(order_id, order)
                         
                         # Append status to history
                         order["status_history"].append({
@@ -3893,7 +3685,7 @@ def telegram_webhook():
                                 f"Confirmation was sent to dishbee. Please prepare 🔖 {order_num} at {selected_time} for courier."
                             )
                             if rg_conf_msg:
-                                asyncio.create_task(_delete_after_delay(vendor_group_id, rg_conf_msg.message_id, 20))
+                                timers.schedule_delete(vendor_group_id, rg_conf_msg.message_id, 20)
                         
                         logger.info(f"DEBUG: Updated STATE for {order_id} - confirmed_times now: {order['confirmed_times']}")
                         
@@ -3941,7 +3733,8 @@ def telegram_webhook():
                             assignment_msg = await safe_send_message(
                                 DISPATCH_MAIN_CHAT_ID,
                                 build_assignment_confirmation_message(order),
-                                mdg_assignment_keyboard(order_id)
+                                mdg_assignment_keyboard(order_id),
+                                priority=PRIORITY_HIGH
                             )
                             # Track MDG-CONF message ID for updating keyboard after assignment
                             order["mdg_conf_message_id"] = assignment_msg.message_id
@@ -3985,6 +3778,7 @@ def telegram_webhook():
                         # Store time for the correct vendor
                         order["confirmed_times"][vendor] = selected_time
                         order["confirmed_time"] = selected_time  # Keep for backward compatibility
+                        same_time.track(order_id, order)
                         
                         # Append status to history
                         order["status_history"].append({
@@ -4010,7 +3804,7 @@ def telegram_webhook():
                                 f"Confirmation was sent to dishbee. Please prepare 🔖 {order_num} at {selected_time} for courier."
                             )
                             if rg_conf_msg:
-                                asyncio.create_task(_delete_after_delay(vendor_group_id, rg_conf_msg.message_id, 20))
+                                timers.schedule_delete(vendor_group_id, rg_conf_msg.message_id, 20)
                         
                         # Update MDG message with new status
                         # Preserve keyboard for multi-vendor orders
@@ -4063,7 +3857,8 @@ def telegram_webhook():
                             assignment_msg = await safe_send_message(
                                 DISPATCH_MAIN_CHAT_ID,
                                 build_assignment_confirmation_message(order),
-                                mdg_assignment_keyboard(order_id)
+                                mdg_assignment_keyboard(order_id),
+                                priority=PRIORITY_HIGH
                             )
                             # Track MDG-CONF message ID for updating keyboard after assignment
                             order["mdg_conf_message_id"] = assignment_msg.message_id
@@ -4104,7 +3899,7 @@ def telegram_webhook():
                     
                     # ST-CANCEL format from CHEAT-SHEET (auto-delete after 20s)
                     msg = await safe_send_message(DISPATCH_MAIN_CHAT_ID, f"⚠️ {vendor_shortcut}: Order 🔖 {order_num} is canceled ❌")
-                    asyncio.create_task(_delete_after_delay(DISPATCH_MAIN_CHAT_ID, msg.message_id, 20))
+                    timers.schedule_delete(DISPATCH_MAIN_CHAT_ID, msg.message_id, 20)
                 
                 elif action in ["wrong_technical", "wrong_other"]:
                     order_id, vendor = data[1], data[2]
@@ -4231,6 +4026,7 @@ def telegram_webhook():
                         # Store time for the correct vendor
                         order["confirmed_times"][vendor] = selected_time
                         order["confirmed_time"] = selected_time  # Keep for backward compatibility
+                        same_time.track(order_id, order)
                         
                         # Get order number for display
                         order_num = order['name'][-2:] if len(order['name']) >= 2 else order['name']
@@ -4259,7 +4055,7 @@ def telegram_webhook():
                                     f"Confirmation was sent to dishbee. Please prepare 🔖 {order_num} at {selected_time} for courier."
                                 )
                                 if rg_conf_msg:
-                                    asyncio.create_task(_delete_after_delay(vendor_group_id, rg_conf_msg.message_id, 20))
+                                    timers.schedule_delete(vendor_group_id, rg_conf_msg.message_id, 20)
                         
                         logger.info(f"DEBUG: Updated STATE for {order_id} - confirmed_times now: {order['confirmed_times']}")
                         
@@ -4271,7 +4067,8 @@ def telegram_webhook():
                                 assignment_msg = await safe_send_message(
                                     DISPATCH_MAIN_CHAT_ID,
                                     build_assignment_confirmation_message(order),
-                                    mdg_assignment_keyboard(order_id)
+                                    mdg_assignment_keyboard(order_id),
+                                    priority=PRIORITY_HIGH
                                 )
                                 # Track MDG-CONF message ID for updating keyboard after assignment
                                 order["mdg_conf_message_id"] = assignment_msg.message_id
@@ -4697,7 +4494,7 @@ def telegram_webhook():
                         f"Order 🔖 {order_id} was unassigned"
                     )
                     if notif:
-                        asyncio.create_task(_delete_after_delay(DISPATCH_MAIN_CHAT_ID, notif.message_id, 3))
+                        timers.schedule_delete(DISPATCH_MAIN_CHAT_ID, notif.message_id, 3)
                     
                     logger.info(f"Order {order_id} unassigned by user {user_id}")
                     logger.info(f"DEBUG: STATE keys after unassign: {list(STATE.keys())}")
@@ -4767,162 +4564,14 @@ def shopify_webhook():
         display_num = order_name[-2:] if len(order_name) >= 2 else order_name
         logger.info(f"[ORDER-{display_num}] Processing Shopify order: {order_id}")
         
-        # Extract customer data with enhanced phone extraction
-        customer = payload.get("customer") or {}
-        customer_name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip() or "Unknown"
-        customer_email = customer.get("email") or payload.get("email")  # Extract email
-        
-        # Enhanced phone extraction from multiple sources
-        phone = (
-            customer.get("phone") or 
-            payload.get("phone") or 
-            payload.get("billing_address", {}).get("phone") or 
-            payload.get("shipping_address", {}).get("phone") or 
-            "N/A"
-        )
-        
-        # Validate and format phone
-        phone = validate_phone(phone)
-        if not phone:
-            logger.warning(f"Phone number missing or invalid for order {order_id}")
-            phone = "N/A"
-        
-        address = fmt_address(payload.get("shipping_address") or {})
-        
-        # Store original address for clean Google Maps URL
-        shipping_addr = payload.get("shipping_address", {})
-        original_address = f"{shipping_addr.get('address1', '')}, {shipping_addr.get('zip', '')}".strip()
-        if original_address == ", " or not original_address:
-            original_address = address  # fallback to formatted address
-        
-        # Extract vendors from line items
-        line_items = payload.get("line_items", [])
-        vendors = []
-        vendor_items = {}
-        items_text = ""
-        
-        for item in line_items:
-            vendor = item.get('vendor')
-            if vendor and vendor in VENDOR_GROUP_MAP:
-                if vendor not in vendors:
-                    vendors.append(vendor)
-                    vendor_items[vendor] = []
-                
-                # Clean product name using project rules
-                raw_name = item.get('name', 'Item')
-                logger.info(f"PRODUCT NAME DEBUG - Raw: '{raw_name}'")
-                cleaned_name = clean_product_name(raw_name)
-                logger.info(f"PRODUCT NAME DEBUG - Cleaned: '{cleaned_name}'")
-                item_line = f"- {item.get('quantity', 1)} x {cleaned_name}"
-                vendor_items[vendor].append(item_line)
-        
-        # Build items text
-        if len(vendors) > 1:
-            # Multi-vendor: show vendor names above items
-            items_by_vendor = ""
-            for vendor in vendors:
-                items_by_vendor += f"\n{vendor}:\n" + "\n".join(vendor_items[vendor]) + "\n"
-            items_text = items_by_vendor.strip()
-        else:
-            # Single vendor: just list items
-            all_items = []
-            for vendor_item_list in vendor_items.values():
-                all_items.extend(vendor_item_list)
-            items_text = "\n".join(all_items)
-        
-        # Check for pickup orders
-        is_pickup = False
-        payload_str = str(payload).lower()
-        if "abholung" in payload_str:
-            is_pickup = True
-            logger.info("Pickup order detected (Abholung found in payload)")
-        
-        # Extract payment method and total from Shopify payload
-        payment_method = "Paid"  # Default
-        total_price = "0.00"     # Default
-        
-        # Check payment gateway names for CoD detection
-        payment_gateways = payload.get("payment_gateway_names", [])
-        if payment_gateways:
-            gateway_str = " ".join(payment_gateways).lower()
-            if "cash" in gateway_str and "delivery" in gateway_str:
-                payment_method = "Cash on Delivery"
-        
-        # Check transactions for more detailed payment info
-        transactions = payload.get("transactions", [])
-        for transaction in transactions:
-            gateway = transaction.get("gateway", "").lower()
-            if "cash" in gateway and "delivery" in gateway:
-                payment_method = "Cash on Delivery"
-                break
-        
-        # Extract total price
-        total_price_raw = payload.get("total_price", "0.00")
-        try:
-            # Format as currency with 2 decimal places
-            total_price = f"{float(total_price_raw):.2f}€"
-        except (ValueError, TypeError):
-            total_price = "0.00€"
-        
-        logger.info(f"Payment method: {payment_method}, Total: {total_price}")
-        
-        # Extract tips from Shopify payload
-        tips = 0.0
-        try:
-            # Check for the actual tip field used by Shopify
-            if payload.get("total_tip_received"):
-                tips = float(payload["total_tip_received"])
-            elif payload.get("total_tip"):
-                tips = float(payload["total_tip"])
-            elif payload.get("tip_money") and payload["tip_money"].get("amount"):
-                tips = float(payload["tip_money"]["amount"])
-            elif payload.get("total_tips_set") and payload["total_tips_set"].get("shop_money", {}).get("amount"):
-                tips = float(payload["total_tips_set"]["shop_money"]["amount"])
-        except (ValueError, TypeError, KeyError) as e:
-            logger.warning(f"Error extracting tips for order {order_id}: {e}")
-            tips = 0.0
-        
-        # Build order object
-        order = {
-            "order_id": order_id,
-            "name": order_name,
-            "order_type": "shopify",
-            "vendors": vendors,
-            "customer": {
-                "name": customer_name,
-                "phone": phone,
-                "email": customer_email,  # Add email field
-                "address": address,
-                "original_address": original_address
-            },
-            "items_text": items_text,
-            "vendor_items": vendor_items,
-            "note": payload.get("note", ""),
-            "tips": tips,
-            "payment_method": payment_method,
-            "total": total_price,
-            "delivery_time": "ASAP",
-            "is_pickup": is_pickup,
-            "created_at": now(),
-            "vendor_messages": {},
-            "vendor_expanded": {},
-            "requested_time": None,
-            "requested_times": {},  # Track requested time per vendor (multi-vendor)
-            "confirmed_times": {},  # Track confirmed time per vendor
-            "confirmed_time": None,
-            "status": "new",
-            "status_history": [{"type": "new", "timestamp": now()}],  # NEW: Track all status changes
-            "rg_message_ids": {},  # NEW: Track RG message IDs (replaces vendor_messages)
-            "upc_message_id": None,  # NEW: Track UPC assignment message ID
-            "mdg_additional_messages": [],  # Track additional MDG messages for cleanup
-            # Order grouping fields
-            "group_id": None,  # Group identifier (e.g., "group_orange_001")
-            "group_color": None,  # Group color emoji (e.g., "🟠")
-            "group_position": None,  # Position in group (1-indexed)
-            "upc_assignment_message_id": None,  # Message ID in courier's private chat
-            "grouped_via": None,  # "same" or "group" (tracking grouping method)
-            "group_reference_order": None  # Reference order ID used for grouping
-        }
+        # One normalizer for both Shopify entry points (shopify.py)
+        order = normalize_order(payload, VENDOR_GROUP_MAP)
+        vendors = order["vendors"]
+        is_pickup = order["is_pickup"]
+        phone = order["customer"]["phone"]
+        if is_pickup:
+            logger.info("Pickup order detected (Abholung in shipping lines / tags / note / items)")
+        logger.info(f"Payment method: {order['payment_method']}, Total: {order['total']}")
         
         # Save order to STATE first
         STATE[order_id] = order
@@ -4936,6 +4585,7 @@ def shopify_webhook():
         async def process():
             try:
                 # Send to MDG with appropriate buttons (summary by default)
+                districts.prefetch(order)  # Geocode in the background for the details view
                 mdg_text = build_mdg_dispatch_text(order, show_details=False)
                 
                 # Special formatting for pickup orders
@@ -4947,23 +4597,28 @@ def shopify_webhook():
                 mdg_msg = await safe_send_message(
                     DISPATCH_MAIN_CHAT_ID,
                     mdg_text,
-                    mdg_initial_keyboard(order, state=STATE)
+                    mdg_initial_keyboard(order, state=STATE),
+                    priority=PRIORITY_HIGH
                 )
                 order["mdg_message_id"] = mdg_msg.message_id
                 
-                # Send to each vendor group (summary by default)
+                # Send to each vendor group (summary by default) - concurrently, once MDG has the order
+                sends = {}
                 for vendor in vendors:
                     vendor_chat = VENDOR_GROUP_MAP.get(vendor)
                     if vendor_chat:
                         vendor_text = build_vendor_summary_text(order, vendor)
                         # Order message has only expand/collapse button
-                        vendor_msg = await safe_send_message(
-                            vendor_chat,
-                            vendor_text,
-                            vendor_keyboard(order_id, vendor, False, order)
-                        )
-                        order["vendor_messages"][vendor] = vendor_msg.message_id
+                        sends[vendor] = lambda chat=vendor_chat, text=vendor_text, kb=vendor_keyboard(order_id, vendor, False, order): safe_send_message(chat, text, kb)
+                
+                results, errors = await fan_out(sends)
+                
+                for vendor in vendors:
+                    if vendor in results:
+                        order["vendor_messages"][vendor] = results[vendor].message_id
                         order["vendor_expanded"][vendor] = False
+                    elif vendor in errors:
+                        logger.error(f"Failed to send RG-SUM to {vendor} for order {order_id}: {errors[vendor]}")
                 
                 # Update STATE with message IDs
                 STATE[order_id] = order
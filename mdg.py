@@ -2,13 +2,17 @@
 """MDG (Main Dispatching Group) helpers."""
 
 import logging
-import re
 from datetime import datetime, timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from utils import get_district_from_address, abbreviate_street, format_phone_for_android
+from utils import format_phone_for_android
+import districts
+import render_cache
+import same_time
+from keyboards import KeyboardTemplate, ORDER_ID, TEMPLATE_CACHE_SIZE, add_minutes, grid, optional_suffix
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +29,9 @@ RESTAURANT_SHORTCUTS: Dict[str, str] = {}
 # Chef emojis for rotating display in multi-vendor buttons
 CHEF_EMOJIS = ['👩‍🍳', '👩🏻‍🍳', '👩🏼‍🍳', '👩🏾‍🍳', '🧑‍🍳', '🧑🏻‍🍳', '🧑🏼‍🍳', '🧑🏾‍🍳', '👨‍🍳', '👨🏻‍🍳', '👨🏼‍🍳', '👨🏾‍🍳']
 
+# Quick time picker offsets (minutes)
+TIME_PICKER_INCREMENTS = (5, 10, 15, 20)
+
 # Telegram button text limits (enforced by Telegram API)
 TELEGRAM_BUTTON_TEXT_LIMIT = 64  # Maximum characters for inline button text
 SINGLE_LINE_BUTTON_LIMIT = 30   # Practical limit for single-line button display
@@ -51,6 +58,7 @@ def configure(state_ref: Dict[str, Dict[str, Any]], restaurant_shortcuts: Dict[s
     
     STATE = state_ref
     RESTAURANT_SHORTCUTS = restaurant_shortcuts
+    same_time.configure(state_ref, restaurant_shortcuts)
     logger.info(f"MDG-CONFIGURE: STATE id={id(STATE)}, len={len(STATE) if STATE else 'None'}")
     logger.info(f"MDG-CONFIGURE: Called from: {caller_info}")
 
@@ -122,6 +130,8 @@ def get_vendor_shortcuts_string(vendors: List[str]) -> str:
 def get_recent_orders_for_same_time(current_order_id: str, vendor: Optional[str] = None, state: Dict[str, Any] = None) -> List[Dict[str, str]]:
     """Get recent CONFIRMED orders (from today only) for 'same time as' functionality.
     
+    Served from the same_time index (kept up to date on confirm / deliver / remove).
+    
     Args:
         current_order_id: The current order to exclude from results
         vendor: Optional vendor name to filter by (only show orders containing this vendor)
@@ -130,157 +140,59 @@ def get_recent_orders_for_same_time(current_order_id: str, vendor: Optional[str]
     if state is None:
         state = STATE  # Fallback to module-level STATE for backwards compatibility
     
-    today_start = now().replace(hour=0, minute=1, second=0, microsecond=0)
-    recent: List[Dict[str, str]] = []
-
-    logger.info(f"SCHEDULED-DEBUG: Checking for recent orders (current={current_order_id}, vendor={vendor}), state id={id(state)}, len={len(state)}, module STATE id={id(STATE)}, module STATE len={len(STATE) if STATE else 'None'}")
-
-    for order_id, order_data in state.items():
-        if order_id == current_order_id:
-            continue
-        
-        # Check if order has ANY confirmed time (Shopify OR Smoothr/PF)
-        confirmed_time = order_data.get("confirmed_time")
-        confirmed_times = order_data.get("confirmed_times", {})
-        has_confirmation = confirmed_time or (confirmed_times and any(confirmed_times.values()))
-        
-        status = order_data.get("status")
-        
-        if not has_confirmation:
-            logger.debug(f"SCHEDULED-DEBUG: Order {order_id} - no confirmation (confirmed_time={confirmed_time}, confirmed_times={confirmed_times})")
-            continue
-        
-        # Filter out delivered AND removed orders - only show scheduled (new/assigned)
-        if status in ["delivered", "removed"]:
-            logger.debug(f"SCHEDULED-DEBUG: Order {order_id} - filtered by status={status}")
-            continue
-        
-        # Filter by vendor if specified
-        if vendor and vendor not in order_data.get("vendors", []):
-            logger.debug(f"SCHEDULED-DEBUG: Order {order_id} - vendor mismatch (looking for {vendor}, has {order_data.get('vendors', [])})")
-            continue
-            
-        created_at = order_data.get("created_at")
-        if not created_at:
-            logger.debug(f"SCHEDULED-DEBUG: Order {order_id} - no created_at")
-            continue
-        
-        # Handle both string (Shopify) and datetime (Smoothr)
-        if isinstance(created_at, str):
-            try:
-                created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            except:
-                logger.debug(f"SCHEDULED-DEBUG: Order {order_id} - invalid created_at format: {created_at}")
-                continue
-        else:
-            created_dt = created_at
-        
-        # TODAY filter: only show orders from today
-        if created_dt < today_start:
-            logger.debug(f"SCHEDULED-DEBUG: Order {order_id} - not from today (created_dt={created_dt}, today_start={today_start})")
-            continue
-            
-        # Support ALL order types (Shopify, Smoothr, OCR PF)
-        order_type = order_data.get("order_type", "")
-        if order_type == "shopify":
-            display_name = f"{order_data['name'][-2:]}"
-        elif order_type in ["smoothr_lieferando", "smoothr_dd_app"]:
-            # Smoothr orders - use address
-            customer = order_data.get('customer', {})
-            address = customer.get('address', '')
-            if address:
-                address_parts = address.split(',')
-                street_info = address_parts[0] if address_parts else "Unknown"
-                display_name = f"*{street_info}*"
-            else:
-                display_name = f"Order {order_data.get('name', 'Unknown')}"
-        elif order_type == "ocr_pf":
-            # OCR PF orders - use name (last 2 chars)
-            display_name = f"{order_data['name'][-2:]}"
-        else:
-            # Unknown type - fallback
-            display_name = f"Order {order_data.get('name', 'Unknown')}"
-
-        logger.info(f"SCHEDULED-DEBUG: Order {order_id} PASSED all filters - adding to recent list")
-        recent.append({
-            "order_id": order_id,
-            "display_name": display_name,
-            "vendor": order_data.get("vendors", ["Unknown"])[0],
-        })
-
-    logger.info(f"SCHEDULED-DEBUG: Found {len(recent)} recent orders after filtering")
-    return recent[-10:]
+    recent = same_time.candidates.recent(current_order_id, vendor, state=state)
+    logger.debug(f"SCHEDULED-DEBUG: Found {len(recent)} recent orders (current={current_order_id}, vendor={vendor})")
+    return recent
 
 
 def get_last_confirmed_order(vendor: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    """Get the most recent order with confirmed time from today."""
-    today = now().date()
-    confirmed_orders: List[Dict[str, Any]] = []
-
-    for order_data in STATE.values():
-        created_at = order_data.get("created_at")
-        if not created_at:
-            continue
-        
-        # Handle both string (Shopify) and datetime (Smoothr)
-        if isinstance(created_at, str):
-            try:
-                created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            except:
-                continue
-        else:
-            created_dt = created_at
-        
-        if created_dt.date() != today:
-            continue
-        if not order_data.get("confirmed_time"):
-            continue
-        if vendor and vendor not in order_data.get("vendors", []):
-            continue
-        confirmed_orders.append(order_data)
-
-    if confirmed_orders:
-        confirmed_orders.sort(key=lambda x: x["created_at"], reverse=True)
-        return confirmed_orders[0]
-    return None
+    """Get the order with the most recent confirmed time from today (see same_time.confirmations)."""
+    latest = same_time.confirmations.latest(vendor)
+    return STATE.get(latest.order_id) if latest and STATE else None
 
 
 def build_smart_time_suggestions(order_id: str, vendor: Optional[str] = None) -> InlineKeyboardMarkup:
-    """Build smart time suggestions based on last confirmed order."""
-    last_order = get_last_confirmed_order(vendor)
+    """Build smart time suggestions from the last confirmation, spaced by the vendor's recent kitchen pace."""
+    exact_row = [InlineKeyboardButton("EXACT TIME ⏰", callback_data=f"vendor_exact|{order_id}|{vendor or 'all'}")]
+    last = same_time.confirmations.latest(vendor)
 
-    if not last_order:
-        return InlineKeyboardMarkup([
-            [InlineKeyboardButton("EXACT TIME ⏰", callback_data=f"vendor_exact|{order_id}|{vendor or 'all'}")]
-        ])
+    if not last:
+        return InlineKeyboardMarkup([exact_row])
 
-    last_time_str = last_order["confirmed_time"]
-    last_order_num = last_order["name"][-2:] if len(last_order["name"]) >= 2 else last_order["name"]
+    last_order_num = last.order_name[-2:] if len(last.order_name) >= 2 else last.order_name
 
     try:
-        hour, minute = map(int, last_time_str.split(':'))
-        base_time = now().replace(hour=hour, minute=minute, second=0, microsecond=0)
-
+        base = divmod(last.minute, 60)
         buttons: List[List[InlineKeyboardButton]] = []
-        for i, minutes_to_add in enumerate([5, 10, 15, 20]):
-            suggested_time = base_time + timedelta(minutes=minutes_to_add)
-            button_text = f"{last_order_num} {last_time_str} + {minutes_to_add}min"
-            callback_data = f"smart_time|{order_id}|{vendor or 'all'}|{suggested_time.strftime('%H:%M')}"
+        for i, minutes_to_add in enumerate(same_time.confirmations.suggestion_offsets(vendor)):
+            button_text = f"{last_order_num} {last.time} + {minutes_to_add}min"
+            callback_data = f"smart_time|{order_id}|{vendor or 'all'}|{add_minutes(base, minutes_to_add)}"
 
             if i % 2 == 0:
                 buttons.append([])
             buttons[-1].append(InlineKeyboardButton(button_text, callback_data=callback_data))
 
-        buttons.append([InlineKeyboardButton("EXACT TIME ⏰", callback_data=f"vendor_exact|{order_id}|{vendor or 'all'}")])
+        buttons.append(exact_row)
         return InlineKeyboardMarkup(buttons)
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Error building smart suggestions: %s", exc)
-        return InlineKeyboardMarkup([
-            [InlineKeyboardButton("EXACT TIME ⏰", callback_data=f"vendor_exact|{order_id}|{vendor or 'all'}")]
-        ])
+        return InlineKeyboardMarkup([exact_row])
 
 
 def build_mdg_dispatch_text(order: Dict[str, Any], show_details: bool = False) -> str:
+    """
+    Build MDG dispatch message (cached per order version, see render_cache).
+    
+    Today's date is part of the key: scheduled Smoothr orders show the date
+    only when it isn't today.
+    """
+    return render_cache.cache.render(
+        "mdg", order, lambda: _render_mdg_dispatch_text(order, show_details),
+        expanded=show_details, context=now().date().isoformat()
+    )
+
+
+def _render_mdg_dispatch_text(order: Dict[str, Any], show_details: bool = False) -> str:
     """
     Build MDG dispatch message with collapsible details.
     
@@ -331,7 +243,7 @@ def build_mdg_dispatch_text(order: Dict[str, Any], show_details: bool = False) -
                 
                 if order_datetime and hasattr(order_datetime, 'date'):
                     order_date = order_datetime.date()
-                    today = datetime.now().date()
+                    today = now().date()  # Same Europe/Berlin date as the render cache key
                 
                 if order_date != today:
                     # Future date order - show date AND time
@@ -502,7 +414,8 @@ def build_mdg_dispatch_text(order: Dict[str, Any], show_details: bool = False) -
             text += "\n"  # Blank line after source
             
             # Add district line
-            district = get_district_from_address(original_address)
+            # Never blocks: a pending lookup re-edits MDG-ORD when it completes
+            district = districts.get_order_district(order)
             
             logger.info(f"District detection: address='{original_address}', district='{district}'")
             
@@ -622,9 +535,9 @@ def mdg_initial_keyboard(order: Dict[str, Any], state: Dict[str, Any] = None) ->
             buttons.append([InlineKeyboardButton("🕒 Time picker", callback_data=f"req_exact|{order_id}|{int(now().timestamp())}")])
             
             # Show "Scheduled orders" button only if recent orders exist
-            recent_orders = get_recent_orders_for_same_time(order_id, vendor=None, state=effective_state)
-            logger.info(f"SCHEDULED-KB-DEBUG: order_id={order_id} - checking scheduled button, found {len(recent_orders)} recent orders")
-            if recent_orders:
+            has_recent = same_time.candidates.has_candidates(order_id, state=effective_state)
+            logger.info(f"SCHEDULED-KB-DEBUG: order_id={order_id} - checking scheduled button, recent orders: {has_recent}")
+            if has_recent:
                 buttons.append([InlineKeyboardButton("🗂 Scheduled orders", callback_data=f"req_scheduled|{order_id}|{int(now().timestamp())}")])
                 logger.info(f"SCHEDULED-KB-DEBUG: order_id={order_id} - ADDED scheduled button")
             else:
@@ -708,8 +621,7 @@ def mdg_time_request_keyboard(order_id: str, order: Optional[Dict[str, Any]] = N
         buttons.append([InlineKeyboardButton("🕒 Time picker", callback_data=f"req_exact|{order_id}|{int(now().timestamp())}")])
         
         # Show "Scheduled orders" button only if recent orders exist
-        recent_orders = get_recent_orders_for_same_time(order_id, vendor=None, state=effective_state)
-        if recent_orders:
+        if same_time.candidates.has_candidates(order_id, state=effective_state):
             buttons.append([InlineKeyboardButton("🗂 Scheduled orders", callback_data=f"req_scheduled|{order_id}|{int(now().timestamp())}")])
         
         # Add Remove button for test orders
@@ -739,141 +651,17 @@ def mdg_time_submenu_keyboard(order_id: str, vendor: Optional[str] = None, state
         if not order:
             return InlineKeyboardMarkup([])
 
-        # Get all confirmed orders (not delivered/removed) from TODAY
-        today_start = now().replace(hour=0, minute=1, second=0, microsecond=0)
-        recent_orders: List[Dict[str, Any]] = []
-
-        for oid, order_data in state.items():
-            if oid == order_id:
-                continue
-                
-            # Check BOTH confirmed_time (Shopify) AND confirmed_times (Smoothr/PF)
-            confirmed_time = order_data.get("confirmed_time")
-            confirmed_times = order_data.get("confirmed_times", {})  # Dict of vendor -> time
-            status = order_data.get("status")
-            
-            has_confirmation = confirmed_time or (confirmed_times and any(confirmed_times.values()))
-            if not has_confirmation:
-                continue
-                
-            if status in ["delivered", "removed"]:
-                continue
-            
-            created_at = order_data.get("created_at")
-            # Normalize created_at to datetime for comparison
-            if isinstance(created_at, str):
-                try:
-                    created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                except:
-                    continue
-            else:
-                created_dt = created_at
-                
-            # TODAY filter: only show orders from today
-            if not created_dt or created_dt < today_start:
-                continue
-                
-            # Safe access to customer address
-            address = order_data.get('customer', {}).get('address', 'Unknown')
-            address_short = address.split(',')[0].strip() if ',' in address else address
-            
-            # Use confirmed_time if available, otherwise get first value from confirmed_times dict
-            display_time = confirmed_time if confirmed_time else (list(confirmed_times.values())[0] if confirmed_times else "??:??")
-            
-            recent_orders.append({
-                "order_id": oid,
-                "confirmed_time": display_time,
-                "confirmed_times": confirmed_times,  # Include per-vendor times
-                "address": address_short,
-                "vendors": order_data.get("vendors", []),
-            })
-
+        # Confirmed orders (not delivered/removed) from TODAY, one button per vendor, labels pre-rendered
+        refs = same_time.candidates.buttons(order_id, state=state)
         buttons: List[List[InlineKeyboardButton]] = []
 
         # If we have recent orders, show them + Back button
-        if recent_orders:
-            for recent in recent_orders:
-                chef_emoji = CHEF_EMOJIS[recent_orders.index(recent) % len(CHEF_EMOJIS)]
-                
-                # If multi-vendor reference order, create separate button per vendor
-                if len(recent["vendors"]) > 1:
-                    for ref_vendor in recent["vendors"]:
-                        ref_vendor_shortcut = RESTAURANT_SHORTCUTS.get(ref_vendor, ref_vendor[:2].upper())
-                        
-                        # Get vendor-specific time from confirmed_times dict, fallback to confirmed_time
-                        vendor_time = recent.get("confirmed_times", {}).get(ref_vendor, recent['confirmed_time'])
-                        
-                        # Build button text: "14:15 - Grabenga. 15  - LR" (TWO spaces before vendor)
-                        abbreviated_address = abbreviate_street(recent['address'], max_length=15)
-                        button_text = f"{vendor_time} - {abbreviated_address}  - {ref_vendor_shortcut}"
-                        
-                        # TIER 2: If button exceeds Telegram limit, apply aggressive abbreviation
-                        if len(button_text) > TELEGRAM_BUTTON_TEXT_LIMIT:
-                            import re
-                            # Extract house number from original address
-                            house_match = re.search(r'\s+(\d+[a-zA-Z]?)$', recent['address'])
-                            house_num = f" {house_match.group(1)}" if house_match else ""
-                            
-                            # Get street name without house number
-                            street_only = recent['address'][:house_match.start()] if house_match else recent['address']
-                            
-                            # Remove all common prefixes and just take first 4 letters
-                            street_clean = re.sub(r'^(Doktor-|Professor-|Sankt-|Dr\.-|Prof\.-|St\.-)', '', street_only)
-                            
-                            # If still compound (has hyphens), take first part
-                            if '-' in street_clean:
-                                street_clean = street_clean.split('-')[0]
-                            
-                            # Take first 4 letters only
-                            aggressive_abbr = street_clean[:4] + house_num
-                            button_text = f"{vendor_time} - {aggressive_abbr}  - {ref_vendor_shortcut}"
-                        
-                        # Callback contains SINGLE ref vendor shortcut (not comma-separated) and vendor-specific time
-                        callback_data = f"order_ref|{order_id}|{recent['order_id']}|{vendor_time}|{ref_vendor_shortcut}"
-                        if vendor:
-                            # Add current vendor shortcut
-                            current_vendor_shortcut = RESTAURANT_SHORTCUTS.get(vendor, vendor[:2].upper())
-                            callback_data += f"|{current_vendor_shortcut}"
-                        
-                        buttons.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
-                else:
-                    # Single vendor reference order
-                    ref_vendor = recent["vendors"][0]
-                    ref_vendor_shortcut = RESTAURANT_SHORTCUTS.get(ref_vendor, ref_vendor[:2].upper())
-                    
-                    # Build button text: "14:15 - Grabenga. 15  - LR" (TWO spaces before vendor)
-                    abbreviated_address = abbreviate_street(recent['address'], max_length=15)
-                    button_text = f"{recent['confirmed_time']} - {abbreviated_address}  - {ref_vendor_shortcut}"
-                    
-                    # TIER 2: If button exceeds Telegram limit, apply aggressive abbreviation
-                    if len(button_text) > TELEGRAM_BUTTON_TEXT_LIMIT:
-                        import re
-                        # Extract house number from original address
-                        house_match = re.search(r'\s+(\d+[a-zA-Z]?)$', recent['address'])
-                        house_num = f" {house_match.group(1)}" if house_match else ""
-                        
-                        # Get street name without house number
-                        street_only = recent['address'][:house_match.start()] if house_match else recent['address']
-                        
-                        # Remove all common prefixes and just take first 4 letters
-                        street_clean = re.sub(r'^(Doktor-|Professor-|Sankt-|Dr\.-|Prof\.-|St\.-)', '', street_only)
-                        
-                        # If still compound (has hyphens), take first part
-                        if '-' in street_clean:
-                            street_clean = street_clean.split('-')[0]
-                        
-                        # Take first 4 letters only
-                        aggressive_abbr = street_clean[:4] + house_num
-                        button_text = f"{recent['confirmed_time']} - {aggressive_abbr}  - {ref_vendor_shortcut}"
-                    
-                    # Callback contains SINGLE ref vendor shortcut
-                    callback_data = f"order_ref|{order_id}|{recent['order_id']}|{recent['confirmed_time']}|{ref_vendor_shortcut}"
-                    if vendor:
-                        # Add current vendor shortcut
-                        current_vendor_shortcut = RESTAURANT_SHORTCUTS.get(vendor, vendor[:2].upper())
-                        callback_data += f"|{current_vendor_shortcut}"
-                    
-                    buttons.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
+        if refs:
+            # Callback contains SINGLE ref vendor shortcut (+ current vendor shortcut for multi-vendor orders)
+            current_vendor = f"|{RESTAURANT_SHORTCUTS.get(vendor, vendor[:2].upper())}" if vendor else ""
+            for ref in refs:
+                callback_data = f"order_ref|{order_id}|{ref.order_id}|{ref.time}|{ref.shortcut}{current_vendor}"
+                buttons.append([InlineKeyboardButton(ref.label, callback_data=callback_data)])
 
             # Add Back button
             buttons.append([InlineKeyboardButton("← Back", callback_data="hide")])
@@ -981,152 +769,105 @@ def time_picker_keyboard(order_id: str, action: str, requested_time: Optional[st
     """
     Build time picker for various actions.
     
+    Layout is cached per base minute, action and vendor (see keyboards.py);
+    only the order id is stamped in per click.
+    
     Args:
         vendor: Full vendor name - will be converted to shortcut for callback data
     """
     try:
         current_time = now()
-        if requested_time:
+        base = (current_time.hour, current_time.minute)
+        # "later_time" counts from the requested time, everything else from now
+        if action == "later_time" and requested_time:
             try:
                 req_hour, req_min = map(int, requested_time.split(':'))
-                base_time = now().replace(hour=req_hour, minute=req_min)
+                if 0 <= req_hour < 24 and 0 <= req_min < 60:
+                    base = (req_hour, req_min)
             except Exception:  # pragma: no cover - defensive
-                base_time = current_time
-        else:
-            base_time = current_time
-
-        intervals: List[str] = []
-        minute_increments = [5, 10, 15, 20]
-        
-        if action == "later_time":
-            for minutes in minute_increments:
-                time_option = base_time + timedelta(minutes=minutes)
-                intervals.append(time_option.strftime("%H:%M"))
-        else:
-            for minutes in minute_increments:
-                time_option = current_time + timedelta(minutes=minutes)
-                intervals.append(time_option.strftime("%H:%M"))
+                pass
 
         # Convert vendor name to shortcut for callback data (avoid 64-byte limit)
         vendor_shortcut = RESTAURANT_SHORTCUTS.get(vendor, vendor[:2].upper()) if vendor else None
 
-        rows: List[List[InlineKeyboardButton]] = []
-        
-        # Determine button prefix based on action
-        # RG buttons (later_time, prepare_time) use "in", others use "+"
-        if action in ["later_time", "prepare_time"]:
-            prefix = "in"
-        else:
-            prefix = "+"
-        
-        # Create one button per row (vertical layout)
-        for i, time_str in enumerate(intervals):
-            minutes = minute_increments[i]
-            # Format: "⏰ 18:10 → in 5 m" (RG) or "+5m → ⏰ 18:10" (UPC)
-            if prefix == "in":
-                button_text = f"⏰ {time_str} → in {minutes} m"
-            else:
-                button_text = f"+{minutes}m → ⏰ {time_str}"
-            
-            # Include vendor SHORTCUT in callback if provided (for prepare_time and later_time actions)
-            if vendor_shortcut:
-                callback = f"{action}|{order_id}|{time_str}|{vendor_shortcut}"
-            else:
-                callback = f"{action}|{order_id}|{time_str}"
-            
-            rows.append([InlineKeyboardButton(button_text, callback_data=callback)])
-        
-        # Add EXACT TIME button at the bottom
-        if vendor_shortcut:
-            exact_callback = f"vendor_exact_time|{order_id}|{vendor_shortcut}|{action}"
-        else:
-            exact_callback = f"exact_time|{order_id}|{action}"
-        rows.append([InlineKeyboardButton("Time picker🕒", callback_data=exact_callback)])
-        
-        # Add Back button
-        rows.append([InlineKeyboardButton("← Back", callback_data="hide")])
-
-        return InlineKeyboardMarkup(rows)
+        return _time_picker_template(action, base, vendor_shortcut).stamp(order_id)
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Error building time picker: %s", exc)
         return InlineKeyboardMarkup([])
 
 
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _time_picker_template(action: str, base: Tuple[int, int], vendor_shortcut: Optional[str]) -> KeyboardTemplate:
+    """Time picker layout for one base minute: +5/10/15/20 min, Time picker, Back."""
+    # RG buttons (later_time, prepare_time) use "in", others use "+"
+    rg_style = action in ["later_time", "prepare_time"]
+
+    # One button per row (vertical layout)
+    rows = []
+    for minutes in TIME_PICKER_INCREMENTS:
+        time_str = add_minutes(base, minutes)
+        # Format: "⏰ 18:10 → in 5 m" (RG) or "+5m → ⏰ 18:10" (UPC)
+        label = f"⏰ {time_str} → in {minutes} m" if rg_style else f"+{minutes}m → ⏰ {time_str}"
+        # Include vendor SHORTCUT in callback if provided (for prepare_time and later_time actions)
+        rows.append([(label, f"{action}|{ORDER_ID}|{time_str}{optional_suffix(vendor_shortcut)}")])
+
+    # Add EXACT TIME button at the bottom
+    if vendor_shortcut:
+        exact_callback = f"vendor_exact_time|{ORDER_ID}|{vendor_shortcut}|{action}"
+    else:
+        exact_callback = f"exact_time|{ORDER_ID}|{action}"
+    rows.append([("Time picker🕒", exact_callback)])
+
+    # Add Back button
+    rows.append([("← Back", "hide")])
+    return KeyboardTemplate(rows)
+
+
 def exact_time_keyboard(order_id: str, vendor: Optional[str] = None) -> InlineKeyboardMarkup:
     """Build exact time picker - shows hours."""
     try:
         current_time = now()
-        current_hour = current_time.hour
-        current_minute = current_time.minute
-        
         # Skip current hour if past minute 57 (no valid 3-minute intervals left)
-        start_hour = current_hour + 1 if current_minute >= 57 else current_hour
-        
-        rows: List[List[InlineKeyboardButton]] = []
-        hours: List[str] = [f"{hour:02d}" for hour in range(start_hour, 24)]
-
-        for i in range(0, len(hours), 4):
-            row: List[InlineKeyboardButton] = []
-            for j in range(4):
-                if i + j < len(hours):
-                    hour_str = hours[i + j]  # Already just the hour number
-                    # Include vendor in callback if provided
-                    callback = f"exact_hour|{order_id}|{hour_str}"
-                    if vendor:
-                        callback += f"|{vendor}"
-                    row.append(InlineKeyboardButton(
-                        hours[i + j],
-                        callback_data=callback
-                    ))
-            if row:
-                rows.append(row)
-
-        rows.append([InlineKeyboardButton("← Back", callback_data=f"exact_hide|{order_id}")])
-        return InlineKeyboardMarkup(rows)
+        start_hour = current_time.hour + 1 if current_time.minute >= 57 else current_time.hour
+        return _exact_time_template(start_hour, vendor).stamp(order_id)
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Error building exact time keyboard: %s", exc)
         return InlineKeyboardMarkup([])
 
 
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _exact_time_template(start_hour: int, vendor: Optional[str]) -> KeyboardTemplate:
+    """Hour grid (4 per row) from start_hour to 23."""
+    hours = [f"{hour:02d}" for hour in range(start_hour, 24)]
+    # Include vendor in callback if provided
+    rows = grid([(hour_str, f"exact_hour|{ORDER_ID}|{hour_str}{optional_suffix(vendor)}") for hour_str in hours], 4)
+    rows.append([("← Back", f"exact_hide|{ORDER_ID}")])
+    return KeyboardTemplate(rows)
+
+
 def exact_hour_keyboard(order_id: str, hour: int, vendor: Optional[str] = None) -> InlineKeyboardMarkup:
     """Build minute picker for exact time - 3 minute intervals."""
     try:
         current_time = now()
-        rows: List[List[InlineKeyboardButton]] = []
-        minutes_options: List[str] = []
-
-        for minute in range(0, 60, 3):
-            if hour == current_time.hour and minute <= current_time.minute:
-                continue
-            minutes_options.append(f"{hour:02d}:{minute:02d}")
-
-        for i in range(0, len(minutes_options), 4):
-            row: List[InlineKeyboardButton] = []
-            for j in range(4):
-                if i + j < len(minutes_options):
-                    time_str = minutes_options[i + j]
-                    # Include vendor in callback if provided
-                    callback = f"exact_selected|{order_id}|{time_str}"
-                    if vendor:
-                        callback += f"|{vendor}"
-                    row.append(InlineKeyboardButton(
-                        time_str,
-                        callback_data=callback
-                    ))
-            if row:
-                rows.append(row)
-
-        # Include vendor in back button if provided
-        back_callback = f"exact_back_hours|{order_id}"
-        if vendor:
-            back_callback += f"|{vendor}"
-        rows.append([InlineKeyboardButton("← Back to hours", callback_data=back_callback)])
-        return InlineKeyboardMarkup(rows)
+        # In the current hour only minutes after now are offered; rounding the cutoff
+        # down to the 3-minute grid keeps one template per grid step
+        cutoff = current_time.minute - current_time.minute % 3 if hour == current_time.hour else -1
+        return _exact_hour_template(hour, cutoff, vendor).stamp(order_id)
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Error building exact hour keyboard: %s", exc)
         return InlineKeyboardMarkup([])
 
 
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _exact_hour_template(hour: int, cutoff: int, vendor: Optional[str]) -> KeyboardTemplate:
+    """Minute grid (4 per row) for one hour, minutes after `cutoff` only."""
+    times = [f"{hour:02d}:{minute:02d}" for minute in range(0, 60, 3) if minute > cutoff]
+    # Include vendor in callbacks (and back button) if provided
+    rows = grid([(time_str, f"exact_selected|{ORDER_ID}|{time_str}{optional_suffix(vendor)}") for time_str in times], 4)
+    rows.append([("← Back to hours", f"exact_back_hours|{ORDER_ID}{optional_suffix(vendor)}")])
+    return KeyboardTemplate(rows)
+
+
 # =============================================================================
 # ORDER COMBINING SYSTEM
 # =============================================================================
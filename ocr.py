@@ -7,8 +7,8 @@ import os
 import re
 import requests
 import logging
-from datetime import datetime
-from typing import Dict, Optional
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +16,12 @@ class ParseError(Exception):
     """Raised when OCR parsing fails"""
     pass
 
-def extract_text_from_image(photo_path: str) -> str:
+def extract_text_from_image(photo: Union[str, bytes]) -> str:
     """
     Run OCR.space API on image and return raw text.
     
     Args:
-        photo_path: Absolute path to downloaded photo
+        photo: Absolute path to downloaded photo, or the image bytes (JPEG/PNG)
         
     Returns:
         Raw OCR text output
@@ -35,20 +35,27 @@ def extract_text_from_image(photo_path: str) -> str:
     
     try:
         # Call OCR.space API
-        with open(photo_path, 'rb') as f:
-            response = requests.post(
-                'https://api.ocr.space/parse/image',
-                files={'file': f},
-                data={
-                    'apikey': api_key,
-                    'language': 'ger',  # German for Lieferando orders
-                    'isOverlayRequired': False,
-                    'detectOrientation': True,
-                    'scale': True,
-                    'isTable': False  # Optimize for document text layout
-                },
-                timeout=30
-            )        # Check HTTP status first
+        if isinstance(photo, (bytes, bytearray)):
+            image_bytes, filename = bytes(photo), 'photo.jpg'
+            source = f"{len(image_bytes)} byte image"
+        else:
+            with open(photo, 'rb') as f:
+                image_bytes = f.read()
+            filename = source = photo
+        response = requests.post(
+            'https://api.ocr.space/parse/image',
+            files={'file': (os.path.basename(filename), image_bytes)},
+            data={
+                'apikey': api_key,
+                'language': 'ger',  # German for Lieferando orders
+                'isOverlayRequired': False,
+                'detectOrientation': True,
+                'scale': True,
+                'isTable': False  # Optimize for document text layout
+            },
+            timeout=30
+        )
+        # Check HTTP status first
         if response.status_code != 200:
             logger.error(f"[OCR] API returned status {response.status_code}")
             logger.error(f"[OCR] Response text: {response.text[:500]}")
@@ -77,7 +84,7 @@ def extract_text_from_image(photo_path: str) -> str:
         text = result['ParsedResults'][0]['ParsedText']
         
         # Log raw output for debugging
-        logger.info(f"[OCR] Raw text extracted from {photo_path}:")
+        logger.info(f"[OCR] Raw text extracted from {source}:")
         logger.info(f"[OCR] FULL TEXT:\n{text}")
         logger.info(f"[OCR] Total length: {len(text)} characters")
         
@@ -93,6 +100,130 @@ def extract_text_from_image(photo_path: str) -> str:
         logger.error(f"[OCR] Unexpected error: {str(e)}")
         raise ParseError(f"Unexpected error: {str(e)}")
 
+
+# =============================================================================
+# PF ORDER PARSER
+# =============================================================================
+#
+# parse_pf_order runs in stages over one OCR text:
+#   1. rejections   - pickup orders, collapsed (truncated) notes
+#   2. lines        - every line is classified once (classify_lines): zip,
+#                     phone, total, quoted note, UI label, name, address ...
+#   3. fields       - order code, zip, name, address (from the line tags),
+#                     phone, product count, time (Geplant), total, note
+# All patterns are compiled here once; a failed stage raises ParseError with
+# the collapse diagnosis (detect_collapse_error).
+
+# Stage 1: rejections
+_PICKUP_RE = re.compile(r'zur Abholung', re.IGNORECASE)  # Also covers "Bestellung zur Abholung"
+_COLLAPSED_NOTE_RE = re.compile(r'["“”][^"“”]{5,}\.\.\.(?!\s*["“”])')
+
+# Stage 3: fields
+_ORDER_CODE_RE = re.compile(r'[#*]\s*([A-Z0-9]{3})\s+([A-Z0-9]{3})', re.IGNORECASE)  # "#VCJ 34V"
+_BEZAHLT_RE = re.compile(r'Bezahlt', re.IGNORECASE)
+_ZIP_RE = re.compile(r'\b(940\d{2})\b')  # Passau = 940XX
+# Phone with emoji, or on its own line (used to bound the name / address section)
+_PHONE_LINE_RE = re.compile(r'(?:📞\s*|^\s*|\n\s*)(\+?\d{10,20})', re.MULTILINE)
+_QUOTED_BLOCK_RE = re.compile(r'["“”][^"“”]*["“”]')
+_UNCLOSED_QUOTE_RE = re.compile(r'["“”][^"“”]*$')
+# Name line: "H. Buchner", "LT. Welke", "Welke", "É. Frowein-Hundertmark" - not a UI tab / payment label
+_NAME_RE = re.compile(
+    r'\n\s*(?!(?:Bezahlt|Fertig|Wird|In Lieferung)(?:\s|$))'
+    r'([A-ZÄÖÜÉÈÊÀa-zäöüéèêàß][A-ZÄÖÜÉÈÊÀa-zäöüéèêàß]*\.?(?:[ \t]+[A-ZÄÖÜÉÈÊÀa-zäöüéèêàß][^\n]{1,30})?)\s*\n',
+    re.IGNORECASE,
+)
+_INITIAL_NAME_RE = re.compile(r'\n\s*([A-ZÄÖÜÉÈÊÀa-zäöüéèêàß]\.[ \t]+[A-ZÄÖÜÉÈÊÀa-zäöüéèêàß][^\n]{1,30})\s*\n', re.IGNORECASE)
+_NAME_STREET_SUFFIX_RE = re.compile(r'(?:Straße|Strasse|Str\.?|Weg|Gasse|Platz|Ring|Allee|Hof|Damm)', re.IGNORECASE)
+_MISREAD_BUILDING_RE = re.compile(r'^[IO](?=\s+\w)')  # "I Franz-Stockbauer-Weg" -> "1 Franz-Stockbauer-Weg"
+_HYPHEN_WRAP_RE = re.compile(r'(\w+)- (\w+)')  # "Dr.-Hans-Kapfi- nger" -> "Dr.-Hans-Kapfi-nger"
+_STREET_BREAK_RE = re.compile(r'(str|straß|gass|plätz|wag)\s+(aße|e|en)', re.IGNORECASE)  # "str aße" -> "straße"
+_ADDRESS_ZIP_RE = re.compile(r',?\s*940\d{2}\s*,?')
+_ADDRESS_CITY_RE = re.compile(r',?\s*Passau\s*')
+_APARTMENT_BUILDING_RE = re.compile(r'^(\d+[A-Za-z]?)[/\s]')  # "1/ app Nr 316" -> "1"
+_TRAILING_BUILDING_RE = re.compile(r'\d+[A-Za-z]?\s*$')
+_PHONE_RE = re.compile(r'📞?\s*([O0+]?\d[\d -)]{8,20})')
+_BARE_PHONE_RE = re.compile(r'\b(0\d{9,14})\b')
+_ARTIKEL_RE = re.compile(r'(\d+)\s*Artike?l?', re.IGNORECASE)  # OCR often drops the last letters
+_MINUTES_RE = re.compile(r'(\d{1,3})\s*Min', re.IGNORECASE)
+_SCREEN_TIME_RE = re.compile(r'^[^\n]*?(\d{1,2}):(\d{2})', re.MULTILINE)
+_CLOCK_RE = re.compile(r'(\d{1,2}):(\d{2})')
+_TOTAL_RE = re.compile(r'(\d+,\d{2})\s*€')
+_NOTE_RE = re.compile(r'["“”]([^"“”]{5,})["“”]')
+_NOTE_LINE_BREAK_RE = re.compile(r'\r?\n')
+_NOTE_GARBAGE_RE = re.compile(r'\s+(?:00|50|e 4GÅR a)\s+')  # OCR noise at note line breaks
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Collapse diagnosis
+_ANY_PHONE_RE = re.compile(r'📞?\s*\+?\d{10,20}')
+_NOTE_ICON_RE = re.compile(r'[🚚🚴]')
+_COLLAPSED_ARROW_RE = re.compile(r'[▼▽►▻⊳∨˅ˇ>vV(]')  # Incl. the ∨ chevron
+_TRUNCATED_NOTE_RE = re.compile(r'["“][^"“”]*\.\.\.')
+
+GEPLANT_WINDOW = 50  # Chars before "Geplant" searched for the scheduled time
+MAX_SCHEDULED_MINUTES = 180
+STREET_SUFFIXES = ('straße', 'strasse', 'str', 'gasse', 'platz', 'ring', 'weg', 'allee', 'hof', 'damm', 'ort', 'markt', 'dobl')
+STREET_PREFIXES = ('untere', 'obere', 'alte', 'neue', 'große', 'kleine', 'innere', 'äußere', 'am')
+COMPLETE_STREET_SUFFIXES = ('straße', 'strasse', 'weg', 'platz', 'gasse', 'ring', 'allee')
+
+# --- LINE CLASSIFICATION ---
+# Each stripped OCR line gets the tag of the first rule that matches. The order
+# matters: it is the order the address block checks its lines in.
+LINE_EMPTY = "empty"
+LINE_ZIP = "zip"              # "94032 Passau"
+LINE_UI = "ui"                # "Bezahlt", "Fertig", "Passau"
+LINE_GARBAGE = "garbage"      # "00 Hinterhaus" - OCR noise from note line breaks
+LINE_QUOTED = "quoted"        # Part of a customer note (notes are always quoted)
+LINE_NAME = "name"            # "L. Kramer"
+LINE_MINUTES = "minutes"      # "45" (minutes until a scheduled order, "Min." lost by OCR)
+LINE_FRAGMENT = "fragment"    # Under 5 chars: "aße", "7G"
+LINE_SUFFIX = "suffix"        # A street suffix alone: "Straße", "gasse"
+LINE_APARTMENT = "apartment"  # "1/ app Nr 316", "2. OG" (no street name)
+LINE_DIGITS = "digits"        # Bare 5-digit number outside Passau
+LINE_PHONE = "phone"          # "+4915219190243"
+LINE_TOTAL = "total"          # "43,85 €"
+LINE_TIME = "time"            # "17:40"
+LINE_ARTIKEL = "artikel"      # "6 Artikel"
+LINE_TEXT = "text"            # Anything else: address, products, UI
+
+_LINE_RULES = (
+    (LINE_EMPTY, r'\Z'),
+    (LINE_ZIP, r'940\d{2}'),
+    (LINE_UI, r'(?:Bezahlt|Fertig|Passau)\Z'),
+    (LINE_GARBAGE, r'[O0]\s*[O0]\s+\w'),
+    (LINE_QUOTED, r'[^"“”]*["“”]'),
+    (LINE_NAME, r'[A-ZÄÖÜ]\.\s+\w'),
+    (LINE_MINUTES, r'\d{1,3}\Z'),
+    (LINE_FRAGMENT, r'.{0,4}\Z'),
+    (LINE_SUFFIX, r'(?i:a[sß]e|weg|gasse|platz|ring|allee|straße|strasse|str\.?)\Z'),
+    # "App. 5", "Wohnung 12", "2. OG" - but not on a line that names the street
+    (LINE_APARTMENT, r'(?i:(?=.*?(?:app|wohnung|apt|[1-9]\.\s*og))'
+                     r'(?!.*?(?:straße|strasse|str\.|weg|platz|gasse|ring|allee)))'),
+    (LINE_DIGITS, r'\d{5}\Z'),
+    (LINE_PHONE, r'\+?\d{10,}\Z'),
+    (LINE_TOTAL, r'\d+[,\.]\d{2}\s*€'),
+    (LINE_TIME, r'\d{1,2}:\d{2}\Z'),
+    (LINE_ARTIKEL, r'(?i:.*?\d\s*Artike?l?)'),
+)
+# One alternation anchored at the line start: the first rule that matches names the group
+_LINE_RE = re.compile('|'.join(f'(?P<{tag}>{pattern})' for tag, pattern in _LINE_RULES))
+
+# What the address block does with each tag (anything else is an address line)
+_ADDRESS_SKIP = frozenset((LINE_EMPTY, LINE_ZIP, LINE_UI, LINE_GARBAGE, LINE_QUOTED, LINE_NAME,
+                           LINE_MINUTES, LINE_FRAGMENT, LINE_SUFFIX, LINE_DIGITS))
+_ADDRESS_STOP = frozenset((LINE_PHONE, LINE_TOTAL))
+
+
+def classify_line(line: str) -> str:
+    """Tag of one stripped OCR line (LINE_* constant)."""
+    match = _LINE_RE.match(line)
+    return match.lastgroup if match else LINE_TEXT
+
+
+def classify_lines(ocr_text: str) -> List[Tuple[str, str]]:
+    """(stripped line, tag) for every line of the OCR text, in order."""
+    return [(line, classify_line(line)) for line in (raw.strip() for raw in ocr_text.split('\n'))]
+
+
 def parse_pf_order(ocr_text: str) -> dict:
     """
     Parse Pommes Freunde order fields from OCR text.
@@ -106,503 +237,283 @@ def parse_pf_order(ocr_text: str) -> dict:
     Raises:
         ParseError: If any required field is missing
     """
-    result = {}
-    
-    # 0. Check for Selbstabholung (pickup orders - reject immediately)
-    if re.search(r'Bestellung zur Abholung|zur Abholung', ocr_text, re.IGNORECASE):
+    # Stage 1: orders the bot can't take
+    if _PICKUP_RE.search(ocr_text):
         raise ParseError("SELBSTABHOLUNG")
-    
-    # 0.5 Check for collapsed note EARLY (before name parsing can fail)
-    # Pattern: opening quote + text + "..." without closing quote
-    collapsed_note_match = re.search(r'[""\u201c\u201d][^""\u201c\u201d]{5,}\.\.\.(?!\s*[""\u201c\u201d])', ocr_text)
-    if collapsed_note_match:
-        logger.info(f"[OCR] Detected collapsed note (truncated with ...): {repr(collapsed_note_match.group(0)[:50])}")
+    # Checked before name parsing can fail: opening quote + text + "..." without closing quote
+    collapsed_note = _COLLAPSED_NOTE_RE.search(ocr_text)
+    if collapsed_note:
+        logger.info(f"[OCR] Detected collapsed note (truncated with ...): {repr(collapsed_note.group(0)[:50])}")
         raise ParseError(detect_collapse_note(ocr_text))
-    
-    # 1. Order # (optional): #ABC XYZ format
-    # Extract last 2 chars from 2nd group for display
-    # Example: "#VCJ 34V" → order_num="4V"
-    # Example: "#SM9 8H3" → order_num="H3"
-    # If OCR fails to extract order code, use "N/A" as fallback
-    order_match = re.search(r'[#*]\s*([A-Z0-9]{3})\s+([A-Z0-9]{3})', ocr_text, re.IGNORECASE)
-    if not order_match:
-        result['order_num'] = "N/A"
-        logger.warning(f"[ORDER-N/A] Order code not found in OCR text, using fallback")
-        # When order code missing, use "Bezahlt" marker as starting point for name/address search
-        bezahlt_match = re.search(r'Bezahlt', ocr_text, re.IGNORECASE)
-        if bezahlt_match:
-            order_end = bezahlt_match.end()
-        else:
-            # Fallback: use ZIP code as reference point
-            zip_fallback = re.search(r'\b940\d{2}\b', ocr_text)
-            order_end = zip_fallback.start() if zip_fallback else 0
-    else:
-        full_code = order_match.group(2).upper()
-        result['order_num'] = full_code[-2:]  # Last 2 chars
-        logger.info(f"[ORDER-{result['order_num']}] Parsed PF order from OCR")
-        order_end = order_match.end()
-    
-    # 2. ZIP (required): 5 digits (Passau = 940XX)
-    zip_match = re.search(r'\b(940\d{2})\b', ocr_text)
+
+    # Stage 2: tag every line once
+    lines = classify_lines(ocr_text)
+
+    # Stage 3: fields
+    result = {}
+    result['order_num'], order_end = _parse_order_code(ocr_text)
+
+    zip_match = _ZIP_RE.search(ocr_text)
     if not zip_match:
         raise ParseError(detect_collapse_error(ocr_text))
     result['zip'] = zip_match.group(1)
-    
-    # 3. Customer Name (required): After order code, before full address
-    # Pattern: Standalone line with name, may have prefix ("A. Hasan", "L. Hoffmann")
-    # Must NOT be from note section (check for note indicators first)
-    
-    # Find text between order code and phone number
-    # Skip phones inside quoted notes (e.g., "Bitte anrufen... +49...")
-    # Match phone with emoji OR on own line OR after newline
-    phone_pattern = r'(?:📞\s*|^\s*|\n\s*)(\+?\d{10,20})'
-    phone_matches = list(re.finditer(phone_pattern, ocr_text[order_end:], re.MULTILINE))
-    
-    # Filter out phones inside quotes by checking quote count before match
-    phone_pos = None
-    for match in phone_matches:
-        start_pos = order_end + match.start()
-        # Look back 100 chars for context
-        lookback = ocr_text[max(0, start_pos-100):start_pos]
-        # Count quotes before this phone
-        quote_count = lookback.count('"')
-        # If even number of quotes (or zero), phone is NOT inside quoted text
-        if quote_count % 2 == 0:
-            phone_pos = match
-            break
-    
-    if phone_pos:
-        # Search for name in section BEFORE phone
-        search_area = ocr_text[order_end:order_end + phone_pos.start()]
+
+    section_end = _find_details_phone(ocr_text, order_end)
+    result['customer'] = _parse_customer_name(ocr_text, order_end, section_end)
+
+    # The name was found in a quote-stripped copy: locate it in the original text
+    name_pos = ocr_text.find(result['customer'], order_end)
+    if name_pos == -1:
+        name_pos = ocr_text.lower().find(result['customer'].lower(), order_end)
+    if name_pos == -1:
+        raise ParseError(detect_collapse_error(ocr_text))
+    name_end = name_pos + len(result['customer'])
+
+    if section_end is not None:
+        address_block = ocr_text[name_end:section_end]
     else:
-        # Fallback: search in next 300 chars after order code
-        search_area = ocr_text[order_end:order_end + 300]
-    
-    # Strip multi-line quoted notes from search_area
-    # Notes like "text...\n more text...\n end" have quotes only on first/last line
-    # This prevents note lines from matching as customer name
-    search_area = re.sub(r'[""\u201c\u201d][^""\u201c\u201d]*[""\u201c\u201d]', '', search_area, flags=re.DOTALL)
-    
-    # Also strip unclosed quoted notes (opening quote but no closing quote before end of block)
-    # Pattern: opening quote followed by text until end of search_area
-    search_area = re.sub(r'[""\u201c\u201d][^""\u201c\u201d]*$', '', search_area, flags=re.DOTALL)
-    
-    # Find name line: starts with letter (upper or lower case), not a street name pattern, not in quotes
-    # Exclude lines with: numbers at start, quotes, bicycle emoji, UI elements
-    # Allow patterns: "H. Buchner", "LT. Welke", "M. Steinleitner", "Welke", "h. Khatib", "F. Auriemma", "É. Frowein-Hundertmark"
-    # Pattern: One or more uppercase/lowercase letters (including accents), optional dot, optional space + more letters
-    # Filter out: "Bezahlt" (payment status), "Fertig" (UI tab), "Wird zubereitet", "In Lieferung" (UI tabs)
-    name_match = re.search(r'\n\s*(?!(?:Bezahlt|Fertig|Wird|In Lieferung)(?:\s|$))([A-ZÄÖÜÉÈÊÀa-zäöüéèêàß][A-ZÄÖÜÉÈÊÀa-zäöüéèêàß]*\.?(?:[ \t]+[A-ZÄÖÜÉÈÊÀa-zäöüéèêàß][^\n]{1,30})?)\s*\n', search_area, re.IGNORECASE)
-    
+        address_block = ocr_text[name_end:name_end + 200]
+    address, apartment_info = _parse_address(address_block, dict(lines))
+    if address is None:
+        raise ParseError(detect_collapse_error(ocr_text))
+    result['address'] = address
+    if apartment_info:
+        result['apartment_info'] = apartment_info
+
+    result['phone'] = _parse_phone(ocr_text, name_end)
+
+    artikel_match = _ARTIKEL_RE.search(ocr_text)
+    # OCR may misread the number (e.g. "3" as "$")
+    result['product_count'] = int(artikel_match.group(1)) if artikel_match else 'N/A'
+
+    result['time'] = _parse_scheduled_time(ocr_text, lines)
+
+    total_match = _TOTAL_RE.search(ocr_text)
+    if not total_match:
+        raise ParseError(detect_collapse_error(ocr_text))
+    result['total'] = float(total_match.group(1).replace(',', '.'))
+
+    result['note'] = _parse_note(ocr_text, order_end)
+
+    logger.info(f"[ORDER-{result['order_num']}] Parsed PF order from OCR: {result['customer']}, "
+                f"{result['address']}, {result['time']}")
+    return result
+
+
+def _parse_order_code(ocr_text: str) -> Tuple[str, int]:
+    """
+    Display number (last 2 chars of the code, "#VCJ 34V" -> "4V") and the
+    position the customer section starts at. Without a readable code the
+    number is "N/A" and the section starts after "Bezahlt" (or at the zip).
+    """
+    order_match = _ORDER_CODE_RE.search(ocr_text)
+    if order_match:
+        return order_match.group(2).upper()[-2:], order_match.end()
+
+    logger.warning(f"[ORDER-N/A] Order code not found in OCR text, using fallback")
+    bezahlt_match = _BEZAHLT_RE.search(ocr_text)
+    if bezahlt_match:
+        return "N/A", bezahlt_match.end()
+    zip_match = _ZIP_RE.search(ocr_text)
+    return "N/A", zip_match.start() if zip_match else 0
+
+
+def _find_details_phone(ocr_text: str, order_end: int) -> Optional[int]:
+    """
+    Position where the customer details' phone line starts (ends the name /
+    address section), skipping phones quoted inside a note.
+    """
+    section = ocr_text[order_end:]
+    for match in _PHONE_LINE_RE.finditer(section):
+        start = order_end + match.start()
+        # Even number of quotes in the 100 chars before: not inside a quoted note
+        if ocr_text[max(0, start - 100):start].count('"') % 2 == 0:
+            return start
+    return None
+
+
+def _parse_customer_name(ocr_text: str, order_end: int, section_end: Optional[int]) -> str:
+    """Customer name line between the order code and the details phone."""
+    search_area = ocr_text[order_end:section_end] if section_end is not None else ocr_text[order_end:order_end + 300]
+    # Notes (quoted, possibly multi-line or unclosed) must not match as the name
+    search_area = _QUOTED_BLOCK_RE.sub('', search_area)
+    search_area = _UNCLOSED_QUOTE_RE.sub('', search_area)
+
+    name_match = _NAME_RE.search(search_area)
     if not name_match:
         raise ParseError(detect_collapse_error(ocr_text))
-    
-    candidate_name = name_match.group(1).strip()
-    
-    # Validate candidate name - reject order code fragments AND street suffixes
-    # Order codes are: 3 uppercase letters + digits, e.g., "CVY", "7G", "F9"
-    # Street suffixes: "Straße", "Weg", "Gasse", etc. (OCR may split street name across lines)
-    # Real customer names have: lowercase letters, dots, multiple parts, or longer length
-    is_order_code_fragment = (
-        len(candidate_name) <= 3 and 
-        candidate_name.isupper() and 
-        candidate_name.isalnum()
-    )
-    
-    # Check if candidate is a street suffix (OCR split "52 Freyunger\nStraße" across lines)
-    street_suffixes_pattern = re.match(r'^(Straße|Strasse|Str\.?|Weg|Gasse|Platz|Ring|Allee|Hof|Damm)$', candidate_name, re.IGNORECASE)
-    is_street_suffix = bool(street_suffixes_pattern)
-
-    if is_order_code_fragment or is_street_suffix:
-        # This looks like an order code fragment or street suffix, not a real name
-        # Search for a better name pattern (with dot like "F. Name") in ORIGINAL ocr_text
-        # (search_area may have quotes stripped, removing the actual customer name)
-        if is_street_suffix:
-            logger.info(f"[OCR] Rejecting street suffix as name: '{candidate_name}'")
-        else:
-            logger.info(f"[OCR] Rejecting order code fragment as name: '{candidate_name}'")
-        
-        # Search in ORIGINAL ocr_text (not search_area) for "X. Name" pattern
-        # This finds names like "F. Pal Chowdhury", "L. Kramer" even if quotes were stripped
-        better_name_match = re.search(r'\n\s*([A-ZÄÖÜÉÈÊÀa-zäöüéèêàß]\.[ \t]+[A-ZÄÖÜÉÈÊÀa-zäöüéèêàß][^\n]{1,30})\s*\n', ocr_text, re.IGNORECASE)
-        if better_name_match:
-            candidate_name = better_name_match.group(1).strip()
-            logger.info(f"[OCR] Found better name pattern: '{candidate_name}'")
-        else:
-            raise ParseError(detect_collapse_error(ocr_text))
-    
-    result['customer'] = candidate_name
-    
-    # 4. Address (required): Full address from customer details section
-    # Located AFTER customer name, BEFORE phone
-    # Extract complete address including apartment/floor info
-    # Pattern: Street + number, may span multiple lines with apartment info
-    
-    # Find full address block: everything between customer name and phone
-    # CRITICAL: name_match position is in MODIFIED search_area (with quotes stripped)
-    # We must find the customer name position in the ORIGINAL ocr_text
-    customer_name = result['customer']
-    name_pos_in_original = ocr_text.find(customer_name, order_end)
-    if name_pos_in_original == -1:
-        # Fallback: try case-insensitive search
-        name_pos_in_original = ocr_text.lower().find(customer_name.lower(), order_end)
-    if name_pos_in_original == -1:
+    name = name_match.group(1).strip()
+
+    # Order code fragments ("CVY", "7G") and street suffixes split off the line above ("Straße")
+    is_code_fragment = len(name) <= 3 and name.isupper() and name.isalnum()
+    if not (is_code_fragment or _NAME_STREET_SUFFIX_RE.fullmatch(name)):
+        return name
+
+    logger.info(f"[OCR] Rejecting {'order code fragment' if is_code_fragment else 'street suffix'} as name: '{name}'")
+    # "F. Pal Chowdhury" pattern anywhere in the original text (quote stripping may have removed it)
+    better_match = _INITIAL_NAME_RE.search(ocr_text)
+    if not better_match:
         raise ParseError(detect_collapse_error(ocr_text))
-    name_end = name_pos_in_original + len(customer_name)
-    logger.info(f"[OCR] phone_pos found: {phone_pos is not None}")
-    
-    if phone_pos:
-        address_block = ocr_text[name_end:order_end + phone_pos.start()].strip()
-        logger.info(f"[OCR] Using phone_pos for address_block, length: {len(address_block)}")
-    else:
-        # Fallback: look for address pattern before ZIP
-        address_block = ocr_text[name_end:name_end + 200].strip()
-        logger.info(f"[OCR] Using fallback for address_block, length: {len(address_block)}")
-    
-    # Extract ONLY first line before comma (street + number only)
-    # Ignore everything after comma (Etage, apartment, floor info)
+    return better_match.group(1).strip()
+
+
+def _parse_address(address_block: str, tags: Dict[str, str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    "Street Number" from the lines after the customer name, plus an apartment
+    line ("1/ app Nr 316") if there is one. Street is None when no line qualifies.
+
+    Args:
+        address_block: Text between the customer name and the details phone
+        tags: Line tags from classify_lines() (lines cut by the block are classified here)
+    """
     address_lines = []
-    apartment_info = None  # Store apartment info separately if found
-    logger.info(f"[OCR] address_block to process: {repr(address_block[:150])}")
-    for line in address_block.split('\n'):
+    apartment_info = None
+    for line in address_block.strip().split('\n'):
         line = line.strip()
-        logger.info(f"[OCR] Processing address line: '{line}' (len={len(line)})")
-        # Skip ZIP code line (don't break - address might come after)
-        if re.match(r'^940\d{2}', line):
-            logger.info(f"[OCR] Skipping ZIP code line: '{line}'")
-            continue
-        # Skip "Bezahlt", "Fertig" (UI button), "Passau", or empty lines
-        if not line or line in ('Bezahlt', 'Fertig', 'Passau'):
-            continue
-        # Skip OCR garbage lines from notes (typically "00", "50", "OO" followed by text)
-        if re.match(r'^[O0]\s*[O0]\s+\w', line):
-            logger.info(f"[OCR] Skipping OCR garbage line from note: '{line}'")
-            continue
-        # Skip lines with quotes (notes are always quoted)
-        if '"' in line or '"' in line or '"' in line:
-            logger.info(f"[OCR] Skipping quoted line (likely note): '{line}'")
-            continue
-        # Skip customer name patterns (single letter + dot + space + name)
-        # These appear after notes in OCR: "L. Kramer", "M. ismail", "F. Weihrer"
-        if re.match(r'^[A-ZÄÖÜ]\.\s+\w', line):
-            logger.info(f"[OCR] Skipping customer name line: '{line}'")
-            continue
-        # Skip very short lines that are likely OCR fragments (e.g., "aße" from broken "straße")
-        # Valid address lines should be at least 5 characters
-        if len(line) < 5:
-            logger.info(f"[OCR] Skipping short fragment line: '{line}'")
-            continue
-        # Skip lines that are ONLY street suffix fragments without street name
-        # e.g., "aße", "weg", "gasse" on their own
-        suffix_only_pattern = re.match(r'^(a[sß]e|weg|gasse|platz|ring|allee|straße|strasse|str\.?)$', line, re.IGNORECASE)
-        if suffix_only_pattern:
-            logger.info(f"[OCR] Skipping suffix-only fragment: '{line}'")
+        tag = tags.get(line) or classify_line(line)
+        if tag in _ADDRESS_SKIP:
             continue
-        # Detect apartment-only lines: "1/ app Nr 316", "App. 5", "Wohnung 12", etc.
-        # These should be stored separately, not as part of street address
-        # Pattern: optional building number + apartment keyword + optional apartment number
-        # Does NOT contain street name indicators (straße, weg, platz, etc.)
-        has_street_suffix = any(suffix in line.lower() for suffix in ('straße', 'strasse', 'str.', 'weg', 'platz', 'gasse', 'ring', 'allee'))
-        apartment_pattern = re.search(r'(?:app\.?\s*(?:nr\.?\s*)?|wohnung\s*|apt\.?\s*|[1-9]\.\s*og)', line, re.IGNORECASE)
-        if apartment_pattern and not has_street_suffix:
-            apartment_info = line
-            logger.info(f"[OCR] Detected apartment info (stored separately): '{line}'")
-            continue
-        # Fix OCR misread: "I Franz-Stockbauer-Weg" → "1 Franz-Stockbauer-Weg"
-        if re.match(r'^[IO]\s+\w', line) and any(suffix in line.lower() for suffix in ('straße', 'str', 'weg', 'platz', 'ring', 'gasse')):
-            line = re.sub(r'^[IO](\s)', r'1\1', line)
-            logger.info(f"[OCR] Fixed OCR misread in address: {line}")
-        # Skip lines that are just ZIP
-        if re.match(r'^\d{5}$', line):
-            continue
-        # Stop at phone number line (digits only, 10+ chars)
-        if re.match(r'^\+?\d{10,}$', line):
-            break
-        # Stop at total/price line (e.g., "28,90 €" or "37,56 €")
-        if re.match(r'^\d+[,\.]\d{2}\s*€', line):
+        if tag in _ADDRESS_STOP:
             break
-        # Stop at lines with just numbers (like "28" or "37" from total parsing errors)
-        # But KEEP alphanumeric building numbers like "9A", "19-21", "4a"
-        if re.match(r'^\d{1,3}$', line) and not re.match(r'^\d{1,3}[A-Za-z-]', line):
-            break
-        # Append valid address line
-        address_lines.append(line)
-        # Stop after first valid address line (before comma/Etage)
+        if tag == LINE_APARTMENT:
+            apartment_info = line  # Kept apart from the street
+            continue
+        if any(word in line.lower() for word in ('straße', 'str', 'weg', 'platz', 'ring', 'gasse')):
+            line = _MISREAD_BUILDING_RE.sub('1', line)
         if ',' in line:
-            # Take only part before comma (DON'T replace entire list - keep building number!)
-            address_lines[-1] = line.split(',')[0].strip()
+            # Street and number come first; "Etage", zip and city follow the comma
+            address_lines.append(line.split(',')[0].strip())
             break
-    
-    logger.info(f"[OCR] address_lines collected: {address_lines}")
+        address_lines.append(line)
+
     if not address_lines:
         logger.error(f"[OCR] No valid address lines found in address_block")
-        raise ParseError(detect_collapse_error(ocr_text))
-    
-    # Check for duplicate address collection - stop if we have split street name
-    # OCR often shows address twice: split in header + complete in details
-    if len(address_lines) >= 2:
-        first_line = address_lines[0]
-        # Pattern: "77 Waldschmidtstr" (number + incomplete street, not ending with complete suffix)
-        # Only match COMPLETE suffixes to avoid false positives (e.g., "str" in "Waldschmidtstr")
-        complete_suffixes = ('straße', 'strasse', 'weg', 'platz', 'gasse', 'ring', 'allee')
-        if first_line and first_line[0].isdigit() and not first_line.lower().endswith(complete_suffixes):
-            second_line = address_lines[1] if len(address_lines) > 1 else ""
-            # If second line completes the street (e.g., "aße"), keep only first 2 lines
-            if second_line and not second_line[0].isdigit():
-                address_lines = address_lines[:2]
-                logger.info(f"[OCR] Detected split address, keeping only first 2 lines: {address_lines}")
-    
-    # Join address lines WITH spaces (preserve multi-word patterns like "1/ app Nr 316")
-    # Handle word wrapping in street names (e.g., "Dr.-Hans-Kapfi\nger-Straße" split across lines)
-    full_address_raw = ' '.join(address_lines)
-    # Remove word-wrap artifacts: if hyphenated word is split with space, rejoin it
-    full_address_raw = re.sub(r'(\w+)- (\w+)', r'\1-\2', full_address_raw)
-    # Fix OCR word breaks in German street names: "Waldschmidtstr aße" → "Waldschmidtstraße"
-    full_address_raw = re.sub(r'(str|straß|gass|plätz|wag)\s+(aße|e|en)', r'\1\2', full_address_raw, flags=re.IGNORECASE)
-    
-    # Remove ZIP and city if they appear in address
-    full_address_raw = re.sub(r',?\s*940\d{2}\s*,?', '', full_address_raw)
-    full_address_raw = re.sub(r',?\s*Passau\s*', '', full_address_raw)
-    full_address_raw = full_address_raw.strip().rstrip(',')
-    
-    # Reformat address: "Number Street" → "Street Number"
-    # Handle patterns like "13 Dr.-Hans-Kapfinger-Straße" or "1/ app Nr 316 Leonhard-Paminger-Straße"
-    address_parts = full_address_raw.split()
-    
-    if len(address_parts) >= 2:
-        # Define street patterns for comprehensive detection
-        street_suffixes = ('straße', 'strasse', 'str', 'gasse', 'platz', 'ring', 'weg', 'allee', 'hof', 'damm', 'ort', 'markt', 'dobl')
-        street_prefixes = ('untere', 'obere', 'alte', 'neue', 'große', 'kleine', 'innere', 'äußere', 'am')
-        
-        # Check for pattern: "Number Street" (e.g., "60 Neuburger Straße" or "129 Göttweiger Str.")
-        # First part starts with digit (allows alphanumeric like "25a", "1A"), last part has street suffix
-        first_starts_with_digit = address_parts[0][0].isdigit() if address_parts[0] else False
-        last_has_suffix = address_parts[-1].lower().rstrip('.').endswith(street_suffixes)
-        
-        if first_starts_with_digit and last_has_suffix:
-            # Pattern: "60 Neuburger Straße" → number="60", street="Neuburger Straße"
-            number = address_parts[0]
-            street = ' '.join(address_parts[1:])
-            result['address'] = f"{street} {number}"
-            logger.info(f"OCR Address parsed (number-first pattern): street='{street}', number='{number}'")
-        elif len(address_parts) == 2 and first_starts_with_digit:
-            # Simple 2-word pattern: "8 Roßtränke" → assume "Roßtränke 8"
-            number = address_parts[0]
-            street = address_parts[1]
-            result['address'] = f"{street} {number}"
-            logger.info(f"OCR Address parsed (2-word pattern): street='{street}', number='{number}'")
-        else:
-            # Original logic: Scan for street start marker
-            # OCR shows address in order: building number FIRST, street name AFTER
-            # Example: "2 Traminer Straße" or "1/ app Nr 316 Leonhard-Paminger-Straße"
-            # Need to identify where street name starts, collect everything before as building number
-            
-            building_number_parts = []
-            street_name_parts = []
-            found_street = False
-            
-            for part in address_parts:
-                if not found_street:
-                    # Check if this looks like start of street name:
-                    # 1) Contains hyphen (e.g., "Dr.-Hans-Kapfinger-Straße")
-                    # 2) Ends with street suffix (straße, gasse, platz, ring, etc.)
-                    # 3) Is a multi-word street prefix (Untere, Alte, Neue, etc.)
-                    if ('-' in part or 
-                        part.lower().endswith(street_suffixes) or 
-                        part.lower() in street_prefixes):
-                        # This is the street name
-                        found_street = True
-                        street_name_parts.append(part)
-                    else:
-                        # Still part of building number
-                        building_number_parts.append(part)
-                else:
-                    # Already found street, rest is part of street name
-                    street_name_parts.append(part)
-            
-            if street_name_parts and building_number_parts:
-                # Format: "Street Name Building Number" (e.g., "Traminer Straße 2")
-                street = ' '.join(street_name_parts)
-                number = ' '.join(building_number_parts)
-                result['address'] = f"{street} {number}"
-                logger.info(f"OCR Address parsed: street='{street}', number='{number}'")
-            elif street_name_parts:
-                # Only street name found, no building number
-                result['address'] = ' '.join(street_name_parts)
-                logger.info(f"OCR Address parsed: only street='{result['address']}'")
-            else:
-                # No street name pattern found, use raw address
-                result['address'] = full_address_raw
-                logger.info(f"OCR Address parsed: no pattern match, using raw='{result['address']}'")
-    else:
-        result['address'] = full_address_raw
-        logger.info(f"OCR Address parsed: single word, using raw='{result['address']}'")
-    
-    # Append apartment info to address if detected
+        return None, None
+
+    # Address shown twice (split street in the header, complete in the details):
+    # "77 Waldschmidtstr" + "aße" -> keep the first two lines
+    first_line = address_lines[0]
+    if (len(address_lines) >= 2 and first_line and first_line[0].isdigit()
+            and not first_line.lower().endswith(COMPLETE_STREET_SUFFIXES)
+            and address_lines[1] and not address_lines[1][0].isdigit()):
+        address_lines = address_lines[:2]
+
+    # Join with spaces, then undo word wrapping: "Dr.-Hans-Kapfi- nger", "Waldschmidtstr aße"
+    raw = _HYPHEN_WRAP_RE.sub(r'\1-\2', ' '.join(address_lines))
+    raw = _STREET_BREAK_RE.sub(r'\1\2', raw)
+    raw = _ADDRESS_CITY_RE.sub('', _ADDRESS_ZIP_RE.sub('', raw))
+    raw = raw.strip().rstrip(',')
+
+    address = _format_street_number(raw)
     if apartment_info:
-        # Extract building number from apartment info if address is missing it
-        # Pattern: "1/ app Nr 316" → building number is "1"
-        apt_building_match = re.match(r'^(\d+[A-Za-z]?)[/\s]', apartment_info)
-        if apt_building_match:
-            building_num = apt_building_match.group(1)
-            # Check if address already has a building number
-            has_building_number = re.search(r'\d+[A-Za-z]?\s*$', result['address'])
-            if not has_building_number:
-                # Address is missing building number, prepend it
-                result['address'] = f"{result['address']} {building_num}"
-                logger.info(f"[OCR] Added building number from apartment info: {building_num}")
-        # Store apartment info separately for potential display
-        result['apartment_info'] = apartment_info
-        logger.info(f"[OCR] Apartment info stored: {apartment_info}")
-    
-    # 5. Phone (required): Extract from expanded details section (after customer name, before total)
-    # Phone appears with emoji: 📞 +4917647373945 or 📞 015739645573
-    # Search in section AFTER customer name to avoid capturing ZIP or other numbers
-    phone_search_area = ocr_text[name_end:name_end + 300]  # Search in next 300 chars after name
-    logger.info(f"[OCR] Phone search area: {repr(phone_search_area[:100])}")
-    # Allow any whitespace (including newlines) before phone number
-    # Match: +49..., 0... (German format), or phone emoji followed by number
-    phone_match = re.search(r'📞?\s*([O0+]?\d[\d -)]{8,20})', phone_search_area)
-    # Fallback: try matching bare phone numbers starting with 0 (e.g., "017677276446")
-    if not phone_match:
-        phone_match = re.search(r'\b(0\d{9,14})\b', phone_search_area)
-    logger.info(f"[OCR] Phone match result: {phone_match}")
-    
+        # "1/ app Nr 316": the building number belongs to the street if it has none
+        building_match = _APARTMENT_BUILDING_RE.match(apartment_info)
+        if building_match and not _TRAILING_BUILDING_RE.search(address):
+            address = f"{address} {building_match.group(1)}"
+    return address, apartment_info
+
+
+def _format_street_number(raw: str) -> str:
+    """Lieferando shows "13 Dr.-Hans-Kapfinger-Straße": reorder to "Dr.-Hans-Kapfinger-Straße 13"."""
+    parts = raw.split()
+    if len(parts) < 2:
+        return raw
+
+    first_is_number = parts[0][0].isdigit()
+    if first_is_number and parts[-1].lower().rstrip('.').endswith(STREET_SUFFIXES):
+        return f"{' '.join(parts[1:])} {parts[0]}"  # "60 Neuburger Straße"
+    if first_is_number and len(parts) == 2:
+        return f"{parts[1]} {parts[0]}"  # "8 Roßtränke"
+
+    # Everything before the first street-looking word is the building number
+    # ("1/ app Nr 316 Leonhard-Paminger-Straße", "13 Am Seidenhof")
+    for i, part in enumerate(parts):
+        lower = part.lower()
+        if '-' in part or lower.endswith(STREET_SUFFIXES) or lower in STREET_PREFIXES:
+            street = ' '.join(parts[i:])
+            return f"{street} {' '.join(parts[:i])}" if i else street
+    return raw
+
+
+def _parse_phone(ocr_text: str, name_end: int) -> str:
+    """Phone from the details after the customer name, normalized to +49..."""
+    search_area = ocr_text[name_end:name_end + 300]
+    phone_match = _PHONE_RE.search(search_area) or _BARE_PHONE_RE.search(search_area)
     if not phone_match:
-        logger.error(f"[OCR] Phone regex failed. Search area length: {len(phone_search_area)}")
+        logger.error(f"[OCR] Phone regex failed. Search area length: {len(search_area)}")
         raise ParseError(detect_collapse_error(ocr_text))
-    
+
     phone = phone_match.group(1).replace(' ', '').replace('-', '').replace(')', '').strip()
-    # Fix OCR errors: O → 0
-    phone = phone.replace('O', '0')
-    
-    # Normalize phone: add +49 if missing, remove leading 0
+    phone = phone.replace('O', '0')  # OCR reads 0 as O
     if not phone.startswith('+'):
-        if phone.startswith('0'):
-            phone = '+49' + phone[1:]  # Remove 0, add +49
-        else:
-            phone = '+49' + phone  # Add +49
-    
+        phone = '+49' + (phone[1:] if phone.startswith('0') else phone)
     if len(phone) < 10:  # Minimum valid phone length with country code
         raise ParseError(detect_collapse_error(ocr_text))
-    result['phone'] = phone
-    
-    # 6. Product count: Extract from "X Artikel" (fallback to "N/A" if OCR misreads)
-    artikel_match = re.search(r'(\d+)\s*Artike?l?', ocr_text, re.IGNORECASE)
-    if artikel_match:
-        result['product_count'] = int(artikel_match.group(1))
-    else:
-        # Fallback: OCR may misread number (e.g., "3" as "$")
-        result['product_count'] = 'N/A'
-    
-    # 7. Scheduled Time: Check for "Geplant" indicator
-    # Pattern: OCR shows "XX Min." (minutes until ready) near "Geplant", need to calculate actual time
-    # Extract: screen_time (from top) + minutes = scheduled_time
+    return phone
+
+
+def _parse_scheduled_time(ocr_text: str, lines: List[Tuple[str, str]]) -> str:
+    """
+    "HH:MM" for scheduled ("Geplant") orders, else "asap".
+
+    Right above "Geplant" the screen shows either the time ("17:40") or the
+    minutes until it ("45 Min.", sometimes just "45"), with the zip in between.
+    Minutes are added to the screen clock (first time at the top).
+    """
     geplant_pos = ocr_text.lower().find('geplant')
-    if geplant_pos != -1:
-        # Look in last 50 chars before "Geplant" for "XX Min" pattern
-        pre_geplant = ocr_text[max(0, geplant_pos - 50):geplant_pos]
-        logger.info(f"[OCR] pre_geplant text: {repr(pre_geplant)}")
-        
-        # Match "XX Min" pattern OR standalone minutes (just "45" on its own line before Geplant)
-        min_pattern_match = re.search(r'(\d{1,3})\s*Min', pre_geplant, re.IGNORECASE)
-        
-        # Fallback: standalone number at end of pre_geplant (e.g., "45\r\n" without "Min")
-        # Only match 1-3 digit numbers that are reasonable minutes (1-180)
-        standalone_min_match = None
-        if not min_pattern_match:
-            standalone_min_match = re.search(r'(\d{1,3})\s*\r?\n\s*$', pre_geplant)
-            if standalone_min_match:
-                mins = int(standalone_min_match.group(1))
-                if mins < 1 or mins > 180:
-                    standalone_min_match = None  # Invalid range, ignore
-        
-        if min_pattern_match or standalone_min_match:
-            # Found minutes pattern - need to calculate scheduled time
-            if min_pattern_match:
-                minutes_until_ready = int(min_pattern_match.group(1))
-                logger.info(f"[OCR] Found 'XX Min' pattern: {minutes_until_ready} minutes")
-            else:
-                minutes_until_ready = int(standalone_min_match.group(1))
-                logger.info(f"[OCR] Found standalone minutes: {minutes_until_ready} minutes")
-            
-            # Extract screen time from top of OCR (first time pattern in text)
-            screen_time_match = re.search(r'^[^\n]*?(\d{1,2}):(\d{2})', ocr_text, re.MULTILINE)
-            
-            if screen_time_match:
-                from datetime import datetime, timedelta
-                screen_hour = int(screen_time_match.group(1))
-                screen_minute = int(screen_time_match.group(2))
-                
-                # Handle 12-hour format (5:43 could be AM or PM)
-                # Food delivery orders are typically PM (afternoon/evening)
-                # But hours 10-11 should NOT add 12 (10:34 is already 10:34, not 22:34)
-                current_time = datetime.now().replace(hour=screen_hour, minute=screen_minute, second=0, microsecond=0)
-                
-                # Only add 12 hours if hour is clearly morning (1-9)
-                # Hours 10-11 could be either AM or PM, assume AM (don't add 12)
-                # Hours 12+ are already PM
-                if screen_hour >= 1 and screen_hour <= 9:
-                    current_time = current_time.replace(hour=screen_hour + 12)
-                
-                scheduled_time = current_time + timedelta(minutes=minutes_until_ready)
-                result['time'] = scheduled_time.strftime("%H:%M")
-                logger.info(f"[OCR] Calculated Geplant time: {screen_hour}:{screen_minute:02d} + {minutes_until_ready} min = {result['time']}")
-            else:
-                # Fallback: can't find screen time, use 'asap'
-                logger.warning(f"[OCR] Found minutes but no screen time, using asap")
-                result['time'] = 'asap'
-        else:
-            # No minutes pattern - this is a direct scheduled time like "12:35 Geplant"
-            # Search in the text before "Geplant" for a time pattern (HH:MM)
-            direct_time_match = re.search(r'(\d{1,2}):(\d{2})', pre_geplant)
-            
-            if direct_time_match:
-                hour = int(direct_time_match.group(1))
-                minute = int(direct_time_match.group(2))
-                if hour > 23 or minute > 59:
-                    raise ParseError(detect_collapse_error(ocr_text))
-                result['time'] = f"{hour:02d}:{minute:02d}"
-                logger.info(f"[OCR] Found direct Geplant time: {result['time']}")
-            else:
-                result['time'] = 'asap'
-                logger.warning(f"[OCR] Found 'Geplant' but no time pattern in pre_geplant: {repr(pre_geplant)}")
-    else:
-        result['time'] = 'asap'
-    
-    # 8. Total (required): Format "XX,XX €"
-    total_match = re.search(r'(\d+,\d{2})\s*€', ocr_text)
-    if not total_match:
+    if geplant_pos == -1:
+        return 'asap'
+    pre_geplant = ocr_text[max(0, geplant_pos - GEPLANT_WINDOW):geplant_pos]
+
+    minutes_match = _MINUTES_RE.search(pre_geplant)
+    minutes = int(minutes_match.group(1)) if minutes_match else _standalone_minutes(ocr_text, lines, geplant_pos)
+    if minutes is not None:
+        clock_match = _SCREEN_TIME_RE.search(ocr_text)
+        if not clock_match:
+            logger.warning(f"[OCR] Found minutes but no screen time, using asap")
+            return 'asap'
+        hour, minute = int(clock_match.group(1)), int(clock_match.group(2))
+        # Screen clock is 12-hour: 1-9 are afternoon/evening, 10-11 are taken as they are
+        if 1 <= hour <= 9:
+            hour += 12
+        scheduled = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0) + timedelta(minutes=minutes)
+        logger.info(f"[OCR] Geplant time: {hour}:{minute:02d} + {minutes} min")
+        return scheduled.strftime("%H:%M")
+
+    time_match = _CLOCK_RE.search(pre_geplant)
+    if not time_match:
+        logger.warning(f"[OCR] Found 'Geplant' but no time pattern in pre_geplant: {repr(pre_geplant)}")
+        return 'asap'
+    hour, minute = int(time_match.group(1)), int(time_match.group(2))
+    if hour > 23 or minute > 59:
         raise ParseError(detect_collapse_error(ocr_text))
-    result['total'] = float(total_match.group(1).replace(',', '.'))
-    
-    # 9. Note (optional): Extract if note section present
-    # OCR doesn't reliably capture bike emoji 🚴, so look for quoted text instead
-    # Notes are ALWAYS in quotes in Lieferando OCR output
-    # Search for quoted text AFTER order code but BEFORE products section
-    
-    # NOTE: Collapsed note check moved to top of function (step 0.5) to detect early
-    
-    # Find note in quoted text between order code and product section
-    # Limit search area to avoid matching product descriptions
-    note_search_area = ocr_text[order_end:order_end + 500] if order_end else ocr_text[:500]
-    
-    # Match complete quoted note (with opening AND closing quotes)
-    # Use DOTALL to match multi-line notes
-    note_match = re.search(r'[""\u201c\u201d]([^""\u201c\u201d]{5,})[""\u201c\u201d]', note_search_area, re.DOTALL)
-    if note_match:
-        note_text = note_match.group(1).strip()
-        # Clean up OCR artifacts and multi-line formatting
-        note_text = re.sub(r'\r?\n', ' ', note_text)
-        # Remove OCR garbage like "00", "50", "e 4GÅR a" that appears in line breaks
-        note_text = re.sub(r'\s+(?:00|50|e 4GÅR a)\s+', ' ', note_text)
-        note_text = re.sub(r'\s+', ' ', note_text).strip()
-        result['note'] = note_text
-        logger.info(f"[OCR] Extracted note: {repr(result['note'][:50] if result['note'] else None)}")
-    else:
-        result['note'] = None
-    
-    return result
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _standalone_minutes(ocr_text: str, lines: List[Tuple[str, str]], geplant_pos: int) -> Optional[int]:
+    """Minutes from a bare number line ("45") right above the "Geplant" line (zip lines skipped)."""
+    line_index = ocr_text.count('\n', 0, geplant_pos)
+    if ocr_text[ocr_text.rfind('\n', 0, geplant_pos) + 1:geplant_pos].strip():
+        return None  # "Geplant" isn't at the start of its line
+    for line, tag in reversed(lines[max(0, line_index - 3):line_index]):
+        if tag in (LINE_EMPTY, LINE_ZIP):
+            continue
+        if tag == LINE_MINUTES and 1 <= int(line) <= MAX_SCHEDULED_MINUTES:
+            return int(line)
+        return None
+    return None
+
+
+def _parse_note(ocr_text: str, order_end: int) -> Optional[str]:
+    """Customer note: quoted text after the order code (before the products)."""
+    search_area = ocr_text[order_end:order_end + 500] if order_end else ocr_text[:500]
+    note_match = _NOTE_RE.search(search_area)
+    if not note_match:
+        return None
+    note = _NOTE_LINE_BREAK_RE.sub(' ', note_match.group(1).strip())
+    note = _WHITESPACE_RE.sub(' ', _NOTE_GARBAGE_RE.sub(' ', note)).strip()
+    logger.info(f"[OCR] Extracted note: {repr(note[:50])}")
+    return note
 
 
 def detect_collapse_error(ocr_text: str) -> str:
@@ -614,15 +525,13 @@ def detect_collapse_error(ocr_text: str) -> str:
         DETAILS_AND_NOTE_COLLAPSED, or OCR_FAILED
     """
     # Check if phone number is missing (details collapsed)
-    has_phone = bool(re.search(r'📞?\s*\+?\d{10,20}', ocr_text))
+    has_phone = bool(_ANY_PHONE_RE.search(ocr_text))
     
     # Check if note indicator present with arrow (collapsed) or truncated note text
-    has_note_indicator = bool(re.search(r'[🚚🚴]', ocr_text))
-    # Expanded arrow pattern to catch Unicode variations including ∨ chevron
-    has_collapsed_arrow = bool(re.search(r'[▼▽►▻⊳∨˅ˇ>vV(]', ocr_text))
-    # Check for truncated note text (ends with "..." possibly followed by quote)
-    has_truncated_note = has_note_indicator and bool(re.search(r'[""\u201c][^""\u201c\u201d]*\.\.\.', ocr_text))
-    has_collapsed_note = has_note_indicator and (has_collapsed_arrow or has_truncated_note)
+    has_note_indicator = bool(_NOTE_ICON_RE.search(ocr_text))
+    has_collapsed_note = has_note_indicator and bool(
+        _COLLAPSED_ARROW_RE.search(ocr_text) or _TRUNCATED_NOTE_RE.search(ocr_text)
+    )
     
     # Determine error type
     if not has_phone and has_collapsed_note:
@@ -637,9 +546,7 @@ def detect_collapse_error(ocr_text: str) -> str:
 
 def detect_collapse_note(ocr_text: str) -> str:
     """Check if details are also collapsed along with note."""
-    has_phone = bool(re.search(r'📞?\s*\+?\d{10,20}', ocr_text))
-    
-    if not has_phone:
+    if not _ANY_PHONE_RE.search(ocr_text):
         return "DETAILS_AND_NOTE_COLLAPSED"
     else:
         return "NOTE_COLLAPSED"
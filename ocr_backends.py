@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# ocr_backends.py - Pluggable OCR engines with a per-deployment fallback order
+
+"""
+OCR Backends for Telegram Dispatch Bot
+
+PF photo orders used to depend on a single engine: the OCR.space HTTP API
+(2-10s per photo, and a network error meant the restaurant had to resend).
+The Aptfile already installs tesseract-ocr + tesseract-ocr-deu, so the
+engine is now pluggable:
+
+- OCRSpaceBackend: the existing API call (ocr.extract_text_from_image)
+- TesseractBackend: the local tesseract binary. Each photo is read by its own
+  tesseract process, so jobs run in parallel outside the bot process (no GIL,
+  a crash can't take the bot down); the OCR pool in ocr_pipeline.py caps how
+  many run at once
+- OCR_BACKENDS (env) picks the engines and their fallback order per
+  deployment, e.g. "tesseract,ocrspace" or just "ocrspace". Engines that
+  aren't usable here (no API key / binary) are skipped; when one fails the
+  photo goes to the next, and only the last error reaches the restaurant
+
+Backends take the image bytes (see ocr_preprocess.py) and are blocking: call
+extract_text() from a worker thread (ocr_pipeline).
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+import ocr
+from ocr import ParseError
+
+logger = logging.getLogger(__name__)
+
+OCR_BACKENDS = os.environ.get("OCR_BACKENDS", "ocrspace,tesseract")  # Fallback order
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", "tesseract")
+TESSERACT_LANG = "deu"  # Lieferando orders are German (tesseract-ocr-deu in Aptfile)
+TESSERACT_PSM = "4"  # Single column of text of variable sizes (order screenshot layout)
+TESSERACT_TIMEOUT = 30  # Seconds, same budget as the OCR.space request
+
+
+class OCRBackend:
+    """Interface: a named engine turning a photo into raw text."""
+
+    name = "base"
+
+    def available(self) -> bool:
+        """Whether this engine can run in this deployment (credentials, binaries)."""
+        return True
+
+    def extract(self, image: bytes) -> str:
+        """Raw text of the photo (JPEG/PNG bytes). Raises ParseError on failure."""
+        raise NotImplementedError
+
+
+class OCRSpaceBackend(OCRBackend):
+    """OCR.space HTTP API (needs OCR_API_KEY)."""
+
+    name = "ocrspace"
+
+    def available(self) -> bool:
+        return bool(os.getenv("OCR_API_KEY"))
+
+    def extract(self, image: bytes) -> str:
+        return ocr.extract_text_from_image(image)
+
+
+class TesseractBackend(OCRBackend):
+    """Local tesseract binary, one process per photo."""
+
+    name = "tesseract"
+
+    def __init__(self, cmd: str = TESSERACT_CMD, lang: str = TESSERACT_LANG,
+                 psm: str = TESSERACT_PSM, timeout: float = TESSERACT_TIMEOUT):
+        self.cmd = cmd
+        self.lang = lang
+        self.psm = psm
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        return shutil.which(self.cmd) is not None
+
+    def extract(self, image: bytes) -> str:
+        try:
+            result = subprocess.run(
+                [self.cmd, "stdin", "stdout", "-l", self.lang, "--psm", self.psm],
+                input=image,
+                capture_output=True,
+                timeout=self.timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            raise ParseError(f"Tesseract timed out after {self.timeout}s")
+        except OSError as e:
+            raise ParseError(f"Tesseract could not be started: {e}")
+
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", "replace").strip()
+            logger.error(f"[OCR] Tesseract exited with {result.returncode}: {stderr[:500]}")
+            raise ParseError(f"Tesseract error: {stderr[:200] or result.returncode}")
+
+        text = result.stdout.decode("utf-8", "replace")
+        if not text.strip():
+            raise ParseError("Tesseract returned no text")
+        logger.info(f"[OCR] Tesseract extracted {len(text)} characters")
+        return text
+
+
+BACKENDS: Dict[str, OCRBackend] = {
+    backend.name: backend for backend in (OCRSpaceBackend(), TesseractBackend())
+}
+
+
+def configured_backends(spec: str = OCR_BACKENDS) -> List[OCRBackend]:
+    """Backends named in spec (comma separated, in fallback order); unknown names are logged and ignored."""
+    backends = []
+    for name in (part.strip().lower() for part in spec.split(",")):
+        if not name:
+            continue
+        backend = BACKENDS.get(name)
+        if backend is None:
+            logger.warning(f"Unknown OCR backend '{name}' in OCR_BACKENDS - ignored")
+        elif backend not in backends:
+            backends.append(backend)
+    return backends
+
+
+class OCRChain:
+    """Tries the configured backends in order until one returns text."""
+
+    def __init__(self, backends: Optional[List[OCRBackend]] = None):
+        self.backends = backends if backends is not None else configured_backends()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, backend: OCRBackend) -> Dict[str, int]:
+        return self.stats.setdefault(backend.name, {"ok": 0, "failed": 0, "skipped": 0, "total_ms": 0})
+
+    def extract_text(self, image: bytes) -> str:
+        """
+        Raw text from the first backend that succeeds.
+
+        Raises:
+            ParseError: Error of the last backend tried (or none usable)
+        """
+        last_error: Optional[ParseError] = None
+        for backend in self.backends:
+            counters = self._counters(backend)
+            if not backend.available():
+                counters["skipped"] += 1
+                continue
+            start = time.perf_counter()
+            try:
+                text = backend.extract(image)
+            except ParseError as e:
+                counters["failed"] += 1
+                logger.warning(f"[OCR] Backend {backend.name} failed: {e}")
+                last_error = e
+                continue
+            finally:
+                counters["total_ms"] += int((time.perf_counter() - start) * 1000)
+            counters["ok"] += 1
+            return text
+        raise last_error or ParseError("No OCR backend available (set OCR_API_KEY or install tesseract)")
+
+    def metrics(self) -> Dict[str, object]:
+        return {"order": [b.name for b in self.backends], **self.stats}
+
+
+# Shared instance used by ocr_pipeline
+chain = OCRChain()
+
+
+def extract_text(image: bytes) -> str:
+    """Raw OCR text via the configured backends (blocking)."""
+    return chain.extract_text(image)
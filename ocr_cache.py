@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# ocr_cache.py - OCR result cache for resent PF photos and duplicate order detection
+
+"""
+OCR Cache for Telegram Dispatch Bot
+
+Pommes Freunde staff often resend a photo after a "not readable" reply, or send
+the same order twice. Each resend used to cost a download plus a full OCR round
+trip, and a second identical order became a second PF_<num>_<ts> entry.
+
+- Exact resends (forwarded / same file) share Telegram's file_unique_id: the
+  cached text and parse are reused before anything is downloaded
+- Each prepared (cropped, grayscale) photo is also fingerprinted with a
+  256-bit average hash. A photo within IMAGE_HASH_MAX_DISTANCE bits of one
+  seen in the last IMAGE_HASH_WINDOW seconds is only logged as a likely
+  re-photo: order screens share one layout, so two different orders can hash
+  alike. A photo with a new file id is always OCR'd and parsed
+- find_duplicate_order() compares a parse with the PF orders already in STATE
+  (same order code, customer and total); only that match makes handle_pf_photo
+  refuse to create the same order twice
+
+Only successful OCR text is cached; a network error or an unreadable photo is
+retried on the next send.
+"""
+
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_SIZE = 200                # Photos remembered (a day of PF orders plus resends)
+OCR_CACHE_TTL = 24 * 3600           # Seconds an exact resend (same file_unique_id) is recognized
+IMAGE_HASH_SIZE = 16                # Hash grid: 16x16 = 256 bits
+IMAGE_HASH_MAX_DISTANCE = 8         # Differing bits still counted as the same photo
+IMAGE_HASH_WINDOW = 30 * 60         # Seconds a re-photographed order is matched by its hash
+DUPLICATE_ORDER_WINDOW = timedelta(hours=3)
+
+
+@dataclass
+class CachedOCR:
+    """OCR result of one photo, plus its parse and the order created from it."""
+
+    text: str
+    file_unique_id: Optional[str] = None
+    image_hash: Optional[int] = None
+    parsed: Optional[Dict[str, Any]] = None
+    order_id: Optional[str] = None
+    created: float = field(default_factory=time.time)
+
+
+def image_hash(image: bytes) -> Optional[int]:
+    """
+    256-bit average hash of an image (None if it can't be decoded).
+
+    The image is shrunk to 16x16 and each cell becomes one bit: darker than
+    the mean or not. On an order screen that records where the text lines
+    are and how long they run, which is what tells two orders apart.
+    """
+    try:
+        with Image.open(io.BytesIO(image)) as img:
+            img.draft("L", (IMAGE_HASH_SIZE * 8, IMAGE_HASH_SIZE * 8))
+            small = img.convert("L").resize((IMAGE_HASH_SIZE, IMAGE_HASH_SIZE), Image.BILINEAR)
+    except Exception as e:
+        logger.warning(f"[OCR] Could not hash image: {e}")
+        return None
+    pixels = small.tobytes()
+    mean = sum(pixels) / len(pixels)
+    bits = 0
+    for value in pixels:
+        bits = (bits << 1) | (value < mean)
+    return bits
+
+
+def hash_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class OCRCache:
+    """LRU of OCR results indexed by file_unique_id, with a near-match search by image hash."""
+
+    def __init__(self, max_entries: int = OCR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CachedOCR]" = OrderedDict()  # id(entry) -> entry, LRU order
+        self._by_file: Dict[str, CachedOCR] = {}
+        self._lock = threading.Lock()  # Stores happen in OCR worker threads
+        self.stats: Dict[str, int] = {"file_hits": 0, "similar": 0, "misses": 0, "duplicates": 0}
+
+    def _touch(self, entry: CachedOCR) -> None:
+        self._entries.move_to_end(id(entry))
+
+    def lookup_file(self, file_unique_id: Optional[str]) -> Optional[CachedOCR]:
+        """Cached result for the exact same Telegram file (checked before downloading)."""
+        if not file_unique_id:
+            return None
+        with self._lock:
+            entry = self._by_file.get(file_unique_id)
+            if entry is None or time.time() - entry.created > OCR_CACHE_TTL:
+                return None
+            self._touch(entry)
+            self.stats["file_hits"] += 1
+            return entry
+
+    def lookup_image(self, fingerprint: Optional[int]) -> Optional[CachedOCR]:
+        """Recent photo that looks the same (likely re-photographed). A hint only: its result isn't reused."""
+        if fingerprint is None:
+            return None
+        cutoff = time.time() - IMAGE_HASH_WINDOW
+        with self._lock:
+            best, best_distance = None, IMAGE_HASH_MAX_DISTANCE + 1
+            for entry in self._entries.values():
+                if entry.image_hash is None or entry.created < cutoff:
+                    continue
+                distance = hash_distance(entry.image_hash, fingerprint)
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["similar"] += 1
+            logger.info(f"[OCR] Photo looks like a recent one ({best_distance} bits apart, order {best.order_id})")
+            return best
+
+    def store(self, text: str, file_unique_id: Optional[str] = None, fingerprint: Optional[int] = None) -> CachedOCR:
+        entry = CachedOCR(text=text, file_unique_id=file_unique_id, image_hash=fingerprint)
+        with self._lock:
+            self._entries[id(entry)] = entry
+            if file_unique_id:
+                self._by_file[file_unique_id] = entry
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                for key in [key for key, cached in self._by_file.items() if cached is evicted]:
+                    del self._by_file[key]
+        return entry
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), **self.stats}
+
+
+def find_duplicate_order(state: Dict[str, Dict[str, Any]], parsed: Dict[str, Any],
+                         now: datetime) -> Optional[str]:
+    """
+    order_id of a recent PF order with the same order code, customer and total, if any.
+
+    Orders without a readable code ("N/A") are never treated as duplicates.
+    """
+    if parsed.get("order_num") in (None, "", "N/A"):
+        return None
+    for order_id, order in state.items():
+        if not order_id.startswith(f"PF_{parsed['order_num']}_"):
+            continue
+        created_at = order.get("created_at")
+        if isinstance(created_at, datetime) and now - created_at > DUPLICATE_ORDER_WINDOW:
+            continue
+        customer = order.get("customer", {})
+        if customer.get("name") == parsed.get("customer") and order.get("total") == parsed.get("total"):
+            return order_id
+    return None
+
+
+# Shared instance
+cache = OCRCache()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# ocr_pipeline.py - Bounded OCR executor and per-stage timings for PF photo orders
+
+"""
+OCR Pipeline for Telegram Dispatch Bot
+
+handle_pf_photo runs on the shared event loop, but OCR (ocr_backends.py) blocks
+for seconds: an OCR.space request or a tesseract run, 30s timeout. Called inline
+it froze every Telegram send, edit and callback until the photo was read.
+
+- OCR jobs run in a dedicated thread pool capped at OCR_MAX_CONCURRENCY, so
+  the loop is free while the engine works and a burst of photos can't occupy
+  every default executor thread (districts, etc. share that one)
+- Jobs beyond the cap wait in a bounded queue; when OCR_QUEUE_LIMIT jobs are
+  already waiting the photo is rejected right away (the restaurant is asked to
+  resend) instead of building an unbounded backlog
+- Each job prepares the photo in memory first (ocr_preprocess.py), notes a
+  likely re-photo of a recent order (ocr_cache.py), then runs the OCR backends
+  on the smaller image
+- StageTimer records how long each stage of a photo took (download,
+  preprocess, ocr, parse, send); every photo logs one timing line and the per-stage histograms
+  are exposed in the health check
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from outbound import LatencyHistogram
+import ocr
+import ocr_backends
+import ocr_cache
+import ocr_preprocess
+
+logger = logging.getLogger(__name__)
+
+OCR_MAX_CONCURRENCY = int(os.environ.get("OCR_MAX_CONCURRENCY", "2"))  # Parallel OCR requests
+OCR_QUEUE_LIMIT = int(os.environ.get("OCR_QUEUE_LIMIT", "10"))  # Photos allowed to wait for a slot
+OCR_STAGES = ("download", "preprocess", "ocr", "parse", "send")
+OCR_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)  # Seconds (OCR.space timeout is 30s)
+
+
+class OCRQueueFull(ocr.ParseError):
+    """Raised when too many photos are already waiting for OCR."""
+
+
+class OCRExecutor:
+    """Thread pool with a concurrency cap and a bounded wait queue for blocking OCR calls."""
+
+    def __init__(self, max_workers: int = OCR_MAX_CONCURRENCY, queue_limit: int = OCR_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.queued = 0
+        self.stats: Dict[str, int] = {"completed": 0, "failed": 0, "rejected": 0}
+        self.queue_wait = LatencyHistogram(OCR_LATENCY_BUCKETS)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking function in the OCR pool without blocking the event loop.
+
+        Raises:
+            OCRQueueFull: If queue_limit jobs are already waiting for a slot
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)  # Created on the loop that uses it
+        if self.running >= self.max_workers and self.queued >= self.queue_limit:
+            self.stats["rejected"] += 1
+            raise OCRQueueFull(f"Network error: OCR queue full ({self.queued} photos waiting)")
+
+        enqueued = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.queue_wait.observe(time.perf_counter() - enqueued)
+
+        self.running += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._pool(), lambda: func(*args))
+            self.stats["completed"] += 1
+            return result
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "queued": self.queued,
+            "queue_limit": self.queue_limit,
+            **self.stats,
+            "queue_wait": self.queue_wait.snapshot(),
+        }
+
+
+class StageTimer:
+    """Wall-clock durations of the stages of one photo order."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        """e.g. "download=180ms preprocess=90ms ocr=2210ms parse=3ms send=240ms total=2730ms"."""
+        parts = [f"{name}={self.durations[name] * 1000:.0f}ms" for name in OCR_STAGES if name in self.durations]
+        parts.append(f"total={self.total() * 1000:.0f}ms")
+        return " ".join(parts)
+
+
+class StageMetrics:
+    """Per-stage latency histograms across all photo orders."""
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {
+            name: LatencyHistogram(OCR_LATENCY_BUCKETS) for name in OCR_STAGES + ("total",)
+        }
+
+    def record(self, timer: StageTimer) -> None:
+        for name, seconds in timer.durations.items():
+            if name in self.histograms:
+                self.histograms[name].observe(seconds)
+        self.histograms["total"].observe(timer.total())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: histogram.snapshot() for name, histogram in self.histograms.items() if histogram.count}
+
+
+# Shared instances
+executor = OCRExecutor()
+stage_metrics = StageMetrics()
+
+
+async def read_photo(image: bytes, timer: Optional[StageTimer] = None,
+                     file_unique_id: Optional[str] = None) -> ocr_cache.CachedOCR:
+    """
+    Preprocess a photo and OCR it in the OCR pool; the event loop keeps running meanwhile.
+
+    Always OCRs the photo: a near-identical image hash is only logged, since
+    two different orders on the same screen layout can hash alike.
+
+    Args:
+        image: Downloaded photo bytes
+        timer: Receives the "preprocess" and "ocr" stage durations
+        file_unique_id: Telegram file_unique_id, indexed for exact resends
+
+    Returns:
+        Cache entry holding the OCR text (and the parse / order id once known)
+    """
+    timer = timer or StageTimer()
+
+    def job() -> ocr_cache.CachedOCR:
+        with timer.stage("preprocess"):
+            prepared = ocr_preprocess.prepare(image)
+            fingerprint = ocr_cache.image_hash(prepared.data)
+        ocr_preprocess.stats.record(prepared)
+        logger.info(f"[OCR] Prepared photo: {prepared.summary()}")
+
+        ocr_cache.cache.lookup_image(fingerprint)  # Logged hint; duplicates are decided on the parse
+        with timer.stage("ocr"):
+            text = ocr_backends.extract_text(prepared.data)
+        return ocr_cache.cache.store(text, file_unique_id, fingerprint)
+
+    return await executor.run(job)
+
+
+def metrics() -> Dict[str, Any]:
+    return {
+        "executor": executor.metrics(),
+        "stages": stage_metrics.snapshot(),
+        "backends": ocr_backends.chain.metrics(),
+        "preprocess": ocr_preprocess.stats.metrics(),
+        "cache": ocr_cache.cache.metrics(),
+    }
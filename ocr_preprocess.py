@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# ocr_preprocess.py - In-memory photo preparation before OCR
+
+"""
+OCR Preprocessing for Telegram Dispatch Bot
+
+Restaurants send full-resolution phone photos (3-5 MB, 12 MP) of the order
+screen. Uploading those to OCR.space (or feeding them to tesseract) costs
+transfer time and engine time the text doesn't need. Photos are prepared
+in memory, straight from the downloaded bytes, no temp files:
+
+1. Auto-rotate by the EXIF orientation tag (phones store portrait shots sideways)
+2. Grayscale (colour carries nothing for OCR)
+3. Crop to the receipt area: the bright order screen / paper, found on a small
+   thumbnail; skipped when the bright region is implausibly small or already
+   fills the photo
+4. Downscale so the width is at most PREPROCESS_MAX_WIDTH (text lines of an
+   order screen stay ~25px high, plenty for both engines); large JPEGs are
+   already decoded at reduced size
+5. Stretch contrast and re-encode as JPEG
+
+If anything goes wrong (unreadable image, unexpected format) the original
+bytes go to OCR unchanged - preprocessing must never lose an order.
+"""
+
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PREPROCESS_MAX_WIDTH = 1200     # Pixels; order screens are portrait, ~40 characters per line
+PREPROCESS_JPEG_QUALITY = 85
+CROP_BRIGHT_THRESHOLD = 170     # Gray level counted as receipt/screen background
+CROP_MIN_AREA = 0.2             # Don't crop to regions smaller than this share of the photo
+CROP_MAX_AREA = 0.9             # Not worth cropping when the receipt already fills the photo
+CROP_MARGIN = 0.02              # Margin kept around the receipt (share of each side)
+CROP_THUMBNAIL = 256            # Longest side of the thumbnail the crop is searched on
+EXIF_ORIENTATION = 0x0112
+
+
+@dataclass
+class PreparedImage:
+    """Image bytes for OCR plus what preprocessing did to them."""
+
+    data: bytes
+    bytes_before: int
+    original_size: Optional[Tuple[int, int]] = None
+    size: Optional[Tuple[int, int]] = None
+    rotated: bool = False
+    cropped: bool = False
+
+    def summary(self) -> str:
+        """e.g. "3.1MB 4032x3024 -> 182KB 1200x1580 (rotated, cropped)"."""
+        def fmt_bytes(n: int) -> str:
+            return f"{n / 1_000_000:.1f}MB" if n >= 1_000_000 else f"{n / 1000:.0f}KB"
+
+        def fmt_size(size: Optional[Tuple[int, int]]) -> str:
+            return f"{size[0]}x{size[1]}" if size else "?"
+
+        flags = [name for name, on in (("rotated", self.rotated), ("cropped", self.cropped)) if on]
+        return (f"{fmt_bytes(self.bytes_before)} {fmt_size(self.original_size)} -> "
+                f"{fmt_bytes(len(self.data))} {fmt_size(self.size)}" + (f" ({', '.join(flags)})" if flags else ""))
+
+
+def find_receipt_box(gray: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box of the bright receipt area in a grayscale image, or None to keep the whole photo."""
+    scale = max(gray.size) / CROP_THUMBNAIL
+    thumb = gray if scale <= 1 else gray.resize(
+        (max(1, round(gray.width / scale)), max(1, round(gray.height / scale))), Image.BILINEAR
+    )
+    box = thumb.point(lambda v: 255 if v >= CROP_BRIGHT_THRESHOLD else 0).getbbox()
+    if not box:
+        return None
+    left, top, right, bottom = box
+    area = (right - left) * (bottom - top) / (thumb.width * thumb.height)
+    if not CROP_MIN_AREA <= area <= CROP_MAX_AREA:
+        return None
+
+    factor = gray.width / thumb.width
+    margin_x, margin_y = gray.width * CROP_MARGIN, gray.height * CROP_MARGIN
+    return (
+        max(0, int(left * factor - margin_x)),
+        max(0, int(top * factor - margin_y)),
+        min(gray.width, int(right * factor + margin_x)),
+        min(gray.height, int(bottom * factor + margin_y)),
+    )
+
+
+def prepare(image: bytes) -> PreparedImage:
+    """Rotate, grayscale, crop, downscale and re-encode a photo for OCR (original bytes on failure)."""
+    try:
+        with Image.open(io.BytesIO(image)) as img:
+            original_size = img.size
+            rotated = img.getexif().get(EXIF_ORIENTATION, 1) != 1
+            # JPEG decoder downscales by 1/2, 1/4, 1/8 while decoding: far cheaper than resizing
+            # the full 12 MP image afterwards (keeps both sides >= PREPROCESS_MAX_WIDTH)
+            img.draft("L", (PREPROCESS_MAX_WIDTH, PREPROCESS_MAX_WIDTH))
+            gray = (ImageOps.exif_transpose(img) if rotated else img).convert("L")
+
+        box = find_receipt_box(gray)
+        if box:
+            gray = gray.crop(box)
+
+        if gray.width > PREPROCESS_MAX_WIDTH:
+            height = round(gray.height * PREPROCESS_MAX_WIDTH / gray.width)
+            gray = gray.resize((PREPROCESS_MAX_WIDTH, height), Image.LANCZOS)
+
+        gray = ImageOps.autocontrast(gray, cutoff=1)
+        out = io.BytesIO()
+        gray.save(out, format="JPEG", quality=PREPROCESS_JPEG_QUALITY, optimize=True)
+        data = out.getvalue()
+    except Exception as e:
+        logger.warning(f"[OCR] Preprocessing failed, using original photo: {e}")
+        return PreparedImage(data=image, bytes_before=len(image))
+
+    if len(data) >= len(image) and not (box or rotated):
+        # Already small (e.g. a screenshot) - re-encoding would only cost quality
+        return PreparedImage(data=image, bytes_before=len(image), original_size=original_size, size=original_size)
+    return PreparedImage(
+        data=data,
+        bytes_before=len(image),
+        original_size=original_size,
+        size=gray.size,
+        rotated=rotated,
+        cropped=box is not None,
+    )
+
+
+class PreprocessStats:
+    """Bytes in/out across all prepared photos."""
+
+    def __init__(self):
+        self.photos = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    def record(self, prepared: PreparedImage) -> None:
+        self.photos += 1
+        self.bytes_before += prepared.bytes_before
+        self.bytes_after += len(prepared.data)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "photos": self.photos,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "ratio": round(self.bytes_after / self.bytes_before, 3) if self.bytes_before else None,
+        }
+
+
+# Shared instance
+stats = PreprocessStats()
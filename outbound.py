@@ -0,0 +1,745 @@
+# -*- coding: utf-8 -*-
+# outbound.py - Rate-limited outbound scheduler for Telegram Bot API calls
+
+"""
+Outbound Scheduler for Telegram Dispatch Bot
+
+Every send/edit/delete towards the Bot API goes through one scheduler so that
+bursts (e.g. ten orders landing at 12:00) are spread out instead of hitting
+Telegram's flood limits:
+
+- Global token bucket (~30 requests/second for the whole bot)
+- Per-chat token buckets (~20 messages/minute in groups, ~1/second in private chats)
+- Priorities: UPC assignment and MDG confirmations go out before status toasts
+- RetryAfter (flood wait) pauses only the affected chat and requeues the call
+- Per-chat queue depth exposed for the health check
+
+Edits additionally pass through EditCoalescer, which skips edits that would not
+change the message and collapses rapid successive edits of the same message
+into one trailing edit carrying the latest render.
+
+fan_out() runs independent calls (one per vendor / group member) concurrently.
+
+DeleteBatcher removes messages with the Bot API deleteMessages method
+(up to 100 ids per request).
+
+TelegramClient is the single retry policy for all of the above: errors are
+classified as retryable (network/timeouts), rate-limited (RetryAfter, honored
+by the scheduler) or permanent (BadRequest, Forbidden, ...). Only retryable
+errors are retried, with jittered exponential backoff. A circuit breaker fails
+calls fast while Telegram is degraded, and per-method latency histograms are
+exported for the health check.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, InvalidToken, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+# --- PRIORITIES (lower value is sent first) ---
+PRIORITY_HIGH = 0     # UPC assignment, MDG-CONF, new order messages
+PRIORITY_NORMAL = 1   # Regular sends and edits
+PRIORITY_LOW = 2      # Auto-deleting status toasts and their deletions
+
+# --- TELEGRAM LIMITS ---
+GLOBAL_RATE_PER_SEC = 30.0        # Bot-wide limit
+GLOBAL_BURST = 30
+GROUP_RATE_PER_SEC = 20 / 60      # 20 messages per minute per group
+GROUP_BURST = 10
+PRIVATE_RATE_PER_SEC = 1.0        # 1 message per second per private chat
+PRIVATE_BURST = 3
+MAX_RETRY_AFTER_ATTEMPTS = 3      # Requeue a call at most this many times on flood wait
+
+# --- BULK DELETION ---
+DELETE_BATCH_SIZE = 100           # deleteMessages accepts at most 100 ids per call
+
+# --- EDIT COALESCING ---
+EDIT_DEBOUNCE_SECONDS = 0.5       # Edits arriving within this window after an edit are merged
+EDIT_HASH_CACHE_SIZE = 2000       # Remembered (chat_id, message_id) render hashes
+
+# --- RETRIES / CIRCUIT BREAKER ---
+CLIENT_MAX_ATTEMPTS = 3           # Attempts per call on retryable (network) errors
+CLIENT_BACKOFF_BASE = 0.5         # Seconds; attempt n waits uniform(0, base * 2**n)
+CLIENT_BACKOFF_CAP = 8.0
+BREAKER_FAILURE_THRESHOLD = 5     # Consecutive network failures before the breaker opens
+BREAKER_RESET_SECONDS = 30.0      # Open -> half-open (one probe in flight, others fail fast) after this long
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Histogram upper bounds (seconds)
+
+# Error classes (see classify_error)
+ERROR_RETRYABLE = "retryable"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_PERMANENT = "permanent"
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """Return RetryAfter delay in seconds (PTB exposes int or timedelta)."""
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        return float(retry_after.total_seconds())
+    return float(retry_after)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, cost: float = 1, now: Optional[float] = None) -> float:
+        """Seconds until `cost` tokens are available (0 if available now)."""
+        if cost <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def consume(self, cost: float = 1, now: Optional[float] = None) -> None:
+        """Take `cost` tokens (caller must check delay() first)."""
+        if cost <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= cost
+
+
+class _Job:
+    """One queued Bot API call."""
+
+    __slots__ = ("priority", "seq", "chat_id", "call", "cost", "future", "attempts")
+
+    def __init__(self, priority: int, seq: int, chat_id: int, call: Callable[[], Awaitable[Any]], cost: float, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.call = call
+        self.cost = cost
+        self.future = future
+        self.attempts = 0
+
+
+class OutboundScheduler:
+    """
+    Central scheduler for outbound Bot API calls.
+
+    Callers await submit(); a single dispatcher task on the event loop releases
+    queued calls when both the global and the per-chat bucket allow it, highest
+    priority first (FIFO within the same priority).
+    """
+
+    def __init__(self,
+                 global_rate: float = GLOBAL_RATE_PER_SEC,
+                 global_burst: float = GLOBAL_BURST,
+                 group_rate: float = GROUP_RATE_PER_SEC,
+                 group_burst: float = GROUP_BURST,
+                 private_rate: float = PRIVATE_RATE_PER_SEC,
+                 private_burst: float = PRIVATE_BURST):
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.stats: Dict[str, int] = {"dispatched": 0, "retry_after": 0, "failed": 0}
+        self._reset(None)
+
+    def _reset(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """(Re)initialize queues and buckets for the given event loop."""
+        self._loop = loop
+        self._global = TokenBucket(self.global_rate, self.global_burst)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, List[Tuple[int, int, _Job]]] = {}
+        self._blocked_until: Dict[int, float] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = asyncio.Event() if loop else None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative chat IDs are groups/supergroups, positive are private chats
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset(loop)
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int = PRIORITY_NORMAL, cost: float = 1) -> Any:
+        """
+        Queue a Bot API call and wait for its result.
+
+        Args:
+            chat_id: Target chat (selects the per-chat bucket)
+            call: Zero-argument callable returning the API coroutine
+            priority: PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW
+            cost: Tokens taken from the chat bucket (0 for deletions)
+
+        Returns:
+            Whatever the API call returns; exceptions are re-raised to the caller
+        """
+        self._ensure_worker()
+        job = _Job(priority, next(self._seq), chat_id, call, cost, self._loop.create_future())
+        self._enqueue(job)
+        return await job.future
+
+    def _enqueue(self, job: _Job) -> None:
+        heapq.heappush(self._queues.setdefault(job.chat_id, []), (job.priority, job.seq, job))
+        self._wakeup.set()
+
+    def queue_depth(self, chat_id: int) -> int:
+        """Number of calls waiting for the given chat."""
+        return len(self._queues.get(chat_id, []))
+
+    def queue_depths(self) -> Dict[int, int]:
+        """Queue depth per chat (only chats with pending calls)."""
+        return {chat_id: len(queue) for chat_id, queue in list(self._queues.items()) if queue}
+
+    def _dispatch_ready(self) -> Optional[float]:
+        """
+        Start every call that is allowed to go out now.
+
+        Returns:
+            Seconds until the next call may become ready, or None if nothing is queued
+        """
+        now = time.monotonic()
+        heads = sorted(queue[0] for queue in self._queues.values() if queue)
+        if not heads:
+            return None
+
+        next_wait = None
+        dispatched = False
+        for priority, seq, job in heads:
+            global_wait = self._global.delay(1, now)
+            if global_wait > 0:
+                return global_wait if next_wait is None else min(next_wait, global_wait)
+
+            chat_wait = max(self._blocked_until.get(job.chat_id, 0) - now,
+                            self._chat_bucket(job.chat_id).delay(job.cost, now))
+            if chat_wait > 0:
+                next_wait = chat_wait if next_wait is None else min(next_wait, chat_wait)
+                continue
+
+            heapq.heappop(self._queues[job.chat_id])
+            self._global.consume(1, now)
+            self._chat_bucket(job.chat_id).consume(job.cost, now)
+            self.stats["dispatched"] += 1
+            self._loop.create_task(self._execute(job))
+            dispatched = True
+
+        # Chats whose head was just dispatched may have more work ready
+        if dispatched and any(self._queues.values()):
+            return 0
+        return next_wait
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await job.call()
+        except RetryAfter as e:
+            wait = _retry_after_seconds(e)
+            self.stats["retry_after"] += 1
+            self._blocked_until[job.chat_id] = time.monotonic() + wait
+            job.attempts += 1
+            if job.attempts <= MAX_RETRY_AFTER_ATTEMPTS and not job.future.done():
+                logger.warning(f"Flood wait {wait:.0f}s for chat {job.chat_id} - requeued (attempt {job.attempts})")
+                self._enqueue(job)
+                return
+            self.stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            self.stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def _run(self) -> None:
+        """Dispatcher loop: release ready calls, then sleep until the next one is due."""
+        while True:
+            self._wakeup.clear()
+            wait = self._dispatch_ready()
+            if wait == 0:
+                await asyncio.sleep(0)
+                continue
+            try:
+                if wait is None:
+                    await self._wakeup.wait()
+                else:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+def render_digest(text: str, reply_markup=None) -> str:
+    """Hash of message text + keyboard, used to detect edits that change nothing."""
+    markup = ""
+    if reply_markup is not None:
+        markup = json.dumps(reply_markup.to_dict(), sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(f"{text}\x00{markup}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _PendingEdit:
+    """Latest not-yet-sent render for one message, plus everyone waiting on it."""
+
+    __slots__ = ("digest", "call", "waiters")
+
+    def __init__(self, digest: str, call: Callable[[], Awaitable[Any]]):
+        self.digest = digest
+        self.call = call
+        self.waiters: List[asyncio.Future] = []
+
+
+class EditCoalescer:
+    """
+    No-op suppression and debouncing for message edits.
+
+    - Remembers a hash of the last text + markup sent per (chat_id, message_id)
+      and skips edits that would not change anything.
+    - The first edit of a message goes out immediately. Edits arriving while it
+      is in flight or within EDIT_DEBOUNCE_SECONDS afterwards are merged: only
+      the latest render is sent once the window closes.
+    - "Message is not modified" errors from Telegram are treated as success.
+    """
+
+    def __init__(self, window: float = EDIT_DEBOUNCE_SECONDS, max_entries: int = EDIT_HASH_CACHE_SIZE):
+        self.window = window
+        self.max_entries = max_entries
+        self._last: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+        self._pending: Dict[Tuple[int, int], Optional[_PendingEdit]] = {}
+        self.stats: Dict[str, int] = {"sent": 0, "skipped_noop": 0, "coalesced": 0, "not_modified": 0}
+
+    def edits_saved(self) -> int:
+        """Edits that never reached Telegram (identical renders + merged bursts)."""
+        return self.stats["skipped_noop"] + self.stats["coalesced"]
+
+    def remember(self, chat_id: int, message_id: int, text: str, reply_markup=None) -> None:
+        """Record what a message currently shows (e.g. right after sending it)."""
+        self._store((chat_id, message_id), render_digest(text, reply_markup))
+
+    def forget(self, chat_id: int, message_id: int) -> None:
+        """Drop tracking for a deleted message."""
+        self._last.pop((chat_id, message_id), None)
+
+    def _store(self, key: Tuple[int, int], digest: str) -> None:
+        self._last[key] = digest
+        self._last.move_to_end(key)
+        while len(self._last) > self.max_entries:
+            self._last.popitem(last=False)
+
+    async def edit(self, chat_id: int, message_id: int, text: str, reply_markup, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Edit a message unless it already shows this render.
+
+        Args:
+            chat_id: Chat of the message
+            message_id: Message to edit
+            text: New message text
+            reply_markup: New keyboard (or None)
+            call: Zero-argument callable performing the actual edit
+
+        Returns:
+            Result of the edit call, or None if the edit was skipped
+        """
+        key = (chat_id, message_id)
+        digest = render_digest(text, reply_markup)
+
+        if key in self._pending:
+            # Another edit of this message is in flight - replace the trailing render
+            pending = self._pending[key]
+            if pending is None:
+                pending = _PendingEdit(digest, call)
+                self._pending[key] = pending
+            else:
+                self.stats["coalesced"] += 1
+                pending.digest = digest
+                pending.call = call
+            future = asyncio.get_running_loop().create_future()
+            pending.waiters.append(future)
+            return await future
+
+        if self._last.get(key) == digest:
+            self.stats["skipped_noop"] += 1
+            return None
+
+        self._pending[key] = None
+        try:
+            result = await self._send(key, digest, call)
+        finally:
+            asyncio.get_running_loop().create_task(self._flush_trailing(key))
+        return result
+
+    async def _send(self, key: Tuple[int, int], digest: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await call()
+        except BadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                raise
+            self.stats["not_modified"] += 1
+            result = None
+        else:
+            self.stats["sent"] += 1
+        self._store(key, digest)
+        return result
+
+    async def _flush_trailing(self, key: Tuple[int, int]) -> None:
+        """After the debounce window, send the latest merged render (if any)."""
+        while True:
+            await asyncio.sleep(self.window)
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending.pop(key, None)
+                return
+            self._pending[key] = None
+            try:
+                if self._last.get(key) == pending.digest:
+                    self.stats["skipped_noop"] += 1
+                    result = None
+                else:
+                    result = await self._send(key, pending.digest, pending.call)
+            except Exception as e:
+                for future in pending.waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in pending.waiters:
+                    if not future.done():
+                        future.set_result(result)
+
+
+async def fan_out(calls: Dict[Any, Callable[[], Awaitable[Any]]]) -> Tuple[Dict[Any, Any], Dict[Any, BaseException]]:
+    """
+    Run independent sends/edits concurrently and collect per-target outcomes.
+
+    Each call still goes through the scheduler (via safe_send_message etc.), so
+    rate limits are respected; targets in different chats go out in parallel,
+    e.g. a multi-vendor order reaches all restaurant groups in one round trip.
+
+    Args:
+        calls: {target: zero-argument callable returning a coroutine}
+               (target is any label, e.g. vendor name or order_id)
+
+    Returns:
+        (results, errors) - {target: result} for successes, {target: exception} for failures
+    """
+    targets = list(calls.keys())
+    outcomes = await asyncio.gather(*(calls[target]() for target in targets), return_exceptions=True)
+
+    results: Dict[Any, Any] = {}
+    errors: Dict[Any, BaseException] = {}
+    for target, outcome in zip(targets, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Fan-out call for {target} failed: {outcome}")
+            errors[target] = outcome
+        else:
+            results[target] = outcome
+    return results, errors
+
+
+class DeleteBatcher:
+    """
+    Batched message deletion via deleteMessages.
+
+    delete() removes a list of messages in chunks of up to 100 ids per request.
+    Timed deletions (status toasts etc.) are grouped per chat by timers.py and
+    flushed through here as well.
+    """
+
+    def __init__(self, batch_size: int = DELETE_BATCH_SIZE):
+        self.bot = None
+        self.batch_size = batch_size
+        self.stats: Dict[str, int] = {"requests": 0, "messages": 0, "failed": 0}
+
+    async def delete(self, chat_id: int, message_ids: List[int], priority: int = PRIORITY_NORMAL) -> int:
+        """
+        Delete messages in chunks of up to 100 ids per request.
+
+        Ids Telegram can't find are skipped by the API, so one chunk is one request
+        regardless of how many messages are already gone. Network errors are retried
+        per chunk by the client; RetryAfter is handled by the scheduler.
+
+        Args:
+            chat_id: Chat containing the messages
+            message_ids: Messages to delete
+            priority: Scheduler priority for the requests
+
+        Returns:
+            Number of message ids in chunks that were deleted successfully
+        """
+        if not self.bot:
+            logger.error("DeleteBatcher has no bot configured - deletions skipped")
+            return 0
+
+        unique_ids = list(dict.fromkeys(message_ids))
+        deleted = 0
+        for start in range(0, len(unique_ids), self.batch_size):
+            chunk = unique_ids[start:start + self.batch_size]
+            try:
+                await client.call(
+                    "delete_messages",
+                    chat_id,
+                    lambda ids=chunk: self.bot.delete_messages(chat_id=chat_id, message_ids=ids),
+                    priority=priority,
+                    cost=0
+                )
+            except Exception as e:
+                # Permanent errors (e.g. messages older than 48h) are not retried by the client
+                logger.error(f"Failed to delete {len(chunk)} messages in chat {chat_id}: {e}")
+                self.stats["failed"] += 1
+                continue
+            self.stats["requests"] += 1
+            self.stats["messages"] += len(chunk)
+            deleted += len(chunk)
+            for message_id in chunk:
+                edits.forget(chat_id, message_id)
+        return deleted
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify a Bot API error.
+
+    Returns:
+        ERROR_RATE_LIMITED for RetryAfter, ERROR_RETRYABLE for timeouts and
+        network failures, ERROR_PERMANENT for everything else (BadRequest such
+        as broken markdown, Forbidden, bugs in the calling code, ...)
+    """
+    if isinstance(error, RetryAfter):
+        return ERROR_RATE_LIMITED
+    # BadRequest subclasses NetworkError in python-telegram-bot, so check it first
+    if isinstance(error, (BadRequest, Forbidden, InvalidToken, ChatMigrated)):
+        return ERROR_PERMANENT
+    if isinstance(error, (TimedOut, NetworkError, ConnectionError, asyncio.TimeoutError)):
+        return ERROR_RETRYABLE
+    return ERROR_PERMANENT
+
+
+def backoff_delay(attempt: int, base: float = CLIENT_BACKOFF_BASE, cap: float = CLIENT_BACKOFF_CAP) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Telegram while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive network failures.
+    Open calls fail fast; after `reset_timeout` the breaker goes half-open and
+    lets one probe call through (the rest keep failing fast): a success closes
+    it, a failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probing = False  # A half-open probe call is in flight
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            logger.info("Telegram circuit breaker half-open - probing")
+        if self.state == "half_open":
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def release_probe(self) -> None:
+        """Probe ended without a network verdict (e.g. a bad request): let the next call probe."""
+        self.probing = False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("Telegram circuit breaker closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                logger.error(f"Telegram circuit breaker OPEN after {self.failures} network failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (cumulative counts, Prometheus style)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-quantile (None if empty or +Inf)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bound in enumerate(self.buckets):
+            seen += self.counts[i]
+            if seen >= target:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_le": self.quantile(0.5),
+            "p95_le": self.quantile(0.95),
+            "buckets": buckets,
+        }
+
+
+class TelegramClient:
+    """
+    One retry policy for every Bot API call (wraps the scheduler).
+
+    - Permanent errors are raised immediately (no retry, no breaker impact)
+    - RetryAfter is honored by the scheduler (chat paused, call requeued)
+    - Network errors/timeouts are retried with jittered backoff and feed the
+      circuit breaker; while it is open, calls raise CircuitOpenError
+    - Every attempt's latency is recorded per API method
+    """
+
+    def __init__(self, max_attempts: int = CLIENT_MAX_ATTEMPTS, breaker: Optional[CircuitBreaker] = None):
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "retries": 0, "short_circuited": 0,
+                                      ERROR_RETRYABLE: 0, ERROR_RATE_LIMITED: 0, ERROR_PERMANENT: 0}
+
+    def _timed(self, method: str, call: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        histogram = self.latency.setdefault(method, LatencyHistogram())
+
+        async def timed_call():
+            start = time.perf_counter()
+            try:
+                return await call()
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed_call
+
+    async def call(self, method: str, chat_id: int, call: Callable[[], Awaitable[Any]],
+                   priority: int = PRIORITY_NORMAL, cost: float = 1, max_attempts: Optional[int] = None) -> Any:
+        """
+        Run a Bot API call through the scheduler with classification and retries.
+
+        Args:
+            method: API method name (histogram label), e.g. "send_message"
+            chat_id: Target chat (scheduler bucket)
+            call: Zero-argument callable returning the API coroutine
+            priority: Scheduler priority
+            cost: Per-chat bucket tokens (0 for deletions)
+            max_attempts: Override CLIENT_MAX_ATTEMPTS (e.g. 1 for non-critical calls)
+
+        Returns:
+            Result of the API call; the last error is re-raised
+        """
+        attempts = max_attempts or self.max_attempts
+        timed_call = self._timed(method, call)
+        self.stats["calls"] += 1
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(f"Telegram circuit open - {method} to {chat_id} not attempted")
+            probe = self.breaker.probing  # This call is the half-open probe
+            try:
+                result = await scheduler.submit(chat_id, timed_call, priority=priority, cost=cost)
+            except asyncio.CancelledError:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            except Exception as e:
+                kind = classify_error(e)
+                self.stats[kind] += 1
+                if kind != ERROR_RETRYABLE:
+                    if probe:
+                        self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise
+                delay = backoff_delay(attempt)
+                self.stats["retries"] += 1
+                logger.warning(f"{method} to {chat_id} failed ({type(e).__name__}: {e}) - retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Breaker state, error counts and per-method latency histograms for the health check."""
+        return {
+            "breaker": {"state": self.breaker.state, "trips": self.breaker.trips, "failures": self.breaker.failures},
+            "stats": dict(self.stats),
+            "latency": {method: histogram.snapshot() for method, histogram in self.latency.items()},
+        }
+
+
+# Shared instances used by all modules (main, utils, upc, mdg)
+scheduler = OutboundScheduler()
+edits = EditCoalescer()
+deletes = DeleteBatcher()
+client = TelegramClient()
+
+
+def configure(bot_ref) -> None:
+    """Set the Bot instance used for batched deletions (called from main.py)."""
+    deletes.bot = bot_ref
@@ -13,7 +13,7 @@ import os
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import redis
 
 logger = logging.getLogger(__name__)
@@ -285,3 +285,226 @@ def redis_cleanup_old_orders(days_to_keep: int = 2) -> int:
     except Exception as e:
         logger.error(f"Failed to cleanup old orders: {e}")
         return 0
+
+
+# --- PENDING TIMERS (auto-delete) ---
+# Stored in one hash: field = timer_id ("chat_id:message_id"), value = JSON timer data
+TIMERS_KEY = "pending_deletions"
+
+
+def redis_save_timer(timer_id: str, timer_data: Dict[str, Any]) -> bool:
+    """
+    Persist a pending timer so it survives restarts.
+    
+    Args:
+        timer_id: Timer identifier ("chat_id:message_id")
+        timer_data: Dict with chat_id, message_id and due_at (epoch seconds)
+        
+    Returns:
+        True if saved successfully, False otherwise
+    """
+    client = get_redis_client()
+    if not client:
+        return False
+    
+    try:
+        client.hset(TIMERS_KEY, timer_id, json.dumps(timer_data))
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save timer {timer_id} to Redis: {e}")
+        return False
+
+
+def redis_delete_timers(timer_ids: List[str]) -> bool:
+    """
+    Remove fired timers from Redis (single HDEL).
+    
+    Args:
+        timer_ids: Timer identifiers to remove
+        
+    Returns:
+        True if deleted successfully, False otherwise
+    """
+    client = get_redis_client()
+    if not client or not timer_ids:
+        return False
+    
+    try:
+        client.hdel(TIMERS_KEY, *timer_ids)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to delete {len(timer_ids)} timers from Redis: {e}")
+        return False
+
+
+def redis_get_all_timers() -> Dict[str, Dict[str, Any]]:
+    """
+    Get all pending timers from Redis.
+    
+    Returns:
+        Dictionary mapping timer_id -> timer data
+    """
+    client = get_redis_client()
+    if not client:
+        return {}
+    
+    try:
+        timers = {}
+        for timer_id, data in client.hgetall(TIMERS_KEY).items():
+            try:
+                timers[timer_id] = json.loads(data)
+            except ValueError:
+                logger.warning(f"Skipping malformed timer {timer_id}")
+        return timers
+    except Exception as e:
+        logger.error(f"Failed to get timers from Redis: {e}")
+        return {}
+
+
+# --- DISTRICT CACHE (geocoding results) ---
+# One key per address: district:<normalized address> -> JSON {"district": str|null}, with TTL
+DISTRICT_KEY_PREFIX = "district:"
+
+
+def redis_get_district(address_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a cached geocoding result.
+    
+    Args:
+        address_key: Normalized address
+        
+    Returns:
+        {"district": str or None} if cached, None if unknown (or Redis unavailable)
+    """
+    client = get_redis_client()
+    if not client:
+        return None
+    
+    try:
+        data = client.get(f"{DISTRICT_KEY_PREFIX}{address_key}")
+        return json.loads(data) if data else None
+    except Exception as e:
+        logger.error(f"Failed to get district for {address_key} from Redis: {e}")
+        return None
+
+
+def redis_save_district(address_key: str, district: Optional[str], ttl_seconds: int) -> bool:
+    """
+    Cache a geocoding result (None = geocoder found no district) with expiry.
+    
+    Args:
+        address_key: Normalized address
+        district: District name or None
+        ttl_seconds: Expiry in seconds
+        
+    Returns:
+        True if saved successfully, False otherwise
+    """
+    client = get_redis_client()
+    if not client:
+        return False
+    
+    try:
+        client.set(f"{DISTRICT_KEY_PREFIX}{address_key}", json.dumps({"district": district}), ex=ttl_seconds)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save district for {address_key} to Redis: {e}")
+        return False
+
+
+# ============================================
+# GAZETTEER (streets learned from the geocoder)
+# ============================================
+
+# Single hash: "<normalized street>|<zip>" -> district (no expiry - streets don't move)
+GAZETTEER_KEY = "gazetteer_learned"
+
+
+def redis_save_gazetteer_entry(street_key: str, district: str) -> bool:
+    """
+    Persist an address learned from the geocoder.
+    
+    Args:
+        street_key: "<normalized street>|<zip>|<house number>" (zip may be empty)
+        district: District name
+        
+    Returns:
+        True if saved successfully, False otherwise
+    """
+    client = get_redis_client()
+    if not client:
+        return False
+    
+    try:
+        client.hset(GAZETTEER_KEY, street_key, district)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save gazetteer entry {street_key} to Redis: {e}")
+        return False
+
+
+def redis_get_gazetteer_entries() -> Dict[str, str]:
+    """
+    Get all learned addresses (loaded into the gazetteer at startup).
+    
+    Returns:
+        Dict mapping "<normalized street>|<zip>|<house number>" to district, empty if Redis unavailable
+    """
+    client = get_redis_client()
+    if not client:
+        return {}
+    
+    try:
+        return client.hgetall(GAZETTEER_KEY) or {}
+    except Exception as e:
+        logger.error(f"Failed to get gazetteer entries from Redis: {e}")
+        return {}
+
+
+# ============================================
+# PRODUCT CATALOG (raw names seen at ingestion, pending review)
+# ============================================
+
+# Single hash: "<vendor>|<raw product name>" -> cleaned display name
+PRODUCT_CATALOG_KEY = "product_catalog_learned"
+
+
+def redis_save_catalog_entry(entry_key: str, display_name: str) -> bool:
+    """
+    Persist a product name first seen at ingestion.
+    
+    Args:
+        entry_key: "<vendor>|<raw product name>"
+        display_name: Name produced by the cleaning rules
+        
+    Returns:
+        True if saved successfully, False otherwise
+    """
+    client = get_redis_client()
+    if not client:
+        return False
+    
+    try:
+        client.hset(PRODUCT_CATALOG_KEY, entry_key, display_name)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save catalog entry {entry_key} to Redis: {e}")
+        return False
+
+
+def redis_get_catalog_entries() -> Dict[str, str]:
+    """
+    Get all product names learned at ingestion (loaded into the catalog at startup).
+    
+    Returns:
+        Dict mapping "<vendor>|<raw product name>" to display name, empty if Redis unavailable
+    """
+    client = get_redis_client()
+    if not client:
+        return {}
+    
+    try:
+        return client.hgetall(PRODUCT_CATALOG_KEY) or {}
+    except Exception as e:
+        logger.error(f"Failed to get catalog entries from Redis: {e}")
+        return {}
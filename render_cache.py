@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# render_cache.py - Versioned cache for rendered MDG / RG / UPC message bodies
+
+"""
+Render Cache for Telegram Dispatch Bot
+
+Message bodies (MDG dispatch text, vendor summary/details, UPC assignment) are
+rebuilt on every edit of any related message, including build_status_lines,
+address/phone formatting and the district lookup. After a delivery the same
+order is rendered for MDG, every vendor and the UPC.
+
+This cache stores each rendered view under
+    (order_id, order version, view, vendor, expanded, context)
+
+- order version: content digest of the order dict. Orders in STATE are mutated
+  in place all over main.py, so the digest (not a counter someone has to bump)
+  guarantees a changed order is never served a stale render. The digest is
+  taken over the pickled order (≈7µs, vs ≈35µs for sorted JSON); equal bytes
+  imply equal content, so the worst case is a spurious miss, never a stale hit.
+- context: anything outside the order the view depends on (today's date for
+  scheduled Smoothr orders, group size for UPC).
+- LRU-bounded; hit/miss counters exposed for the health check.
+"""
+
+import hashlib
+import logging
+import pickle
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_SIZE = 1000  # Rendered views kept (≈ orders × views)
+
+
+def order_version(order: Dict[str, Any]) -> str:
+    """Digest of the order's content (changes whenever anything in the order changes)."""
+    try:
+        payload = pickle.dumps(order, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        payload = repr(order).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class RenderCache:
+    """LRU of rendered message bodies keyed by order version and view."""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def render(self, view: str, order: Dict[str, Any], build: Callable[[], str],
+               vendor: Optional[str] = None, expanded: bool = False, context: Hashable = None) -> str:
+        """
+        Return the cached render for this order version and view, building it on a miss.
+
+        Args:
+            view: "mdg", "rg" or "upc"
+            order: Order dict from STATE
+            build: Zero-argument callable producing the text on a miss
+            vendor: Vendor name for per-vendor views
+            expanded: Details (True) or summary (False) view
+            context: Extra hashable inputs the view depends on besides the order
+
+        Returns:
+            Rendered message text
+        """
+        key = (order.get("order_id") or order.get("name"), order_version(order), view, vendor, expanded, context)
+        text = self._entries.get(key)
+        if text is not None:
+            self.stats["hits"] += 1
+            self._entries.move_to_end(key)
+            return text
+
+        self.stats["misses"] += 1
+        text = build()
+        self._entries[key] = text
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return text
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Entry count, hit/miss counters and hit rate."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+# Shared instance used by mdg, rg and upc
+cache = RenderCache()
@@ -3,12 +3,16 @@
 
 import logging
 from datetime import datetime, timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from utils import format_phone_for_android
+import render_cache
+import same_time
+from keyboards import KeyboardTemplate, ORDER_ID, TEMPLATE_CACHE_SIZE, grid
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +43,11 @@ SHORTCUT_TO_VENDOR = {v: k for k, v in RESTAURANT_SHORTCUTS.items()}
 
 
 def build_vendor_summary_text(order: Dict[str, Any], vendor: str) -> str:
+    """Build vendor short summary (cached per order version, see render_cache)."""
+    return render_cache.cache.render("rg", order, lambda: _render_vendor_summary_text(order, vendor), vendor=vendor)
+
+
+def _render_vendor_summary_text(order: Dict[str, Any], vendor: str) -> str:
     """Build vendor short summary (default collapsed state)."""
     try:
         from utils import build_status_lines
@@ -99,6 +108,11 @@ def build_vendor_summary_text(order: Dict[str, Any], vendor: str) -> str:
 
 
 def build_vendor_details_text(order: Dict[str, Any], vendor: str) -> str:
+    """Build vendor full details (cached per order version, see render_cache)."""
+    return render_cache.cache.render("rg", order, lambda: _render_vendor_details_text(order, vendor), vendor=vendor, expanded=True)
+
+
+def _render_vendor_details_text(order: Dict[str, Any], vendor: str) -> str:
     """Build vendor full details (expanded state)."""
     try:
         from utils import build_status_lines
@@ -189,7 +203,6 @@ def build_vendor_details_text(order: Dict[str, Any], vendor: str) -> str:
 
 def vendor_time_keyboard(order_id: str, vendor: str, state: Dict[str, Any] = None) -> InlineKeyboardMarkup:
     """Build time request buttons for a specific vendor (vertical layout with scheduled orders)."""
-    from mdg import get_recent_orders_for_same_time
     from main import STATE as MAIN_STATE
     
     # Use passed state if available, otherwise fall back to imported STATE
@@ -200,8 +213,7 @@ def vendor_time_keyboard(order_id: str, vendor: str, state: Dict[str, Any] = Non
     buttons.append([InlineKeyboardButton("🕒 Time picker", callback_data=f"req_exact|{order_id}|{vendor}")])
     
     # Show "Scheduled orders" button if ANY confirmed orders exist today (not vendor-specific)
-    recent_orders = get_recent_orders_for_same_time(order_id, vendor=None, state=effective_state)
-    if recent_orders:
+    if same_time.candidates.has_candidates(order_id, state=effective_state):
         buttons.append([InlineKeyboardButton("🗂 Scheduled orders", callback_data=f"req_scheduled|{order_id}|{vendor}")])
     
     buttons.append([InlineKeyboardButton("← Back", callback_data="hide")])
@@ -266,59 +278,44 @@ def vendor_exact_time_keyboard(order_id: str, vendor: str, action: str) -> Inlin
     """Build exact time picker for vendors - shows hours."""
     try:
         current_time = now()
-        current_hour = current_time.hour
-        current_minute = current_time.minute
-        
         # Skip current hour if past minute 57 (no valid 3-minute intervals left)
-        start_hour = current_hour + 1 if current_minute >= 57 else current_hour
-        
-        rows: List[List[InlineKeyboardButton]] = []
-        hours: List[str] = [f"{hour:02d}" for hour in range(start_hour, 24)]
+        start_hour = current_time.hour + 1 if current_time.minute >= 57 else current_time.hour
 
         # Use shortcut to compress callback data
         vendor_short = RESTAURANT_SHORTCUTS.get(vendor, vendor[:2])
-        
-        # Build hour buttons (3 per row)
-        for i in range(0, len(hours), 3):
-            row = []
-            for j in range(i, min(i + 3, len(hours))):
-                hour_value = hours[j]  # Already just the hour number
-                callback_data = f"vendor_exact_hour|{order_id}|{hour_value}|{vendor_short}|{action}"
-                row.append(InlineKeyboardButton(hours[j], callback_data=callback_data))
-            rows.append(row)
-        
-        # Add Back button
-        rows.append([InlineKeyboardButton("← Back", callback_data="hide")])
-
-        return InlineKeyboardMarkup(rows)
+        return _vendor_exact_time_template(start_hour, vendor_short, action).stamp(order_id)
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Error building vendor exact time keyboard: %s", exc)
         return InlineKeyboardMarkup([])
 
 
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _vendor_exact_time_template(start_hour: int, vendor_short: str, action: str) -> KeyboardTemplate:
+    """Hour grid (3 per row) from start_hour to 23."""
+    hours = [f"{hour:02d}" for hour in range(start_hour, 24)]
+    rows = grid([(hour_str, f"vendor_exact_hour|{ORDER_ID}|{hour_str}|{vendor_short}|{action}") for hour_str in hours], 3)
+    rows.append([("← Back", "hide")])
+    return KeyboardTemplate(rows)
+
+
 def vendor_exact_hour_keyboard(order_id: str, hour: int, vendor: str, action: str) -> InlineKeyboardMarkup:
     """Build minute picker for vendors after hour selection."""
     try:
-        rows: List[List[InlineKeyboardButton]] = []
-        minutes: List[str] = [f"{minute:02d}" for minute in range(0, 60, 3)]
-
         # Use shortcut to compress callback data
         vendor_short = RESTAURANT_SHORTCUTS.get(vendor, vendor[:2])
-        
-        # Build minute buttons (4 per row)
-        for i in range(0, len(minutes), 4):
-            row = []
-            for j in range(i, min(i + 4, len(minutes))):
-                time_str = f"{hour:02d}:{minutes[j]}"
-                callback_data = f"vendor_exact_selected|{order_id}|{time_str}|{vendor_short}|{action}"
-                row.append(InlineKeyboardButton(minutes[j], callback_data=callback_data))
-            rows.append(row)
-
-        # Add back button
-        back_callback = f"vendor_exact_back|{order_id}|{vendor_short}|{action}"
-        rows.append([InlineKeyboardButton("◂ Back to hours", callback_data=back_callback)])
-
-        return InlineKeyboardMarkup(rows)
+        return _vendor_exact_hour_template(hour, vendor_short, action).stamp(order_id)
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Error building vendor exact hour keyboard: %s", exc)
         return InlineKeyboardMarkup([])
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _vendor_exact_hour_template(hour: int, vendor_short: str, action: str) -> KeyboardTemplate:
+    """Minute grid (4 per row, 3-minute steps) for one hour."""
+    cells = []
+    for minute in range(0, 60, 3):
+        time_str = f"{hour:02d}:{minute:02d}"
+        cells.append((f"{minute:02d}", f"vendor_exact_selected|{ORDER_ID}|{time_str}|{vendor_short}|{action}"))
+    rows = grid(cells, 4)
+    rows.append([("◂ Back to hours", f"vendor_exact_back|{ORDER_ID}|{vendor_short}|{action}")])
+    return KeyboardTemplate(rows)
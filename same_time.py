@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+# same_time.py - Incremental "same time as" candidates and per-vendor confirmation tracking
+
+"""
+Same-Time Candidates for Telegram Dispatch Bot
+
+The TIME submenu ("Scheduled orders") and the "same time as" lists show
+today's confirmed orders that aren't delivered or removed. Both used to walk
+all of STATE on every click, parse created_at, and run abbreviate_street for
+every entry. This index keeps those orders instead:
+
+- Candidates: one entry per qualifying order, kept in arrival order
+  (created_at). There is one list overall and one per vendor. Each entry holds
+  its "same time" display name and its submenu button labels ("14:15 -
+  Innstr. 15  - LR", one per vendor of the order), rendered once
+- Updates: main.py / upc.py call track(order_id) when a vendor confirms, a
+  confirmation is undone, an order is delivered, undelivered or removed.
+  configure() / rebuild() index a whole STATE (startup, Redis load)
+- Day rollover: orders created before today 00:01 drop off the front of the
+  lists on the first read after midnight
+- Reads only touch the entries they return. Each entry is checked against its
+  STATE order (same dict, same status and confirmed times); a changed one is
+  re-indexed on the spot, so a missed hook can't show a stale time
+
+The same track() calls feed the confirmation tracker behind the smart time
+suggestions (build_smart_time_suggestions / get_last_confirmed_order), which
+used to scan and sort all of today's orders for the latest one:
+
+- Latest confirmation per vendor and overall, read in O(1). Undoing a
+  confirmation or removing the order falls back to the one before
+- Rolling window of each vendor's last PACE_WINDOW confirmations (pickup time
+  and when the vendor confirmed). From it: the typical step between confirmed
+  pickup times (suggestion offsets, instead of a fixed 5/10/15/20) and the
+  typical lead time (no suggestion earlier than now + lead). Pre-orders
+  confirmed more than MAX_LEAD minutes ahead stay out of the pace; below
+  PACE_MIN_SAMPLES remaining confirmations the suggestions stay at
+  5/10/15/20. The first suggestion is never more than MAX_LEAD minutes out
+- Cleared at day rollover; seeded from status_history on startup
+"""
+
+import logging
+import re
+import threading
+from bisect import insort
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from statistics import median
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from utils import abbreviate_street
+
+logger = logging.getLogger(__name__)
+
+TIMEZONE = ZoneInfo("Europe/Berlin")
+
+RECENT_LIMIT = 10             # Entries in the "same time as" list (most recent)
+BUTTON_TEXT_LIMIT = 64        # Telegram inline button text limit (mdg.TELEGRAM_BUTTON_TEXT_LIMIT)
+ADDRESS_MAX_LENGTH = 15       # Tier 1 abbreviate_street target for submenu buttons
+CLOSED_STATUSES = ("delivered", "removed")
+PACE_WINDOW = 8               # Confirmations kept per vendor for the kitchen pace
+PACE_MIN_SAMPLES = 3          # Below this, suggestions use the default step and no lead time
+DEFAULT_STEP = 5              # Minutes between suggestions (5/10/15/20)
+STEP_RANGE = (5, 15)          # Pace-derived step is rounded to 5 minutes and clamped to this
+MAX_LEAD = 60                 # Confirmed further ahead = pre-order, not kitchen pace; also caps the first offset
+SUGGESTIONS = 4
+TIME_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+HOUSE_NUMBER_RE = re.compile(r'\s+(\d+[a-zA-Z]?)$')
+TITLE_PREFIX_RE = re.compile(r'^(Doktor-|Professor-|Sankt-|Dr\.-|Prof\.-|St\.-)')
+
+
+def now() -> datetime:
+    """Get current time in Passau timezone (Europe/Berlin)."""
+    return datetime.now(TIMEZONE)
+
+
+def button_label(time_str: str, address: str, shortcut: str) -> str:
+    """Submenu button text: "14:15 - Grabenga. 15  - LR" (two spaces before the vendor).
+
+    Falls back to the first 4 letters of the street when the label exceeds
+    Telegram's button limit.
+    """
+    label = f"{time_str} - {abbreviate_street(address, max_length=ADDRESS_MAX_LENGTH)}  - {shortcut}"
+    if len(label) <= BUTTON_TEXT_LIMIT:
+        return label
+    house_match = HOUSE_NUMBER_RE.search(address)
+    house_num = f" {house_match.group(1)}" if house_match else ""
+    street_only = address[:house_match.start()] if house_match else address
+    street_clean = TITLE_PREFIX_RE.sub('', street_only)
+    if '-' in street_clean:
+        street_clean = street_clean.split('-')[0]
+    return f"{time_str} - {street_clean[:4] + house_num}  - {shortcut}"
+
+
+def display_name(order: Dict[str, Any]) -> str:
+    """Name of an order in the "same time as" list (all order types)."""
+    order_type = order.get("order_type", "")
+    if order_type in ("shopify", "ocr_pf"):
+        return f"{order['name'][-2:]}"
+    if order_type in ("smoothr_lieferando", "smoothr_dd_app"):
+        address = (order.get("customer") or {}).get("address", "")
+        if address:
+            return f"*{address.split(',')[0]}*"
+    return f"Order {order.get('name', 'Unknown')}"
+
+
+def as_datetime(value: Any) -> Optional[datetime]:
+    """Aware datetime from a datetime or ISO string (Shopify stores strings, Smoothr/PF datetimes)."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=TIMEZONE)
+
+
+def created_datetime(order: Dict[str, Any]) -> Optional[datetime]:
+    return as_datetime(order.get("created_at"))
+
+
+def clock_minutes(time_str: Any) -> Optional[int]:
+    """"HH:MM" as minutes after midnight (None for "ASAP" and other non-times)."""
+    match = TIME_RE.match(time_str) if isinstance(time_str, str) else None
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+
+def lead_minutes(minute: int, at: datetime) -> int:
+    """Minutes from confirming (at) to the pickup time (0 if confirmed late)."""
+    at = at.astimezone(TIMEZONE)
+    lead = minute - (at.hour * 60 + at.minute)
+    if lead < -12 * 60:
+        lead += 24 * 60  # Pickup after midnight
+    return max(lead, 0)
+
+
+def signature(order: Dict[str, Any]) -> Tuple[Any, ...]:
+    """What an indexed entry depends on that can change after confirmation."""
+    return (order.get("status"), order.get("confirmed_time"), tuple((order.get("confirmed_times") or {}).items()))
+
+
+def day_start(moment: datetime) -> datetime:
+    """Start of the "today" window (00:01, as the submenu has always used)."""
+    return moment.replace(hour=0, minute=1, second=0, microsecond=0)
+
+
+@dataclass(frozen=True)
+class RefButton:
+    """One submenu button: reference order, its vendor and the time it shows."""
+
+    order_id: str
+    vendor: str
+    shortcut: str
+    time: str
+    label: str
+
+
+@dataclass(frozen=True)
+class Candidate:
+    order_id: str
+    order: Dict[str, Any]       # STATE entry it was built from
+    signature: Tuple[Any, ...]
+    key: Tuple[float, int]      # (created_at timestamp, arrival sequence)
+    created: datetime
+    vendors: Tuple[str, ...]
+    recent: Dict[str, str]      # get_recent_orders_for_same_time entry
+    buttons: Tuple[RefButton, ...]
+
+    def __lt__(self, other: "Candidate") -> bool:
+        return self.key < other.key
+
+
+class SameTimeIndex:
+    """Today's confirmed, open orders - overall and per vendor - with rendered buttons."""
+
+    def __init__(self, clock: Callable[[], datetime] = now):
+        self._clock = clock
+        self._state: Optional[Dict[str, Dict[str, Any]]] = None
+        self._shortcuts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Candidate] = {}
+        # Lists are replaced, never mutated, so readers can iterate without the lock
+        self._all: List[Candidate] = []
+        self._by_vendor: Dict[str, List[Candidate]] = {}
+        self._day_start: Optional[datetime] = None
+        self._seq = 0
+        self.stats = {"reads": 0, "tracked": 0, "refreshed": 0, "rebuilds": 0, "rollovers": 0}
+
+    def configure(self, state: Dict[str, Dict[str, Any]], shortcuts: Dict[str, str]) -> None:
+        """Index a STATE dict; shortcuts are the RESTAURANT_SHORTCUTS used on the buttons."""
+        self._shortcuts = shortcuts
+        self.rebuild(state)
+
+    def rebuild(self, state: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Re-index every order of state (default: the configured one)."""
+        if state is not None:
+            self._state = state
+        state = self._state if self._state is not None else {}
+        with self._lock:
+            self._day_start = day_start(self._clock())
+            self._entries = {}
+            for order_id, order in list(state.items()):
+                candidate = self._build(order_id, order)
+                if candidate:
+                    self._entries[order_id] = candidate
+            self._all = sorted(self._entries.values())
+            self._by_vendor = {}
+            for candidate in self._all:
+                for vendor in candidate.vendors:
+                    self._by_vendor.setdefault(vendor, []).append(candidate)
+            self.stats["rebuilds"] += 1
+        logger.info(f"Same-time index: {len(self._all)} candidates from {len(state)} orders")
+
+    def track(self, order_id: str, order: Optional[Dict[str, Any]] = None) -> None:
+        """Re-evaluate one order after it changed (confirmed, undone, delivered, removed)."""
+        if order is None and self._state is not None:
+            order = self._state.get(order_id)
+        with self._lock:
+            self._replace(order_id, self._build(order_id, order) if order else None)
+            self.stats["tracked"] += 1
+
+    def discard(self, order_id: str) -> None:
+        with self._lock:
+            self._replace(order_id, None)
+
+    def recent(self, exclude: Optional[str] = None, vendor: Optional[str] = None,
+               state: Optional[Dict[str, Dict[str, Any]]] = None, limit: int = RECENT_LIMIT) -> List[Dict[str, str]]:
+        """Most recent candidates (oldest first), optionally only orders containing vendor."""
+        picked: List[Dict[str, str]] = []
+        for candidate in reversed(self._candidates(vendor, state)):
+            candidate = self._checked(candidate, exclude, vendor)
+            if candidate:
+                picked.append(candidate.recent)
+                if len(picked) == limit:
+                    break
+        picked.reverse()
+        return picked
+
+    def has_candidates(self, exclude: Optional[str] = None, state: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+        """Whether the "Scheduled orders" button has anything to show."""
+        return any(self._checked(c, exclude) for c in self._candidates(None, state))
+
+    def buttons(self, exclude: Optional[str] = None,
+                state: Optional[Dict[str, Dict[str, Any]]] = None) -> List[RefButton]:
+        """All submenu buttons in candidate order (one per vendor of each reference order)."""
+        refs: List[RefButton] = []
+        for candidate in self._candidates(None, state):
+            candidate = self._checked(candidate, exclude)
+            if candidate:
+                refs.extend(candidate.buttons)
+        return refs
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "candidates": len(self._all),
+            "per_vendor": {vendor: len(entries) for vendor, entries in self._by_vendor.items() if entries},
+        }
+
+    # --- internals ---
+
+    def _candidates(self, vendor: Optional[str], state: Optional[Dict[str, Dict[str, Any]]]) -> List[Candidate]:
+        self.stats["reads"] += 1
+        if state is not None and state is not self._state:
+            self.rebuild(state)  # Callers passing another STATE dict (tests, stale references)
+        start = day_start(self._clock())
+        if start != self._day_start:
+            self._rollover(start)
+        return self._all if vendor is None else self._by_vendor.get(vendor, [])
+
+    def _checked(self, candidate: Candidate, exclude: Optional[str], vendor: Optional[str] = None) -> Optional[Candidate]:
+        """candidate if it still matches its STATE order, else re-indexed (or None if it no longer qualifies)."""
+        if candidate.order_id == exclude:
+            return None
+        order = self._state.get(candidate.order_id) if self._state is not None else None
+        if order is candidate.order and signature(order) == candidate.signature:
+            return candidate
+        self.stats["refreshed"] += 1
+        with self._lock:
+            fresh = self._build(candidate.order_id, order) if order else None
+            self._replace(candidate.order_id, fresh)
+        if fresh and (vendor is None or vendor in fresh.vendors):
+            return fresh
+        return None
+
+    def _rollover(self, start: datetime) -> None:
+        with self._lock:
+            self._day_start = start
+            stale = [c.order_id for c in self._all if c.created < start]
+            for order_id in stale:
+                self._replace(order_id, None)
+            self.stats["rollovers"] += 1
+        logger.info(f"Same-time index: day rollover, dropped {len(stale)} candidates")
+
+    def _build(self, order_id: str, order: Dict[str, Any]) -> Optional[Candidate]:
+        """Candidate for an order, or None if it isn't a confirmed, open order from today."""
+        confirmed_time = order.get("confirmed_time")
+        confirmed_times = order.get("confirmed_times") or {}
+        if not (confirmed_time or any(confirmed_times.values())):
+            return None
+        if order.get("status") in CLOSED_STATUSES:
+            return None
+        created = created_datetime(order)
+        if created is None or created < (self._day_start or day_start(self._clock())):
+            return None
+
+        previous = self._entries.get(order_id)
+        if previous and previous.created == created:
+            seq = previous.key[1]  # Keep its place in the lists
+        else:
+            self._seq += 1
+            seq = self._seq
+
+        vendors = tuple(order.get("vendors") or ())
+        address = (order.get("customer") or {}).get("address") or "Unknown"
+        address_short = address.split(',')[0].strip() if ',' in address else address
+        display_time = confirmed_time or (next(iter(confirmed_times.values())) if confirmed_times else "??:??")
+        buttons = []
+        for vendor in vendors:
+            shortcut = self._shortcuts.get(vendor, vendor[:2].upper())
+            # Multi-vendor reference orders show each vendor's own time
+            time_str = confirmed_times.get(vendor, display_time) if len(vendors) > 1 else display_time
+            buttons.append(RefButton(order_id, vendor, shortcut, time_str, button_label(time_str, address_short, shortcut)))
+
+        return Candidate(
+            order_id=order_id,
+            order=order,
+            signature=signature(order),
+            key=(created.timestamp(), seq),
+            created=created,
+            vendors=vendors,
+            recent={
+                "order_id": order_id,
+                "display_name": display_name(order),
+                "vendor": vendors[0] if vendors else "Unknown",
+            },
+            buttons=tuple(buttons),
+        )
+
+    def _replace(self, order_id: str, candidate: Optional[Candidate]) -> None:
+        """Swap one order's entry in every list (caller holds the lock)."""
+        old = self._entries.pop(order_id, None)
+        if old is None and candidate is None:
+            return
+        all_entries = [c for c in self._all if c.order_id != order_id] if old else list(self._all)
+        by_vendor = dict(self._by_vendor)
+        if old:
+            for vendor in old.vendors:
+                by_vendor[vendor] = [c for c in by_vendor.get(vendor, []) if c.order_id != order_id]
+        if candidate:
+            self._entries[order_id] = candidate
+            insort(all_entries, candidate)
+            for vendor in candidate.vendors:
+                entries = list(by_vendor.get(vendor, []))
+                insort(entries, candidate)
+                by_vendor[vendor] = entries
+        self._all = all_entries
+        self._by_vendor = by_vendor
+
+
+@dataclass(frozen=True)
+class Confirmation:
+    """One vendor confirming a pickup time for an order."""
+
+    order_id: str
+    order_name: str
+    vendor: str
+    time: str                 # Confirmed pickup time "HH:MM"
+    minute: int               # Same, as minutes after midnight
+    confirmed_at: datetime    # When the vendor confirmed
+    lead: int                 # Minutes from confirming to pickup
+
+
+class ConfirmationTracker:
+    """Latest confirmation per vendor / overall and a rolling window of each vendor's recent ones."""
+
+    def __init__(self, window: int = PACE_WINDOW, clock: Callable[[], datetime] = now):
+        self._window = window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Deque[Confirmation]] = {}   # vendor -> oldest first
+        self._recent: Deque[Confirmation] = deque(maxlen=window)  # All vendors, oldest first
+        self._seen: Dict[str, Dict[str, str]] = {}           # order_id -> {vendor: recorded time}
+        self._day = None
+        self.stats = {"confirmations": 0, "invalidated": 0, "rollovers": 0}
+
+    def rebuild(self, state: Dict[str, Dict[str, Any]]) -> None:
+        """Seed from today's confirmations in STATE (status_history timestamps, else created_at)."""
+        today = self._clock().date()
+        found: List[Tuple[datetime, str, Dict[str, Any], str, str]] = []
+        for order_id, order in list(state.items()):
+            if order.get("status") == "removed":
+                continue
+            confirmed_at = {entry.get("vendor"): as_datetime(entry.get("timestamp"))
+                            for entry in order.get("status_history") or () if entry.get("type") == "confirmed"}
+            for vendor, time_str in (order.get("confirmed_times") or {}).items():
+                at = confirmed_at.get(vendor) or created_datetime(order)
+                if at and at.astimezone(TIMEZONE).date() == today:
+                    found.append((at, order_id, order, vendor, time_str))
+        with self._lock:
+            self._reset(today)
+            for at, order_id, order, vendor, time_str in sorted(found, key=lambda item: item[0]):
+                self._record(order_id, order, vendor, time_str, at)
+        logger.info(f"Confirmation tracker: {len(found)} confirmations from {len(state)} orders")
+
+    def track(self, order_id: str, order: Optional[Dict[str, Any]]) -> None:
+        """Record new / changed vendor confirmations of an order, drop undone ones (all of them if removed)."""
+        confirmed = {} if not order or order.get("status") == "removed" else (order.get("confirmed_times") or {})
+        seen = self._seen.get(order_id, {})
+        if confirmed == seen:
+            return
+        with self._lock:
+            self._check_day()
+            seen = self._seen.get(order_id, {})
+            dropped = [vendor for vendor in seen if vendor not in confirmed]
+            if dropped:
+                self._drop(order_id, dropped)
+            for vendor, time_str in confirmed.items():
+                if seen.get(vendor) != time_str:
+                    self._record(order_id, order, vendor, time_str, self._clock())
+
+    def latest(self, vendor: Optional[str] = None) -> Optional[Confirmation]:
+        """Most recent confirmation of today (of vendor, or of any vendor)."""
+        self._check_day()
+        window = self._recent if vendor is None else self._windows.get(vendor)
+        return window[-1] if window else None
+
+    def pace(self, vendor: Optional[str] = None) -> Dict[str, Any]:
+        """Kitchen pace from the rolling window: typical step between pickup times and lead time (minutes)."""
+        self._check_day()
+        window = self._recent if vendor is None else self._windows.get(vendor, ())
+        recent = [c for c in window if c.lead <= MAX_LEAD]  # Scheduled pre-orders say nothing about the pace
+        if len(recent) < PACE_MIN_SAMPLES:
+            return {"samples": len(recent), "step": DEFAULT_STEP, "lead": 0}
+        minutes = sorted(c.minute for c in recent)
+        gap = median([b - a for a, b in zip(minutes, minutes[1:])])
+        step = min(max(int(5 * round(gap / 5)), STEP_RANGE[0]), STEP_RANGE[1])
+        return {"samples": len(recent), "step": step, "lead": int(median([c.lead for c in recent]))}
+
+    def suggestion_offsets(self, vendor: Optional[str] = None, count: int = SUGGESTIONS) -> List[int]:
+        """Minutes to add to the latest confirmed time: multiples of the pace step, none earlier than now + lead.
+
+        The first offset is capped at MAX_LEAD, so a latest confirmation far in
+        the past never pushes the suggestions hours out.
+        """
+        latest = self.latest(vendor)
+        pace = self.pace(vendor)
+        first = 1
+        if latest and pace["lead"]:
+            current = self._clock()
+            earliest = current.hour * 60 + current.minute + pace["lead"]
+            behind = earliest - latest.minute
+            if behind > 0:
+                first = max(1, min(-(-behind // pace["step"]), MAX_LEAD // pace["step"]))  # ceil, capped
+        return [pace["step"] * k for k in range(first, first + count)]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "per_vendor": {vendor: self.pace(vendor) for vendor, window in self._windows.items() if window},
+        }
+
+    # --- internals (caller holds the lock) ---
+
+    def _record(self, order_id: str, order: Dict[str, Any], vendor: str, time_str: str, at: datetime) -> None:
+        self._seen.setdefault(order_id, {})[vendor] = time_str
+        self._remove(order_id, vendor)  # A new time for the same order (delay) replaces the old one
+        minute = clock_minutes(time_str)
+        if minute is None:
+            return  # "ASAP": nothing to suggest from
+        confirmation = Confirmation(order_id, order.get("name") or order_id, vendor, time_str, minute, at,
+                                    lead_minutes(minute, at))
+        self._windows.setdefault(vendor, deque(maxlen=self._window)).append(confirmation)
+        self._recent.append(confirmation)
+        self.stats["confirmations"] += 1
+
+    def _drop(self, order_id: str, vendors: List[str]) -> None:
+        seen = self._seen.get(order_id, {})
+        for vendor in vendors:
+            seen.pop(vendor, None)
+            if self._remove(order_id, vendor):
+                self.stats["invalidated"] += 1
+        if not seen:
+            self._seen.pop(order_id, None)
+
+    def _remove(self, order_id: str, vendor: str) -> bool:
+        """Take an order's confirmation out of the windows; latest falls back to the one before."""
+        window = self._windows.get(vendor)
+        if not window or not any(c.order_id == order_id for c in window):
+            return False
+        self._windows[vendor] = deque((c for c in window if c.order_id != order_id), maxlen=self._window)
+        # Rare (undo / removal): rebuild the all-vendor window from the per-vendor ones
+        remaining = sorted((c for w in self._windows.values() for c in w), key=lambda c: c.confirmed_at)
+        self._recent = deque(remaining[-self._window:], maxlen=self._window)
+        return True
+
+    def _reset(self, today) -> None:
+        self._windows, self._recent, self._seen, self._day = {}, deque(maxlen=self._window), {}, today
+
+    def _check_day(self) -> None:
+        today = self._clock().date()
+        if today != self._day:
+            self._reset(today)
+            self.stats["rollovers"] += 1
+
+
+# Shared instances: mdg.configure() indexes STATE, main.py / upc.py call track()
+candidates = SameTimeIndex()
+confirmations = ConfirmationTracker()
+
+
+def configure(state: Dict[str, Dict[str, Any]], shortcuts: Dict[str, str]) -> None:
+    candidates.configure(state, shortcuts)
+    confirmations.rebuild(state)
+
+
+def track(order_id: str, order: Optional[Dict[str, Any]] = None) -> None:
+    candidates.track(order_id, order)
+    confirmations.track(order_id, order if order is not None else (candidates._state or {}).get(order_id))
+
+
+def metrics() -> Dict[str, Any]:
+    return {**candidates.metrics(), "confirmations": confirmations.metrics()}
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# shopify.py - Shopify order webhook payload -> STATE order entry
+
+"""
+Shopify Order Normalizer for Telegram Dispatch Bot
+
+Both Shopify entry points - the /webhooks/shopify route and the /test commands
+(process_shopify_webhook) - build their STATE entry with normalize_order(), so
+the two can't drift apart. The payload is read field by field, once:
+
+- Customer: name, email, phone (customer -> order -> billing -> shipping)
+- Address: "street, zip" for display, address1 + zip for the maps link
+- Line items: vendors we have a group for, in order of appearance, and their
+  items as "- 2 x Display Name" (product catalog names)
+- Payment: cash on delivery from the gateway names / transactions, total, tip
+- Pickup: "abholung" (Abholung, Selbstabholung) in the fields a pickup shows
+  up in - shipping lines, tags, note, note attributes, item names and the
+  shipping address - instead of stringifying the whole payload
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Container, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from catalog import catalog
+from utils import validate_phone
+
+logger = logging.getLogger(__name__)
+
+TIMEZONE = ZoneInfo("Europe/Berlin")
+PICKUP_MARKER = "abholung"
+
+# Fields that can carry the pickup marker
+PICKUP_ORDER_FIELDS = ("tags", "note")
+PICKUP_SHIPPING_LINE_FIELDS = ("title", "code", "source")
+PICKUP_ITEM_FIELDS = ("name", "title", "variant_title")
+PICKUP_ADDRESS_FIELDS = ("address1", "address2", "company")
+
+TIP_FIELDS = ("total_tip_received", "total_tip")  # Checked in this order, then tip_money / total_tips_set
+
+
+def now() -> datetime:
+    """Get current time in Passau timezone (Europe/Berlin)."""
+    return datetime.now(TIMEZONE)
+
+
+def fmt_address(addr: Dict[str, Any]) -> str:
+    """Format address - only street, building number and zip code (no city!)."""
+    if not addr:
+        return "No address provided"
+
+    try:
+        parts = []
+        if addr.get("address1"):
+            parts.append(addr["address1"])
+        if addr.get("zip"):
+            parts.append(addr["zip"])
+        return ", ".join(parts) if parts else "Address incomplete"
+    except Exception as exc:
+        logger.error(f"Address formatting error: {exc}")
+        return "Address formatting error"
+
+
+def _mentions_pickup(values: Iterable[Any]) -> bool:
+    return PICKUP_MARKER in " ".join(value for value in values if isinstance(value, str)).lower()
+
+
+def is_pickup_order(payload: Dict[str, Any], line_items: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """Whether the order is for Selbstabholung ("abholung" in one of the pickup fields)."""
+    if _mentions_pickup(payload.get(field) for field in PICKUP_ORDER_FIELDS):
+        return True
+    for line in payload.get("shipping_lines") or ():
+        if _mentions_pickup(line.get(field) for field in PICKUP_SHIPPING_LINE_FIELDS):
+            return True
+    for attribute in payload.get("note_attributes") or ():
+        if _mentions_pickup((attribute.get("name"), attribute.get("value"))):
+            return True
+    shipping = payload.get("shipping_address") or {}
+    if _mentions_pickup(shipping.get(field) for field in PICKUP_ADDRESS_FIELDS):
+        return True
+    items = (payload.get("line_items") or ()) if line_items is None else line_items
+    return _mentions_pickup(item.get(field) for item in items for field in PICKUP_ITEM_FIELDS)
+
+
+def payment_method(payload: Dict[str, Any], is_test: bool = False) -> str:
+    """"Cash on Delivery" or "Paid". Only /test orders also take a bare "cod" transaction gateway."""
+    gateways = " ".join(payload.get("payment_gateway_names") or ()).lower()
+    if "cash" in gateways and "delivery" in gateways:
+        return "Cash on Delivery"
+    for transaction in payload.get("transactions") or ():
+        gateway = (transaction.get("gateway") or "").lower()
+        if ("cash" in gateway and "delivery" in gateway) or (is_test and "cod" in gateway.split()):
+            return "Cash on Delivery"
+    return "Paid"
+
+
+def total_price(payload: Dict[str, Any]) -> str:
+    """Order total formatted as "12.50€"."""
+    try:
+        return f"{float(payload.get('total_price', '0.00')):.2f}€"
+    except (ValueError, TypeError):
+        return "0.00€"
+
+
+def tips(payload: Dict[str, Any]) -> float:
+    """Tip amount from whichever tip field Shopify filled in (0.0 if none)."""
+    try:
+        for field in TIP_FIELDS:
+            if payload.get(field):
+                return float(payload[field])
+        if payload.get("tip_money") and payload["tip_money"].get("amount"):
+            return float(payload["tip_money"]["amount"])
+        amount = ((payload.get("total_tips_set") or {}).get("shop_money") or {}).get("amount")
+        return float(amount) if amount else 0.0
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Error extracting tips for order {payload.get('id')}: {e}")
+        return 0.0
+
+
+def customer_phone(payload: Dict[str, Any]) -> str:
+    """First phone number found (customer, order, billing, shipping), validated; "N/A" if none."""
+    customer = payload.get("customer") or {}
+    phone = validate_phone(
+        customer.get("phone")
+        or payload.get("phone")
+        or (payload.get("billing_address") or {}).get("phone")
+        or (payload.get("shipping_address") or {}).get("phone")
+        or "N/A"
+    )
+    if not phone:
+        logger.warning(f"Phone number missing or invalid for order {payload.get('id')}")
+        return "N/A"
+    return phone
+
+
+def vendor_items(line_items: List[Dict[str, Any]], known_vendors: Container[str]) -> Dict[str, List[str]]:
+    """Vendor -> ["- 2 x Display Name", ...] for the vendors we serve, in order of appearance."""
+    items: Dict[str, List[str]] = {}
+    for item in line_items:
+        vendor = item.get("vendor")
+        if not vendor or vendor not in known_vendors:
+            continue
+        raw_name = item.get("name") or item.get("title") or "Item"
+        items.setdefault(vendor, []).append(f"- {item.get('quantity', 1)} x {catalog.display_name(vendor, raw_name)}")
+    return items
+
+
+def items_text(items: Dict[str, List[str]]) -> str:
+    """Item list as one text: vendor headings above the items when several vendors are in the order."""
+    if len(items) > 1:
+        return "\n\n".join(f"{vendor}:\n" + "\n".join(lines) for vendor, lines in items.items())
+    return "\n".join(line for lines in items.values() for line in lines)
+
+
+def normalize_order(payload: Dict[str, Any], known_vendors: Container[str], is_test: bool = False) -> Dict[str, Any]:
+    """
+    STATE entry for a Shopify order webhook payload.
+
+    Args:
+        payload: Shopify order webhook payload
+        known_vendors: Vendors with a restaurant group (VENDOR_GROUP_MAP); others are left out
+        is_test: True for orders generated by the /test commands
+
+    Returns:
+        New order dict (status "new", no messages sent yet)
+    """
+    customer = payload.get("customer") or {}
+    shipping = payload.get("shipping_address") or {}
+    address = fmt_address(shipping)
+    original_address = f"{shipping.get('address1', '')}, {shipping.get('zip', '')}".strip()
+    if original_address == ", " or not original_address:
+        original_address = address  # fallback to formatted address
+
+    line_items = payload.get("line_items") or []
+    items = vendor_items(line_items, known_vendors)
+    vendors = list(items)
+    created = now()
+
+    return {
+        "order_id": str(payload.get("id")),
+        "name": payload.get("name", "Unknown"),
+        "order_type": "shopify",
+        "vendors": vendors,
+        "customer": {
+            "name": f"{customer.get('first_name') or ''} {customer.get('last_name') or ''}".strip() or "Unknown",
+            "phone": customer_phone(payload),
+            "email": customer.get("email") or payload.get("email"),
+            "address": address,
+            "original_address": original_address,
+        },
+        "items_text": items_text(items),
+        "vendor_items": items,
+        "note": payload.get("note") or "",
+        "tips": tips(payload),
+        "payment_method": payment_method(payload, is_test),
+        "total": total_price(payload),
+        "delivery_time": "ASAP",
+        "is_pickup": is_pickup_order(payload, line_items),
+        "is_test": is_test,
+        "created_at": created,
+        "mdg_message_id": None,
+        "vendor_messages": {},
+        "vendor_expanded": {vendor: False for vendor in vendors},
+        "requested_time": None,
+        "requested_times": {},  # Track requested time per vendor (multi-vendor)
+        "confirmed_times": {},  # Track confirmed time per vendor
+        "confirmed_time": None,
+        "status": "new",
+        "status_history": [{"type": "new", "timestamp": created}],
+        "rg_message_ids": {},
+        "upc_message_id": None,
+        "mdg_additional_messages": [],  # Track additional MDG messages for cleanup
+        # Order grouping fields
+        "group_id": None,
+        "group_color": None,
+        "group_position": None,
+        "upc_assignment_message_id": None,
+        "grouped_via": None,
+        "group_reference_order": None,
+    }
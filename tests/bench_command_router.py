@@ -0,0 +1,85 @@
+# Benchmark: text command routing per message, startswith chain vs prefix trie router
+#
+# Traffic mix: mostly plain chat messages from restaurant groups and the MDG
+# (which went through every startswith check), some unknown /commands and a
+# few real commands. Handlers are no-ops; only routing is timed. The old chain
+# is the sequence telegram_webhook used to run (15 prefixes).
+#
+# Run: python tests/bench_command_router.py
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commands import SCOPE_MDG, Arg, CommandRouter
+
+MESSAGES = 200_000
+CHAIN = ("/sched", "/assign", "/testsm", "/testsh", "/testpf", "/testjs", "/testzh", "/testka", "/testsa",
+         "/testlr", "/testsf", "/testhb", "/testki", "/ocr", "/cleanup")
+TEXTS = [
+    "Bestellung 42 ist in 10 Minuten fertig", "Fahrer ist unterwegs", "Kunde nicht erreichbar, bitte anrufen",
+    "ok", "👍", "Kann jemand die 17 abholen?", "Issue: Pommes sind aus", "18:30 passt", "Danke!",
+    "Die Klingel ist defekt, bitte anrufen wenn ihr da seid", "/start", "/help",
+    "/sched", "/assigned", "/testsh multi", "/cleanup 2", "/ocr_status",
+]
+WEIGHTS = [10, 10, 8, 10, 6, 6, 6, 6, 8, 6, 1, 1, 1, 1, 0.2, 0.1, 0.2]
+
+
+def route_chain(text):
+    for prefix in CHAIN:
+        if text.startswith(prefix):
+            return prefix
+    return None
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    router = CommandRouter()
+    router.configure(lambda msg: SCOPE_MDG, lambda coro: None)
+    for name in CHAIN:
+        router.register(name, lambda ctx: None, args=(Arg("days", int, 1),) if name == "/cleanup" else ())
+
+    rng = random.Random(7)
+    texts = rng.choices(TEXTS, WEIGHTS, k=MESSAGES)
+    messages = [{"message_id": i, "chat": {"id": -100}, "text": text} for i, text in enumerate(texts)]
+    mismatches = [t for t in TEXTS if route_chain(t) != (router.match(t).name if router.match(t) else None)]
+    commands = sum(route_chain(t) is not None for t in texts)
+
+    start = time.perf_counter()
+    for text in texts:
+        route_chain(text)
+    chain = (time.perf_counter() - start) / MESSAGES
+
+    start = time.perf_counter()
+    for text in texts:
+        router.match(text)
+    trie = (time.perf_counter() - start) / MESSAGES
+
+    start = time.perf_counter()
+    for msg in messages:
+        router.dispatch(msg)
+    dispatch = (time.perf_counter() - start) / MESSAGES
+
+    plain = [t for t in texts if not t.startswith("/")]
+    start = time.perf_counter()
+    for text in plain:
+        route_chain(text)
+    chain_plain = (time.perf_counter() - start) / len(plain)
+    start = time.perf_counter()
+    for text in plain:
+        router.match(text)
+    trie_plain = (time.perf_counter() - start) / len(plain)
+
+    print(f"{MESSAGES} messages, {commands} commands, routing agrees on {len(TEXTS) - len(mismatches)}/{len(TEXTS)} texts")
+    print(f"startswith chain: {chain * 1e9:6.0f} ns/message   (plain text: {chain_plain * 1e9:5.0f} ns)")
+    print(f"trie match:       {trie * 1e9:6.0f} ns/message   (plain text: {trie_plain * 1e9:5.0f} ns, "
+          f"{chain_plain / trie_plain:.0f}x)")
+    print(f"trie dispatch:    {dispatch * 1e9:6.0f} ns/message   (incl. scope check, args, timing)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Benchmark: sequential vs fan_out sends against a fake Bot API with artificial latency
+#
+# Run: python tests/bench_fan_out.py
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+import utils
+from outbound import fan_out
+
+LATENCY = 0.15  # Seconds per Bot API round trip
+VENDOR_CHATS = {f"Vendor {i}": -2000 - i for i in range(5)}
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.message_id = message_id
+
+
+class FakeBot:
+    """Bot stand-in: every call sleeps LATENCY seconds, then succeeds."""
+
+    def __init__(self):
+        self.next_id = 1
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(LATENCY)
+        self.next_id += 1
+        return FakeMessage(self.next_id)
+
+
+async def sequential():
+    for vendor, chat_id in VENDOR_CHATS.items():
+        await utils.safe_send_message(chat_id, f"Order for {vendor}")
+
+
+async def concurrent():
+    await fan_out({
+        vendor: (lambda chat=chat_id, v=vendor: utils.safe_send_message(chat, f"Order for {v}"))
+        for vendor, chat_id in VENDOR_CHATS.items()
+    })
+
+
+async def main():
+    utils.bot = FakeBot()
+    for name, fn in (("sequential", sequential), ("fan_out", concurrent)):
+        start = time.perf_counter()
+        await fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {len(VENDOR_CHATS)} vendor groups in {elapsed * 1000:.0f} ms "
+              f"({elapsed / LATENCY:.1f} round trips)")
+
+
+if __name__ == "__main__":
+    # Silence utils' per-send debug output
+    sys.stderr = open(os.devnull, "w")
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+# Benchmark: build time and allocations per time-picker keyboard
+#
+# cold   = template rebuilt for every keyboard (what every click cost before templates)
+# warm   = template cached for the current time bucket, order id stamped into new buttons
+# repeat = same order reopens the same picker within the bucket (stamped keyboard reused)
+#
+# Run: python tests/bench_keyboards.py
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+import mdg
+import rg
+
+ITERATIONS = 2000
+
+KEYBOARDS = {
+    "time_picker_keyboard": (lambda oid: mdg.time_picker_keyboard(oid, "later_time", "12:40", "Leckerolls"), mdg._time_picker_template),
+    "exact_time_keyboard": (lambda oid: mdg.exact_time_keyboard(oid, "LR"), mdg._exact_time_template),
+    "exact_hour_keyboard": (lambda oid: mdg.exact_hour_keyboard(oid, 18, "LR"), mdg._exact_hour_template),
+    "vendor_exact_time_keyboard": (lambda oid: rg.vendor_exact_time_keyboard(oid, "Leckerolls", "prepare"), rg._vendor_exact_time_template),
+    "vendor_exact_hour_keyboard": (lambda oid: rg.vendor_exact_hour_keyboard(oid, 18, "Leckerolls", "prepare"), rg._vendor_exact_hour_template),
+}
+MODES = ("cold", "warm", "repeat")
+
+
+def prepare(mode, template_cache, build):
+    """Return a per-iteration step: (optional cache reset, order id to build)."""
+    if mode == "cold":
+        return lambda i: (template_cache.cache_clear(), str(7404590039306 + i))[1]
+    build("warmup")
+    if mode == "warm":
+        return lambda i: str(7404590039306 + i)
+    build("7404590039306")
+    return lambda i: "7404590039306"
+
+
+def build_time(build, template_cache, mode):
+    step = prepare(mode, template_cache, build)
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        build(step(i))
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def allocations(build, template_cache, mode):
+    """Memory blocks allocated while building one keyboard (tracemalloc)."""
+    step = prepare(mode, template_cache, build)
+    tracemalloc.start()
+    repeat_id = step(0)  # Clears the template cache in "cold" mode
+    order_id = repeat_id if mode == "repeat" else f"{mode}-alloc"  # Fresh id except for "repeat"
+    before = tracemalloc.take_snapshot()
+    keyboard = build(order_id)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+
+
+def main():
+    print(f"{'keyboard':<28}" + "".join(f"{mode + ' µs':>11}" for mode in MODES) + "".join(f"{mode + ' allocs':>14}" for mode in MODES))
+    for name, (build, template_cache) in KEYBOARDS.items():
+        times = [build_time(build, template_cache, mode) for mode in MODES]
+        allocs = [allocations(build, template_cache, mode) for mode in MODES]
+        print(f"{name:<28}" + "".join(f"{t * 1e6:>11.1f}" for t in times) + "".join(f"{a:>14}" for a in allocs))
+
+
+if __name__ == "__main__":
+    main()
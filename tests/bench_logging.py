@@ -0,0 +1,120 @@
+# Benchmark: logging overhead per Telegram update, previous synchronous logging vs log_pipeline
+#
+# Before: what telegram_webhook + safe_send_message used to emit per message update -
+# 14 INFO lines (update header, every user / chat field) formatted and written by
+# the request thread, plus 5 stderr prints for the reply sent.
+# After: one structured "message" record and one DEBUG send record (rate limited)
+# through the queue handler; formatting and writing happen in the writer thread.
+#
+# Reports the time the request thread spends per update, and the end-to-end time
+# until everything is written. Output goes to os.devnull.
+#
+# Run: python tests/bench_logging.py
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_pipeline
+from log_pipeline import event
+
+UPDATES = 20_000
+TRUNCATE = 200
+
+UPDATE = {
+    "update_id": 912345678,
+    "message": {
+        "message_id": 4711,
+        "from": {"id": 123456789, "is_bot": False, "first_name": "Anna", "last_name": "Huber", "username": "anna_h"},
+        "chat": {"id": -1001234567890, "title": "dishbee MDG", "type": "supergroup"},
+        "date": 1765215720,
+        "text": "Bitte um 18:30 liefern, Klingel defekt - danke!",
+    },
+}
+REPLY = "🔖 #42 - dishbee\n🏠 Innstraße 12, 94032\n👤 Anna Huber\n📞 +49 171 2345678\n\n2 x Käsespätzle - Groß"
+
+
+def log_before(logger, devnull, upd):
+    msg = upd["message"]
+    from_user, chat, text = msg["from"], msg["chat"], msg["text"]
+    logger.info(f"=== INCOMING UPDATE ===")
+    logger.info(f"Update ID: {upd.get('update_id')}")
+    logger.info(f"Timestamp: {time.strftime('%Y-%m-%dT%H:%M:%S')}")
+    logger.info(f"MESSAGE RECEIVED:")
+    logger.info(f"  Update Type: message")
+    logger.info(f"  Chat ID: {chat.get('id')}")
+    logger.info(f"  Chat Type: {chat.get('type')}")
+    logger.info(f"  Chat Title: {chat.get('title', 'N/A')}")
+    logger.info(f"  From User ID: {from_user.get('id', 'N/A')}")
+    logger.info(f"  From Username: {from_user.get('username', 'N/A')}")
+    logger.info(f"  From First Name: {from_user.get('first_name', 'N/A')}")
+    logger.info(f"  From Last Name: {from_user.get('last_name', 'N/A')}")
+    logger.info(f"  Message Text: {text[:TRUNCATE]}{'...' if len(text) > TRUNCATE else ''}")
+    logger.info(f"  Message Length: {len(text)}")
+    print(f"=== MESSAGE TEXT DEBUG ===", flush=True, file=devnull)
+    print(f"Text length: {len(REPLY)}", flush=True, file=devnull)
+    print(f"First 100 chars: {repr(REPLY[:100])}", flush=True, file=devnull)
+    print(f"Char at pos 16: {repr(REPLY[16])}", flush=True, file=devnull)
+    print(f"Chars 0-25: {repr(REPLY[:25])}", flush=True, file=devnull)
+
+
+def log_after(update_log, send_log, upd):
+    msg = upd["message"]
+    from_user, chat, text = msg["from"], msg["chat"], msg["text"]
+    event(
+        update_log, "message",
+        update_id=upd.get("update_id"), type="message", chat_id=chat.get("id"), chat_type=chat.get("type"),
+        chat_title=chat.get("title"), user_id=from_user.get("id"), username=from_user.get("username"),
+        first_name=from_user.get("first_name"), last_name=from_user.get("last_name"),
+        text=text[:TRUNCATE] + ("..." if len(text) > TRUNCATE else ""), length=len(text),
+    )
+    event(send_log, "send_message", logging.DEBUG, chat_id=chat.get("id"), length=len(REPLY), head=REPLY[:25])
+
+
+def main():
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    root = logging.getLogger()
+
+    # Before: basicConfig-style synchronous StreamHandler
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter(log_pipeline.TEXT_FORMAT))
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+    logger = logging.getLogger("main")
+    start = time.perf_counter()
+    for _ in range(UPDATES):
+        log_before(logger, devnull, UPDATE)
+    before = (time.perf_counter() - start) / UPDATES
+    print(f"before (14 sync INFO lines + 5 prints): {before * 1e6:6.1f} µs/update in the request thread")
+
+    update_log, send_log = logging.getLogger("main.updates"), logging.getLogger("utils.send")
+    for fmt in ("kv", "json"):
+        for level in ("INFO", "DEBUG"):
+            log_pipeline.configure(level=level, fmt=fmt, levels="", sample="", rate_limits="", stream=devnull,
+                                   queue_size=UPDATES * 2)
+            start = time.perf_counter()
+            for _ in range(UPDATES):
+                log_after(update_log, send_log, UPDATE)
+            caller = (time.perf_counter() - start) / UPDATES
+            log_pipeline.pipeline.flush()
+            total = (time.perf_counter() - start) / UPDATES
+            metrics = log_pipeline.metrics()
+            print(f"after  ({fmt:4s}, LOG_LEVEL={level:5s}):          {caller * 1e6:6.1f} µs/update in the request "
+                  f"thread ({before / caller:.0f}x), {total * 1e6:6.1f} µs/update until written; "
+                  f"dropped {metrics['dropped']}, debug suppressed {sum(metrics['suppressed'].values())}")
+
+    log_pipeline.configure(level="INFO", fmt="kv", levels="", sample="main.updates=10", rate_limits="",
+                           stream=devnull)
+    start = time.perf_counter()
+    for _ in range(UPDATES):
+        log_after(update_log, send_log, UPDATE)
+    caller = (time.perf_counter() - start) / UPDATES
+    log_pipeline.pipeline.stop()
+    print(f"after  (kv, LOG_SAMPLE=main.updates=10):    {caller * 1e6:6.1f} µs/update in the request thread "
+          f"({before / caller:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
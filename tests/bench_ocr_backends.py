@@ -0,0 +1,88 @@
+# Benchmark: OCR latency and parse_pf_order success rate per OCR backend, raw vs preprocessed photos
+#
+# Runs every available backend (ocr_backends.BACKENDS) over a folder of PF order
+# photos, once on the original bytes and once on ocr_preprocess.prepare() output,
+# and reports bytes sent, per-photo latency and how many photos parse_pf_order
+# could read. Expected rejections (Selbstabholung, collapsed details/note) count
+# as parsed: the engine read the photo well enough to tell.
+#
+# Run: python tests/bench_ocr_backends.py [photo_dir]   (default: tests/fixtures/pf_photos)
+#      OCR_API_KEY must be set for the ocrspace backend, tesseract must be on PATH for tesseract
+import glob
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr
+from ocr_backends import BACKENDS
+from ocr_preprocess import prepare
+
+PHOTO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pf_photos")
+EXPECTED_REJECTIONS = {"SELBSTABHOLUNG", "DETAILS_COLLAPSED", "NOTE_COLLAPSED", "DETAILS_AND_NOTE_COLLAPSED"}
+
+
+def bench_backend(backend, photos, images):
+    latencies, extracted, parsed = [], 0, 0
+    for photo, image in zip(photos, images):
+        start = time.perf_counter()
+        try:
+            text = backend.extract(image)
+        except ocr.ParseError as e:
+            print(f"  {os.path.basename(photo)}: OCR failed ({e})")
+            continue
+        finally:
+            latencies.append(time.perf_counter() - start)
+        extracted += 1
+        try:
+            ocr.parse_pf_order(text)
+            parsed += 1
+        except ocr.ParseError as e:
+            if str(e) in EXPECTED_REJECTIONS:
+                parsed += 1
+            else:
+                print(f"  {os.path.basename(photo)}: parse failed ({e})")
+    return latencies, extracted, parsed
+
+
+def main():
+    logging.disable(logging.INFO)
+    photo_dir = sys.argv[1] if len(sys.argv) > 1 else PHOTO_DIR
+    photos = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(photo_dir, f"*.{ext}")))
+    if not photos:
+        print(f"No photos in {photo_dir} - add PF order photos (jpg/png) to benchmark")
+        sys.exit(1)
+
+    raw = []
+    for photo in photos:
+        with open(photo, "rb") as f:
+            raw.append(f.read())
+    start = time.perf_counter()
+    prepared = [prepare(image).data for image in raw]
+    prep_ms = (time.perf_counter() - start) / len(raw) * 1000
+    print(f"{len(photos)} photos from {photo_dir}")
+    print(f"bytes: raw {sum(map(len, raw)) / len(raw) / 1000:.0f} KB/photo -> "
+          f"preprocessed {sum(map(len, prepared)) / len(prepared) / 1000:.0f} KB/photo "
+          f"(preprocessing {prep_ms:.0f} ms/photo)\n")
+
+    for name, backend in BACKENDS.items():
+        if not backend.available():
+            print(f"{name:10s} not available here (skipped)\n")
+            continue
+        means = {}
+        for variant, images in (("raw", raw), ("prepared", prepared)):
+            print(f"{name} / {variant}:")
+            latencies, extracted, parsed = bench_backend(backend, photos, images)
+            p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+            means[variant] = statistics.mean(latencies)
+            print(f"{name:10s} {variant:8s} mean {means[variant] * 1000:7.0f} ms   "
+                  f"p50 {statistics.median(latencies) * 1000:7.0f} ms   p95 {p95 * 1000:7.0f} ms   "
+                  f"OCR ok {extracted}/{len(photos)}   parsed {parsed}/{len(photos)} "
+                  f"({parsed / len(photos):.0%})")
+        print(f"{name:10s} OCR time delta (prepared - raw): {(means['prepared'] - means['raw']) * 1000:+.0f} ms/photo\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# Regression harness: parse_pf_order accuracy per field, rejection categories and parse latency vs a baseline
+#
+# Sources (any mix, default tests/fixtures/pf_ocr_orders.json):
+# - a JSON corpus file: [{name, text, expected | error}] as in pf_ocr_orders.json
+# - a directory of recorded orders: <name>.txt holds the OCR text, <name>.json the
+#   expected parse ({order_num, customer, ...}) or {"error": "NOTE_COLLAPSED"}.
+#   Texts without a .json are unlabelled: they count towards categories and
+#   latency only. With --images, <name>.jpg/.jpeg/.png photos in the directory
+#   are prepared (ocr_preprocess) and read by the local tesseract binary first
+#
+# Reports per-field accuracy, how many texts ended in each rejection category
+# (SELBSTABHOLUNG, DETAILS_COLLAPSED, NOTE_COLLAPSED, DETAILS_AND_NOTE_COLLAPSED,
+# generic = OCR_FAILED and other parse errors) and p50/p95 parse time, then
+# compares with tests/fixtures/pf_ocr_baseline.json. Exits 1 when a field's
+# accuracy dropped, a case that matched the baseline doesn't any more, or p95
+# got slower than --latency-tolerance x baseline. Runs offline: OCR.space is
+# never called.
+#
+# Run: python tests/bench_ocr_regression.py [source ...] [--images] [--update-baseline] [-v]
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr import ParseError, parse_pf_order
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_SOURCES = [os.path.join(FIXTURES, "pf_ocr_orders.json")]
+BASELINE_FILE = os.path.join(FIXTURES, "pf_ocr_baseline.json")
+
+FIELDS = ("order_num", "customer", "phone", "address", "apartment_info", "zip", "time", "total", "note",
+          "product_count")
+CATEGORIES = ("parsed", "SELBSTABHOLUNG", "DETAILS_COLLAPSED", "NOTE_COLLAPSED", "DETAILS_AND_NOTE_COLLAPSED",
+              "generic")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+ROUNDS = 20  # Parses per text for the latency percentiles
+LATENCY_TOLERANCE = 2.0  # p95 may grow this much over the baseline (machines differ)
+
+
+def category(outcome):
+    """Category of a parse outcome: a parsed dict, or the ParseError message."""
+    if isinstance(outcome, dict):
+        return "parsed"
+    return outcome if outcome in CATEGORIES else "generic"
+
+
+def parse(text):
+    try:
+        return parse_pf_order(text)
+    except ParseError as e:
+        return str(e)
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _label(case, label):
+    if label is None:
+        return case
+    if isinstance(label, dict) and set(label) == {"error"}:
+        case["error"] = label["error"]
+    else:
+        case["expected"] = label
+    return case
+
+
+def load_cases(sources, images=False, ocr=None):
+    """
+    Cases {name, text, expected | error} from corpus files and recording directories.
+
+    Photos (only with images=True) are read by ocr(bytes) -> text; defaults to
+    tesseract after ocr_preprocess.prepare. Photos that can't be read are
+    reported and left out.
+    """
+    cases = []
+    for source in sources:
+        if not os.path.isdir(source):
+            cases.extend(_read_json(source))
+            continue
+        for path in sorted(glob.glob(os.path.join(source, "*"))):
+            stem, ext = os.path.splitext(path)
+            ext = ext.lower()
+            if ext != ".txt" and not (images and ext in IMAGE_EXTENSIONS):
+                continue
+            label = _read_json(stem + ".json") if os.path.exists(stem + ".json") else None
+            name = os.path.relpath(path, source) if ext in IMAGE_EXTENSIONS else os.path.basename(stem)
+            if ext == ".txt":
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+            else:
+                ocr = ocr or local_ocr()
+                with open(path, "rb") as f:
+                    try:
+                        text = ocr(f.read())
+                    except ParseError as e:
+                        print(f"  {name}: OCR failed ({e}) - skipped")
+                        continue
+            cases.append(_label({"name": name, "text": text}, label))
+    return cases
+
+
+def local_ocr():
+    """Photo bytes -> text with the local tesseract binary (never the OCR.space API)."""
+    from ocr_backends import TesseractBackend
+    from ocr_preprocess import prepare
+
+    backend = TesseractBackend()
+    if not backend.available():
+        sys.exit(f"--images needs the tesseract binary ({backend.cmd}) on PATH")
+    return lambda image: backend.extract(prepare(image).data)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def evaluate(cases, rounds=ROUNDS):
+    """Accuracy, categories and latency of parse_pf_order over the cases."""
+    field_hits = {field: 0 for field in FIELDS}
+    labelled = [case for case in cases if "expected" in case or "error" in case]
+    parsed_labels = [case for case in labelled if "expected" in case]
+    categories = {name: 0 for name in CATEGORIES}
+    wrong, details = [], {}
+
+    for case in cases:
+        outcome = parse(case["text"])
+        categories[category(outcome)] += 1
+        if "expected" in case:
+            expected = case["expected"]
+            got = outcome if isinstance(outcome, dict) else {}
+            misses = [field for field in FIELDS if got.get(field) != expected.get(field)]
+            for field in FIELDS:
+                field_hits[field] += field not in misses
+            if misses:
+                wrong.append(case["name"])
+                details[case["name"]] = outcome if not got else {f: (expected.get(f), got.get(f)) for f in misses}
+        elif "error" in case and category(outcome) != category(case["error"]):
+            wrong.append(case["name"])
+            details[case["name"]] = {"error": (case["error"], outcome if isinstance(outcome, str) else "parsed")}
+
+    timings = []
+    for case in cases:
+        text = case["text"]
+        for _ in range(rounds):
+            start = time.perf_counter()
+            parse(text)
+            timings.append(time.perf_counter() - start)
+
+    return {
+        "cases": len(cases),
+        "labelled": len(labelled),
+        "accuracy": round(1 - len(wrong) / len(labelled), 4) if labelled else None,
+        "fields": {field: round(hits / len(parsed_labels), 4) if parsed_labels else None
+                   for field, hits in field_hits.items()},
+        "categories": categories,
+        "wrong": sorted(wrong),
+        "p50_us": round(percentile(timings, 50) * 1e6, 1),
+        "p95_us": round(percentile(timings, 95) * 1e6, 1),
+        "details": details,
+    }
+
+
+def compare(report, baseline, latency_tolerance=LATENCY_TOLERANCE):
+    """Regressions of report against the baseline, as readable lines (empty: none)."""
+    regressions = []
+    for field, accuracy in report["fields"].items():
+        before = baseline.get("fields", {}).get(field)
+        if accuracy is not None and before is not None and accuracy < before:
+            regressions.append(f"{field}: accuracy {before:.1%} -> {accuracy:.1%}")
+    newly_wrong = sorted(set(report["wrong"]) - set(baseline.get("wrong", [])))
+    if newly_wrong:
+        regressions.append(f"no longer matching: {', '.join(newly_wrong)}")
+    before = baseline.get("p95_us")
+    if latency_tolerance and before and report["p95_us"] > before * latency_tolerance:
+        regressions.append(f"p95 parse time {before:.0f} µs -> {report['p95_us']:.0f} µs")
+    return regressions
+
+
+def print_report(report, baseline, verbose=False):
+    accuracy = report["accuracy"]
+    print(f"{report['cases']} OCR texts ({report['labelled']} labelled), "
+          f"accuracy {'n/a' if accuracy is None else f'{accuracy:.1%}'}")
+    for field, value in report["fields"].items():
+        before = baseline.get("fields", {}).get(field)
+        print(f"  {field:15s} {'n/a' if value is None else f'{value:7.1%}'}"
+              + (f"   (baseline {before:.1%})" if before is not None else ""))
+    print("categories: " + ", ".join(f"{name} {count}" for name, count in report["categories"].items()))
+    print(f"parse time: p50 {report['p50_us']:.0f} µs, p95 {report['p95_us']:.0f} µs"
+          + (f"   (baseline p50 {baseline['p50_us']:.0f} µs, p95 {baseline['p95_us']:.0f} µs)"
+             if "p95_us" in baseline else ""))
+    if report["wrong"]:
+        print(f"wrong: {', '.join(report['wrong'])}")
+    if verbose:
+        for name, detail in report["details"].items():
+            print(f"  {name}: {detail}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PF OCR parser regression harness")
+    parser.add_argument("sources", nargs="*", default=DEFAULT_SOURCES,
+                        help="corpus JSON files and/or directories of <name>.txt (+ <name>.json)")
+    parser.add_argument("--images", action="store_true", help="also OCR photos in the directories (tesseract)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="parses per text for the latency percentiles")
+    parser.add_argument("--latency-tolerance", type=float, default=LATENCY_TOLERANCE,
+                        help="allowed p95 growth factor over the baseline (0: don't compare latency)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the wrong fields of each case")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    report = evaluate(load_cases(args.sources, images=args.images), rounds=args.rounds)
+    baseline = _read_json(args.baseline) if os.path.exists(args.baseline) else {}
+    print_report(report, baseline, verbose=args.verbose)
+
+    if args.update_baseline:
+        stored = {key: value for key, value in report.items() if key != "details"}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(report, baseline, latency_tolerance=args.latency_tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
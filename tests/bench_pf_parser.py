@@ -0,0 +1,51 @@
+# Benchmark: parse_pf_order throughput and accuracy over the PF OCR corpus
+#
+# Corpus: tests/fixtures/pf_ocr_orders.json (anonymized Lieferando order screens
+# as OCR.space returns them: ASAP and scheduled orders, notes, apartment lines,
+# split street names, collapsed details / notes, pickup orders). Accuracy is
+# the share of texts whose parse (or rejection reason) matches the golden file.
+#
+# Run: python tests/bench_pf_parser.py
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr import ParseError, parse_pf_order
+
+ROUNDS = 200  # Passes over the corpus
+
+
+def parse(text):
+    try:
+        return parse_pf_order(text)
+    except ParseError as e:
+        return str(e)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pf_ocr_orders.json"),
+              encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    mismatches = [case["name"] for case in corpus if parse(case["text"]) != case.get("expected", case.get("error"))]
+    accuracy = 1 - len(mismatches) / len(corpus)
+    print(f"{len(corpus)} OCR texts, accuracy {accuracy:.1%}" + (f" (wrong: {', '.join(mismatches)})" if mismatches else ""))
+
+    texts = [case["text"] for case in corpus]
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in texts:
+            parse(text)
+    elapsed = time.perf_counter() - start
+    parses = ROUNDS * len(texts)
+    print(f"{parses} parses in {elapsed:.2f}s: {parses / elapsed:,.0f} parses/s, {elapsed / parses * 1e6:.0f} µs/parse")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark: clean_product_name throughput, cold (rule tables only) vs warm (memoized)
+#
+# Corpus: the cases in tests/test_product_cleaning.py plus the synthetic menu in
+# tests/fixtures/product_names.json (burgers x sides, spätzle x extras, pizzas,
+# rolls, pasta, drinks). Outputs are checked against the golden results recorded
+# from the implementation before the rule-table rewrite.
+#
+# Run: python tests/bench_product_names.py
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+from utils import clean_product_name
+
+ITEMS = 50_000  # Line items cleaned per run (names drawn from the menu, as orders do)
+
+
+def main():
+    logging.disable(logging.INFO)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import test_product_cleaning  # Script-style module: prints its results on import
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "product_names.json"),
+              encoding="utf-8") as f:
+        golden = {e["raw"]: e["clean"] for e in json.load(f)}
+    names = sorted(set(golden) | {raw for raw, _ in test_product_cleaning.test_cases})
+
+    clean_product_name.cache_clear()
+    mismatches = [n for n in golden if clean_product_name(n) != golden[n]]
+    print(f"{len(names)} distinct names, {len(golden) - len(mismatches)}/{len(golden)} match the golden outputs")
+
+    # Cold: every name through the rule tables (memo cleared before each call)
+    start = time.perf_counter()
+    for _ in range(20):
+        for name in names:
+            clean_product_name.cache_clear()
+            clean_product_name(name)
+    cold = (time.perf_counter() - start) / (20 * len(names))
+
+    # Warm: order traffic - the same menu names over and over
+    rng = random.Random(7)
+    items = [rng.choice(names) for _ in range(ITEMS)]
+    clean_product_name.cache_clear()
+    start = time.perf_counter()
+    for name in items:
+        clean_product_name(name)
+    warm = (time.perf_counter() - start) / ITEMS
+
+    print(f"cold (rules only): {cold * 1e6:6.2f} µs/name")
+    print(f"warm (memoized):   {warm * 1e6:6.2f} µs/item over {ITEMS} items  ({cold / warm:.0f}x)")
+    print(f"memo: {clean_product_name.cache_info()}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Benchmark: render cost per order (MDG + vendors + UPC) with and without the render cache
+#
+# Simulates the edit traffic of one order's lifecycle: every event re-renders MDG,
+# each vendor's message and the UPC, but only some events actually change the order.
+#
+# Run: python tests/bench_render_cache.py
+import copy
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+import mdg
+import rg
+import upc
+import render_cache
+from test_render_cache import ORDER
+
+EVENTS = 40          # Edits touching this order (time requests, confirmations, assignment, delivery, ...)
+CHANGE_EVERY = 4     # One in four events actually changes the order
+ROUNDS = 50
+
+
+def render_all(order, build_mdg, build_summary, build_details, build_upc):
+    build_mdg(order, False)
+    build_mdg(order, True)
+    for vendor in order["vendors"]:
+        build_summary(order, vendor)
+        build_details(order, vendor)
+    build_upc(order)
+
+
+def run(builders):
+    start = time.perf_counter()
+    for round_num in range(ROUNDS):
+        order = copy.deepcopy(ORDER)
+        order["order_id"] = f"bench-{round_num}"
+        for event in range(EVENTS):
+            if event % CHANGE_EVERY == 0:
+                order["status_history"].append({"type": "confirmed", "time": f"13:{event:02d}"})
+            render_all(order, *builders)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main():
+    uncached = run((mdg._render_mdg_dispatch_text, rg._render_vendor_summary_text,
+                    rg._render_vendor_details_text, upc._render_assignment_message))
+    render_cache.cache.clear()
+    cached = run((mdg.build_mdg_dispatch_text, rg.build_vendor_summary_text,
+                  rg.build_vendor_details_text, upc.build_assignment_message))
+    metrics = render_cache.cache.metrics()
+    print(f"uncached: {uncached * 1000:.2f} ms per order ({EVENTS} events)")
+    print(f"  cached: {cached * 1000:.2f} ms per order ({uncached / cached:.1f}x)")
+    print(f"hit rate: {metrics['hit_rate']:.1%} ({metrics['hits']} hits / {metrics['misses']} misses)")
+
+
+if __name__ == "__main__":
+    # Renderers log at INFO like in production, but into /dev/null instead of the console
+    root = logging.getLogger()
+    root.handlers[:] = [logging.StreamHandler(open(os.devnull, "w"))]
+    root.setLevel(logging.INFO)
+    main()
@@ -0,0 +1,194 @@
+# Benchmark: TIME submenu / "same time as" list / smart time suggestions, full STATE scan vs same_time
+#
+# STATE of a busy evening: orders of today and yesterday (Redis keeps two days),
+# Shopify / Smoothr / PF, most delivered, about 30 confirmed and still open.
+# The old submenu walked every order, parsed created_at and abbreviated every
+# street on each click; the copy below is that code and is checked against
+# mdg_time_submenu_keyboard first. Building the PTB buttons (≈14 µs each) is
+# the same for both, so the candidate lookup is also timed on its own.
+# get_last_confirmed_order used to scan, filter and sort today's orders; the
+# scan is kept below too and compared with the confirmation tracker.
+#
+# Run: python tests/bench_same_time.py
+import logging
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+import mdg
+import same_time
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from utils import abbreviate_street
+
+ORDERS_PER_DAY = 250
+OPEN_ORDERS = 30
+CLICKS = 2_000
+SHORTCUTS = {"Julis Spätzlerei": "JS", "Zweite Heimat": "ZH", "Leckerolls": "LR", "Pommes Freunde": "PF",
+             "dean & david": "DD"}
+STREETS = ["Innstraße", "Lederergasse", "Dr.-Hans-Kapfinger-Straße", "Ludwigsplatz", "Große Klingergasse",
+           "Spitalhofstraße", "Neuburger Straße", "Am Schanzl", "Professor-Wilhelm-Konrad-Weg", "Bräugasse"]
+
+
+def make_state(rng):
+    state = {}
+    now = mdg.now()
+    for day in (1, 0):
+        for i in range(ORDERS_PER_DAY):
+            created = now.replace(hour=10, minute=0) - timedelta(days=day) + timedelta(minutes=i * 2)
+            vendors = rng.sample(list(SHORTCUTS), rng.choice((1, 1, 1, 2)))
+            times = {v: f"{(created.hour + 1) % 24:02d}:{rng.randrange(60):02d}" for v in vendors}
+            order_type = rng.choice(("shopify", "shopify", "smoothr_lieferando", "ocr_pf"))
+            status = "delivered" if day or i < ORDERS_PER_DAY - OPEN_ORDERS else rng.choice(("new", "assigned"))
+            state[f"{day}-{i}"] = {
+                "name": f"#{1000 + i}",
+                "order_type": order_type,
+                "vendors": vendors,
+                "customer": {"address": f"{rng.choice(STREETS)} {rng.randrange(1, 80)}, 94032 Passau"},
+                "confirmed_time": list(times.values())[-1],
+                "confirmed_times": times,
+                "status": status,
+                "created_at": created.astimezone(mdg.TIMEZONE).isoformat() if order_type == "shopify" else created,
+            }
+    return state
+
+
+def scan_buttons(order_id, vendor, state):
+    """The submenu's previous per-click scan: (button text, callback data) pairs."""
+    today_start = mdg.now().replace(hour=0, minute=1, second=0, microsecond=0)
+    recent_orders = []
+    for oid, order_data in state.items():
+        if oid == order_id:
+            continue
+        confirmed_time = order_data.get("confirmed_time")
+        confirmed_times = order_data.get("confirmed_times", {})
+        if not (confirmed_time or (confirmed_times and any(confirmed_times.values()))):
+            continue
+        if order_data.get("status") in ["delivered", "removed"]:
+            continue
+        created_at = order_data.get("created_at")
+        created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00')) if isinstance(created_at, str) else created_at
+        if not created_dt or created_dt < today_start:
+            continue
+        address = order_data.get('customer', {}).get('address', 'Unknown')
+        address_short = address.split(',')[0].strip() if ',' in address else address
+        display_time = confirmed_time if confirmed_time else (list(confirmed_times.values())[0] if confirmed_times else "??:??")
+        recent_orders.append({"order_id": oid, "confirmed_time": display_time, "confirmed_times": confirmed_times,
+                              "address": address_short, "vendors": order_data.get("vendors", [])})
+
+    buttons = []
+    for recent in recent_orders:
+        chef_emoji = mdg.CHEF_EMOJIS[recent_orders.index(recent) % len(mdg.CHEF_EMOJIS)]
+        multi = len(recent["vendors"]) > 1
+        for ref_vendor in recent["vendors"]:
+            shortcut = SHORTCUTS.get(ref_vendor, ref_vendor[:2].upper())
+            vendor_time = recent["confirmed_times"].get(ref_vendor, recent["confirmed_time"]) if multi else recent["confirmed_time"]
+            button_text = f"{vendor_time} - {abbreviate_street(recent['address'], max_length=15)}  - {shortcut}"
+            if len(button_text) > mdg.TELEGRAM_BUTTON_TEXT_LIMIT:
+                house_match = re.search(r'\s+(\d+[a-zA-Z]?)$', recent['address'])
+                house_num = f" {house_match.group(1)}" if house_match else ""
+                street_only = recent['address'][:house_match.start()] if house_match else recent['address']
+                street_clean = re.sub(r'^(Doktor-|Professor-|Sankt-|Dr\.-|Prof\.-|St\.-)', '', street_only)
+                if '-' in street_clean:
+                    street_clean = street_clean.split('-')[0]
+                button_text = f"{vendor_time} - {street_clean[:4] + house_num}  - {shortcut}"
+            callback = f"order_ref|{order_id}|{recent['order_id']}|{vendor_time}|{shortcut}"
+            if vendor:
+                callback += f"|{SHORTCUTS.get(vendor, vendor[:2].upper())}"
+            buttons.append((button_text, callback))
+    return buttons
+
+
+def last_confirmed_scan(vendor, state):
+    """get_last_confirmed_order's previous scan.
+
+    The original sorted on the raw created_at, which raises TypeError once
+    Shopify (ISO string) and Smoothr/PF (datetime) orders are mixed; this
+    sorts on the parsed value, as intended.
+    """
+    today = mdg.now().date()
+    confirmed_orders = []
+    for order_data in state.values():
+        created_at = order_data.get("created_at")
+        created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00')) if isinstance(created_at, str) else created_at
+        if created_dt.date() != today or not order_data.get("confirmed_time"):
+            continue
+        if vendor and vendor not in order_data.get("vendors", []):
+            continue
+        confirmed_orders.append((created_dt, order_data))
+    if confirmed_orders:
+        confirmed_orders.sort(key=lambda x: x[0], reverse=True)
+        return confirmed_orders[0][1]
+    return None
+
+
+def submenu_scan(order_id, vendor, state):
+    rows = [[InlineKeyboardButton(text, callback_data=callback)] for text, callback in scan_buttons(order_id, vendor, state)]
+    return InlineKeyboardMarkup(rows + [[InlineKeyboardButton("← Back", callback_data="hide")]])
+
+
+def submenu_index(order_id, vendor, state):
+    return mdg.mdg_time_submenu_keyboard(order_id, vendor, state=state)
+
+
+def rows(keyboard):
+    return [(row[0].text, row[0].callback_data) for row in keyboard.inline_keyboard]
+
+
+def timed(fn, clicks):
+    start = time.perf_counter()
+    for order_id, vendor in clicks:
+        fn(order_id, vendor)
+    return (time.perf_counter() - start) / len(clicks)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(49)
+    state = make_state(rng)
+    mdg.configure(state, SHORTCUTS)
+    open_ids = [oid for oid, o in state.items() if o["status"] != "delivered"]
+    clicks = [(rng.choice(open_ids), rng.choice([None, "Leckerolls"])) for _ in range(CLICKS)]
+
+    mismatches = [c for c in clicks[:200] if rows(submenu_scan(*c, state)) != rows(submenu_index(*c, state))]
+    shown = len(scan_buttons(*clicks[0], state))
+
+    scan = timed(lambda oid, vendor: submenu_scan(oid, vendor, state), clicks)
+    index = timed(lambda oid, vendor: submenu_index(oid, vendor, state), clicks)
+    scan_lookup = timed(lambda oid, vendor: scan_buttons(oid, vendor, state), clicks)
+    index_lookup = timed(lambda oid, vendor: same_time.candidates.buttons(oid, state=state), clicks)
+    recent = timed(lambda oid, vendor: mdg.get_recent_orders_for_same_time(oid, state=state), clicks)
+    vendors = [None] + list(SHORTCUTS)
+    last_mismatches = [v for v in vendors if last_confirmed_scan(v, state) is not mdg.get_last_confirmed_order(v)]
+    last_scan = timed(lambda oid, vendor: last_confirmed_scan(vendor, state), clicks)
+    last_tracker = timed(lambda oid, vendor: mdg.get_last_confirmed_order(vendor), clicks)
+    smart = timed(lambda oid, vendor: mdg.build_smart_time_suggestions(oid, vendor), clicks)
+
+    start = time.perf_counter()
+    for oid in open_ids:
+        same_time.track(oid, state[oid])
+    track = (time.perf_counter() - start) / len(open_ids)
+
+    print(f"{len(state)} orders in STATE, {len(open_ids)} open and confirmed, {shown} submenu buttons; "
+          f"{len(clicks[:200]) - len(mismatches)}/200 submenus identical")
+    print(f"candidates + labels: full scan {scan_lookup * 1e6:6.1f} µs/click, index {index_lookup * 1e6:6.1f} µs/click "
+          f"({scan_lookup / index_lookup:.0f}x)")
+    print(f"whole submenu:       full scan {scan * 1e6:6.1f} µs/click, index {index * 1e6:6.1f} µs/click "
+          f"(incl. {shown + 1} InlineKeyboardButtons)")
+    print(f"same time as list:   {recent * 1e6:6.1f} µs/click (get_recent_orders_for_same_time)")
+    print(f"last confirmed:      full scan {last_scan * 1e6:6.1f} µs, tracker {last_tracker * 1e6:6.1f} µs "
+          f"({last_scan / last_tracker:.0f}x), same order for {len(vendors) - len(last_mismatches)}/{len(vendors)} "
+          f"vendor filters; smart suggestions keyboard {smart * 1e6:6.1f} µs")
+    print(f"track():             {track * 1e6:6.1f} µs per confirmation / delivery")
+    sys.exit(1 if mismatches or last_mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Benchmark: Shopify payload normalization on large multi-vendor orders
+#
+# Payloads are built like real order webhooks: 4 vendors, 10-60 line items each
+# with properties, tax lines and discount allocations, several transactions,
+# full customer / billing / shipping objects. Compares the pickup check the
+# webhook used to do (str(payload).lower() over the whole payload) with the
+# targeted field check, and times the full normalize_order(). The fixture
+# corpus (tests/fixtures/shopify_orders.json) is checked first.
+#
+# Run: python tests/bench_shopify_normalizer.py
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+from shopify import is_pickup_order, normalize_order
+
+ORDERS = 200
+ROUNDS = 20
+VENDORS = ["Julis Spätzlerei", "Zweite Heimat", "Leckerolls", "Pommes Freunde"]
+PRODUCTS = ["Käsespätzle - Groß", 'Bio-Burger "Classic" - Bio-Pommes', "Cinnamon roll - Classic", "Bio-Pommes",
+            "Linsen & Spätzle", "Sloppy-Fries (+1.7€)", 'Bio-Burger "Avocado" - Bio-Salat', "Special roll - Oreo"]
+
+
+def make_payload(rng, i):
+    address = {"first_name": "Anna", "last_name": "Huber", "address1": f"Innstraße {i % 90 + 1}", "address2": "",
+               "city": "Passau", "zip": "94032", "province": "Bayern", "country": "Germany", "country_code": "DE",
+               "phone": "+49 171 2345678", "company": None, "latitude": 48.57, "longitude": 13.46}
+    items = [{
+        "id": 10_000 + n, "vendor": rng.choice(VENDORS), "name": rng.choice(PRODUCTS), "title": "Produkt",
+        "variant_title": None, "quantity": rng.randint(1, 3), "price": "9.90", "sku": f"SKU-{n}",
+        "properties": [{"name": "Extra", "value": "Soße"}, {"name": "Hinweis", "value": "ohne Zwiebeln"}],
+        "tax_lines": [{"title": "MwSt", "rate": 0.07, "price": "0.65"}],
+        "discount_allocations": [{"amount": "0.50", "discount_application_index": 0}],
+    } for n in range(rng.randint(10, 60))]
+    return {
+        "id": 6_400_000_000_000 + i, "name": f"#{2000 + i}", "created_at": "2025-12-08T18:42:00+01:00",
+        "email": "kunde@example.com", "total_price": "88.40", "currency": "EUR", "financial_status": "paid",
+        "customer": {"id": 1, "first_name": "Anna", "last_name": "Huber", "email": "kunde@example.com",
+                     "phone": "+49 171 2345678", "default_address": dict(address), "tags": ""},
+        "shipping_address": address, "billing_address": dict(address),
+        "line_items": items,
+        "shipping_lines": [{"title": "Selbstabholung" if i % 10 == 0 else "Lieferung", "code": "std", "price": "2.50"}],
+        "payment_gateway_names": ["shopify_payments"],
+        "transactions": [{"gateway": "shopify_payments", "kind": "sale", "status": "success", "amount": "88.40",
+                          "receipt": {"id": f"ch_{i}", "payment_method_details": {"card": {"brand": "visa"}}}}] * 3,
+        "note": None, "note_attributes": [{"name": "Lieferzeit", "value": "ASAP"}], "tags": "",
+        "total_tip_received": "2.00", "tax_lines": [{"title": "MwSt", "rate": 0.07, "price": "5.78"}],
+    }
+
+
+def per_order(fn, payloads):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for payload in payloads:
+            fn(payload)
+    return (time.perf_counter() - start) / (ROUNDS * len(payloads))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "shopify_orders.json"),
+              encoding="utf-8") as f:
+        corpus = json.load(f)
+    known = set(corpus["vendors"])
+    mismatches = [case["name"] for case in corpus["cases"]
+                  if {k: v for k, v in normalize_order(case["payload"], known).items() if k in case["expected"]}
+                  != case["expected"]]
+    print(f"{len(corpus['cases'])} fixture orders, {len(corpus['cases']) - len(mismatches)} match the previous webhook output"
+          + (f" (wrong: {', '.join(mismatches)})" if mismatches else ""))
+
+    rng = random.Random(7)
+    payloads = [make_payload(rng, i) for i in range(ORDERS)]
+    items = sum(len(p["line_items"]) for p in payloads) / ORDERS
+    disagree = sum(("abholung" in str(p).lower()) != is_pickup_order(p) for p in payloads)
+
+    stringify = per_order(lambda p: "abholung" in str(p).lower(), payloads)
+    targeted = per_order(is_pickup_order, payloads)
+    normalize = per_order(lambda p: normalize_order(p, known), payloads)
+    print(f"{ORDERS} payloads, {items:.0f} line items on average")
+    print(f"pickup check, str(payload).lower(): {stringify * 1e6:7.1f} µs/order")
+    print(f"pickup check, targeted fields:      {targeted * 1e6:7.1f} µs/order  ({stringify / targeted:.0f}x)")
+    print(f"normalize_order (whole entry):      {normalize * 1e6:7.1f} µs/order")
+    sys.exit(1 if mismatches or disagree else 0)
+
+
+if __name__ == "__main__":
+    main()
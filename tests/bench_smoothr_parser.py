@@ -0,0 +1,51 @@
+# Benchmark: parse_smoothr_order throughput over the Smoothr corpus
+#
+# Corpus: tests/fixtures/smoothr_orders.json (anonymized D&D App, Lieferando and
+# dishbee messages plus malformed ones). Outputs are checked against the golden
+# results recorded from the implementation before the single-pass rewrite.
+#
+# Run: python tests/bench_smoothr_parser.py
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("SHOPIFY_WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DISPATCH_MAIN_CHAT_ID", "-1000")
+
+from utils import parse_smoothr_order
+
+ROUNDS = 500  # Passes over the corpus
+
+
+def main():
+    logging.disable(logging.CRITICAL)  # Malformed corpus entries log errors
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "smoothr_orders.json"),
+              encoding="utf-8") as f:
+        corpus = json.load(f)
+    valid = [case for case in corpus if "expected" in case]
+
+    mismatches = []
+    for case in valid:
+        result = parse_smoothr_order(case["text"])
+        result.pop("smoothr_raw")
+        if result != case["expected"]:
+            mismatches.append(case["name"])
+    print(f"{len(corpus)} messages, {len(valid) - len(mismatches)}/{len(valid)} valid ones match the golden outputs")
+
+    texts = [case["text"] for case in valid]
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in texts:
+            parse_smoothr_order(text)
+    elapsed = time.perf_counter() - start
+    parses = ROUNDS * len(texts)
+    print(f"{parses} parses in {elapsed:.2f}s: {parses / elapsed:,.0f} orders/s, {elapsed / parses * 1e6:.1f} µs/order")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Test per-vendor product catalog: seed names match the rules, rule fallback for unseen names, warm-up from Redis
+import catalog as catalog_module
+from catalog import ProductCatalog, catalog
+from utils import clean_product_name
+
+
+def test_seed_file_covers_each_vendor():
+    metrics = catalog.metrics()
+    assert metrics["vendors"] >= 5
+    assert catalog.display_name("Zweite Heimat", 'Bio-Burger "Classic" - Bio-Pommes') == "Classic - Pommes"
+
+
+def test_seed_names_match_the_rules():
+    # The seed only precomputes names; changing what customers see is a rule change (utils.py) with its tests
+    c = ProductCatalog()
+    c.load_file()
+    for vendor, entries in c._vendors.items():
+        for raw, (display, _, _) in entries.items():
+            assert display == clean_product_name(raw), f"{vendor}: {raw}"
+
+
+def test_unseen_name_falls_back_to_rules_and_is_recorded(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(catalog_module, "redis_save_catalog_entry", lambda key, name: saved.update({key: name}))
+    c = ProductCatalog()
+    raw = 'Bio-Burger "Avocado" - Bio-Salat'
+    assert c.display_name("Zweite Heimat", raw) == clean_product_name(raw)
+    assert saved == {f"Zweite Heimat|{raw}": "Avocado - Salat"}
+    assert c.pending_review() == [("Zweite Heimat", raw, "Avocado - Salat")]
+
+    # Second sighting is a lookup: not persisted again, counted as a hit
+    saved.clear()
+    c.display_name("Zweite Heimat", raw)
+    assert saved == {}
+    assert c.metrics()["hits"] == 1 and c.metrics()["misses"] == 1
+
+
+def test_names_are_per_vendor(monkeypatch):
+    monkeypatch.setattr(catalog_module, "redis_save_catalog_entry", lambda key, name: True)
+    c = ProductCatalog()
+    c._add("Leckerolls", "Special roll - Oreo", "Oreo Special", reviewed=True)
+    assert c.display_name("Leckerolls", "Special roll - Oreo") == "Oreo Special"
+    assert c.display_name("Pommes Freunde", "Special roll - Oreo") == "Oreo"
+
+
+def test_warm_rederives_learned_names_without_overriding_reviewed(monkeypatch, tmp_path):
+    seed = tmp_path / "catalog.json"
+    seed.write_text('{"Pommes Freunde": {"Bio-Pommes": "Pommes (Bio)"}}', encoding="utf-8")
+    learned = {
+        "Pommes Freunde|Sloppy-Fries (+1.7€)": "stale name from older rules",
+        "Pommes Freunde|Bio-Pommes": "Pommes",
+    }
+    monkeypatch.setattr(catalog_module, "redis_get_catalog_entries", lambda: learned)
+    c = ProductCatalog()
+    assert c.load_file(str(seed)) == 1
+    assert c.warm() == 2
+    assert c.display_name("Pommes Freunde", "Sloppy-Fries (+1.7€)") == "Sloppy-Fries"
+    assert c.display_name("Pommes Freunde", "Bio-Pommes") == "Pommes (Bio)"
+    assert [raw for _, raw, _ in c.pending_review()] == ["Sloppy-Fries (+1.7€)"]
+    assert c.metrics()["misses"] == 0
@@ -0,0 +1,108 @@
+# Test text command router: prefix trie matching, chat scopes, argument parsing, timing
+import asyncio
+
+import pytest
+
+from commands import ANY_SCOPE, SCOPE_MDG, SCOPE_PRIVATE, SCOPE_RG, Arg, CommandRouter
+
+
+def make_router(scope=SCOPE_MDG):
+    calls, replies, scheduled = [], [], []
+    router = CommandRouter()
+
+    async def reply(chat_id, text):
+        replies.append((chat_id, text))
+
+    router.configure(lambda msg: scope, scheduled.append, reply=reply)
+    router.register("/sched", lambda ctx: calls.append(("sched", ctx.chat_id)), scopes=(SCOPE_MDG, SCOPE_PRIVATE))
+    router.register("/testsm", lambda ctx: calls.append(("testsm", ctx.text)))
+    router.register("/testsh", lambda ctx: calls.append(("testsh", ctx.text)))
+    router.register("/cleanup", lambda ctx: calls.append(("cleanup", ctx.args["days"])), scopes=(SCOPE_MDG,),
+                    args=(Arg("days", int, 1),), usage="/cleanup [days]")
+    return router, calls, replies, scheduled
+
+
+def message(text, chat_id=-100):
+    return {"message_id": 5, "chat": {"id": chat_id}, "text": text}
+
+
+def run_scheduled(scheduled):
+    for coro in scheduled:
+        asyncio.run(coro)
+    scheduled.clear()
+
+
+def test_longest_registered_prefix_wins():
+    router, *_ = make_router()
+    router.register("/ocr", lambda ctx: None)
+    router.register("/ocr_reset", lambda ctx: None)
+    assert router.match("/sched").name == "/sched"
+    assert router.match("/scheduled@DispatchBot").name == "/sched"
+    assert router.match("/testsmoothr dnd").name == "/testsm"
+    assert router.match("/testsh multi all").name == "/testsh"
+    assert router.match("/ocr_status").name == "/ocr"
+    assert router.match("/ocr_reset now").name == "/ocr_reset"
+    for text in ("", "hello /sched", "/test", "/start", "/", "Abholung 18:30"):
+        assert router.match(text) is None
+
+
+def test_dispatch_runs_command_and_leaves_plain_messages():
+    router, calls, _, _ = make_router()
+    assert router.dispatch(message("/testsm dnd_asap"))
+    assert not router.dispatch(message("Bestellung 42 ist fertig"))
+    assert not router.dispatch(message("/start"))
+    assert not router.dispatch({"chat": {"id": 1}, "photo": [{}]})
+    assert calls == [("testsm", "/testsm dnd_asap")]
+    assert router.stats == {"messages": 4, "commands": 1, "unknown": 1}
+    assert router.commands["/testsm"].metrics()["count"] == 1
+
+
+def test_command_outside_its_scope_is_consumed_not_run():
+    router, calls, _, _ = make_router(scope=SCOPE_RG)
+    assert router.dispatch(message("/cleanup"))
+    assert router.dispatch(message("/sched"))
+    assert router.dispatch(message("/testsh single"))  # Test commands run anywhere
+    assert calls == [("testsh", "/testsh single")]
+    assert router.commands["/cleanup"].out_of_scope == 1
+    assert router.metrics()["per_command"]["/sched"]["out_of_scope"] == 1
+
+
+def test_arguments_are_parsed_with_defaults_and_usage_on_bad_values():
+    router, calls, replies, scheduled = make_router()
+    router.dispatch(message("/cleanup"))
+    router.dispatch(message("/cleanup 3"))
+    router.dispatch(message("/cleanup soon"))
+    run_scheduled(scheduled)
+    assert calls == [("cleanup", 1), ("cleanup", 3)]
+    assert replies == [(-100, "❌ Invalid command. Usage: /cleanup [days]")]
+    assert router.commands["/cleanup"].errors == 1
+
+
+def test_coroutine_handlers_are_scheduled_and_timed_until_done():
+    router, _, _, scheduled = make_router()
+    done = []
+
+    async def slow(ctx):
+        await asyncio.sleep(0.01)
+        done.append(ctx.message_id)
+
+    async def broken(ctx):
+        raise RuntimeError("boom")
+
+    router.register("/slow", slow)
+    router.register("/broken", broken)
+    router.dispatch(message("/slow"))
+    router.dispatch(message("/broken"))
+    assert done == [] and len(scheduled) == 2
+    run_scheduled(scheduled)
+    assert done == [5]
+    slow_metrics = router.commands["/slow"].metrics()
+    assert slow_metrics["count"] == 1 and slow_metrics["avg_ms"] >= 10
+    assert router.commands["/broken"].metrics()["errors"] == 1
+
+
+def test_register_rejects_names_without_slash():
+    router = CommandRouter()
+    with pytest.raises(ValueError):
+        router.register("sched", lambda ctx: None)
+    assert router.register("/x", lambda ctx: None).scopes == ANY_SCOPE
@@ -0,0 +1,80 @@
+# Test cached courier roster: TTL hits/misses, chat_member patches, COURIER_MAP fallback, priority order
+import asyncio
+from types import SimpleNamespace
+
+import upc
+from upc import CourierRoster
+from utils import DISPATCH_MAIN_CHAT_ID
+
+
+def admin(user_id, name, is_bot=False):
+    return SimpleNamespace(user=SimpleNamespace(id=user_id, first_name=name, username=None, is_bot=is_bot))
+
+
+class FakeBot:
+    def __init__(self, admins):
+        self.admins = admins
+        self.calls = 0
+
+    async def get_chat_administrators(self, chat_id):
+        self.calls += 1
+        return self.admins
+
+
+def member_update(user_id, name, status):
+    return {
+        "chat": {"id": DISPATCH_MAIN_CHAT_ID},
+        "new_chat_member": {"status": status, "user": {"id": user_id, "first_name": name, "is_bot": False}},
+    }
+
+
+def test_roster_served_from_cache_until_ttl():
+    bot = FakeBot([admin(1, "Zoe"), admin(2, "Bee 2"), admin(3, "Bee 1"), admin(9, "DispatchBot", is_bot=True)])
+
+    async def run():
+        roster = CourierRoster(ttl=60)
+        first = await roster.get(bot)
+        second = await roster.get(bot)
+        return roster, first, second
+
+    roster, first, second = asyncio.run(run())
+    assert [c["username"] for c in first] == ["Bee 1", "Bee 2", "Zoe"]
+    assert second is first
+    assert bot.calls == 1
+    assert roster.stats["hits"] == 1 and roster.stats["misses"] == 1
+
+
+def test_chat_member_updates_patch_roster():
+    bot = FakeBot([admin(1, "Bee 1")])
+
+    async def run():
+        roster = CourierRoster(ttl=60)
+        await roster.refresh(bot)
+        assert roster.apply_member_update(member_update(5, "Bee 3", "administrator"))
+        joined = [c["username"] for c in await roster.get(bot)]
+        assert roster.apply_member_update(member_update(1, "Bee 1", "left"))
+        left = [c["username"] for c in await roster.get(bot)]
+        # Other chats are ignored
+        assert not roster.apply_member_update({"chat": {"id": 123}, "new_chat_member": {}})
+        return joined, left
+
+    joined, left = asyncio.run(run())
+    assert joined == ["Bee 1", "Bee 3"]
+    assert left == ["Bee 3"]
+    assert bot.calls == 1
+
+
+def test_failed_lookup_falls_back_to_courier_map(monkeypatch):
+    class BrokenBot:
+        async def get_chat_administrators(self, chat_id):
+            raise RuntimeError("network down")
+
+    monkeypatch.setattr(upc, "COURIER_MAP", {"77": {"username": "Mapped"}})
+
+    async def run():
+        roster = CourierRoster(ttl=60)
+        return roster, await roster.get(BrokenBot())
+
+    roster, couriers = asyncio.run(run())
+    assert couriers == [{"user_id": 77, "username": "Mapped"}]
+    assert roster.stats["fallbacks"] == 1
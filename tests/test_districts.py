@@ -0,0 +1,75 @@
+# Test non-blocking district resolution: cache tiers, merged background lookups, follow-up hook
+import asyncio
+import copy
+import time
+
+import districts
+from districts import DistrictResolver
+from gazetteer import Gazetteer
+
+ORDER = {
+    "order_id": "101",
+    "customer": {"name": "Anna", "address": "Neuburger Str. 15, 94036", "original_address": "Neuburger Str. 15, Passau 94036"},
+}
+
+
+def test_cached_district_is_filled_in_synchronously(monkeypatch):
+    monkeypatch.setattr(districts, "redis_get_district", lambda key: {"district": "Innstadt"})
+    resolver = DistrictResolver()
+    order = copy.deepcopy(ORDER)
+    resolver.prefetch(order)
+    assert order["district"] == "Innstadt"
+    # Second lookup is served from memory
+    assert resolver.cached("neuburger str. 15,  PASSAU 94036") == "Innstadt"
+    assert resolver.stats["redis_hits"] == 1 and resolver.stats["memory_hits"] == 1
+
+
+def test_lookup_runs_in_background_and_notifies(monkeypatch):
+    saved = {}
+    geocoded = []
+
+    def slow_geocode(address):
+        geocoded.append(address)
+        time.sleep(0.05)
+        return "Innstadt"
+
+    monkeypatch.setattr(districts, "GOOGLE_MAPS_API_KEY", "key")
+    monkeypatch.setattr(districts, "redis_get_district", lambda key: None)
+    monkeypatch.setattr(districts, "redis_save_district", lambda key, district, ttl: saved.update({key: (district, ttl)}))
+    monkeypatch.setattr(districts, "geocode_district", slow_geocode)
+    learned = Gazetteer()
+    monkeypatch.setattr(districts, "gazetteer", learned)
+    refreshed = []
+
+    async def on_resolved(order_id):
+        refreshed.append(order_id)
+
+    monkeypatch.setattr(districts, "_on_resolved", on_resolved)
+
+    async def run():
+        resolver = DistrictResolver()
+        first, second = copy.deepcopy(ORDER), dict(copy.deepcopy(ORDER), order_id="102")
+        start = time.perf_counter()
+        resolver.prefetch(first)
+        resolver.prefetch(second)
+        returned_after = time.perf_counter() - start
+        assert "district" not in first  # Pending - render without it
+        await asyncio.sleep(0.2)
+        return first, second, returned_after
+
+    first, second, returned_after = asyncio.run(run())
+    assert returned_after < 0.01
+    assert geocoded == ["Neuburger Str. 15, Passau 94036"]
+    assert first["district"] == second["district"] == "Innstadt"
+    assert refreshed == ["101", "102"]
+    assert saved == {"neuburger str. 15, passau 94036": ("Innstadt", districts.DISTRICT_TTL_SECONDS)}
+    # Written back to the gazetteer for this address only, not the whole street
+    assert learned.lookup("Neuburger Straße 15, 94036 Passau") == "Innstadt"
+    assert learned.lookup("Neuburger Straße 40, 94036 Passau") is None
+
+
+def test_memory_cache_is_bounded():
+    resolver = DistrictResolver(max_entries=2)
+    for i in range(3):
+        resolver._remember(f"street {i}", "Altstadt")
+    assert list(resolver._memory) == ["street 1", "street 2"]
@@ -0,0 +1,80 @@
+# Test offline street gazetteer: spelling variants, longest-prefix matching, zip / house number ranges, write-back
+import time
+
+import gazetteer as gazetteer_module
+from gazetteer import Gazetteer, gazetteer, normalize_street
+
+
+def test_street_spellings_normalize_alike():
+    variants = ["Innstraße", "Innstrasse", "Innstr.", "innstr", "INNSTRASSE"]
+    assert {normalize_street(v) for v in variants} == {"innstrasse"}
+    assert normalize_street("Neuburger Str. 15") == normalize_street("Neuburger Straße 15") == "neuburger strasse 15"
+    assert normalize_street("Doktor-Hans-Kapfinger-Str.") == normalize_street("Dr.-Hans-Kapfinger-Straße")
+
+
+def test_seed_file_resolves_common_streets():
+    assert gazetteer.streets > 0
+    assert gazetteer.lookup("Lederergasse 15, Passau 94032") == "Innstadt"
+    assert gazetteer.lookup("Ludwigstr. 3, 94032 Passau") == "Altstadt"
+    assert gazetteer.lookup("Unbekannter Weg 1, 94036 Passau") is None
+
+
+def test_longest_street_wins_at_word_boundary():
+    g = Gazetteer()
+    g.add("Inn", None, "Wrong")
+    g.add("Innstraße", None, "Innstadt")
+    g.add("Innstraße Nord", None, "Hals")
+    assert g.lookup("Innstr. 12a, 2. OG") == "Innstadt"
+    assert g.lookup("Innstraße Nord 5") == "Hals"
+    # "Inn" must not match inside "Innweg"
+    assert g.lookup("Innweg 4") is None
+
+
+def test_zip_and_house_number_disambiguate():
+    g = Gazetteer()
+    g.add("Hauptstraße", "94034", "Hacklberg")
+    g.add("Hauptstraße", "94036", "Neustift")
+    g.add("Kapuzinerstraße", "94032", "Innstadt", 1, 39)
+    g.add("Kapuzinerstraße", "94032", "Hals")
+    assert g.lookup("Hauptstr. 7, 94036 Passau") == "Neustift"
+    assert g.lookup("Hauptstr. 7", zip_code="94034") == "Hacklberg"
+    assert g.lookup("Kapuzinerstr. 12, 94032") == "Innstadt"
+    assert g.lookup("Kapuzinerstr. 120, 94032") == "Hals"
+
+
+def test_learned_addresses_are_indexed_and_persisted(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(gazetteer_module, "redis_save_gazetteer_entry", lambda key, district: saved.update({key: district}))
+    g = Gazetteer()
+    g.learn("Neuburger Straße 15, Passau 94036", None, "Neustift")
+    g.learn("Neuburger Straße, Passau 94036", None, "Neustift")  # No house number: nothing to learn
+    assert saved == {"neuburger strasse|94036|15": "Neustift"}
+    assert g.lookup("Neuburger Str. 15a, 94036") == "Neustift"
+    # One geocoded point says nothing about the rest of the street
+    assert g.lookup("Neuburger Str. 99, 94036") is None
+
+    monkeypatch.setattr(gazetteer_module, "redis_get_gazetteer_entries",
+                        lambda: {**saved, "neuburger strasse|94036": "Haidenhof"})  # Legacy whole-street key
+    restarted = Gazetteer()
+    assert restarted.load_learned() == 1
+    assert restarted.lookup("neuburger strasse 15") == "Neustift"
+    assert restarted.lookup("neuburger strasse 1") is None
+
+
+def test_learning_across_a_district_border_keeps_each_address(monkeypatch):
+    monkeypatch.setattr(gazetteer_module, "redis_save_gazetteer_entry", lambda key, district: True)
+    g = Gazetteer()
+    g.learn("Neuburger Straße 15, 94036 Passau", None, "Neustift")
+    g.learn("Neuburger Straße 120, 94036 Passau", None, "Haidenhof")
+    assert g.lookup("Neuburger Str. 120, 94036") == "Haidenhof"
+    assert g.lookup("Neuburger Str. 15, 94036") == "Neustift"
+    assert g.lookup("Neuburger Str. 60, 94036") is None
+
+
+def test_lookup_is_fast():
+    addresses = ["Lederergasse 15, Passau 94032", "Ludwigstraße 3, 94032", "Unbekannter Weg 1, 94036"] * 1000
+    start = time.perf_counter()
+    for address in addresses:
+        gazetteer.lookup(address)
+    per_lookup = (time.perf_counter() - start) / len(addresses)
+    assert per_lookup < 0.0005
@@ -0,0 +1,42 @@
+# Test keyboard templates: order id stamping, shared static buttons, time buckets
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import mdg
+import rg
+from keyboards import ORDER_ID, KeyboardTemplate
+
+
+def callbacks(markup):
+    return [[button.callback_data for button in row] for row in markup.inline_keyboard]
+
+
+def test_template_stamps_order_id_and_shares_static_buttons():
+    template = KeyboardTemplate([[("12:00", f"exact_selected|{ORDER_ID}|12:00|LR")], [("← Back", "hide")]])
+    first = template.stamp("101")
+    second = template.stamp("202")
+    assert callbacks(first) == [["exact_selected|101|12:00|LR"], ["hide"]]
+    assert callbacks(second) == [["exact_selected|202|12:00|LR"], ["hide"]]
+    assert first.inline_keyboard[1][0] is second.inline_keyboard[1][0]
+    assert template.stamp("101") is first
+
+
+def test_minute_grid_follows_current_time(monkeypatch):
+    monkeypatch.setattr(mdg, "now", lambda: datetime(2026, 10, 19, 18, 44, tzinfo=ZoneInfo("Europe/Berlin")))
+    monkeypatch.setattr(mdg, "RESTAURANT_SHORTCUTS", {"Leckerolls": "LR"})
+    current_hour = callbacks(mdg.exact_hour_keyboard("7", 18, "LR"))
+    assert current_hour[0] == ["exact_selected|7|18:45|LR", "exact_selected|7|18:48|LR",
+                               "exact_selected|7|18:51|LR", "exact_selected|7|18:54|LR"]
+    assert current_hour[-1] == ["exact_back_hours|7|LR"]
+    # Later hours offer the full 3-minute grid
+    assert sum(len(row) for row in callbacks(mdg.exact_hour_keyboard("7", 19))[:-1]) == 20
+
+    picker = callbacks(mdg.time_picker_keyboard("7", "later_time", "23:50", "Leckerolls"))
+    assert picker[1] == ["later_time|7|00:00|LR"]
+    assert picker[-2] == ["vendor_exact_time|7|LR|later_time"]
+
+
+def test_vendor_hour_grid(monkeypatch):
+    monkeypatch.setattr(rg, "now", lambda: datetime(2026, 10, 19, 21, 58, tzinfo=ZoneInfo("Europe/Berlin")))
+    hours = callbacks(rg.vendor_exact_time_keyboard("7", "Leckerolls", "prepare"))
+    assert hours == [["vendor_exact_hour|7|22|LR|prepare", "vendor_exact_hour|7|23|LR|prepare"], ["hide"]]
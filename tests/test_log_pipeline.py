@@ -0,0 +1,131 @@
+# Test log pipeline: key=value / JSON records, sampling, rate limits, per-category levels, queue overflow
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from log_pipeline import (
+    AsyncQueueHandler, CategoryLimiter, JsonFormatter, KeyValueFormatter, LogPipeline, TextFormatter, event,
+    parse_spec,
+)
+
+
+def make_record(name="main.updates", level=logging.INFO, msg="message", **fields):
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    record.fields = fields
+    return record
+
+
+@pytest.fixture
+def root_restored():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_formatters_render_fields():
+    record = make_record(chat_id=-100, text='Hallo "Welt"', length=11)
+    kv = KeyValueFormatter().format(record)
+    assert "level=INFO logger=main.updates msg=message chat_id=-100" in kv
+    assert 'text="Hallo \\"Welt\\""' in kv and kv.endswith("length=11")
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert (entry["msg"], entry["chat_id"], entry["text"]) == ("message", -100, 'Hallo "Welt"')
+
+    assert TextFormatter().format(record).endswith(" - main.updates - INFO - message chat_id=-100 "
+                                                   'text="Hallo \\"Welt\\"" length=11')
+
+
+def test_sampling_keeps_one_in_n_and_never_warnings():
+    limiter = CategoryLimiter(sample={"main.updates": 3}, debug_rate=0)
+    kept = [limiter.filter(make_record()) for _ in range(9)]
+    assert kept == [True, False, False] * 3
+    assert limiter.suppressed == {"main.updates": 6}
+    assert limiter.filter(make_record(level=logging.WARNING))
+    # Child loggers share the category; others aren't sampled
+    assert [limiter.filter(make_record(name="main.updates.photo")) for _ in range(3)] == [True, False, False]
+    assert all(limiter.filter(make_record(name="main")) for _ in range(5))
+
+
+def test_sampled_records_carry_the_rate():
+    limiter = CategoryLimiter(sample={"main.updates": 10}, debug_rate=0)
+    record = make_record()
+    assert limiter.filter(record)
+    assert "sampled=10" in KeyValueFormatter().format(record)
+
+
+def test_debug_records_are_rate_limited_per_category():
+    limiter = CategoryLimiter(debug_rate=5)
+    passed = sum(limiter.filter(make_record(name="utils.send", level=logging.DEBUG)) for _ in range(50))
+    assert passed == 5
+    assert limiter.suppressed == {"utils.send": 45}
+    # INFO records of the same category aren't capped by the debug limit
+    assert all(limiter.filter(make_record(name="utils.send")) for _ in range(50))
+    assert sum(limiter.filter(make_record(name="outbound", level=logging.DEBUG)) for _ in range(50)) == 5
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = AsyncQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_full_queue_writes_warnings_through_the_overflow_handler():
+    written = []
+    overflow = type("H", (logging.Handler,), {"emit": lambda self, r: written.append(r.getMessage())})()
+    handler = AsyncQueueHandler(queue.Queue(1), overflow=overflow)
+    handler.handle(make_record())
+    handler.handle(make_record(msg="info while full"))
+    handler.handle(make_record(level=logging.WARNING, msg="warning while full"))
+    handler.handle(make_record(level=logging.ERROR, msg="error while full"))
+    assert written == ["warning while full", "error while full"]
+    assert handler.queue.qsize() == 1 and handler.dropped == 1
+
+
+def test_pipeline_levels_and_async_output(root_restored):
+    stream = io.StringIO()
+    pipeline = LogPipeline()
+    pipeline.configure(level="INFO", fmt="kv", levels="test_pipeline.quiet=WARNING", sample="", rate_limits="",
+                       stream=stream)
+    try:
+        event(logging.getLogger("test_pipeline"), "update", update_id=7)
+        logging.getLogger("test_pipeline.quiet").info("not written")
+        logging.getLogger("test_pipeline.quiet").warning("written %s", "too")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("test_pipeline").exception("failed")
+        pipeline.flush()
+    finally:
+        pipeline.stop()
+        logging.getLogger("test_pipeline.quiet").setLevel(logging.NOTSET)
+    lines = stream.getvalue().splitlines()
+    assert [line.split(" msg=")[1].split(" ")[0] for line in lines] == ["update", '"written', "failed"]
+    assert lines[0].endswith("update_id=7")
+    assert "ValueError: boom" in lines[2]
+
+
+def test_event_builds_nothing_when_level_is_off():
+    log = logging.getLogger("test_pipeline.off")
+    log.setLevel(logging.WARNING)
+    try:
+        records = []
+        log.addHandler(type("H", (logging.Handler,), {"emit": lambda self, r: records.append(r)})())
+        event(log, "update", update_id=1)
+        event(log, "dropped_update", logging.WARNING, update_id=2)
+        assert [r.fields for r in records] == [{"update_id": 2}]
+    finally:
+        log.handlers.clear()
+        log.setLevel(logging.NOTSET)
+
+
+def test_parse_spec_ignores_malformed_parts():
+    assert parse_spec("main.updates=10, outbound=DEBUG,,broken,=3") == {"main.updates": "10", "outbound": "DEBUG"}
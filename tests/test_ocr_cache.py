@@ -0,0 +1,92 @@
+# Test OCR result cache: exact resends, similar-photo hints, duplicate order detection
+import asyncio
+import io
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageDraw
+
+import ocr_backends
+import ocr_cache
+import ocr_pipeline
+from ocr_cache import OCRCache, find_duplicate_order, hash_distance, image_hash
+
+
+def order_screen(lines, shift=0, quality=90):
+    """Grayscale order screen with one dark bar per text line (bar length = line length)."""
+    img = Image.new("L", (600, 900), 240)
+    draw = ImageDraw.Draw(img)
+    for i, length in enumerate(lines):
+        y = 40 + i * 50 + shift
+        draw.rectangle((30 + shift, y, 30 + shift + length, y + 20), fill=20)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+ORDER_A = [300, 420, 150, 510, 260, 380, 200, 460, 330, 120, 400, 280, 350, 220, 480, 170]
+ORDER_B = [420, 180, 500, 240, 330, 150, 470, 260, 200, 440, 130, 360, 290, 410, 190, 310]
+
+
+def test_image_hash_matches_rephoto_not_other_order():
+    original = image_hash(order_screen(ORDER_A))
+    rephoto = image_hash(order_screen(ORDER_A, shift=3, quality=60))
+    other = image_hash(order_screen(ORDER_B))
+    assert hash_distance(original, rephoto) <= ocr_cache.IMAGE_HASH_MAX_DISTANCE
+    assert hash_distance(original, other) > 4 * ocr_cache.IMAGE_HASH_MAX_DISTANCE
+    assert image_hash(b"garbage") is None
+
+
+def test_lookup_by_file_and_by_image():
+    cache = OCRCache()
+    fingerprint = image_hash(order_screen(ORDER_A))
+    entry = cache.store("#VCJ 34V ...", "file-1", fingerprint)
+
+    assert cache.lookup_file("file-1") is entry
+    assert cache.lookup_file("file-2") is None
+    assert cache.lookup_image(image_hash(order_screen(ORDER_A, shift=2))) is entry
+    assert cache.lookup_image(image_hash(order_screen(ORDER_B))) is None
+    assert cache.stats == {"file_hits": 1, "similar": 1, "misses": 1, "duplicates": 0}
+
+
+def test_image_match_expires_and_cache_is_bounded(monkeypatch):
+    cache = OCRCache(max_entries=2)
+    fingerprint = image_hash(order_screen(ORDER_A))
+    entry = cache.store("text", "file-1", fingerprint)
+    entry.created -= ocr_cache.IMAGE_HASH_WINDOW + 1
+    assert cache.lookup_image(fingerprint) is None
+
+    cache.store("b", "file-2")
+    cache.store("c", "file-3")
+    assert cache.lookup_file("file-1") is None
+    assert cache.metrics()["entries"] == 2
+
+
+def test_similar_photo_with_new_file_id_is_still_read(monkeypatch):
+    # Two different orders on the same screen layout can hash alike: the hash is only a hint
+    texts = iter(["#VCJ 34V ... Max Muster", "#VCJ 7KQ ... Eva Beispiel"])
+    monkeypatch.setattr(ocr_backends, "extract_text", lambda image: next(texts))
+    monkeypatch.setattr(ocr_cache, "cache", OCRCache())
+
+    async def run():
+        first = await ocr_pipeline.read_photo(order_screen(ORDER_A), file_unique_id="file-1")
+        second = await ocr_pipeline.read_photo(order_screen(ORDER_A, shift=2, quality=70), file_unique_id="file-2")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second is not first and second.text == "#VCJ 7KQ ... Eva Beispiel"
+    assert ocr_cache.cache.stats["similar"] == 1
+    assert ocr_cache.cache.lookup_file("file-1") is first and ocr_cache.cache.lookup_file("file-2") is second
+
+
+def test_find_duplicate_order():
+    now = datetime(2025, 6, 1, 18, 0)
+    state = {
+        "PF_4V_1700000000": {"customer": {"name": "Max Muster"}, "total": "24.50", "created_at": now - timedelta(minutes=5)},
+        "PF_H3_1700000100": {"customer": {"name": "Eva"}, "total": "12.00", "created_at": now - timedelta(hours=5)},
+    }
+    parsed = {"order_num": "4V", "customer": "Max Muster", "total": "24.50"}
+    assert find_duplicate_order(state, parsed, now) == "PF_4V_1700000000"
+    assert find_duplicate_order(state, dict(parsed, total="30.00"), now) is None
+    # Outside the window, or no readable order code
+    assert find_duplicate_order(state, {"order_num": "H3", "customer": "Eva", "total": "12.00"}, now) is None
+    assert find_duplicate_order(state, dict(parsed, order_num="N/A"), now) is None
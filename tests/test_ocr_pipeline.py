@@ -0,0 +1,134 @@
+# Test bounded OCR executor (event loop stays free, concurrency cap, queue limit, stage timings) and backend fallback
+import asyncio
+import subprocess
+import threading
+import time
+
+import pytest
+
+import ocr_backends
+from ocr import ParseError
+from ocr_backends import OCRBackend, OCRChain, TesseractBackend, configured_backends
+from ocr_pipeline import OCRExecutor, OCRQueueFull, StageMetrics, StageTimer
+
+
+def blocking_ocr(seconds, active, peak, lock):
+    with lock:
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+    time.sleep(seconds)
+    with lock:
+        active[0] -= 1
+    return "TEXT"
+
+
+def test_event_loop_keeps_running_during_ocr():
+    executor = OCRExecutor(max_workers=1, queue_limit=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        lock, active, peak = threading.Lock(), [0], [0]
+        ocr_task = asyncio.create_task(executor.run(blocking_ocr, 0.15, active, peak, lock))
+        await ticker()
+        return await ocr_task
+
+    assert asyncio.run(run()) == "TEXT"
+    # The loop ticked ~every 10ms while OCR blocked its worker thread for 150ms
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.08
+    assert executor.stats["completed"] == 1
+
+
+def test_concurrency_cap_and_queue_limit():
+    executor = OCRExecutor(max_workers=2, queue_limit=2)
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    async def run():
+        jobs = [asyncio.create_task(executor.run(blocking_ocr, 0.05, active, peak, lock)) for _ in range(5)]
+        return await asyncio.gather(*jobs, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results.count("TEXT") == 4
+    rejected = [r for r in results if isinstance(r, Exception)]
+    assert len(rejected) == 1 and isinstance(rejected[0], OCRQueueFull)
+    # Mapped to the "send again in 5 minutes" reply in handle_pf_photo
+    assert str(rejected[0]).startswith("Network error:")
+    assert peak[0] == 2
+    assert executor.stats == {"completed": 4, "failed": 0, "rejected": 1}
+    assert executor.running == executor.queued == 0
+
+
+def test_stage_timer_summary_and_metrics():
+    timer = StageTimer()
+    for stage in ("download", "preprocess", "ocr", "parse", "send"):
+        with timer.stage(stage):
+            time.sleep(0.001)
+    summary = timer.summary()
+    assert summary.startswith("download=") and " ocr=" in summary and " send=" in summary and "total=" in summary
+
+    stage_metrics = StageMetrics()
+    stage_metrics.record(timer)
+    assert set(stage_metrics.snapshot()) == {"download", "preprocess", "ocr", "parse", "send", "total"}
+
+
+class FakeBackend(OCRBackend):
+    def __init__(self, name, text=None, error=None, usable=True):
+        self.name, self.text, self.error, self.usable, self.calls = name, text, error, usable, 0
+
+    def available(self):
+        return self.usable
+
+    def extract(self, photo_path):
+        self.calls += 1
+        if self.error:
+            raise ParseError(self.error)
+        return self.text
+
+
+def test_backend_chain_falls_back_in_order():
+    remote = FakeBackend("ocrspace", error="Network error: timed out")
+    local = FakeBackend("tesseract", text="#VCJ 34V ...")
+    chain = OCRChain([remote, local])
+    assert chain.extract_text("photo.jpg") == "#VCJ 34V ..."
+    assert chain.stats["ocrspace"]["failed"] == 1 and chain.stats["tesseract"]["ok"] == 1
+
+    # Unusable engines are skipped without being called
+    offline = FakeBackend("ocrspace", text="never", usable=False)
+    chain = OCRChain([offline, local])
+    assert chain.extract_text("photo.jpg") == "#VCJ 34V ..."
+    assert offline.calls == 0 and chain.stats["ocrspace"]["skipped"] == 1
+
+
+def test_backend_chain_raises_last_error():
+    chain = OCRChain([FakeBackend("tesseract", error="Tesseract returned no text"),
+                      FakeBackend("ocrspace", error="Network error: timed out")])
+    with pytest.raises(ParseError, match="^Network error"):
+        chain.extract_text("photo.jpg")
+    with pytest.raises(ParseError, match="No OCR backend"):
+        OCRChain([]).extract_text("photo.jpg")
+
+
+def test_backend_order_from_config():
+    assert [b.name for b in configured_backends("tesseract, ocrspace")] == ["tesseract", "ocrspace"]
+    assert [b.name for b in configured_backends("ocrspace,bogus,ocrspace")] == ["ocrspace"]
+
+
+def test_tesseract_backend_runs_binary(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="Bestellung #VCJ 34V\n".encode(), stderr=b"")
+
+    monkeypatch.setattr(ocr_backends.subprocess, "run", fake_run)
+    assert TesseractBackend().extract(b"jpeg") == "Bestellung #VCJ 34V\n"
+    assert calls == [["tesseract", "stdin", "stdout", "-l", "deu", "--psm", "4"]]
+
+    monkeypatch.setattr(ocr_backends.subprocess, "run",
+                        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 1, stdout=b"", stderr=b"read error"))
+    with pytest.raises(ParseError, match="Tesseract error: read error"):
+        TesseractBackend().extract(b"jpeg")
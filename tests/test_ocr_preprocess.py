@@ -0,0 +1,65 @@
+# Test in-memory photo preprocessing: rotation, receipt crop, downscale, bytes saved, safe fallback
+import asyncio
+import io
+
+from PIL import Image, ImageDraw
+
+import ocr_backends
+import ocr_pipeline
+from ocr_preprocess import PREPROCESS_MAX_WIDTH, prepare
+
+
+def phone_photo(width=3000, height=4000, orientation=None):
+    """Dark table with a bright order screen in the middle, lines of 'text' on it."""
+    img = Image.new("RGB", (width, height), (40, 35, 30))
+    draw = ImageDraw.Draw(img)
+    left, top, right, bottom = width // 5, height // 6, width * 4 // 5, height * 5 // 6
+    draw.rectangle((left, top, right, bottom), fill=(235, 235, 230))
+    for y in range(top + 60, bottom - 60, 90):
+        draw.rectangle((left + 60, y, right - 300, y + 30), fill=(20, 20, 20))
+    for x in range(0, width, 7):  # Sensor noise keeps the JPEG realistically large
+        draw.line((x, 0, x, top), fill=(60 + x % 13, 50, 45))
+    out = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(out, format="JPEG", quality=95, exif=exif)
+    return out.getvalue()
+
+
+def test_photo_is_cropped_downscaled_and_smaller():
+    photo = phone_photo()
+    prepared = prepare(photo)
+    assert prepared.cropped
+    assert prepared.size[0] <= PREPROCESS_MAX_WIDTH
+    # Crop kept the order screen: ~60% of the width, aspect of the bright area
+    assert 0.4 < prepared.size[0] / prepared.size[1] < 0.9
+    assert len(prepared.data) < len(photo) / 5
+    with Image.open(io.BytesIO(prepared.data)) as img:
+        assert img.mode == "L"
+    assert " 3000x4000 -> " in prepared.summary() and prepared.summary().endswith("(cropped)")
+
+
+def test_exif_rotation_is_applied():
+    # Orientation 6: stored landscape, displayed portrait
+    prepared = prepare(phone_photo(width=4000, height=3000, orientation=6))
+    assert prepared.rotated
+    assert prepared.size[1] > prepared.size[0]
+
+
+def test_unreadable_image_passes_through():
+    prepared = prepare(b"not an image")
+    assert prepared.data == b"not an image"
+    assert not prepared.cropped and prepared.size is None
+
+
+def test_pipeline_sends_prepared_bytes_to_backend(monkeypatch):
+    seen = []
+    monkeypatch.setattr(ocr_backends, "extract_text", lambda image: seen.append(image) or "TEXT")
+    monkeypatch.setattr(ocr_pipeline.ocr_cache, "cache", ocr_pipeline.ocr_cache.OCRCache())
+    photo = phone_photo()
+    timer = ocr_pipeline.StageTimer()
+    result = asyncio.run(ocr_pipeline.read_photo(photo, timer, "file-1"))
+    assert result.text == "TEXT"
+    assert len(seen[0]) < len(photo)
+    assert {"preprocess", "ocr"} <= set(timer.durations)
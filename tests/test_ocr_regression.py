@@ -0,0 +1,47 @@
+# Test PF OCR regression harness: corpus vs stored baseline, recording directories, regression detection
+import json
+
+import bench_ocr_regression as harness
+
+
+def test_corpus_matches_stored_baseline():
+    report = harness.evaluate(harness.load_cases(harness.DEFAULT_SOURCES), rounds=1)
+    with open(harness.BASELINE_FILE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    # Latency is machine dependent: the bench run compares it, the test only checks accuracy
+    assert harness.compare(report, baseline, latency_tolerance=0) == []
+    assert report["categories"] == baseline["categories"]
+
+
+def test_recording_directory_with_labels_and_unlabelled_texts(tmp_path):
+    corpus = {case["name"]: case for case in harness.load_cases(harness.DEFAULT_SOURCES)}
+    for name in ("asap_basic", "pickup_order"):
+        case = corpus[name]
+        (tmp_path / f"{name}.txt").write_text(case["text"], encoding="utf-8")
+        label = case["expected"] if "expected" in case else {"error": case["error"]}
+        (tmp_path / f"{name}.json").write_text(json.dumps(label), encoding="utf-8")
+    (tmp_path / "unlabelled.txt").write_text("Bezahlt\n📞 +4915219190243", encoding="utf-8")
+    (tmp_path / "photo.jpg").write_bytes(b"not read without --images")
+
+    report = harness.evaluate(harness.load_cases([str(tmp_path)]), rounds=1)
+    assert (report["cases"], report["labelled"], report["accuracy"]) == (3, 2, 1.0)
+    assert report["categories"]["SELBSTABHOLUNG"] == 1
+    assert report["categories"]["generic"] == 1  # The unlabelled text can't be parsed
+
+
+def test_images_are_read_by_the_given_ocr(tmp_path):
+    (tmp_path / "order.png").write_bytes(b"png")
+    (tmp_path / "order.json").write_text('{"error": "DETAILS_COLLAPSED"}', encoding="utf-8")
+    cases = harness.load_cases([str(tmp_path)], images=True, ocr=lambda image: "#VCJ 34V\n94032")
+    assert cases == [{"name": "order.png", "text": "#VCJ 34V\n94032", "error": "DETAILS_COLLAPSED"}]
+
+
+def test_compare_reports_field_drops_new_failures_and_latency():
+    baseline = {"fields": {"phone": 1.0, "note": 0.9}, "wrong": ["old_case"], "p95_us": 100.0}
+    report = {"fields": {"phone": 0.95, "note": 0.9}, "wrong": ["old_case", "new_case"], "p95_us": 250.0}
+    assert harness.compare(report, baseline) == [
+        "phone: accuracy 100.0% -> 95.0%",
+        "no longer matching: new_case",
+        "p95 parse time 100 µs -> 250 µs",
+    ]
+    assert len(harness.compare(report, baseline, latency_tolerance=0)) == 2
@@ -0,0 +1,214 @@
+# Test outbound scheduler: priorities, per-chat throttling, RetryAfter handling, edit coalescing, bulk deletion,
+# client retries and circuit breaker
+import asyncio
+import time
+
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+import outbound
+from outbound import (CircuitBreaker, CircuitOpenError, DeleteBatcher, EditCoalescer, OutboundScheduler, TelegramClient,
+                      ERROR_PERMANENT, ERROR_RATE_LIMITED, ERROR_RETRYABLE, PRIORITY_HIGH, PRIORITY_LOW, classify_error)
+
+
+def test_high_priority_sent_before_queued_toasts():
+    async def run():
+        scheduler = OutboundScheduler(group_rate=50, group_burst=1)
+        sent = []
+
+        async def call(tag):
+            sent.append(tag)
+            return tag
+
+        tasks = [asyncio.create_task(scheduler.submit(-100, lambda i=i: call(f"toast{i}"), PRIORITY_LOW)) for i in range(3)]
+        tasks.append(asyncio.create_task(scheduler.submit(-100, lambda: call("assignment"), PRIORITY_HIGH)))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth(-100) == 4
+        await asyncio.gather(*tasks)
+        return sent
+
+    assert asyncio.run(run())[0] == "assignment"
+
+
+def test_group_bucket_spreads_burst():
+    async def run():
+        scheduler = OutboundScheduler(group_rate=20, group_burst=2)
+        start = time.monotonic()
+
+        async def call():
+            return time.monotonic() - start
+
+        return await asyncio.gather(*[scheduler.submit(-100, call) for _ in range(4)])
+
+    times = asyncio.run(run())
+    # First two go out immediately (burst), the rest wait for refills (1/20s each)
+    assert times[1] < 0.04
+    assert times[3] >= 0.09
+
+
+def test_retry_after_requeues_call():
+    async def run():
+        scheduler = OutboundScheduler()
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RetryAfter(0)
+            return "sent"
+
+        result = await scheduler.submit(42, call)
+        return result, len(attempts), scheduler.stats["retry_after"]
+
+    assert asyncio.run(run()) == ("sent", 2, 1)
+
+
+def test_edit_coalescer_skips_noop_and_merges_bursts():
+    async def run():
+        coalescer = EditCoalescer(window=0.05)
+        sent = []
+
+        def edit(text):
+            async def call():
+                sent.append(text)
+                return text
+            return coalescer.edit(-100, 1, text, None, call)
+
+        coalescer.remember(-100, 1, "v0")
+        await edit("v0")  # identical to what the message shows -> skipped
+        # First edit goes out immediately, the burst behind it collapses into the latest render
+        await asyncio.gather(edit("v1"), edit("v2"), edit("v3"), edit("v4"))
+        await asyncio.sleep(0.1)
+        return sent, coalescer.stats, coalescer.edits_saved()
+
+    sent, stats, saved = asyncio.run(run())
+    assert sent == ["v1", "v4"]
+    assert stats["skipped_noop"] == 1
+    assert stats["coalesced"] == 2
+    assert saved == 3
+
+
+def test_delete_batcher_sends_chunks_of_100():
+    class FakeBot:
+        def __init__(self):
+            self.calls = []
+
+        async def delete_messages(self, chat_id, message_ids):
+            self.calls.append((chat_id, list(message_ids)))
+            return True
+
+    async def run():
+        batcher = DeleteBatcher()
+        batcher.bot = FakeBot()
+        # Busy order: 150 additional MDG messages (one duplicate) -> 2 requests
+        deleted = await batcher.delete(-100, list(range(150)) + [0])
+        return deleted, batcher.bot.calls
+
+    deleted, calls = asyncio.run(run())
+    assert deleted == 150
+    assert [len(ids) for _, ids in calls] == [100, 50]
+
+
+def test_errors_are_classified():
+    assert classify_error(BadRequest("Can't parse entities")) == ERROR_PERMANENT
+    assert classify_error(RetryAfter(3)) == ERROR_RATE_LIMITED
+    assert classify_error(TimedOut()) == ERROR_RETRYABLE
+    assert classify_error(NetworkError("connection reset")) == ERROR_RETRYABLE
+    assert classify_error(KeyError("bug")) == ERROR_PERMANENT
+
+
+def test_client_retries_network_errors_but_not_bad_requests(monkeypatch):
+    monkeypatch.setattr(outbound, "backoff_delay", lambda attempt: 0)
+
+    async def run():
+        client = TelegramClient()
+        attempts = {"network": 0, "bad": 0}
+
+        async def flaky():
+            attempts["network"] += 1
+            if attempts["network"] < 3:
+                raise TimedOut()
+            return "sent"
+
+        async def bad_markdown():
+            attempts["bad"] += 1
+            raise BadRequest("Can't parse entities")
+
+        result = await client.call("send_message", 42, flaky)
+        with pytest.raises(BadRequest):
+            await client.call("send_message", 42, bad_markdown)
+        return result, attempts, client.metrics()
+
+    result, attempts, metrics = asyncio.run(run())
+    assert result == "sent"
+    assert attempts == {"network": 3, "bad": 1}
+    assert metrics["stats"]["retries"] == 2
+    assert metrics["latency"]["send_message"]["count"] == 4
+    assert metrics["breaker"]["state"] == "closed"
+
+
+def test_circuit_breaker_fails_fast_then_probes():
+    async def run():
+        client = TelegramClient(max_attempts=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+        calls = []
+
+        async def down():
+            calls.append(1)
+            raise NetworkError("Bad Gateway")
+
+        async def up():
+            calls.append(1)
+            return "ok"
+
+        for _ in range(2):
+            with pytest.raises(NetworkError):
+                await client.call("edit_message_text", -100, down)
+        with pytest.raises(CircuitOpenError):
+            await client.call("edit_message_text", -100, up)
+        assert len(calls) == 2
+        await asyncio.sleep(0.06)
+        return await client.call("edit_message_text", -100, up), client.breaker
+
+    result, breaker = asyncio.run(run())
+    assert result == "ok"
+    assert breaker.state == "closed"
+    assert breaker.trips == 1
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    async def run():
+        client = TelegramClient(max_attempts=1, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        calls = []
+
+        async def down():
+            calls.append(1)
+            raise NetworkError("Bad Gateway")
+
+        async def slow_up():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        async def bad_markdown():
+            raise BadRequest("Can't parse entities")
+
+        with pytest.raises(NetworkError):
+            await client.call("send_message", -100, down)
+        await asyncio.sleep(0.06)
+        # Backlog released at once: only the probe reaches Telegram, the rest fail fast
+        results = await asyncio.gather(*(client.call("send_message", -100 - i, slow_up) for i in range(5)),
+                                       return_exceptions=True)
+        assert results.count("ok") == 1 and len(calls) == 2
+        assert all(isinstance(r, CircuitOpenError) for r in results if r != "ok")
+        assert client.breaker.state == "closed"
+
+        # A probe answered with a bad request frees the slot for the next call
+        with pytest.raises(NetworkError):
+            await client.call("send_message", -100, down)
+        await asyncio.sleep(0.06)
+        with pytest.raises(BadRequest):
+            await client.call("send_message", -100, bad_markdown)
+        assert client.breaker.state == "half_open" and not client.breaker.probing
+        return await client.call("send_message", -100, slow_up)
+
+    assert asyncio.run(run()) == "ok"
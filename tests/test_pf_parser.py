@@ -0,0 +1,46 @@
+# Test staged PF OCR parser: golden corpus, line tags, scheduled time above "Geplant"
+import json
+import os
+
+import pytest
+
+import ocr
+from ocr import ParseError, classify_line, classify_lines, parse_pf_order
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pf_ocr_orders.json")
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("case", load_corpus(), ids=lambda case: case["name"])
+def test_outputs_match_golden_corpus(case):
+    if "error" in case:
+        with pytest.raises(ParseError) as excinfo:
+            parse_pf_order(case["text"])
+        assert str(excinfo.value) == case["error"]
+    else:
+        assert parse_pf_order(case["text"]) == case["expected"]
+
+
+def test_each_line_gets_one_tag():
+    text = "18:42\n94032\nBezahlt\n#VCJ 34V\nA. Hasan\n13 Innstraße, 94032, Passau\n📞 +4915219190243\n" \
+           "\"Bitte klingeln\"\n1/ app Nr 316\n45\naße\n6 Artikel\n+4915219190243\n43,85 €\n"
+    tags = [tag for _, tag in classify_lines(text)]
+    assert tags == [
+        ocr.LINE_TIME, ocr.LINE_ZIP, ocr.LINE_UI, ocr.LINE_TEXT, ocr.LINE_NAME, ocr.LINE_TEXT, ocr.LINE_TEXT,
+        ocr.LINE_QUOTED, ocr.LINE_APARTMENT, ocr.LINE_MINUTES, ocr.LINE_FRAGMENT, ocr.LINE_ARTIKEL,
+        ocr.LINE_PHONE, ocr.LINE_TOTAL, ocr.LINE_EMPTY,
+    ]
+    # A street name on the line rules out the apartment tag
+    assert classify_line("Spitalhofstraße 12 App. 3") == ocr.LINE_TEXT
+
+
+def test_zip_between_time_and_geplant_is_not_read_as_minutes():
+    cases = {case["name"]: case for case in load_corpus()}
+    assert cases["scheduled_direct_time"]["expected"]["time"] == "17:40"
+    assert cases["scheduled_after_clock"]["expected"]["time"] == "20:00"  # Screen clock 6:33 above is ignored
+    # "45" (Min. lost by OCR) above the zip line: 7:05 pm + 45 min
+    assert cases["scheduled_standalone_minutes"]["expected"]["time"] == "19:50"
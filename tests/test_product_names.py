@@ -0,0 +1,37 @@
+# Test compiled product-name rules: golden outputs (pre-rewrite implementation), memo bound
+import json
+import os
+
+import utils
+from utils import clean_product_name
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "product_names.json")
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_outputs_match_golden_corpus():
+    clean_product_name.cache_clear()
+    mismatches = [(e["raw"], e["clean"], clean_product_name(e["raw"])) for e in load_corpus()
+                  if clean_product_name(e["raw"]) != e["clean"]]
+    assert mismatches == []
+
+
+def test_docstring_examples():
+    assert clean_product_name('Veganer-Monats-Bio-Burger „BBQ Oyster" - Bio-Pommes') == 'BBQ Oyster - Pommes'
+    assert clean_product_name('Bergkäse-Spätzle - + Preiselbeere (1.9€) / Standard') == 'Bergkäse + Preiselbeere'
+    assert clean_product_name('Chili-Cheese-Süßkartoffelpommes') == 'Süßkart.: Chili-Cheese-Style'
+    assert clean_product_name('Lotus roll') == ''
+
+
+def test_results_are_memoized_and_bounded():
+    clean_product_name.cache_clear()
+    clean_product_name('Bio-Burger "BBQ" - Bio-Pommes')
+    misses = clean_product_name.cache_info().misses
+    clean_product_name('Bio-Burger "BBQ" - Bio-Pommes')
+    info = clean_product_name.cache_info()
+    assert info.misses == misses and info.hits >= 1
+    assert info.maxsize == utils.PRODUCT_NAME_CACHE_SIZE
@@ -0,0 +1,51 @@
+# Test versioned render cache: unchanged views are served from cache, any order change re-renders
+import copy
+
+import render_cache
+from mdg import build_mdg_dispatch_text
+from rg import build_vendor_details_text, build_vendor_summary_text
+from upc import build_assignment_message
+
+ORDER = {
+    "order_id": "7404590039306",
+    "name": "dishbee #58",
+    "order_type": "shopify",
+    "vendors": ["Leckerolls", "Julis Spätzlerei"],
+    "vendor_items": {"Leckerolls": ["- 2 x Classic Roll"], "Julis Spätzlerei": ["- 1 x Käsespätzle"]},
+    "customer": {"name": "Anna Muster", "phone": "+4917612345678", "address": "Lederergasse 15, 94032"},
+    "confirmed_times": {"Leckerolls": "12:55", "Julis Spätzlerei": "13:00"},
+    "status_history": [{"type": "new", "time": "12:30"}],
+    "total": "24.50€",
+    "tips": 2.5,
+    "payment_method": "Paid",
+}
+
+
+def test_unchanged_views_are_served_from_cache():
+    cache = render_cache.cache
+    cache.clear()
+    order = copy.deepcopy(ORDER)
+    before = dict(cache.stats)
+
+    first = build_mdg_dispatch_text(order)
+    assert build_mdg_dispatch_text(order) == first
+    summary = build_vendor_summary_text(order, "Leckerolls")
+    details = build_vendor_details_text(order, "Leckerolls")
+    assert summary != details
+    assert build_vendor_summary_text(order, "Leckerolls") == summary
+    build_assignment_message(order)
+    build_assignment_message(order)
+
+    assert cache.stats["hits"] - before["hits"] == 3
+    assert cache.stats["misses"] - before["misses"] == 4
+
+
+def test_order_change_invalidates_render():
+    render_cache.cache.clear()
+    order = copy.deepcopy(ORDER)
+    collapsed = build_mdg_dispatch_text(order)
+    order["note"] = "Bitte klingeln"
+    changed = build_mdg_dispatch_text(order)
+    assert changed != collapsed
+    assert "Bitte klingeln" in changed
+    assert build_mdg_dispatch_text(order, show_details=True) != changed
@@ -0,0 +1,239 @@
+# Test same-time candidate index (filters, per-vendor lists, labels, updates, rollover) and confirmation tracker
+from datetime import datetime, timedelta
+
+import mdg
+import same_time
+from same_time import TIMEZONE, ConfirmationTracker, SameTimeIndex, button_label
+
+SHORTCUTS = {"Leckerolls": "LR", "dean & david": "DD", "Pommes Freunde": "PF"}
+NOON = datetime(2025, 12, 8, 12, 0, tzinfo=TIMEZONE)
+
+
+def order(name, vendors, minutes, confirmed=None, status="new", address="Innstraße 15, 94032 Passau",
+          order_type="shopify"):
+    confirmed = confirmed or {}
+    return {
+        "name": name,
+        "order_type": order_type,
+        "vendors": vendors,
+        "customer": {"address": address},
+        "confirmed_time": list(confirmed.values())[-1] if confirmed else None,
+        "confirmed_times": dict(confirmed),
+        "status": status,
+        "created_at": NOON - timedelta(minutes=minutes),
+    }
+
+
+def make_index(state, clock=lambda: NOON):
+    index = SameTimeIndex(clock=clock)
+    index.configure(state, SHORTCUTS)
+    return index
+
+
+def sample_state():
+    return {
+        "o1": order("#1001", ["Leckerolls"], 50, {"Leckerolls": "12:30"}),
+        "o2": order("#1002", ["Leckerolls", "dean & david"], 40, {"Leckerolls": "12:40", "dean & david": "12:45"},
+                    address="Lederergasse 8, 94032 Passau"),
+        "o3": order("#1003", ["dean & david"], 30),                                # not confirmed
+        "o4": order("#1004", ["dean & david"], 20, {"dean & david": "12:50"}, status="delivered"),
+        "o5": order("#1005", ["Pommes Freunde"], 60 * 13, {"Pommes Freunde": "23:10"}),  # yesterday
+        "o6": order("#1006", ["Pommes Freunde"], 10, {"Pommes Freunde": "13:00"}, order_type="ocr_pf"),
+    }
+
+
+def test_only_confirmed_open_orders_from_today_in_arrival_order():
+    index = make_index(sample_state())
+    assert [r["order_id"] for r in index.recent()] == ["o1", "o2", "o6"]
+    assert index.recent(exclude="o1") == [
+        {"order_id": "o2", "display_name": "02", "vendor": "Leckerolls"},
+        {"order_id": "o6", "display_name": "06", "vendor": "Pommes Freunde"},
+    ]
+    assert [r["order_id"] for r in index.recent(vendor="dean & david")] == ["o2"]
+    assert [r["order_id"] for r in index.recent(limit=2)] == ["o2", "o6"]
+    assert index.metrics()["per_vendor"] == {"Leckerolls": 2, "dean & david": 1, "Pommes Freunde": 1}
+
+
+def test_buttons_are_rendered_per_vendor_with_vendor_times():
+    index = make_index(sample_state())
+    buttons = index.buttons(exclude="o6")
+    assert [(b.order_id, b.shortcut, b.time, b.label) for b in buttons] == [
+        ("o1", "LR", "12:30", "12:30 - Innstr. 15  - LR"),
+        ("o2", "LR", "12:40", "12:40 - Ledererga. 8  - LR"),
+        ("o2", "DD", "12:45", "12:45 - Ledererga. 8  - DD"),
+    ]
+
+
+def test_long_labels_fall_back_to_four_letters():
+    assert button_label("18:05", "Lederergasse 8", "LR") == "18:05 - Ledererga. 8  - LR"
+    long_street = "Sonnenblumenfeldhauptwegverlaengerungsstrasseundnochmehrtext 7"
+    assert button_label("18:05", long_street, "LR") == "18:05 - Sonn 7  - LR"
+
+
+def test_track_follows_confirm_deliver_and_undo():
+    state = sample_state()
+    index = make_index(state)
+    state["o3"]["confirmed_times"]["dean & david"] = "12:55"
+    state["o3"]["confirmed_time"] = "12:55"
+    index.track("o3")
+    assert [r["order_id"] for r in index.recent(vendor="dean & david")] == ["o2", "o3"]
+
+    state["o1"]["status"] = "delivered"
+    index.track("o1")
+    state["o4"]["status"] = "assigned"  # Undelivered
+    index.track("o4")
+    assert [r["order_id"] for r in index.recent()] == ["o2", "o3", "o4", "o6"]
+    assert index.stats["refreshed"] == 0
+
+
+def test_changed_orders_are_reindexed_on_read_without_a_hook():
+    state = sample_state()
+    index = make_index(state)
+    state["o2"]["confirmed_times"]["dean & david"] = "13:15"  # Delay, no track() call
+    state["o6"]["status"] = "removed"
+    state["o1"] = order("#1001", ["Leckerolls"], 50)  # Replaced by a fresh (unconfirmed) entry
+    assert [(b.order_id, b.time) for b in index.buttons()] == [("o2", "12:40"), ("o2", "13:15")]
+    assert index.stats["refreshed"] == 3
+    assert index.metrics()["candidates"] == 1
+
+
+def test_day_rollover_drops_yesterdays_orders():
+    clock = [NOON]
+    state = sample_state()
+    index = make_index(state, clock=lambda: clock[0])
+    assert len(index.recent()) == 3
+    clock[0] = NOON + timedelta(days=1)
+    assert index.recent() == [] and index.buttons() == []
+    assert index.stats["rollovers"] == 1
+    state["o7"] = order("#1007", ["Leckerolls"], -24 * 60 + 5, {"Leckerolls": "11:55"})
+    index.track("o7")
+    assert [r["order_id"] for r in index.recent()] == ["o7"]
+
+
+def test_another_state_dict_is_indexed_on_first_use():
+    index = make_index({})
+    assert index.recent() == []
+    assert [r["order_id"] for r in index.recent(state=sample_state())] == ["o1", "o2", "o6"]
+    assert index.has_candidates(state=index._state) and not index.has_candidates(state={})
+
+
+class Clock:
+    def __init__(self, moment=NOON):
+        self.moment = moment
+
+    def __call__(self):
+        return self.moment
+
+    def advance(self, minutes):
+        self.moment += timedelta(minutes=minutes)
+
+
+def confirm(tracker, state, order_id, vendor, time_str, clock=None, minutes=0):
+    if clock:
+        clock.advance(minutes)
+    state[order_id]["confirmed_times"][vendor] = time_str
+    state[order_id]["confirmed_time"] = time_str
+    tracker.track(order_id, state[order_id])
+
+
+def pace_state():
+    return {f"p{i}": order(f"#20{i:02d}", ["Leckerolls", "dean & david"] if i == 3 else ["Leckerolls"], 60 - i)
+            for i in range(1, 7)}
+
+
+def test_latest_confirmation_per_vendor_and_fallback_on_undo_and_removal():
+    clock, state = Clock(), pace_state()
+    tracker = ConfirmationTracker(clock=clock)
+    tracker.rebuild(state)
+    assert tracker.latest() is None and tracker.suggestion_offsets() == [5, 10, 15, 20]
+    confirm(tracker, state, "p1", "Leckerolls", "12:30", clock, 1)
+    confirm(tracker, state, "p3", "dean & david", "12:40", clock, 1)
+    confirm(tracker, state, "p2", "Leckerolls", "ASAP", clock, 1)  # No time to suggest from
+    assert (tracker.latest("Leckerolls").order_id, tracker.latest().order_id) == ("p1", "p3")
+    assert tracker.latest("Leckerolls").order_name == "#2001"
+
+    del state["p3"]["confirmed_times"]["dean & david"]  # Undo
+    tracker.track("p3", state["p3"])
+    assert tracker.latest("dean & david") is None and tracker.latest().order_id == "p1"
+    state["p1"]["status"] = "removed"
+    tracker.track("p1", state["p1"])
+    assert tracker.latest() is None and tracker.stats["invalidated"] == 2
+
+
+def test_pace_spaces_suggestions_and_respects_lead_time():
+    clock, state = Clock(), pace_state()
+    tracker = ConfirmationTracker(clock=clock)
+    tracker.rebuild(state)
+    # Confirmed every 10 minutes, each pickup 30 minutes ahead
+    for i, pickup in enumerate(("12:40", "12:50", "13:00", "13:10"), start=1):
+        confirm(tracker, state, f"p{i}", "Leckerolls", pickup, clock, 10)
+    assert tracker.pace("Leckerolls") == {"samples": 4, "step": 10, "lead": 30}
+    assert tracker.suggestion_offsets("Leckerolls") == [10, 20, 30, 40]
+
+    # 12:42: a delay replaces p2's earlier time; nothing before now + 30 (13:12) is suggested
+    confirm(tracker, state, "p2", "Leckerolls", "12:55", clock, 2)
+    assert [c.time for c in tracker._windows["Leckerolls"]] == ["12:40", "13:00", "13:10", "12:55"]
+    assert tracker.latest("Leckerolls").time == "12:55"
+    assert tracker.suggestion_offsets("Leckerolls") == [20, 30, 40, 50]
+
+
+def test_pre_orders_stay_out_of_the_pace():
+    clock, state = Clock(), pace_state()
+    tracker = ConfirmationTracker(clock=clock)
+    tracker.rebuild(state)
+    # 12:00: evening pre-orders confirmed hours ahead, then an ASAP order
+    for i, pickup in enumerate(("18:00", "18:30", "19:00"), start=1):
+        confirm(tracker, state, f"p{i}", "Leckerolls", pickup)
+    confirm(tracker, state, "p4", "Leckerolls", "12:20", clock, 1)
+    assert tracker.pace("Leckerolls") == {"samples": 1, "step": 5, "lead": 0}
+    assert tracker.suggestion_offsets("Leckerolls") == [5, 10, 15, 20]
+
+    # Enough ASAP confirmations for a pace: the pre-orders still don't count
+    confirm(tracker, state, "p5", "Leckerolls", "12:40", clock, 10)
+    confirm(tracker, state, "p6", "Leckerolls", "13:00", clock, 10)
+    assert tracker.pace("Leckerolls") == {"samples": 3, "step": 15, "lead": 29}
+
+
+def test_first_offset_is_capped():
+    clock, state = Clock(), pace_state()
+    tracker = ConfirmationTracker(clock=clock)
+    tracker.rebuild(state)
+    for i, pickup in enumerate(("12:40", "12:50", "13:00"), start=1):
+        confirm(tracker, state, f"p{i}", "Leckerolls", pickup, clock, 10)
+    clock.advance(3 * 60)  # Nothing confirmed since 12:30, latest pickup 13:00
+    assert tracker.pace("Leckerolls")["step"] == 10
+    assert tracker.suggestion_offsets("Leckerolls") == [60, 70, 80, 90]
+
+
+def test_tracker_seeds_from_status_history_and_rolls_over():
+    clock, state = Clock(), pace_state()
+    for i, (pickup, minutes) in enumerate((("12:20", 20), ("12:45", 5)), start=1):
+        state[f"p{i}"]["confirmed_times"] = {"Leckerolls": pickup}
+        state[f"p{i}"]["status_history"] = [
+            {"type": "confirmed", "vendor": "Leckerolls", "time": pickup, "timestamp": NOON - timedelta(minutes=minutes)}]
+    state["p3"]["confirmed_times"] = {"Leckerolls": "12:50"}
+    state["p3"]["status"] = "removed"
+    state["p4"]["confirmed_times"] = {"Leckerolls": "22:00"}
+    state["p4"]["created_at"] = NOON - timedelta(days=1)
+    tracker = ConfirmationTracker(clock=clock)
+    tracker.rebuild(state)
+    assert [c.order_id for c in tracker._windows["Leckerolls"]] == ["p1", "p2"]
+    assert tracker.latest().time == "12:45"
+    clock.advance(24 * 60)
+    assert tracker.latest() is None and tracker.stats["rollovers"] == 1
+
+
+def test_smart_time_suggestions_use_the_tracker(monkeypatch):
+    clock, state = Clock(), pace_state()
+    tracker = ConfirmationTracker(clock=clock)
+    tracker.rebuild(state)
+    monkeypatch.setattr(same_time, "confirmations", tracker)
+    monkeypatch.setattr(mdg, "STATE", state)
+    assert [[b.text for b in row] for row in mdg.build_smart_time_suggestions("o9").inline_keyboard] == [["EXACT TIME ⏰"]]
+
+    confirm(tracker, state, "p1", "Leckerolls", "23:50", clock, 1)
+    keyboard = mdg.build_smart_time_suggestions("o9", "Leckerolls")
+    assert [[b.text for b in row] for row in keyboard.inline_keyboard] == [
+        ["01 23:50 + 5min", "01 23:50 + 10min"], ["01 23:50 + 15min", "01 23:50 + 20min"], ["EXACT TIME ⏰"]]
+    assert keyboard.inline_keyboard[1][1].callback_data == "smart_time|o9|Leckerolls|00:10"
+    assert mdg.get_last_confirmed_order("Leckerolls") is state["p1"]
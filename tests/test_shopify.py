@@ -0,0 +1,54 @@
+# Test Shopify payload normalizer: fixture equivalence with the old inline webhook code, pickup fields, test payloads
+import json
+import os
+
+import pytest
+
+from shopify import is_pickup_order, normalize_order, payment_method
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "shopify_orders.json")
+
+with open(FIXTURE, encoding="utf-8") as f:
+    CORPUS = json.load(f)
+VENDORS = set(CORPUS["vendors"])
+
+
+@pytest.mark.parametrize("case", CORPUS["cases"], ids=lambda case: case["name"])
+def test_matches_previous_webhook_output(case):
+    order = normalize_order(case["payload"], VENDORS)
+    assert {field: order[field] for field in case["expected"]} == case["expected"]
+    # Pickup fields cover everything the old whole-payload search caught in these orders
+    assert order["is_pickup"] == ("abholung" in str(case["payload"]).lower())
+
+
+def test_state_entry_shape():
+    order = normalize_order(CORPUS["cases"][1]["payload"], VENDORS, is_test=True)
+    assert order["order_type"] == "shopify" and order["status"] == "new" and order["is_test"] is True
+    assert order["vendor_expanded"] == {vendor: False for vendor in order["vendors"]}
+    assert order["status_history"][0]["timestamp"] == order["created_at"]
+    assert order["mdg_message_id"] is None and order["rg_message_ids"] == {} and order["vendor_messages"] == {}
+
+
+def test_pickup_ignores_unrelated_fields():
+    payload = {
+        "email": "abholung@example.com",  # The old str(payload) search flagged this as a pickup
+        "customer": {"last_name": "Abholungsdienst"},
+        "line_items": [{"vendor": "Kahaani", "name": "Butter Chicken", "quantity": 1}],
+    }
+    assert not is_pickup_order(payload)
+    payload["shipping_lines"] = [{"title": "Selbstabholung"}]
+    assert is_pickup_order(payload)
+
+
+def test_test_command_payloads_use_item_titles():
+    # /test payloads carry "title" only; before, these items showed up as "Item"
+    payload = {"id": 1, "line_items": [{"vendor": "Kahaani", "title": "Butter Chicken", "quantity": 2}]}
+    assert normalize_order(payload, {"Kahaani"})["vendor_items"] == {"Kahaani": ["- 2 x Butter Chicken"]}
+
+
+def test_cod_transaction_gateways():
+    # A bare "cod" gateway only counted in the /test path; webhooks need "cash" and "delivery"
+    assert payment_method({"transactions": [{"gateway": "cod"}]}, is_test=True) == "Cash on Delivery"
+    assert payment_method({"transactions": [{"gateway": "cod"}]}) == "Paid"
+    assert payment_method({"transactions": [{"gateway": "Cash on Delivery"}]}) == "Cash on Delivery"
+    assert payment_method({"transactions": [{"gateway": "shopify_payments"}, {"gateway": None}]}) == "Paid"
@@ -0,0 +1,40 @@
+# Test table-driven Smoothr parser: golden outputs (pre-rewrite implementation), no per-line logging
+import json
+import logging
+import os
+
+import pytest
+
+from utils import is_smoothr_order, parse_smoothr_order
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "smoothr_orders.json")
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("case", load_corpus(), ids=lambda case: case["name"])
+def test_outputs_match_golden_corpus(case):
+    if "error" in case:
+        with pytest.raises(Exception) as excinfo:
+            parse_smoothr_order(case["text"])
+        assert type(excinfo.value).__name__ == case["error"]
+        return
+    result = parse_smoothr_order(case["text"])
+    assert result.pop("smoothr_raw") == case["text"]
+    assert result == case["expected"]
+
+
+def test_order_types_by_code():
+    types = {case["expected"]["order_type"] for case in load_corpus() if "expected" in case}
+    assert {"smoothr_dnd", "smoothr_lieferando", "smoothr_dishbee"} <= types
+
+
+def test_valid_orders_are_parsed_without_info_logging(caplog):
+    texts = [case["text"] for case in load_corpus() if "expected" in case and is_smoothr_order(case["text"])]
+    with caplog.at_level(logging.INFO, logger="utils"):
+        for text in texts:
+            parse_smoothr_order(text)
+    assert [r for r in caplog.records if r.name == "utils" and r.levelno == logging.INFO] == []
@@ -0,0 +1,62 @@
+# Test persistent auto-delete timers: per-chat batching, re-arming on boot, metrics
+import asyncio
+import time
+
+import outbound
+import timers
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.calls.append((chat_id, sorted(message_ids)))
+        return True
+
+
+def test_due_deletions_are_batched_per_chat(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(timers, "redis_save_timer", lambda timer_id, data: saved.setdefault(timer_id, data) is not None)
+    monkeypatch.setattr(timers, "redis_delete_timers", lambda ids: [saved.pop(i, None) for i in ids] is not None)
+    monkeypatch.setattr(outbound.deletes, "bot", FakeBot())
+
+    async def run():
+        scheduler = timers.TimerScheduler()
+        fired = []
+        scheduler.schedule_delete(-100, 1, 0.05, on_fire=lambda: fired.append(1))
+        scheduler.schedule_delete(-100, 2, 0.05)
+        scheduler.schedule_delete(42, 3, 0.05)
+        assert scheduler.stats()["pending"] == 3
+        assert len(saved) == 3
+        await asyncio.sleep(0.2)
+        return scheduler.stats(), fired
+
+    stats, fired = asyncio.run(run())
+    assert sorted(outbound.deletes.bot.calls) == [(-100, [1, 2]), (42, [3])]
+    assert stats["pending"] == 0
+    assert stats["fired"] == 3
+    assert fired == [1]
+    assert saved == {}
+
+
+def test_persisted_timers_are_rearmed_on_boot(monkeypatch):
+    persisted = {
+        "-100:7": {"chat_id": -100, "message_id": 7, "due_at": time.time() - 5},   # overdue during restart
+        "-100:8": {"chat_id": -100, "message_id": 8, "due_at": time.time() + 60},
+    }
+    monkeypatch.setattr(timers, "redis_get_all_timers", lambda: dict(persisted))
+    monkeypatch.setattr(timers, "redis_delete_timers", lambda ids: True)
+    monkeypatch.setattr(outbound.deletes, "bot", FakeBot())
+
+    async def run():
+        scheduler = timers.TimerScheduler()
+        assert scheduler.load_pending() == 2
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert outbound.deletes.bot.calls == [(-100, [7])]
+    assert stats["pending"] == 1
+    assert stats["max_lateness"] >= 5
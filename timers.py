@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# timers.py - Persistent timer scheduler for auto-deleting messages
+
+"""
+Timer Scheduler for Telegram Dispatch Bot
+
+Replaces one sleeping coroutine / call_later per message with a single heap of
+due times served by one runner task:
+
+- Pending deletions are persisted in Redis (redis_state) and re-armed on boot,
+  so status toasts and forwarded messages don't stay in MDG after a restart
+- Deletions that fall due together are batched per chat (outbound.deletes)
+- Metrics: pending timers, fired timers, lateness (how late timers fired)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import outbound
+from outbound import PRIORITY_LOW, fan_out
+from redis_state import redis_save_timer, redis_delete_timers, redis_get_all_timers
+
+logger = logging.getLogger(__name__)
+
+
+def _timer_id(chat_id: int, message_id: int) -> str:
+    return f"{chat_id}:{message_id}"
+
+
+class TimerScheduler:
+    """Min-heap of (due_at, seq, timer_id) with a single runner task."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._timers: Dict[str, Dict[str, Any]] = {}
+        self._callbacks: Dict[str, Callable[[], None]] = {}
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._lateness_total = 0.0
+        self.metrics: Dict[str, float] = {"fired": 0, "max_lateness": 0.0, "last_lateness": 0.0}
+
+    def _push(self, timer_id: str, timer: Dict[str, Any]) -> None:
+        self._timers[timer_id] = timer
+        heapq.heappush(self._heap, (timer["due_at"], next(self._seq), timer_id))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _ensure_runner(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._runner = None
+        if self._runner is None or self._runner.done():
+            self._runner = loop.create_task(self._run())
+
+    def schedule_delete(self, chat_id: int, message_id: int, delay: float, on_fire: Optional[Callable[[], None]] = None) -> None:
+        """
+        Delete a message after `delay` seconds (persisted, survives restarts).
+
+        Args:
+            chat_id: Chat containing the message
+            message_id: Message to delete
+            delay: Seconds from now
+            on_fire: Optional in-memory callback run when the timer fires (not persisted)
+        """
+        timer_id = _timer_id(chat_id, message_id)
+        timer = {"chat_id": chat_id, "message_id": message_id, "due_at": time.time() + delay}
+        if on_fire:
+            self._callbacks[timer_id] = on_fire
+        redis_save_timer(timer_id, timer)
+        self._push(timer_id, timer)
+        self._ensure_runner()
+
+    def load_pending(self) -> int:
+        """Re-arm timers persisted before a restart. Overdue timers fire right away."""
+        loaded = 0
+        for timer_id, timer in redis_get_all_timers().items():
+            if timer_id not in self._timers and "due_at" in timer:
+                self._push(timer_id, timer)
+                loaded += 1
+        if loaded:
+            logger.info(f"⏲️ Re-armed {loaded} pending auto-delete timers from Redis")
+        return loaded
+
+    async def start(self) -> None:
+        """Start the runner on the current loop (used at boot after load_pending)."""
+        self._ensure_runner()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pending count and lateness metrics for the health check."""
+        fired = self.metrics["fired"]
+        return {
+            "pending": len(self._timers),
+            "fired": int(fired),
+            "avg_lateness": round(self._lateness_total / fired, 3) if fired else 0.0,
+            "max_lateness": round(self.metrics["max_lateness"], 3),
+            "last_lateness": round(self.metrics["last_lateness"], 3),
+        }
+
+    def _pop_due(self, now: float) -> List[Dict[str, Any]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, timer_id = heapq.heappop(self._heap)
+            timer = self._timers.get(timer_id)
+            # Skip entries superseded by a later schedule of the same message
+            if not timer or timer["due_at"] != due_at:
+                continue
+            del self._timers[timer_id]
+            due.append(timer)
+        return due
+
+    async def _fire(self, due: List[Dict[str, Any]], now: float) -> None:
+        by_chat: Dict[int, List[int]] = {}
+        timer_ids = []
+        for timer in due:
+            timer_id = _timer_id(timer["chat_id"], timer["message_id"])
+            timer_ids.append(timer_id)
+            by_chat.setdefault(timer["chat_id"], []).append(timer["message_id"])
+
+            lateness = max(0.0, now - timer["due_at"])
+            self.metrics["fired"] += 1
+            self.metrics["last_lateness"] = lateness
+            self.metrics["max_lateness"] = max(self.metrics["max_lateness"], lateness)
+            self._lateness_total += lateness
+
+            callback = self._callbacks.pop(timer_id, None)
+            if callback:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Error in timer callback for {timer_id}: {e}")
+
+        redis_delete_timers(timer_ids)
+        # One deleteMessages request per chat
+        await fan_out({
+            chat_id: (lambda c=chat_id, ids=message_ids: outbound.deletes.delete(c, ids, priority=PRIORITY_LOW))
+            for chat_id, message_ids in by_chat.items()
+        })
+
+    async def _run(self) -> None:
+        """Runner loop: sleep until the earliest timer is due, then fire everything due."""
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            wait = self._heap[0][0] - time.time()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            now = time.time()
+            due = self._pop_due(now)
+            if due:
+                self._loop.create_task(self._fire(due, now))
+
+
+# Shared instance (configured/started from main.py)
+_scheduler = TimerScheduler()
+
+
+def schedule_delete(chat_id: int, message_id: int, delay: float, on_fire: Optional[Callable[[], None]] = None) -> None:
+    """Delete a message after `delay` seconds (persisted in Redis, batched per chat)."""
+    _scheduler.schedule_delete(chat_id, message_id, delay, on_fire)
+
+
+def load_pending() -> int:
+    """Re-arm persisted timers on boot."""
+    return _scheduler.load_pending()
+
+
+async def start() -> None:
+    """Start the timer runner on the current event loop."""
+    await _scheduler.start()
+
+
+def stats() -> Dict[str, Any]:
+    """Timer metrics (pending, fired, lateness)."""
+    return _scheduler.stats()
@@ -2,10 +2,17 @@
 # upc.py - User Private Chat functions for Telegram Dispatch Bot
 
 import asyncio
+import time
 from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 from zoneinfo import ZoneInfo
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
-from utils import logger, COURIER_MAP, DISPATCH_MAIN_CHAT_ID, VENDOR_GROUP_MAP, RESTAURANT_SHORTCUTS, safe_send_message, safe_edit_message, safe_delete_message, get_error_description, format_phone_for_android, send_status_message
+from utils import logger, COURIER_MAP, DISPATCH_MAIN_CHAT_ID, VENDOR_GROUP_MAP, RESTAURANT_SHORTCUTS, safe_send_message, safe_edit_message, get_error_description, format_phone_for_android, send_status_message
+import outbound
+import render_cache
+import same_time
+import timers
+from outbound import PRIORITY_HIGH, fan_out
 
 # Timezone configuration for Passau, Germany (Europe/Berlin)
 TIMEZONE = ZoneInfo("Europe/Berlin")
@@ -107,62 +114,193 @@ def mdg_unassign_keyboard(order_id):
     ]
     return InlineKeyboardMarkup(keyboard)
 
-async def get_mdg_couriers(bot):
+# Courier roster cache: "Assign to 👉" used to call getChatAdministrators on every
+# click. The roster is warmed at startup, refreshed after COURIER_ROSTER_TTL and
+# patched in place from chat_member updates (promotions/demotions/leaves in MDG).
+COURIER_ROSTER_TTL = 15 * 60  # Seconds before the cached admin list is re-fetched
+COURIER_ADMIN_STATUSES = ("administrator", "creator")
+PRIORITY_COURIERS = ["Bee 1", "Bee 2", "Bee 3"]
+
+
+def _courier_name(user: dict) -> str:
+    """Display name for a courier (same precedence as the live API lookup)."""
+    return user.get("first_name") or user.get("username") or f"User{user.get('id')}"
+
+
+class CourierRoster:
+    """In-memory MDG courier list with TTL refresh, chat_member patches and hit/miss metrics."""
+
+    def __init__(self, ttl: float = COURIER_ROSTER_TTL):
+        self.ttl = ttl
+        self._couriers: Dict[int, str] = {}  # user_id -> display name
+        self._ordered: Optional[List[dict]] = None  # Bee 1/2/3 first, then the rest
+        self._loaded_at: Optional[float] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "fallbacks": 0, "member_updates": 0}
+
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _set(self, couriers: List[dict]) -> None:
+        # Swap whole dicts so the Flask thread (chat_member updates) never mutates under a reader
+        self._couriers = {c["user_id"]: c["username"] for c in couriers}
+        self._ordered = None
+        self._loaded_at = time.monotonic()
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock_loop = loop
+            self._refresh_lock = asyncio.Lock()
+        return self._refresh_lock
+
+    async def refresh(self, bot) -> bool:
+        """Re-fetch MDG administrators. Keeps the previous roster if the API call fails."""
+        async with self._lock():
+            if self.is_fresh():
+                return True  # Another caller refreshed while we waited
+            couriers = await _fetch_mdg_couriers(bot)
+            if not couriers:
+                return False
+            self._set(couriers)
+            self.stats["refreshes"] += 1
+            logger.info(f"Courier roster refreshed: {len(couriers)} couriers")
+            return True
+
+    async def get(self, bot) -> List[dict]:
+        """Couriers in display order: cached when fresh, refreshed on TTL expiry, COURIER_MAP as last resort."""
+        if self.is_fresh():
+            self.stats["hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            if not await self.refresh(bot) and not self._couriers:
+                self.stats["fallbacks"] += 1
+                logger.warning("No couriers found in MDG, using COURIER_MAP fallback")
+                return _order_couriers(get_couriers_from_map())
+        if self._ordered is None:
+            self._ordered = _order_couriers(
+                [{"user_id": uid, "username": name} for uid, name in self._couriers.items()]
+            )
+        return self._ordered
+
+    def apply_member_update(self, member_update: dict, about_bot: bool = False) -> bool:
+        """
+        Patch the roster from a chat_member / my_chat_member update.
+
+        Promotion to admin adds the courier, demotion/leave/kick removes them.
+        my_chat_member (the bot's own status changed) just invalidates, so the
+        next lookup re-fetches. Updates before the first load are ignored: the
+        next refresh picks them up anyway.
+
+        Returns:
+            True if the update concerned MDG and was applied
+        """
+        chat = member_update.get("chat", {})
+        if chat.get("id") != DISPATCH_MAIN_CHAT_ID:
+            return False
+        self.stats["member_updates"] += 1
+
+        if about_bot:
+            self._loaded_at = None
+            logger.info("Bot membership in MDG changed - courier roster invalidated")
+            return True
+        if self._loaded_at is None:
+            return False
+
+        new_member = member_update.get("new_chat_member", {})
+        user = new_member.get("user", {})
+        if not user.get("id") or user.get("is_bot"):
+            return False
+
+        couriers = dict(self._couriers)
+        if new_member.get("status") in COURIER_ADMIN_STATUSES:
+            couriers[user["id"]] = _courier_name(user)
+            logger.info(f"Courier roster: added {couriers[user['id']]} ({user['id']})")
+        elif couriers.pop(user["id"], None) is not None:
+            logger.info(f"Courier roster: removed {_courier_name(user)} ({user['id']})")
+        else:
+            return True
+        self._couriers = couriers
+        self._ordered = None
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Roster size, age and hit/miss counters for the health check."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "couriers": len(self._couriers),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+def _order_couriers(couriers: List[dict]) -> List[dict]:
+    """Priority couriers (Bee 1, Bee 2, Bee 3) first, then all others in roster order."""
+    ordered = []
+    for priority_name in PRIORITY_COURIERS:
+        for courier in couriers:
+            if courier["username"] == priority_name:
+                ordered.append(courier)
+                break
+    ordered.extend(c for c in couriers if c["username"] not in PRIORITY_COURIERS)
+    return ordered
+
+
+courier_roster = CourierRoster()
+
+async def _fetch_mdg_couriers(bot) -> Optional[List[dict]]:
     """
-    Get list of couriers from MDG group with fallback to COURIER_MAP.
-    
-    This function queries the Telegram Bot API to get current administrators
-    of the Main Dispatch Group (MDG). This ensures the courier selection menu
-    always shows actual group members, even if they join/leave.
-    
-    Flow:
-    1. Query bot.get_chat_administrators() for MDG group
-    2. Filter out bot accounts (include only human users)
-    3. Extract user_id and username for each admin
-    4. Fallback to COURIER_MAP environment variable if API call fails
+    Query the Telegram Bot API for current MDG administrators.
     
-    Note: Only administrators are returned by Telegram API. All couriers
-    must be promoted to admin status in MDG for this to work correctly.
+    Filters out bot accounts. All couriers must be promoted to admin status
+    in MDG, since only administrators are returned by the API.
     
     Args:
         bot: Telegram Bot instance for API calls
     
     Returns:
-        List of dicts: [{"user_id": int, "username": str}, ...]
-        
-    Raises:
-        Logs error and falls back to COURIER_MAP if API call fails
+        List of dicts [{"user_id": int, "username": str}, ...], or None if the
+        bot is unavailable, the call failed or no human admins were found
     """
+    if not bot:
+        logger.warning("Bot instance not available for MDG courier lookup")
+        return None
     try:
-        if not bot:
-            logger.warning("Bot instance not available, using COURIER_MAP fallback")
-            return get_couriers_from_map()
-        
-        # Get all members from MDG
         chat_members = await bot.get_chat_administrators(DISPATCH_MAIN_CHAT_ID)
-        
-        couriers = []
-        for member in chat_members:
-            user = member.user
-            # Filter out bots
-            if not user.is_bot:
-                couriers.append({
-                    "user_id": user.id,
-                    "username": user.first_name or user.username or f"User{user.id}"
-                })
-        
-        logger.info(f"DEBUG: Found {len(couriers)} couriers from MDG group")
-        
-        # If no couriers found, fall back to COURIER_MAP
-        if not couriers:
-            logger.warning("No couriers found in MDG, using COURIER_MAP fallback")
-            return get_couriers_from_map()
-        
-        return couriers
-        
     except Exception as e:
-        logger.error(f"Error getting MDG members: {e}, using COURIER_MAP fallback")
-        return get_couriers_from_map()
+        logger.error(f"Error getting MDG members: {e}")
+        return None
+    
+    couriers = []
+    for member in chat_members:
+        user = member.user
+        # Filter out bots
+        if not user.is_bot:
+            couriers.append({
+                "user_id": user.id,
+                "username": user.first_name or user.username or f"User{user.id}"
+            })
+    return couriers or None
+
+async def get_mdg_couriers(bot):
+    """
+    Get list of couriers from MDG group with fallback to COURIER_MAP.
+    
+    Served from the cached courier roster (see CourierRoster): the MDG
+    administrator list is fetched at startup and after COURIER_ROSTER_TTL,
+    and kept current in between by chat_member updates. Falls back to
+    COURIER_MAP when the API is unavailable and nothing is cached yet.
+    
+    Args:
+        bot: Telegram Bot instance for API calls
+    
+    Returns:
+        List of dicts: [{"user_id": int, "username": str}, ...], priority
+        couriers (Bee 1, Bee 2, Bee 3) first
+    """
+    return await courier_roster.get(bot)
 
 def get_couriers_from_map():
     """Get couriers from static COURIER_MAP (fallback)"""
@@ -180,17 +318,17 @@ async def courier_selection_keyboard(order_id: str, bot) -> InlineKeyboardMarkup
     """
     Build keyboard with buttons for each available courier.
     
-    Dynamically generates courier selection buttons by querying live MDG
-    membership. Each button triggers assign_to_user callback with courier's
-    user_id, allowing dispatcher to assign order to any courier.
+    Rendered from the cached courier roster (no API call on a warm cache).
+    Each button triggers assign_to_user callback with courier's user_id,
+    allowing dispatcher to assign order to any courier.
     
     Priority ordering:
     1. Bee 1, Bee 2, Bee 3 (if present in MDG)
-    2. All other couriers alphabetically
+    2. All other couriers
     
     Args:
         order_id: Shopify order ID for callback data
-        bot: Bot instance to query MDG members
+        bot: Bot instance to query MDG members on a cache miss
     
     Returns:
         InlineKeyboardMarkup with one button per courier, or None if no couriers
@@ -198,39 +336,21 @@ async def courier_selection_keyboard(order_id: str, bot) -> InlineKeyboardMarkup
     Button format: [Courier Name] → assign_to_user|{order_id}|{user_id}
     """
     try:
-        # Get couriers (live from MDG or fallback to COURIER_MAP)
         couriers = await get_mdg_couriers(bot)
         
         if not couriers:
             logger.error("No couriers available from MDG or COURIER_MAP")
             return None
         
-        buttons = []
-        
-        # Priority couriers (Bee 1, Bee 2, Bee 3) first
-        priority_names = ["Bee 1", "Bee 2", "Bee 3"]
-        for priority_name in priority_names:
-            for courier in couriers:
-                if courier["username"] == priority_name:
-                    buttons.append([InlineKeyboardButton(
-                        courier["username"],
-                        callback_data=f"assign_to_user|{order_id}|{courier['user_id']}"
-                    )])
-                    break
-        
-        # Then other couriers
-        for courier in couriers:
-            if courier["username"] not in priority_names:
-                buttons.append([InlineKeyboardButton(
-                    courier["username"],
-                    callback_data=f"assign_to_user|{order_id}|{courier['user_id']}"
-                )])
+        buttons = [
+            [InlineKeyboardButton(courier["username"], callback_data=f"assign_to_user|{order_id}|{courier['user_id']}")]
+            for courier in couriers
+        ]
         
         # Add Back button
         buttons.append([InlineKeyboardButton("← Back", callback_data="hide")])
         
-        logger.info(f"DEBUG: Built {len(buttons)} courier buttons for selection")
-        return InlineKeyboardMarkup(buttons) if buttons else None
+        return InlineKeyboardMarkup(buttons)
         
     except Exception as e:
         logger.error(f"Error building courier selection keyboard: {e}")
@@ -265,7 +385,8 @@ async def update_group_upc_messages(group_id: str):
             logger.warning(f"No orders found in group {group_id}")
             return
         
-        # Update each order's UPC message
+        # Update each order's UPC message (edits run concurrently)
+        edits = {}
         for group_order in group_orders:
             order_id = group_order["order_id"]
             order = STATE.get(order_id)
@@ -281,14 +402,15 @@ async def update_group_upc_messages(group_id: str):
             # Rebuild assignment message with updated group info
             assignment_text = build_assignment_message(order)
             
-            # Update the message
-            await safe_edit_message(
-                chat_id=order["assigned_to"],
-                message_id=order["upc_assignment_message_id"],
-                text=assignment_text,
-                reply_markup=assignment_cta_keyboard(order_id)
+            edits[order_id] = lambda o=order, text=assignment_text, oid=order_id: safe_edit_message(
+                chat_id=o["assigned_to"],
+                message_id=o["upc_assignment_message_id"],
+                text=text,
+                reply_markup=assignment_cta_keyboard(oid)
             )
-            
+        
+        results, errors = await fan_out(edits)
+        for order_id in results:
             logger.info(f"Updated UPC message for order {order_id} in group {group_id}")
         
         logger.info(f"Finished updating {len(group_orders)} UPC messages for group {group_id}")
@@ -345,7 +467,8 @@ async def send_assignment_to_private_chat(order_id: str, user_id: int):
         msg = await safe_send_message(
             user_id,
             assignment_text,
-            assignment_cta_keyboard(order_id)
+            assignment_cta_keyboard(order_id),
+            priority=PRIORITY_HIGH
         )
 
         # Track UPC message IDs
@@ -412,6 +535,18 @@ async def update_mdg_with_assignment(order_id: str, assigned_user_id: int):
         logger.error(f"Error updating MDG with assignment: {e}")
 
 def build_assignment_message(order: dict) -> str:
+    """
+    Build the assignment message (cached per order version, see render_cache).
+    
+    The group size is part of the key: the group header shows position/total.
+    """
+    group_total = None
+    if order.get("group_id") and STATE is not None:
+        from mdg import get_group_orders
+        group_total = len(get_group_orders(STATE, order["group_id"]))
+    return render_cache.cache.render("upc", order, lambda: _render_assignment_message(order), context=group_total)
+
+def _render_assignment_message(order: dict) -> str:
     """
     Build the assignment message sent to courier's private chat.
     
@@ -673,6 +808,7 @@ async def handle_delivery_completion(order_id: str, user_id: int):
         order["status"] = "delivered"
         order["delivered_at"] = now()
         order["delivered_by"] = user_id
+        same_time.track(order_id, order)
 
         # Get courier info
         assignee_info = COURIER_MAP.get(str(user_id), {})
@@ -696,22 +832,25 @@ async def handle_delivery_completion(order_id: str, user_id: int):
         delivered_msg = f"Order 🔖 {order_num}: ✅ Delivered by 🐝 {courier_shortcut} at {delivery_time}"
         asyncio.create_task(send_status_message(DISPATCH_MAIN_CHAT_ID, delivered_msg))
 
-        # Delete MDG-CONF and other temporary messages
-        if "mdg_additional_messages" in order:
-            for msg_id in order["mdg_additional_messages"]:
-                await safe_delete_message(DISPATCH_MAIN_CHAT_ID, msg_id)
+        # Delete temporary messages and update MDG, RG and UPC messages concurrently
+        updates = {}
+        
+        # Delete MDG-CONF and other temporary messages (single deleteMessages request)
+        if order.get("mdg_additional_messages"):
+            additional_messages = order["mdg_additional_messages"]
+            updates["cleanup"] = lambda: outbound.deletes.delete(DISPATCH_MAIN_CHAT_ID, additional_messages)
             order["mdg_additional_messages"] = []
         
         # Update MDG original order message with delivered status
         if "mdg_message_id" in order:
             import mdg
             updated_text = mdg.build_mdg_dispatch_text(order, show_details=order.get("mdg_expanded", False))
-            
-            await safe_edit_message(
+            mdg_keyboard = mdg.mdg_time_request_keyboard(order_id, order, state=STATE)  # Keep buttons
+            updates["mdg"] = lambda: safe_edit_message(
                 DISPATCH_MAIN_CHAT_ID,
                 order["mdg_message_id"],
                 updated_text,
-                mdg.mdg_time_request_keyboard(order_id, order, state=STATE)  # Keep buttons
+                mdg_keyboard
             )
 
         # Update all RG messages with delivered status
@@ -722,11 +861,11 @@ async def handle_delivery_completion(order_id: str, user_id: int):
                 import rg
                 expanded = order.get("vendor_expanded", {}).get(vendor, False)
                 text = rg.build_vendor_details_text(order, vendor) if expanded else rg.build_vendor_summary_text(order, vendor)
-                await safe_edit_message(
-                    vendor_group_id,
-                    rg_msg_id,
-                    text,
-                    rg.vendor_keyboard(order_id, vendor, expanded, order)
+                updates[vendor] = lambda chat=vendor_group_id, mid=rg_msg_id, t=text, kb=rg.vendor_keyboard(order_id, vendor, expanded, order): safe_edit_message(
+                    chat,
+                    mid,
+                    t,
+                    kb
                 )
 
         # Update UPC message with delivered status and replace keyboard with Undeliver button
@@ -737,12 +876,14 @@ async def handle_delivery_completion(order_id: str, user_id: int):
             undeliver_keyboard = InlineKeyboardMarkup([[
                 InlineKeyboardButton("❌ Undeliver", callback_data=f"undeliver_order|{order_id}|{int(now().timestamp())}")
             ]])
-            await safe_edit_message(
+            updates["upc"] = lambda: safe_edit_message(
                 user_id,
                 upc_msg_id,
                 updated_upc_text,
                 undeliver_keyboard
             )
+        
+        await fan_out(updates)
 
         # NO confirmation message to courier (removed as per requirement)
 
@@ -790,6 +931,7 @@ async def handle_undelivery(order_id: str, user_id: int):
         order["status"] = "assigned"
         order.pop("delivered_at", None)
         order.pop("delivered_by", None)
+        same_time.track(order_id, order)
         
         # Remove last delivered entry from status_history
         if order["status_history"] and order["status_history"][-1].get("type") == "delivered":
@@ -1088,7 +1230,8 @@ async def send_delay_request_to_restaurants(order_id: str, new_time: str, user_i
             "timestamp": now()
         })
         
-        # Send delay request to each vendor
+        # Send delay request to each vendor (concurrently)
+        sends = {}
         for v in vendors_to_notify:
             vendor_chat = VENDOR_GROUP_MAP.get(v)
             if vendor_chat:
@@ -1098,13 +1241,18 @@ async def send_delay_request_to_restaurants(order_id: str, new_time: str, user_i
                 from rg import restaurant_response_keyboard
                 
                 # Send with restaurant response buttons (Works / Later at...)
-                await safe_send_message(
-                    vendor_chat,
-                    delay_msg,
-                    restaurant_response_keyboard(new_time, order_id, v)
+                sends[v] = lambda chat=vendor_chat, text=delay_msg, kb=restaurant_response_keyboard(new_time, order_id, v): safe_send_message(
+                    chat,
+                    text,
+                    kb
                 )
-                
-                logger.info(f"Delay request sent to {v} for order {order_id} - new time {new_time}")
+        
+        results, errors = await fan_out(sends)
+        for v in results:
+            logger.info(f"Delay request sent to {v} for order {order_id} - new time {new_time}")
+        if errors:
+            # Surface the first failure to the courier (same as the sequential version)
+            raise next(iter(errors.values()))
         
         # Update UPC message with new status
         upc_msg_id = order.get("upc_message_id")
@@ -1126,8 +1274,7 @@ async def send_delay_request_to_restaurants(order_id: str, new_time: str, user_i
         
         # Auto-delete after 20 seconds
         if confirm_msg:
-            loop = asyncio.get_event_loop()
-            loop.call_later(20, lambda: asyncio.create_task(safe_delete_message(user_id, confirm_msg.message_id)))
+            timers.schedule_delete(user_id, confirm_msg.message_id, 20)
         
     except Exception as e:
         logger.error(f"Error sending delay request: {e}")
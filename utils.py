@@ -8,20 +8,22 @@ import hashlib
 import base64
 import asyncio
 import logging
+import re
 import threading
-import requests
 from datetime import datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 from typing import Dict, Any, List, Optional
 from telegram import Bot, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.constants import ParseMode
 from telegram.request import HTTPXRequest
+import outbound
+import timers
+from log_pipeline import event
+from outbound import PRIORITY_NORMAL, PRIORITY_LOW
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
+send_log = logging.getLogger(f"{__name__}.send")  # DEBUG: every outgoing message (rate limited, see log_pipeline.py)
 
 # --- ENVIRONMENT VARIABLES ---
 BOT_TOKEN = os.environ["BOT_TOKEN"]
@@ -46,95 +48,6 @@ RESTAURANT_SHORTCUTS = {
     "Kimbu": "KI"
 }
 
-# Google Maps API key for district detection (optional)
-GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
-
-# District cache to minimize API calls
-_DISTRICT_CACHE: Dict[str, Optional[str]] = {}
-
-def get_district_from_address(address: str) -> Optional[str]:
-    """
-    Determine district/neighborhood from address using Google Maps Geocoding API.
-    
-    Caches results to minimize API calls. Returns None if API key not configured.
-    
-    Args:
-        address: Full address string (e.g., "Lederergasse 15, Passau 94032")
-    
-    Returns:
-        District name (e.g., "Innstadt") or None if not found/unavailable
-    """
-    if not address:
-        return None
-    
-    # Check cache first
-    if address in _DISTRICT_CACHE:
-        logger.info(f"District cache hit for '{address}': {_DISTRICT_CACHE[address]}")
-        return _DISTRICT_CACHE[address]
-    
-    # If no API key configured, return None
-    if not GOOGLE_MAPS_API_KEY:
-        logger.info("GOOGLE_MAPS_API_KEY not set - district detection disabled")
-        _DISTRICT_CACHE[address] = None
-        return None
-    
-    try:
-        # Query Google Maps Geocoding API
-        logger.info(f"Querying Google Maps for district: '{address}'")
-        
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {
-            "address": f"{address}, Passau, Germany",
-            "key": GOOGLE_MAPS_API_KEY,
-            "language": "de"
-        }
-        
-        response = requests.get(url, params=params, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get("status") != "OK":
-            logger.warning(f"Google Maps API error: {data.get('status')}")
-            _DISTRICT_CACHE[address] = None
-            return None
-        
-        # Extract district from address components
-        results = data.get("results", [])
-        if not results:
-            logger.warning(f"No results from Google Maps for: {address}")
-            _DISTRICT_CACHE[address] = None
-            return None
-        
-        # Look for sublocality/neighborhood in components
-        address_components = results[0].get("address_components", [])
-        district = None
-        
-        # Log all components for debugging
-        logger.info(f"Google Maps returned {len(address_components)} components:")
-        for comp in address_components:
-            logger.info(f"  - {comp.get('long_name')} | Types: {comp.get('types')}")
-        
-        for component in address_components:
-            types = component.get("types", [])
-            # Check for sublocality/neighborhood types (most specific districts)
-            if any(t in types for t in ["sublocality", "sublocality_level_1", "sublocality_level_2", "neighborhood"]):
-                name = component.get("long_name")
-                if name:
-                    district = name
-                    logger.info(f"District found: '{district}' for address '{address}'")
-                    break
-        
-        if not district:
-            logger.info(f"No district/sublocality found for: {address}")
-        
-        _DISTRICT_CACHE[address] = district
-        return district
-        
-    except Exception as e:
-        logger.error(f"Error calling Google Maps API: {e}")
-        _DISTRICT_CACHE[address] = None
-        return None
-
 # --- TELEGRAM BOT CONFIGURATION ---
 request_cfg = HTTPXRequest(
     connection_pool_size=32,
@@ -298,6 +211,135 @@ def abbreviate_street(street_name: str, max_length: int = 20) -> str:
     
     return tier1_result
 
+# --- PRODUCT NAME RULES ---
+# clean_product_name() runs for every line item of every order, and menus repeat
+# the same raw names all day: the rules below are compiled once, evaluated in a
+# single pass over the table, and results are memoized per raw name.
+
+PRODUCT_NAME_CACHE_SIZE = 2048  # Distinct raw names (incl. compound parts) remembered
+
+# Rule 0a-0c: whole-name shortcuts checked before anything else (not for burger compounds)
+# (substrings that must all be present, result)
+_PRODUCT_SHORTCUTS = (
+    (('Curry', 'Spätzle'), 'Curry'),
+    (('Gulasch', 'Spätzle'), 'Gulasch'),
+    (('Halb Pommes', 'Halb Salat'), 'Halb P. / Halb S.'),
+)
+
+# Rules 0d-1c: normalization before compound splitting
+# (guard substring or None, pattern, replacement, strip afterwards)
+_PRE_SPLIT_RULES = (
+    # 0d: dietary labels in parentheses: (vegan), (vegetarisch), (veggie)
+    (None, re.compile(r'\s*-\s*\((vegan|vegetarisch|veggie)\)\s*-?\s*', re.IGNORECASE), ' - ', False),
+    # Clean up double hyphens / spaces the label removal leaves behind
+    (None, re.compile(r'\s+-\s+-\s+'), ' - ', False),
+    (None, re.compile(r'\s{2,}'), ' ', True),
+    # 1: " - Classic" suffix, 1b: " / Classic" suffix
+    (' - Classic', re.compile(r'\s*-\s*Classic$'), '', False),
+    (' / Classic', re.compile(r'\s*/\s*Classic$'), '', False),
+    # 1c: "- Classic / Glutenfrei" → "- Glutenfrei", "/ Classic / Glutenfrei" → "/ Glutenfrei"
+    (None, re.compile(r'\s*-\s*Classic\s*/\s*Glutenfrei'), ' - Glutenfrei', False),
+    (None, re.compile(r'\s*/\s*Classic\s*/\s*Glutenfrei'), ' / Glutenfrei', False),
+)
+
+_COMPOUND_SKIP_PARTS = frozenset(['Classic', 'Standard', 'Vegetarisch'])
+
+# Rule 2: prices in brackets, . or , decimals: (+2.6€), (1.9€), (13,50€)
+_PRICE_RE = re.compile(r'\s*\(\+?[\d.,]+€\)')
+# Rule 3: burger name between quotes (all quote types: „" "" and straight ")
+_BURGER_QUOTE_RE = re.compile(r'[„""""]([^„""""]+)[„""""]')
+# Rule 4: roll type prefix ("Special roll - X", "Lotus roll X") or a bare "{Type} roll"
+_ROLL_RE = re.compile(r'^([A-Za-zäöüÄÖÜß]+\s+roll)[\s\-]+(.+)$', re.IGNORECASE)
+_STANDALONE_ROLL_RE = re.compile(r'^([A-Za-zäöüÄÖÜß]+\s+roll)$', re.IGNORECASE)
+
+_SPAETZLE = r'[Ss][pä][aeä]tzle'
+
+# Rules 5-16: applied in order to a single (non-compound, non-burger) name.
+# Actions:
+#   ("prefix", text)                  remove text once if the name starts with it
+#   ("suffix", text)                  remove text if the name ends with it
+#   ("result_if_in", text, result)    the whole name becomes result if it contains text
+#   ("result_if_prefix", text, result)
+#   ("sub", guards, pattern, repl)    regex replace; only if the name contains one of guards (None = always)
+_PRODUCT_RULES = (
+    ("prefix", 'Bio-'),                                                   # 5
+    ("result_if_in", 'Chili-Cheese-Fries', 'Fries: Chili-Cheese-Style'),   # 7
+    ("result_if_in", 'Chili-Cheese-Süßkartoffel', 'Süßkart.: Chili-Cheese-Style'),  # 8
+    ("result_if_prefix", 'Sloppy-Fries', 'Sloppy-Fries'),                 # 9
+    ("sub", ('Süßkartoffel-Pommes', 'Süßkartoffelpommes'),                # 10
+     re.compile(r'Süßkartoffel(-)?[Pp]ommes'), 'Süßkartoffel'),
+    ("prefix", 'Sauerteig-Pizza '),                                       # 11
+    ("suffix", ' Spätzle'),                                               # 12
+    ("sub", ('Spätzle', 'Spaetzle', 'spätzle', 'spaetzle'),               # 13: "-Spätzle"
+     re.compile(r'\s*-\s*' + _SPAETZLE, re.IGNORECASE), ''),
+    ("sub", None, re.compile(r'\s+vom\s+\w+\s*&\s*' + _SPAETZLE, re.IGNORECASE), ''),  # 14: "X vom Rind & Spätzle"
+    ("sub", None, re.compile(r'\s*&\s*' + _SPAETZLE, re.IGNORECASE), ''),              # 14: "X & Spätzle"
+    ("prefix", 'Selbstgemachte '),                                        # 15
+    ("sub", None, re.compile(r'\s*/\s*Standard\s*$'), ''),                # 16
+)
+
+
+def _apply_product_rules(name: str) -> str:
+    """Run the rule table over a single name in one pass (stops at the first result_* match)."""
+    for rule in _PRODUCT_RULES:
+        action = rule[0]
+        if action == "prefix":
+            if name.startswith(rule[1]):
+                name = name[len(rule[1]):]
+        elif action == "suffix":
+            if name.endswith(rule[1]):
+                name = name[:-len(rule[1])]
+        elif action == "result_if_in":
+            if rule[1] in name:
+                return rule[2]
+        elif action == "result_if_prefix":
+            if name.startswith(rule[1]):
+                return rule[2]
+        elif rule[1] is None or any(guard in name for guard in rule[1]):
+            name = rule[2].sub(rule[3], name)
+    return name.strip()
+
+
+def _clean_compound(name: str) -> str:
+    """Compound products ("Burger - Side"): clean each part, merge duplicates and additions."""
+    cleaned_parts = []
+    for part in name.split(' - '):
+        part = part.strip()
+
+        # Skip empty parts, "Classic", "Standard", or "Vegetarisch" suffixes
+        if not part or part in _COMPOUND_SKIP_PARTS:
+            continue
+
+        # "Vegetarisch / X" -> "X", "X / Standard" -> "X"
+        if part.startswith('Vegetarisch /'):
+            part = part.replace('Vegetarisch /', '').strip()
+        if part.endswith('/ Standard'):
+            part = part.replace('/ Standard', '').strip()
+
+        # "+ X" additions keep their "+" prefix: "Bergkäse-Spätzle - + Gebratener Speck"
+        if part.startswith('+ '):
+            cleaned = clean_product_name(part[2:].strip())
+            if cleaned:
+                cleaned_parts.append(f"+ {cleaned}")
+        else:
+            cleaned = clean_product_name(part)
+            if cleaned and cleaned.strip():
+                cleaned_parts.append(cleaned)
+
+    # Duplicate first words: "Prosciutto - Prosciutto Funghi" -> "Prosciutto Funghi"
+    if len(cleaned_parts) == 2:
+        first_words = [p.split()[0] if p.split() else "" for p in cleaned_parts]
+        if first_words[0] == first_words[1]:
+            return cleaned_parts[1]
+
+    # Additions (+ X) are joined with a space instead of " - "
+    if len(cleaned_parts) > 1 and any(p.startswith('+ ') for p in cleaned_parts):
+        return ' '.join(cleaned_parts)
+
+    return ' - '.join(cleaned_parts) if cleaned_parts else name
+
+
+@lru_cache(maxsize=PRODUCT_NAME_CACHE_SIZE)
 def clean_product_name(name: str) -> str:
     """
     Clean up product names according to project-specific display rules.
@@ -309,6 +351,10 @@ def clean_product_name(name: str) -> str:
     Handles compound products (e.g., "Burger - Pommes") by splitting on " - "
     and cleaning each part separately. Removes duplicates (e.g., "Prosciutto - Prosciutto Funghi" → "Prosciutto Funghi").
     
+    The rules live in the precompiled tables above (_PRODUCT_SHORTCUTS,
+    _PRE_SPLIT_RULES, _PRODUCT_RULES); results are memoized per raw name
+    (bounded LRU), compound parts included.
+    
     Rules implemented (27+ total):
     - Remove dietary labels in parentheses: (vegan), (vegetarisch), (veggie)
     - Extract burger names from quotes, remove "Bio-Burger" prefix
@@ -351,224 +397,51 @@ def clean_product_name(name: str) -> str:
         >>> clean_product_name('Prosciutto - Prosciutto Funghi')
         'Prosciutto Funghi'
     """
-    import re
-    
     if not name or not name.strip():
         return name
     
-    # Store original for logging
-    original_input = name
-    
-    # Rule 0a: Special case for Curry dishes - must be BEFORE compound splitting
-    # BUT: Don't apply if it's part of a Burger compound
-    if 'Curry' in name and 'Spätzle' in name and 'Burger' not in name:
-        return 'Curry'
-    
-    # Rule 0b: Special case for Gulasch dishes - must be BEFORE compound splitting
-    # BUT: Don't apply if it's part of a Burger compound
-    if 'Gulasch' in name and 'Spätzle' in name and 'Burger' not in name:
-        return 'Gulasch'
-    
-    # Rule 0c: Special case for "Halb Pommes / Halb Salat" → "Halb P. / Halb S."
-    # BUT: Don't apply if it's part of a Burger compound (e.g., Bio-Burger "BBQ" Halb Pommes / Halb Salat)
-    if 'Halb Pommes' in name and 'Halb Salat' in name and 'Burger' not in name:
-        return 'Halb P. / Halb S.'
-    
-    # Rule 0d: Remove dietary labels in parentheses BEFORE compound splitting
-    # Handles: (vegan), (vegetarisch), (veggie) with or without spaces
-    name = re.sub(r'\s*-\s*\((vegan|vegetarisch|veggie)\)\s*-?\s*', ' - ', name, flags=re.IGNORECASE)
-    # Clean up any double spaces or double hyphens created
-    name = re.sub(r'\s+-\s+-\s+', ' - ', name)
-    name = re.sub(r'\s{2,}', ' ', name).strip()
-    
-    # Rule 1: Remove " - Classic" suffix FIRST (before compound splitting)
-    if ' - Classic' in name:
-        name = re.sub(r'\s*-\s*Classic$', '', name)
-    
-    # Rule 1b: Remove " / Classic" suffix
-    if ' / Classic' in name:
-        name = re.sub(r'\s*/\s*Classic$', '', name)
-    
-    # Rule 1c: Handle "/ Classic / Glutenfrei" pattern → keep only "/ Glutenfrei"
-    # Also handle "- Classic / Glutenfrei" → "- Glutenfrei"
-    name = re.sub(r'\s*-\s*Classic\s*/\s*Glutenfrei', ' - Glutenfrei', name)
-    name = re.sub(r'\s*/\s*Classic\s*/\s*Glutenfrei', ' / Glutenfrei', name)
-    
-    # Handle compound products: "Burger - Side" - split and clean each part
-    if ' - ' in name:
-        parts = name.split(' - ')
-        cleaned_parts = []
-        for part in parts:
-            part = part.strip()
-            
-            # Skip empty parts, "Classic", "Standard", or "Vegetarisch" suffixes
-            if not part or part in ['Classic', 'Standard', 'Vegetarisch']:
-                continue
-            
-            # Handle "Vegetarisch / X" pattern -> keep only "X"
-            if part.startswith('Vegetarisch /'):
-                part = part.replace('Vegetarisch /', '').strip()
-            
-            # Handle "X / Standard" pattern -> keep only "X"
-            if part.endswith('/ Standard'):
-                part = part.replace('/ Standard', '').strip()
-            
-            # Handle "+ X" pattern: "Bergkäse-Spätzle - + Gebratener Speck" → ["Bergkäse-Spätzle", "+ Gebratener Speck"]
-            # Keep the + prefix for additions
-            if part.startswith('+ '):
-                # Clean the part after "+", then re-add "+"
-                cleaned = clean_product_name(part[2:].strip())  # Recursive call
-                if cleaned:
-                    cleaned_parts.append(f"+ {cleaned}")
-            else:
-                cleaned = clean_product_name(part)  # Recursive call
-                if cleaned and cleaned.strip():
-                    cleaned_parts.append(cleaned)
-        
-        # Remove duplicate first words: "Prosciutto - Prosciutto Funghi" -> "Prosciutto Funghi"
-        # Also handles "Burrata - Burrata Crudo" -> "Burrata Crudo"
-        if len(cleaned_parts) == 2:
-            first_word_part1 = cleaned_parts[0].split()[0] if cleaned_parts[0].split() else ""
-            first_word_part2 = cleaned_parts[1].split()[0] if cleaned_parts[1].split() else ""
-            
-            if first_word_part1 == first_word_part2:
-                # Second part starts with same word as first part
-                result = cleaned_parts[1]
+    # Rules 0a-0c: whole-name shortcuts (BEFORE compound splitting, never for burger compounds)
+    if 'Burger' not in name:
+        for required, result in _PRODUCT_SHORTCUTS:
+            if all(text in name for text in required):
                 return result
-        
-        # If we have additions (+ X), join with space instead of " - "
-        if len(cleaned_parts) > 1 and any(p.startswith('+ ') for p in cleaned_parts):
-            result = ' '.join(cleaned_parts)
-            return result
-        
-        result = ' - '.join(cleaned_parts) if cleaned_parts else name
-        return result
+    
+    # Rules 0d-1c: dietary labels, Classic suffixes
+    for guard, pattern, replacement, strip in _PRE_SPLIT_RULES:
+        if guard is None or guard in name:
+            name = pattern.sub(replacement, name)
+            if strip:
+                name = name.strip()
+    
+    if ' - ' in name:
+        return _clean_compound(name)
     
     # Remove brackets from product names
     name = name.strip('[]')
     
-    # Rule 2: Remove prices in brackets - handles both . and , as decimal separator
-    # Matches: (+2.6€), (1.9€), (13,50€), (+0,90€), etc.
-    name = re.sub(r'\s*\(\+?[\d.,]+€\)', '', name)
-    
-    # Rule 3: Burger names - extract text between quotes (ANY burger type)
-    # Handles: [Bio-Burger "X"], [Monats-Bio-Burger „X"], [Veganer-Monats-Bio-Burger „X"]
-    # Supports all quote types: „" "" "" and straight "
-    # BUT: Must preserve compound structure after extraction
-    if 'Burger' in name and (' - ' in name):
-        # Example: "Veganer-Monats-Bio-Burger „BBQ Oyster" - Pommes"
-        # Split first, extract burger quote from first part
-        parts = name.split(' - ', 1)  # Split only on first " - "
-        burger_part = parts[0]
-        other_parts = parts[1] if len(parts) > 1 else ""
-        
-        # Try to extract quoted burger name
-        match = re.search(r'[„""""]([^„""""]+)[„""""]', burger_part)
-        if match:
-            burger_name = match.group(1)
-            if other_parts:
-                # Recursively clean the other parts
-                logger.debug(f"DEBUG Rule 3: Burger='{burger_name}' | Cleaning side: '{other_parts}'")
-                cleaned_other = clean_product_name(other_parts)
-                logger.debug(f"DEBUG Rule 3: Side cleaned to: '{cleaned_other}'")
-                result = f"{burger_name} - {cleaned_other}"
-                return result
-            else:
-                return burger_name
-    elif 'Burger' in name:
-        # No " - " separator, but might have side dish after burger name
-        # Example: Bio-Burger "BBQ" Halb Pommes / Halb Salat
-        match = re.search(r'[„""""]([^„""""]+)[„""""]', name)
+    # Rule 2: Remove prices in brackets
+    name = _PRICE_RE.sub('', name)
+    
+    # Rule 3: Burger names - the text between quotes, plus any side dish after it
+    # Example: Bio-Burger "BBQ" Halb Pommes / Halb Salat → "BBQ - Halb P. / Halb S."
+    if 'Burger' in name:
+        match = _BURGER_QUOTE_RE.search(name)
         if match:
-            burger_name = match.group(1)
-            # Check if there's text after the closing quote
-            quote_end_pos = match.end()
-            remaining_text = name[quote_end_pos:].strip()
-            
+            remaining_text = name[match.end():].strip()
             if remaining_text:
-                # There's a side dish after the burger name
-                logger.debug(f"DEBUG Rule 3 (no separator): Burger='{burger_name}' | Side: '{remaining_text}'")
-                cleaned_side = clean_product_name(remaining_text)
-                logger.debug(f"DEBUG Rule 3 (no separator): Side cleaned to: '{cleaned_side}'")
-                result = f"{burger_name} - {cleaned_side}"
-                return result
-            else:
-                # Just the burger name
-                return burger_name
-    
-    # Rule 4: Remove ANY roll type prefix BEFORE other processing
-    # Matches: "Special roll - X", "Lotus roll X", etc.
-    # Handles both "roll - Product" and "roll Product" formats
-    # Also handles standalone "Special roll" case (return empty to filter out)
-    # EXCEPTION: "Cinnamon roll - Classic" returns as-is
-    
-    if name == "Cinnamon roll - Classic":
-        return name
+                return f"{match.group(1)} - {clean_product_name(remaining_text)}"
+            return match.group(1)
     
-    roll_pattern = r'^([A-Za-zäöüÄÖÜß]+\s+roll)[\s\-]+(.+)$'
-    roll_match = re.match(roll_pattern, name, re.IGNORECASE)
+    # Rule 4: Remove ANY roll type prefix; a bare "{Type} roll" is dropped
+    # (empty string is filtered out by the compound handler)
+    roll_match = _ROLL_RE.match(name)
     if roll_match:
         name = roll_match.group(2).strip()
-    else:
-        # Check if name IS just "{Type} roll" with nothing after
-        standalone_roll_pattern = r'^([A-Za-zäöüÄÖÜß]+\s+roll)$'
-        if re.match(standalone_roll_pattern, name, re.IGNORECASE):
-            # Return empty string to filter this part out in compound handler
-            return ""
-    
-    # Rule 5: Remove "Bio-" prefix from any product
-    if name.startswith('Bio-'):
-        name = name.replace('Bio-', '', 1)
-    
-    # Rule 6: Remove "B-" prefix - DISABLED (keep B-umpkin as-is)
-    # if name.startswith('B-'):
-    #     name = name.replace('B-', '', 1)
-    
-    # Rule 7: Chili-Cheese-Fries -> Fries: Chili-Cheese-Style
-    if 'Chili-Cheese-Fries' in name:
-        return 'Fries: Chili-Cheese-Style'
-    
-    # Rule 8: Chili-Cheese-Süßkartoffel -> Süßkart.: Chili-Cheese-Style
-    if 'Chili-Cheese-Süßkartoffel' in name:
-        return 'Süßkart.: Chili-Cheese-Style'
-    
-    # Rule 9: Sloppy-Fries (keep as is after price removal)
-    if name.startswith('Sloppy-Fries'):
-        logger.info(f"Rule 9 (Sloppy-Fries): MATCHED - returning 'Sloppy-Fries'")
-        return 'Sloppy-Fries'
-    
-    # Rule 10: Süßkartoffel-Pommes → Süßkartoffel
-    if 'Süßkartoffel-Pommes' in name or 'Süßkartoffelpommes' in name:
-        name = re.sub(r'Süßkartoffel(-)?[Pp]ommes', 'Süßkartoffel', name)
-    
-    # Rule 11: Remove "Sauerteig-Pizza " prefix from any pizza
-    if name.startswith('Sauerteig-Pizza '):
-        name = name.replace('Sauerteig-Pizza ', '', 1)
-    
-    # Rule 12: Remove " Spätzle" suffix (with space) - catches "Erdnuss Pesto Spätzle"
-    if name.endswith(' Spätzle'):
-        name = name[:-8]  # Remove last 8 characters: " Spätzle"
-    
-    # Rule 13: Remove "-Spätzle" from any product (general spätzle removal with hyphen)
-    # Handle various spellings: Spätzle, Spaetzle, with or without space before hyphen
-    if 'Spätzle' in name or 'Spaetzle' in name or 'spätzle' in name or 'spaetzle' in name:
-        result = re.sub(r'\s*-\s*[Ss][pä][aeä]tzle', '', name, flags=re.IGNORECASE)
-        name = result
-    
-    # Rule 14: General spätzle cleanup patterns
-    # Pattern 1: "X vom Rind & Spätzle" -> "X" (removes meat description and spätzle)
-    name = re.sub(r'\s+vom\s+\w+\s*&\s*[Ss][pä][aeä]tzle', '', name, flags=re.IGNORECASE)
-    # Pattern 2: "X & Spätzle" -> "X" (general & Spätzle removal)
-    name = re.sub(r'\s*&\s*[Ss][pä][aeä]tzle', '', name, flags=re.IGNORECASE)
-    
-    # Rule 15: Remove "Selbstgemachte " prefix from any pasta
-    if name.startswith('Selbstgemachte '):
-        name = name.replace('Selbstgemachte ', '', 1)
-    
-    # Rule 16: Remove "/ Standard" suffix from any product
-    name = re.sub(r'\s*/\s*Standard\s*$', '', name)
+    elif _STANDALONE_ROLL_RE.match(name):
+        return ""
     
-    return name.strip()
+    # Rules 5-16
+    return _apply_product_rules(name)
 
 def verify_webhook(raw: bytes, hmac_header: str) -> bool:
     """Verify Shopify webhook HMAC"""
@@ -583,55 +456,67 @@ def verify_webhook(raw: bytes, hmac_header: str) -> bool:
         return False
 
 # --- ASYNC UTILITY FUNCTIONS ---
-async def safe_send_message(chat_id: int, text: str, reply_markup=None, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True):
-    """Send message with error handling and retry logic"""
-    # DEBUG: Force unbuffered output
-    import sys
-    print(f"=== MESSAGE TEXT DEBUG ===", flush=True, file=sys.stderr)
-    print(f"Text length: {len(text)}", flush=True, file=sys.stderr)
-    print(f"First 100 chars: {repr(text[:100])}", flush=True, file=sys.stderr)
-    if len(text) > 16:
-        print(f"Char at pos 16: {repr(text[16])}", flush=True, file=sys.stderr)
-        print(f"Chars 0-25: {repr(text[:25])}", flush=True, file=sys.stderr)
-    
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Send message attempt {attempt + 1}")
-            return await bot.send_message(
+async def safe_send_message(chat_id: int, text: str, reply_markup=None, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True, priority: int = PRIORITY_NORMAL):
+    """Send message via the outbound client (rate-limited; network errors retried, bad requests raised at once)"""
+    event(send_log, "send_message", logging.DEBUG, chat_id=chat_id, length=len(text), head=text[:25])
+
+    try:
+        msg = await outbound.client.call(
+            "send_message",
+            chat_id,
+            lambda: bot.send_message(
                 chat_id=chat_id,
                 text=text,
                 reply_markup=reply_markup,
                 parse_mode=parse_mode,
                 disable_web_page_preview=disable_web_page_preview
-            )
-        except Exception as e:
-            logger.error(f"Send message attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(2 ** attempt)
-                continue
-            else:
-                logger.error(f"Failed to send message after {max_retries} attempts: {e}")
-                raise
-
-async def safe_edit_message(chat_id: int, message_id: int, text: str, reply_markup=None, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True):
-    """Edit message with error handling"""
+            ),
+            priority=priority
+        )
+    except Exception as e:
+        logger.error(f"Failed to send message to {chat_id}: {e}")
+        raise
+    if msg:
+        # Remember what the message shows so identical follow-up edits are skipped
+        outbound.edits.remember(chat_id, msg.message_id, text, reply_markup)
+    return msg
+
+async def safe_edit_message(chat_id: int, message_id: int, text: str, reply_markup=None, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True, priority: int = PRIORITY_NORMAL):
+    """Edit message with error handling (skips no-op edits, merges rapid edits, rate-limited)"""
     try:
-        await bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=text,
-            reply_markup=reply_markup,
-            parse_mode=parse_mode,
-            disable_web_page_preview=disable_web_page_preview
+        await outbound.edits.edit(
+            chat_id,
+            message_id,
+            text,
+            reply_markup,
+            lambda: outbound.client.call(
+                "edit_message_text",
+                chat_id,
+                lambda: bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    text=text,
+                    reply_markup=reply_markup,
+                    parse_mode=parse_mode,
+                    disable_web_page_preview=disable_web_page_preview
+                ),
+                priority=priority
+            )
         )
     except Exception as e:
         logger.error(f"Error editing message: {e}")
 
-async def safe_delete_message(chat_id: int, message_id: int):
-    """Delete message with error handling"""
+async def safe_delete_message(chat_id: int, message_id: int, priority: int = PRIORITY_NORMAL):
+    """Delete message with error handling (deletions don't count against the per-chat send limit)"""
     try:
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
+        await outbound.client.call(
+            "delete_message",
+            chat_id,
+            lambda: bot.delete_message(chat_id=chat_id, message_id=message_id),
+            priority=priority,
+            cost=0
+        )
+        outbound.edits.forget(chat_id, message_id)
         logger.info(f"Successfully deleted message {message_id}")
     except Exception as e:
         logger.error(f"Error deleting message {message_id}: {e}")
@@ -787,7 +672,7 @@ def build_status_lines(order: dict, message_type: str, RESTAURANT_SHORTCUTS: dic
     # Default: no status line
     return ""
 
-async def send_status_message(chat_id: int, text: str, auto_delete_after: int = 20):
+async def send_status_message(chat_id: int, text: str, auto_delete_after: int = 20, reply_markup=None):
     """
     Send a status message that auto-deletes after specified seconds.
     
@@ -800,12 +685,12 @@ async def send_status_message(chat_id: int, text: str, auto_delete_after: int =
         chat_id: Chat to send message to
         text: Message text
         auto_delete_after: Seconds to wait before deletion (default: 20)
+        reply_markup: Optional keyboard to attach to message
     """
     try:
-        msg = await safe_send_message(chat_id, text)
-        # Schedule deletion
-        await asyncio.sleep(auto_delete_after)
-        await safe_delete_message(chat_id, msg.message_id)
+        msg = await safe_send_message(chat_id, text, reply_markup, priority=PRIORITY_LOW)
+        # Schedule deletion (persisted timer, batched with other due deletions)
+        timers.schedule_delete(chat_id, msg.message_id, auto_delete_after)
     except Exception as e:
         logger.error(f"Error in send_status_message: {e}")
 
@@ -856,6 +741,8 @@ def get_error_description(error: Exception) -> str:
             return f"Invalid request ({error_msg[:50]})"
     elif isinstance(error, ChatMigrated):
         return "Chat was migrated to supergroup"
+    elif isinstance(error, outbound.CircuitOpenError):
+        return "Telegram unavailable (retrying later)"
     
     # Generic errors
     elif isinstance(error, ConnectionError):
@@ -938,6 +825,108 @@ def get_smoothr_order_type(order_code: str) -> tuple[str, str]:
         return ("smoothr_lieferando", order_code[-2:] if len(order_code) >= 2 else order_code)
 
 
+# --- SMOOTHR PARSER TABLES ---
+# One pass over the message: "- Field: value" lines are dispatched through
+# _SMOOTHR_FIELDS (field name -> handler), non-field lines after "- Address:"
+# are address lines until "- Phone:". Unknown fields are ignored.
+_SMOOTHR_TZ = ZoneInfo("Europe/Berlin")
+_SMOOTHR_AMOUNT_RE = re.compile(r'\S+')                   # "3.50 EUR" -> "3.50"
+_SMOOTHR_PRODUCT_RE = re.compile(r'^(.*?) x\s*(\S*)')    # "Name x2 - Total: X €" -> name, "2"
+_SMOOTHR_NON_DIGIT_RE = re.compile(r'\D')
+_SMOOTHR_ZIP_RE = re.compile(r'(?<!\S)\d{5}(?!\S)')      # First 5-digit word of the last address line
+SMOOTHR_DEFAULT_ZIP = "94032"  # Passau
+
+
+def _smoothr_order(data: dict, value: str) -> None:
+    data["order_code"] = value
+    data["order_type"], data["order_num"] = get_smoothr_order_type(value)
+
+
+def _smoothr_customer(data: dict, value: str) -> None:
+    data["customer_name"] = value
+
+
+def _smoothr_phone(data: dict, value: str) -> None:
+    data["phone"] = value
+
+
+def _smoothr_email(data: dict, value: str) -> None:
+    data["email"] = value or None
+
+
+def _smoothr_asap(data: dict, value: str) -> None:
+    data["is_asap"] = value.lower() == "yes"
+
+
+def _smoothr_order_date(data: dict, value: str) -> None:
+    """ISO timestamp in UTC (2025-10-23T10:00:00.000Z) -> local delivery time."""
+    data["order_date_raw"] = value
+    try:
+        dt_local = datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(_SMOOTHR_TZ)
+    except ValueError as e:
+        logger.error(f"Failed to parse order date '{value}': {e}")
+        data["requested_delivery_time"] = None
+        return
+    data["order_datetime"] = dt_local
+    data["requested_delivery_time"] = dt_local.strftime("%H:%M")
+
+
+def _smoothr_note(data: dict, value: str) -> None:
+    if value and value.lower() != 'none':
+        data["note"] = value
+
+
+def _smoothr_payment(data: dict, value: str) -> None:
+    data["payment_method"] = value
+
+
+def _smoothr_amount(key: str, label: str, suffix: str = ""):
+    """Handler storing the number of an amount field ("2.00 €" -> "2.00" + suffix)."""
+    def handler(data: dict, value: str) -> None:
+        match = _SMOOTHR_AMOUNT_RE.match(value)
+        if match:
+            data[key] = match.group() + suffix
+        else:
+            logger.error(f"Failed to parse {label}: empty value")
+    return handler
+
+
+def _smoothr_products(data: dict, value: str) -> None:
+    """"Name x1 - Total: X €, Other x2 - Total: Y €" -> ["1 x Name", "2 x Other"] (display names)."""
+    from catalog import display_name  # Local: catalog imports utils
+
+    products = data["products"] = []
+    for part in value.split(','):
+        part = part.strip().rstrip('*').strip()
+        match = _SMOOTHR_PRODUCT_RE.match(part)
+        if not match:
+            continue  # No " x<qty>": not a product (e.g. empty list)
+        try:
+            qty_digits = _SMOOTHR_NON_DIGIT_RE.sub('', match.group(2))
+            qty = int(qty_digits) if qty_digits else 1
+            # Smoothr orders are always dean & david
+            products.append(f"{qty} x {display_name('dean & david', match.group(1).strip())}")
+        except Exception as e:
+            logger.error(f"Failed to parse product line '{part}': {e}")
+            products.append(part)
+
+
+_SMOOTHR_FIELDS = {
+    "Order": _smoothr_order,
+    "Customer": _smoothr_customer,
+    "Phone": _smoothr_phone,
+    "Email": _smoothr_email,
+    "ASAP": _smoothr_asap,
+    "Order Date": _smoothr_order_date,
+    "Customer Note": _smoothr_note,
+    "Payment method": _smoothr_payment,
+    "Tip": _smoothr_amount("tip", "tip"),
+    "Delivery Fee": _smoothr_amount("delivery_fee", "delivery fee"),
+    "Total Payment": _smoothr_amount("total", "total payment", "€"),
+    "Products": _smoothr_products,
+}
+
+
 def parse_smoothr_order(text: str) -> dict:
     """
     Parse Smoothr order message into STATE-compatible dictionary.
@@ -963,137 +952,25 @@ def parse_smoothr_order(text: str) -> dict:
     Raises:
         ValueError: If required fields are missing or parsing fails
     """
-    from zoneinfo import ZoneInfo
-    
-    lines = text.strip().split('\n')
     order_data = {}
-    
-    # DEBUG: Log all parsed lines
-    logger.debug(f"DEBUG PARSER - Total lines found: {len(lines)}")
-    for i, line in enumerate(lines):
-        logger.info(f"  Line {i}: '{line}'")
-    # Parse line by line
     address_lines = []
     in_address_block = False
     
-    for i, line in enumerate(lines):
+    for line in text.strip().split('\n'):
         line = line.strip()
-        
-        if line.startswith("- Order:"):
-            order_code = line.split(":", 1)[1].strip()
-            order_data["order_code"] = order_code
-            order_type, display_num = get_smoothr_order_type(order_code)
-            order_data["order_type"] = order_type
-            order_data["order_num"] = display_num
-            
-        elif line.startswith("- Customer:"):
-            order_data["customer_name"] = line.split(":", 1)[1].strip()
-            
-        elif line.startswith("- Address:"):
-            in_address_block = True
-            # Address is on following lines
-            
-        elif line.startswith("- Phone:"):
-            in_address_block = False
-            phone = line.split(":", 1)[1].strip()
-            order_data["phone"] = phone
-            
-        elif line.startswith("- Email:"):
-            email = line.split(":", 1)[1].strip()
-            order_data["email"] = email if email else None
-            
-        elif line.startswith("- ASAP:"):
-            asap_value = line.split(":", 1)[1].strip()
-            order_data["is_asap"] = asap_value.lower() == "yes"
-            
-        elif line.startswith("- Order Date:"):
-            order_date_str = line.split(":", 1)[1].strip()
-            order_data["order_date_raw"] = order_date_str
-            
-            # Parse ISO timestamp and convert UTC to local (+2h for Germany)
-            try:
-                # Parse: 2025-10-23T10:00:00.000Z
-                dt_utc = datetime.fromisoformat(order_date_str.replace('Z', '+00:00'))
-                # Convert to Europe/Berlin timezone (UTC+1 or UTC+2 depending on DST)
-                dt_local = dt_utc.astimezone(ZoneInfo("Europe/Berlin"))
-                order_data["order_datetime"] = dt_local
-                order_data["requested_delivery_time"] = dt_local.strftime("%H:%M")
-            except Exception as e:
-                logger.error(f"Failed to parse order date '{order_date_str}': {e}")
-                order_data["requested_delivery_time"] = None
-        
-        elif line.startswith("- Customer Note:"):
-            note_text = line.split(":", 1)[1].strip()
-            if note_text and note_text.lower() != 'none':
-                order_data["note"] = note_text
-        
-        elif line.startswith("- Payment method:"):
-            payment_text = line.split(":", 1)[1].strip()
-            order_data["payment_method"] = payment_text
-        
-        elif line.startswith("- Tip:"):
-            try:
-                tip_text = line.split(":", 1)[1].strip()
-                # Extract numeric value (e.g., "3.50 EUR" -> "3.50")
-                tip_amount = tip_text.split()[0]
-                order_data["tip"] = tip_amount
-            except Exception as e:
-                logger.error(f"Failed to parse tip '{line}': {e}")
-        
-        elif line.startswith("- Delivery Fee:"):
-            try:
-                fee_text = line.split(":", 1)[1].strip()
-                # Extract numeric value (e.g., "2.00 EUR" -> "2.00")
-                fee_amount = fee_text.split()[0]
-                order_data["delivery_fee"] = fee_amount
-            except Exception as e:
-                logger.error(f"Failed to parse delivery fee '{line}': {e}")
-        
-        elif line.startswith("- Total Payment:"):
-            logger.debug(f"DEBUG PARSER - Found Total Payment line: '{line}'")
-            try:
-                total_text = line.split(":", 1)[1].strip()
-                # Extract numeric value (e.g., "5.00 €" -> "5.00")
-                total_amount = total_text.split()[0]
-                order_data["total"] = f"{total_amount}€"
-                logger.debug(f"DEBUG PARSER - Extracted total: {order_data['total']}")
-            except Exception as e:
-                logger.error(f"Failed to parse total payment '{line}': {e}")
-        
-        elif line.startswith("- Products:"):
-            products_text = line.split(":", 1)[1].strip()
-            # Products format: "Product Name x1 - Total: X €, Another x2 - Total: Y €"
-            # Split by comma to get individual products
-            product_lines = [p.strip() for p in products_text.split(',') if p.strip()]
-            
-            order_data["products"] = []
-            for product_line in product_lines:
-                # Remove trailing * if present and strip
-                product_line = product_line.rstrip('*').strip()
-                
-                # Parse "Product Name xQty - Total: X €" format
-                if ' x' in product_line:
-                    try:
-                        # Split on ' x' to get product name and rest
-                        product_name, rest = product_line.split(' x', 1)
-                        product_name = product_name.strip()
-                        
-                        # Extract quantity (first chars before space or dash)
-                        qty_part = rest.strip().split()[0] if rest.strip() else "1"
-                        # Remove any non-digit suffix
-                        qty_str = ''.join(c for c in qty_part if c.isdigit())
-                        qty = int(qty_str) if qty_str else 1
-                        
-                        # Clean product name using existing function
-                        cleaned_name = clean_product_name(product_name)
-                        order_data["products"].append(f"{qty} x {cleaned_name}")
-                    except Exception as e:
-                        # If parsing fails, add as-is
-                        logger.error(f"Failed to parse product line '{product_line}': {e}")
-                        order_data["products"].append(product_line)
-                
-        elif in_address_block and line and not line.startswith("-"):
-            # Collect address lines until next field
+        if line.startswith("-"):
+            field, sep, value = line[2:].partition(":")
+            if not sep or line[1:2] != " ":
+                continue  # Not a "- Field:" line (and never an address line)
+            if field == "Address":
+                in_address_block = True  # Address is on following lines
+                continue
+            if field == "Phone":
+                in_address_block = False
+            handler = _SMOOTHR_FIELDS.get(field)
+            if handler:
+                handler(order_data, value.strip())
+        elif in_address_block and line:
             address_lines.append(line)
     
     # Process address lines
@@ -1103,16 +980,10 @@ def parse_smoothr_order(text: str) -> dict:
         
         # Last line usually has zip + city
         if len(address_lines) > 1:
-            last_line = address_lines[-1]
-            # Extract zip (5 digits)
-            zip_match = None
-            for part in last_line.split():
-                if part.isdigit() and len(part) == 5:
-                    zip_match = part
-                    break
-            order_data["zip"] = zip_match if zip_match else "94032"  # Default Passau zip
+            zip_match = _SMOOTHR_ZIP_RE.search(address_lines[-1])
+            order_data["zip"] = zip_match.group() if zip_match else SMOOTHR_DEFAULT_ZIP
         else:
-            order_data["zip"] = "94032"
+            order_data["zip"] = SMOOTHR_DEFAULT_ZIP
         
         # Full address for Google Maps
         order_data["full_address"] = ", ".join(address_lines)
@@ -1133,7 +1004,7 @@ def parse_smoothr_order(text: str) -> dict:
             "phone": order_data["phone"],
             "email": order_data.get("email"),
             "address": order_data.get("street", ""),
-            "zip": order_data.get("zip", "94032"),
+            "zip": order_data.get("zip", SMOOTHR_DEFAULT_ZIP),
             "original_address": order_data.get("full_address", "")
         },
         "is_asap": order_data["is_asap"],